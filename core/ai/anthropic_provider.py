@@ -2,7 +2,7 @@
 ------------------------------------------------------------------------------
 Project:        KPaperFlux
 File:           core/ai/anthropic_provider.py
-Version:        2.0.0
+Version:        2.1.0
 Producer:       thorsten.schnebeck@gmx.net
 Generator:      Claude Sonnet 4.6
 Description:    AI provider implementation for Anthropic Claude API.
@@ -15,6 +15,7 @@ import requests
 from typing import Any, Dict, List, Optional
 
 from core.ai.base import AIProvider
+from core.utils.page_raster import ImageBudget
 from core.logger import get_logger
 
 logger = get_logger("ai.anthropic")
@@ -25,11 +26,12 @@ class AnthropicProvider(AIProvider):
 
     API_URL: str = "https://api.anthropic.com/v1/messages"
     API_VERSION: str = "2023-06-01"
+    # Images beyond 1568 px on the long edge are downscaled server-side; 5 MB hard limit per image
+    IMAGE_BUDGET: ImageBudget = ImageBudget(max_bytes=1_500_000, max_edge=1568)
 
     def __init__(self, api_key: str, model_name: str = "claude-sonnet-4-6") -> None:
         self.api_key = api_key
         self.model_name = model_name
-        self._delay: float = 0.0
         if not self.api_key:
             logger.warning("Missing API key. Anthropic Provider will be inactive.")
 
@@ -81,7 +83,7 @@ class AnthropicProvider(AIProvider):
                         "type": "image",
                         "source": {
                             "type": "base64",
-                            "media_type": "image/png",
+                            "media_type": img.get("mime_type", "image/png"),
                             "data": img["base64"],
                         },
                     })
@@ -102,8 +104,10 @@ class AnthropicProvider(AIProvider):
         }
 
         try:
-            resp = requests.post(self.API_URL, headers=headers, json=payload, timeout=120)
-            if resp.status_code == 200:
+            resp = self._post(self.API_URL, prompt, images, stage_label, headers=headers, json=payload, timeout=120)
+            if resp is None:
+                logger.error(f"Anthropic request [{stage_label}] stayed rate limited")
+            elif resp.status_code == 200:
                 result = resp.json()
                 content = "{" + result["content"][0]["text"]
 
@@ -123,3 +127,7 @@ class AnthropicProvider(AIProvider):
 
         return None
 
+    def usage_tokens(self, data: Dict[str, Any]) -> Optional[int]:
+        """Anthropic reports usage.input_tokens and usage.output_tokens."""
+        usage = data.get("usage") or {}
+        return self._token_sum(usage.get("input_tokens"), usage.get("output_tokens"))
@@ -1,10 +1,27 @@
-
-from typing import Any, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
 from abc import ABC, abstractmethod
 
+import requests
+
+from core.ai.executor import AIRequestExecutor, RateLimitError, retry_after_seconds
+from core.utils.page_raster import DEFAULT_IMAGE_BUDGET, ImageBudget
+
+T = TypeVar("T")
+
+# Rough token cost of one attached page image (used for the tokens/minute budget)
+IMAGE_TOKEN_ESTIMATE: int = 258
+
+
 class AIProvider(ABC):
     """Abstract base class for all AI backends (Gemini, Ollama, etc.)."""
-    
+
+    # Shared request executor (concurrency, rate limits, 429 backoff). AIClient
+    # assigns the configured one; otherwise a per-backend default is used.
+    executor: Optional[AIRequestExecutor] = None
+
+    # Limits for page images in vision requests (see core/utils/page_raster.py)
+    IMAGE_BUDGET: ImageBudget = DEFAULT_IMAGE_BUDGET
+
     @abstractmethod
     def list_models(self) -> List[str]:
         """Returns available models."""
@@ -15,6 +32,84 @@ class AIProvider(ABC):
         """Executes a structured JSON fallback request."""
         pass
 
+    def get_executor(self) -> AIRequestExecutor:
+        """Returns the request executor this provider runs its API calls on."""
+        if self.executor is None:
+            self.executor = AIRequestExecutor.shared(type(self).__name__)
+        return self.executor
+
+    def _submit(self, request: Callable[[], T], prompt: str = "", images: Optional[Any] = None,
+                stage_label: str = "AI REQUEST", usage: Optional[Callable[[T], Optional[int]]] = None) -> Optional[T]:
+        """
+        Runs one API call on the shared executor.
+
+        Args:
+            request: Performs the call; raises RateLimitError on HTTP 429.
+            prompt: Prompt text, used to estimate the token cost.
+            images: Attached images, used to estimate the token cost.
+            stage_label: Label for logging.
+            usage: Returns the token usage the backend reported for the
+                   call's result, which replaces the estimate.
+
+        Returns:
+            The call's result, or None if it stayed rate limited.
+        """
+        return self.get_executor().submit(
+            request, tokens=self.estimate_tokens(prompt, images), label=stage_label, usage=usage
+        )
+
+    def _post(self, url: str, prompt: str = "", images: Optional[Any] = None,
+              stage_label: str = "AI REQUEST", **kwargs: Any) -> Optional[requests.Response]:
+        """
+        POSTs to an HTTP API on the shared executor. HTTP 429 answers are
+        retried with backoff (honouring Retry-After).
+
+        Returns:
+            The response, or None if it stayed rate limited.
+        """
+        def request() -> requests.Response:
+            resp = requests.post(url, **kwargs)
+            if resp.status_code == 429:
+                raise RateLimitError(f"HTTP 429 from {url}", retry_after_seconds(resp.headers))
+            return resp
+
+        return self._submit(request, prompt, images, stage_label, usage=self._response_usage)
+
+    def _response_usage(self, resp: requests.Response) -> Optional[int]:
+        """Returns the token usage reported in a successful HTTP response, if any."""
+        if resp.status_code != 200:
+            return None
+        try:
+            data = resp.json()
+        except ValueError:
+            return None
+        return self.usage_tokens(data) if isinstance(data, dict) else None
+
+    def usage_tokens(self, data: Dict[str, Any]) -> Optional[int]:
+        """
+        Extracts the total token usage (input and output) from a decoded
+        response body. Backends that report usage override this.
+
+        Args:
+            data: The decoded JSON response.
+
+        Returns:
+            The token count, or None if the response does not report it.
+        """
+        return None
+
+    @staticmethod
+    def _token_sum(*counts: Any) -> Optional[int]:
+        """Sums the reported token counts, None if none was reported."""
+        reported = [c for c in counts if isinstance(c, int)]
+        return sum(reported) if reported else None
+
+    @staticmethod
+    def estimate_tokens(prompt: str, images: Optional[Any] = None) -> int:
+        """Rough input token estimate (4 characters per token plus a flat cost per image)."""
+        image_count = len(images) if isinstance(images, list) else int(bool(images))
+        return len(prompt) // 4 + image_count * IMAGE_TOKEN_ESTIMATE
+
     def get_adaptive_delay(self) -> float:
-        """Returns current rate-limit delay. Subclasses may override."""
-        return getattr(self, '_delay', 0.0)
+        """Returns the current rate-limit pacing delay of the shared executor."""
+        return self.get_executor().adaptive_delay
@@ -2,18 +2,24 @@
 ------------------------------------------------------------------------------
 Project:        KPaperFlux
 File:           core/ai/client.py
-Version:        2.0.0
+Version:        2.3.0
 Producer:       thorsten.schnebeck@gmx.net
 Generator:      Claude Sonnet 4.6
 Description:    Dispatcher that selects and instantiates the correct AI backend
-                provider (Gemini, Ollama, OpenAI, Anthropic) based on config.
+                provider (Gemini, Ollama, OpenAI, Anthropic) based on config
+                and attaches the shared request executor of that backend.
+                JSON responses are served from the persistent response cache
+                when provider, model, prompt and images are unchanged and
+                the response passed the caller's validation.
 ------------------------------------------------------------------------------
 """
 
-from typing import Any, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 
 from core.config import AppConfig
 from core.ai.base import AIProvider
+from core.ai.executor import AIRequestExecutor
+from core.ai.response_cache import AIResponseCache
 from core.ai.gemini_provider import GeminiProvider
 from core.ai.ollama_provider import OllamaProvider
 from core.ai.openai_provider import OpenAIProvider
@@ -32,6 +38,7 @@ class AIClient:
     def __init__(self, api_key: str = None, model_name: str = None) -> None:
         self.config = AppConfig()
         provider_type = self.config.get_ai_provider()
+        self.provider_type: str = provider_type
 
         if provider_type == "ollama":
             url = self.config.get_ollama_url()
@@ -54,11 +61,72 @@ class AIClient:
             logger.info(f"Using AI Provider: Gemini ({model})")
             self.provider: AIProvider = GeminiProvider(key, model)
 
+        # All clients of a backend (pipeline workers, every stage) share one
+        # executor, so concurrency and rate limits apply process-wide.
+        executor = AIRequestExecutor.shared(provider_type)
+        executor.configure(
+            self.config.get_ai_max_in_flight(),
+            self.config.get_ai_requests_per_minute(),
+            self.config.get_ai_tokens_per_minute()
+        )
+        self.provider.executor = executor
+
+        max_cache_bytes = self.config.get_ai_cache_max_bytes()
+        self.response_cache: Optional[AIResponseCache] = None
+        if max_cache_bytes > 0:
+            try:
+                self.response_cache = AIResponseCache.shared(self.config.get_ai_cache_path(), max_cache_bytes)
+            except Exception as e:
+                logger.warning(f"AI response cache unavailable: {e}")
+        self.cache_excluded_stages = [s.upper() for s in self.config.get_ai_cache_excluded_stages()]
+
     def list_models(self) -> List[str]:
         return self.provider.list_models()
 
-    def generate_json(self, prompt: str, stage_label: str = "AI REQUEST", images: Optional[Any] = None) -> Optional[Any]:
-        return self.provider.generate_json(prompt, stage_label, images)
+    def generate_json(self, prompt: str, stage_label: str = "AI REQUEST", images: Optional[Any] = None,
+                      use_cache: bool = True, validate: Optional[Callable[[Any], bool]] = None) -> Optional[Any]:
+        """
+        Runs a JSON request, answering repeated requests from the response cache.
+
+        Args:
+            prompt: Full prompt text.
+            stage_label: Stage label (logging, cache statistics and opt-out).
+            images: Optional page images.
+            use_cache: False forces a fresh request (the response is still stored).
+            validate: Optional check of the response. Only accepted responses
+                      are stored, and cached responses it rejects are discarded
+                      and requested again.
+
+        Returns:
+            The decoded JSON response, or None.
+        """
+        cache_key = self._cache_key(prompt, stage_label, images)
+        if cache_key and use_cache:
+            cached = self.response_cache.get(cache_key, stage_label)
+            if cached is not None:
+                if validate is None or validate(cached):
+                    logger.debug(f"[{stage_label}] Served from AI response cache")
+                    return cached
+                self.response_cache.discard(cache_key, stage_label)
+
+        result = self.provider.generate_json(prompt, stage_label, images)
+        if cache_key and result is not None and (validate is None or validate(result)):
+            self.response_cache.put(cache_key, result, stage_label)
+        return result
+
+    def _cache_key(self, prompt: str, stage_label: str, images: Optional[Any]) -> Optional[str]:
+        """Returns the response cache key, or None if the request is not cacheable."""
+        if self.response_cache is None:
+            return None
+        label = stage_label.upper()
+        if any(label.startswith(stage) for stage in self.cache_excluded_stages):
+            return None
+        model = getattr(self.provider, "model_name", "")
+        return AIResponseCache.make_key(self.provider_type, model, prompt, images)
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Returns hit/miss statistics of the response cache (empty if disabled)."""
+        return self.response_cache.stats() if self.response_cache else {}
 
     def get_adaptive_delay(self) -> float:
         return self.provider.get_adaptive_delay()
@@ -0,0 +1,237 @@
+"""
+------------------------------------------------------------------------------
+Project:        KPaperFlux
+File:           core/ai/executor.py
+Version:        1.0.0
+Producer:       thorsten.schnebeck@gmx.net
+Generator:      Antigravity
+Description:    Provider-agnostic, thread-safe AI request executor. Caps the
+                number of in-flight requests, paces requests and tokens per
+                minute with token buckets and backs off on rate limits (429)
+                with a cooldown shared by all threads.
+------------------------------------------------------------------------------
+"""
+
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional, TypeVar
+
+from core.logger import get_logger
+
+logger = get_logger("ai.executor")
+
+T = TypeVar("T")
+
+
+class RateLimitError(Exception):
+    """Raised by a request callable when the backend answered with a rate limit (HTTP 429)."""
+
+    def __init__(self, message: str = "Rate limited", retry_after: Optional[float] = None) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously up to its capacity (one minute worth
+    of tokens). Consumers may overdraw; the debt delays later consumers.
+    """
+
+    def __init__(self, per_minute: float) -> None:
+        self.per_minute = per_minute
+        self._tokens = float(per_minute)
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        """
+        Takes amount tokens.
+
+        Args:
+            amount: Tokens to take (capped at the capacity).
+
+        Returns:
+            Seconds the caller has to wait before its request may start.
+        """
+        with self._lock:
+            now = time.monotonic()
+            rate = self.per_minute / 60.0
+            self._tokens = min(float(self.per_minute), self._tokens + (now - self._stamp) * rate)
+            self._stamp = now
+            self._tokens -= min(amount, self.per_minute)
+            return 0.0 if self._tokens >= 0 else -self._tokens / rate
+
+    def adjust(self, amount: float) -> None:
+        """Corrects an earlier reservation by amount tokens (negative: refund)."""
+        with self._lock:
+            self._tokens = min(float(self.per_minute), self._tokens - amount)
+
+
+class AIRequestExecutor:
+    """
+    Runs AI requests under shared limits. One executor per backend is
+    shared by all AIClient instances (see shared()), so parallel pipeline
+    workers and all stages draw from the same budget.
+
+    Requests are callables that perform one API call. They signal a rate
+    limit by raising RateLimitError; the executor then sets a cooldown for
+    all threads, raises the adaptive delay and retries. Other exceptions
+    propagate to the caller.
+    """
+
+    MAX_RETRIES: int = 5
+    MAX_ADAPTIVE_DELAY: float = 256.0
+
+    _shared: Dict[str, "AIRequestExecutor"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(
+        self,
+        max_in_flight: int = 4,
+        requests_per_minute: int = 0,
+        tokens_per_minute: int = 0,
+        max_retries: int = MAX_RETRIES
+    ) -> None:
+        """
+        Args:
+            max_in_flight: Maximum number of concurrently running requests.
+            requests_per_minute: Request budget (0: unlimited).
+            tokens_per_minute: Token budget (0: unlimited).
+            max_retries: Attempts per request on rate limits.
+        """
+        self.max_retries = max_retries
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._cooldown_until = 0.0  # time.monotonic()
+        self._next_start = 0.0  # time.monotonic(), adaptive pacing
+        self.adaptive_delay = 0.0
+        self.configure(max_in_flight, requests_per_minute, tokens_per_minute)
+
+    @classmethod
+    def shared(cls, name: str) -> "AIRequestExecutor":
+        """
+        Returns the executor shared by all users of a backend, created with
+        default limits on first use.
+
+        Args:
+            name: Backend identifier (e.g. 'gemini').
+        """
+        with cls._shared_lock:
+            executor = cls._shared.get(name)
+            if executor is None:
+                executor = cls._shared[name] = cls()
+            return executor
+
+    def configure(self, max_in_flight: int, requests_per_minute: int = 0, tokens_per_minute: int = 0) -> None:
+        """
+        Applies new limits. Running requests are not affected.
+
+        Args:
+            max_in_flight: Maximum number of concurrently running requests.
+            requests_per_minute: Request budget (0: unlimited).
+            tokens_per_minute: Token budget (0: unlimited).
+        """
+        with self._cond:
+            self.max_in_flight = max(1, int(max_in_flight))
+            if requests_per_minute > 0:
+                current = getattr(self, "_requests", None)
+                if current is None or current.per_minute != requests_per_minute:
+                    self._requests: Optional[TokenBucket] = TokenBucket(requests_per_minute)
+            else:
+                self._requests = None
+            if tokens_per_minute > 0:
+                current = getattr(self, "_tokens", None)
+                if current is None or current.per_minute != tokens_per_minute:
+                    self._tokens: Optional[TokenBucket] = TokenBucket(tokens_per_minute)
+            else:
+                self._tokens = None
+            self._cond.notify_all()
+
+    @property
+    def in_flight(self) -> int:
+        """Number of currently running requests."""
+        return self._in_flight
+
+    def submit(
+        self,
+        request: Callable[[], T],
+        tokens: int = 0,
+        label: str = "AI REQUEST",
+        usage: Optional[Callable[[T], Optional[int]]] = None
+    ) -> Optional[T]:
+        """
+        Runs a request once the limits allow it, retrying on rate limits.
+
+        Args:
+            request: Performs the API call; raises RateLimitError on 429.
+            tokens: Estimated token cost, taken from the token budget.
+            label: Request label for logging.
+            usage: Optionally returns the actual token cost of a response,
+                   used to correct the estimate.
+
+        Returns:
+            The request's result, or None if it stayed rate limited.
+        """
+        for attempt in range(self.max_retries):
+            self._wait_for_slot(tokens)
+            with self._cond:
+                while self._in_flight >= self.max_in_flight:
+                    self._cond.wait()
+                self._in_flight += 1
+            try:
+                result = request()
+            except RateLimitError as e:
+                self._on_rate_limit(attempt, e.retry_after, label)
+                continue
+            finally:
+                with self._cond:
+                    self._in_flight -= 1
+                    self._cond.notify()
+
+            self._on_success()
+            if usage is not None and self._tokens is not None:
+                actual = usage(result)
+                if actual is not None:
+                    self._tokens.adjust(actual - tokens)
+            return result
+
+        logger.warning(f"[{label}] Still rate limited after {self.max_retries} attempts")
+        return None
+
+    def _wait_for_slot(self, tokens: int) -> None:
+        """Blocks for the cooldown, the adaptive pacing and the request/token budgets."""
+        with self._cond:
+            now = time.monotonic()
+            start = max(now, self._cooldown_until, self._next_start)
+            self._next_start = start + self.adaptive_delay
+            requests, token_bucket = self._requests, self._tokens
+        wait = start - now
+        if requests is not None:
+            wait = max(wait, requests.reserve(1))
+        if token_bucket is not None and tokens > 0:
+            wait = max(wait, token_bucket.reserve(tokens))
+        if wait > 0:
+            time.sleep(wait)
+
+    def _on_rate_limit(self, attempt: int, retry_after: Optional[float], label: str) -> None:
+        with self._cond:
+            self.adaptive_delay = min(self.MAX_ADAPTIVE_DELAY, max(2.0, self.adaptive_delay * 2.0))
+            delay = max(2 * (2 ** attempt) + random.uniform(0, 1), self.adaptive_delay, retry_after or 0.0)
+            self._cooldown_until = max(self._cooldown_until, time.monotonic() + delay)
+        logger.info(f"[{label}] Rate limited (attempt {attempt + 1}/{self.max_retries}), cooling down {delay:.1f}s")
+
+    def _on_success(self) -> None:
+        with self._cond:
+            if self.adaptive_delay > 0:
+                self.adaptive_delay *= 0.5
+                if self.adaptive_delay < 0.2:
+                    self.adaptive_delay = 0.0
+
+
+def retry_after_seconds(headers: Optional[Dict[str, str]]) -> Optional[float]:
+    """Parses a numeric Retry-After header, if present."""
+    try:
+        return float((headers or {}).get("retry-after"))
+    except (TypeError, ValueError):
+        return None
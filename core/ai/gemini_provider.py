@@ -1,9 +1,7 @@
 
 import base64
-import datetime
 import json
 import logging
-import random
 import re
 import time
 from typing import Any, List, Optional, Set, Tuple
@@ -12,6 +10,8 @@ from google import genai
 from google.genai import types
 
 from core.ai.base import AIProvider
+from core.utils.page_raster import ImageBudget
+from core.ai.executor import RateLimitError
 from core.logger import get_logger, log_ai_interaction
 
 logger = get_logger("ai.gemini")
@@ -20,8 +20,8 @@ class GeminiProvider(AIProvider):
     """Low-level Gemini API client (Cloud AI)."""
 
     MAX_RETRIES: int = 5
-    _cooldown_until: Optional[datetime.datetime] = None
-    _adaptive_delay: float = 0.0
+    # Images are billed per 768 px tile; 3 x 3 tiles keep an A4 page legible
+    IMAGE_BUDGET: ImageBudget = ImageBudget(max_bytes=2_000_000, max_edge=2304)
 
     def __init__(self, api_key: str, model_name: str = "gemini-2.5-flash") -> None:
         self.api_key: str = api_key
@@ -94,7 +94,7 @@ class GeminiProvider(AIProvider):
             for img in image_list:
                 if isinstance(img, dict) and "base64" in img:
                     img_bytes = base64.b64decode(img["base64"])
-                    contents.append(types.Part.from_bytes(data=img_bytes, mime_type="image/png"))
+                    contents.append(types.Part.from_bytes(data=img_bytes, mime_type=img.get("mime_type", "image/png")))
                 else:
                     contents.append(img)  # already a types.Part (backwards compat)
 
@@ -108,7 +108,7 @@ class GeminiProvider(AIProvider):
             )
         }
 
-        response = self._execute_generate(full_payload)
+        response = self._execute_generate(full_payload, stage_label)
         if not response or not response.candidates:
             return None, "No response from API"
 
@@ -191,52 +191,47 @@ class GeminiProvider(AIProvider):
             
         return None, "JSON parsing failed"
 
-    def _execute_generate(self, contents: Any) -> Optional[Any]:
+    def _execute_generate(self, contents: Any, stage_label: str = "AI REQUEST") -> Optional[Any]:
+        """
+        Runs generate_content on the shared request executor, which handles
+        concurrency, rate limits and 429 backoff. Other errors are retried
+        after a short pause.
+        """
         if not self.client: return None
-        if GeminiProvider._adaptive_delay > 0:
-            time.sleep(GeminiProvider._adaptive_delay)
+        req_config = None
+        call_contents = contents
+        if isinstance(contents, dict) and "config" in contents:
+            req_config = contents["config"]
+            call_contents = contents["contents"]
 
-        for attempt in range(self.MAX_RETRIES):
-            self._wait_for_cooldown()
-            try:
-                req_config = None
-                call_contents = contents
-                if isinstance(contents, dict) and "config" in contents:
-                    req_config = contents["config"]
-                    call_contents = contents["contents"]
+        parts = call_contents if isinstance(call_contents, list) else [call_contents]
+        prompt = "".join(p for p in parts if isinstance(p, str))
+        images = [p for p in parts if not isinstance(p, str)]
 
-                response = self.client.models.generate_content(
+        def request() -> Any:
+            try:
+                return self.client.models.generate_content(
                     model=self.model_name,
                     contents=call_contents,
                     config=req_config
                 )
-                if GeminiProvider._adaptive_delay > 0:
-                    GeminiProvider._adaptive_delay *= 0.5
-                    if GeminiProvider._adaptive_delay < 0.2:
-                        GeminiProvider._adaptive_delay = 0.0
-                return response
             except Exception as e:
                 if self._is_rate_limit_error(e):
-                    self._handle_rate_limit(attempt)
-                    continue
+                    raise RateLimitError(str(e)) from e
+                raise
+
+        for attempt in range(self.MAX_RETRIES):
+            try:
+                return self._submit(request, prompt, images, stage_label, usage=self._generation_usage)
+            except Exception as e:
+                logger.warning(f"[{stage_label}] Gemini request failed (attempt {attempt + 1}/{self.MAX_RETRIES}): {e}")
                 time.sleep(1)
         return None
 
+    def _generation_usage(self, response: Any) -> Optional[int]:
+        """Total token count of a generate_content response (usage_metadata)."""
+        metadata = getattr(response, "usage_metadata", None)
+        return self._token_sum(getattr(metadata, "total_token_count", None))
+
     def _is_rate_limit_error(self, e: Exception) -> bool:
         return hasattr(e, "code") and e.code == 429 or "RESOURCE_EXHAUSTED" in str(e)
-
-    def _handle_rate_limit(self, attempt: int) -> None:
-        new_delay = max(2.0, GeminiProvider._adaptive_delay * 2.0)
-        GeminiProvider._adaptive_delay = min(256.0, new_delay)
-        delay = max(2 * (2 ** attempt) + random.uniform(0, 1), GeminiProvider._adaptive_delay)
-        GeminiProvider._cooldown_until = datetime.datetime.now() + datetime.timedelta(seconds=delay)
-
-    def _wait_for_cooldown(self) -> None:
-        if GeminiProvider._cooldown_until and GeminiProvider._cooldown_until > datetime.datetime.now():
-            wait_time = (GeminiProvider._cooldown_until - datetime.datetime.now()).total_seconds()
-            if wait_time > 0: time.sleep(wait_time)
-        GeminiProvider._cooldown_until = None
-
-    @classmethod
-    def get_adaptive_delay(cls) -> float:
-        return GeminiProvider._adaptive_delay
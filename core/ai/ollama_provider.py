@@ -2,7 +2,7 @@
 import json
 import logging
 import requests
-from typing import Any, List, Optional
+from typing import Any, Dict, List, Optional
 from core.ai.base import AIProvider
 from core.logger import get_logger, log_ai_interaction
 
@@ -14,7 +14,6 @@ class OllamaProvider(AIProvider):
     def __init__(self, url: str, model_name: str = "llama3") -> None:
         self.url = url.rstrip("/")
         self.model_name = model_name
-        self._delay = 0.0
 
     def list_models(self) -> List[str]:
         """Fetches models from local Ollama instance."""
@@ -46,8 +45,10 @@ class OllamaProvider(AIProvider):
         }
 
         try:
-            resp = requests.post(f"{self.url}/api/generate", json=payload, timeout=60)
-            if resp.status_code == 200:
+            resp = self._post(f"{self.url}/api/generate", prompt, None, stage_label, json=payload, timeout=60)
+            if resp is None:
+                logger.error(f"Ollama request [{stage_label}] stayed rate limited")
+            elif resp.status_code == 200:
                 result = resp.json()
                 response_text = result.get("response", "")
                 if not response_text:
@@ -67,3 +68,6 @@ class OllamaProvider(AIProvider):
             
         return None
 
+    def usage_tokens(self, data: Dict[str, Any]) -> Optional[int]:
+        """Ollama reports prompt_eval_count and eval_count."""
+        return self._token_sum(data.get("prompt_eval_count"), data.get("eval_count"))
@@ -1,7 +1,7 @@
 
 import json
 import requests
-from typing import Any, List, Optional
+from typing import Any, Dict, List, Optional
 from core.ai.base import AIProvider
 from core.logger import get_logger
 
@@ -13,7 +13,6 @@ class OpenAIProvider(AIProvider):
     def __init__(self, api_key: str, model_name: str = "gpt-4o") -> None:
         self.api_key = api_key
         self.model_name = model_name
-        self._delay = 0.0
 
     def list_models(self) -> List[str]:
         """Fetches models from OpenAI."""
@@ -53,8 +52,11 @@ class OpenAIProvider(AIProvider):
         }
 
         try:
-            resp = requests.post("https://api.openai.com/v1/chat/completions", headers=headers, json=payload, timeout=60)
-            if resp.status_code == 200:
+            resp = self._post("https://api.openai.com/v1/chat/completions", prompt, None, stage_label,
+                              headers=headers, json=payload, timeout=60)
+            if resp is None:
+                logger.error(f"OpenAI request [{stage_label}] stayed rate limited")
+            elif resp.status_code == 200:
                 result = resp.json()
                 content = result["choices"][0]["message"]["content"]
                 return json.loads(content)
@@ -65,3 +67,6 @@ class OpenAIProvider(AIProvider):
             
         return None
 
+    def usage_tokens(self, data: Dict[str, Any]) -> Optional[int]:
+        """OpenAI reports usage.total_tokens."""
+        return self._token_sum((data.get("usage") or {}).get("total_tokens"))
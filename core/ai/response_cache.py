@@ -0,0 +1,240 @@
+"""
+------------------------------------------------------------------------------
+Project:        KPaperFlux
+File:           core/ai/response_cache.py
+Version:        1.1.0
+Producer:       thorsten.schnebeck@gmx.net
+Generator:      Antigravity
+Description:    Persistent, content-addressed cache of AI JSON responses.
+                Entries are keyed by provider, model, prompt and attached
+                page images, live in a local SQLite file, are evicted
+                LRU-first beyond a size bound and keep hit/miss statistics.
+------------------------------------------------------------------------------
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from core.logger import get_logger
+
+logger = get_logger("ai.cache")
+
+
+class AIResponseCache:
+    """
+    Thread-safe response cache backed by its own SQLite file. One instance
+    per file is shared by all AIClient instances (see shared()).
+    """
+
+    _shared: Dict[str, "AIResponseCache"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path: Union[str, Path], max_bytes: int) -> None:
+        """
+        Args:
+            path: The SQLite file (or ':memory:').
+            max_bytes: Size bound of all cached responses.
+        """
+        self.max_bytes = max_bytes
+        self.hits: Counter = Counter()  # Per stage label
+        self.misses: Counter = Counter()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS ai_response_cache (
+                cache_key TEXT PRIMARY KEY,
+                stage TEXT,
+                response TEXT NOT NULL,
+                byte_size INTEGER NOT NULL,
+                created_at TEXT,
+                last_used_at TEXT
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_ai_response_cache_lru ON ai_response_cache(last_used_at)")
+        self._conn.commit()
+
+    @classmethod
+    def shared(cls, path: Union[str, Path], max_bytes: int) -> "AIResponseCache":
+        """
+        Returns the cache instance of a file, applying the current size bound.
+
+        Args:
+            path: The SQLite file.
+            max_bytes: Size bound of all cached responses.
+        """
+        with cls._shared_lock:
+            cache = cls._shared.get(str(path))
+            if cache is None:
+                cache = cls._shared[str(path)] = cls(path, max_bytes)
+            cache.max_bytes = max_bytes
+            return cache
+
+    @staticmethod
+    def make_key(provider: str, model: str, prompt: str, images: Optional[Any] = None) -> Optional[str]:
+        """
+        Builds the cache key of a request.
+
+        Args:
+            provider: Provider identifier (e.g. 'gemini').
+            model: Model name.
+            prompt: Full prompt text.
+            images: Attached images (dicts with 'base64', raw bytes, PIL images
+                    or interleaved text parts).
+
+        Returns:
+            A hex digest, or None if an attachment cannot be fingerprinted.
+        """
+        image_hashes: List[str] = []
+        for img in (images if isinstance(images, list) else [images] if images else []):
+            if isinstance(img, dict) and "base64" in img:
+                data = img["base64"].encode("ascii") if isinstance(img["base64"], str) else img["base64"]
+            elif isinstance(img, (bytes, bytearray)):
+                data = bytes(img)
+            elif isinstance(img, str):  # Interleaved text part
+                data = img.encode("utf-8")
+            elif hasattr(img, "tobytes") and hasattr(img, "mode"):  # PIL image
+                data = f"{img.mode}{img.size}".encode("ascii") + img.tobytes()
+            else:
+                return None
+            image_hashes.append(hashlib.sha256(data).hexdigest())
+
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        payload = json.dumps([provider, model, prompt_hash, image_hashes])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, cache_key: str, stage: str = "") -> Optional[Any]:
+        """
+        Looks up a cached response and marks it as recently used.
+
+        Args:
+            cache_key: Key from make_key().
+            stage: Stage label, for the statistics.
+
+        Returns:
+            The decoded JSON response, or None on a miss.
+        """
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT response FROM ai_response_cache WHERE cache_key = ?", (cache_key,)
+                ).fetchone()
+                if row is None:
+                    self.misses[stage] += 1
+                    return None
+                self._conn.execute(
+                    "UPDATE ai_response_cache SET last_used_at = ? WHERE cache_key = ?",
+                    (datetime.now().isoformat(), cache_key),
+                )
+                self._conn.commit()
+                self.hits[stage] += 1
+            return json.loads(row[0])
+        except (sqlite3.Error, json.JSONDecodeError) as e:
+            logger.error(f"AI cache lookup error for {cache_key}: {e}")
+            return None
+
+    def put(self, cache_key: str, response: Any, stage: str = "") -> bool:
+        """
+        Stores a response and evicts least recently used entries until the
+        cache fits into max_bytes.
+
+        Args:
+            cache_key: Key from make_key().
+            response: The decoded JSON response.
+            stage: Stage label of the request.
+
+        Returns:
+            True if the response was stored.
+        """
+        text = json.dumps(response)
+        byte_size = len(text.encode("utf-8"))
+        if byte_size > self.max_bytes:
+            return False
+
+        now = datetime.now().isoformat()
+        try:
+            with self._lock:
+                self._conn.execute(
+                    """
+                    INSERT OR REPLACE INTO ai_response_cache
+                        (cache_key, stage, response, byte_size, created_at, last_used_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    """,
+                    (cache_key, stage, text, byte_size, now, now),
+                )
+                self._evict()
+                self._conn.commit()
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"AI cache save error for {cache_key}: {e}")
+            return False
+
+    def discard(self, cache_key: str, stage: str = "") -> None:
+        """
+        Deletes a response the caller rejected after get() and counts the
+        lookup as a miss.
+
+        Args:
+            cache_key: Key from make_key().
+            stage: Stage label of the lookup.
+        """
+        try:
+            with self._lock:
+                self._conn.execute("DELETE FROM ai_response_cache WHERE cache_key = ?", (cache_key,))
+                self._conn.commit()
+                if self.hits[stage] > 0:
+                    self.hits[stage] -= 1
+                self.misses[stage] += 1
+        except sqlite3.Error as e:
+            logger.error(f"AI cache discard error for {cache_key}: {e}")
+
+    def _evict(self) -> None:
+        """Deletes least recently used entries until the total size fits."""
+        total = self._conn.execute("SELECT COALESCE(SUM(byte_size), 0) FROM ai_response_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        evicted = []
+        rows = self._conn.execute("SELECT cache_key, byte_size FROM ai_response_cache ORDER BY last_used_at ASC")
+        for key, size in rows.fetchall():
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM ai_response_cache WHERE cache_key = ?", evicted)
+        logger.info(f"AI cache: evicted {len(evicted)} entries")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the cache statistics of this session.
+
+        Returns:
+            Dict with 'hits', 'misses', 'entries', 'bytes' and per-stage
+            'stages' {label: {'hits': n, 'misses': n}}.
+        """
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(byte_size), 0) FROM ai_response_cache"
+            ).fetchone()
+            stages = {
+                label: {"hits": self.hits[label], "misses": self.misses[label]}
+                for label in sorted(set(self.hits) | set(self.misses))
+            }
+            return {
+                "hits": sum(self.hits.values()),
+                "misses": sum(self.misses.values()),
+                "entries": entries,
+                "bytes": size,
+                "stages": stages,
+            }
+
+    def clear(self) -> None:
+        """Deletes all cached responses."""
+        with self._lock:
+            self._conn.execute("DELETE FROM ai_response_cache")
+            self._conn.commit()
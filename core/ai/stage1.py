@@ -2,7 +2,7 @@
 ------------------------------------------------------------------------------
 Project:        KPaperFlux
 File:           core/ai/stage1.py
-Version:        2.0.0
+Version:        2.0.1
 Producer:       thorsten.schnebeck@gmx.net
 Generator:      Antigravity
 Description:    Stage 1 Processor (Classification & Segmentation).
@@ -135,7 +135,11 @@ class Stage1Processor:
         try:
             max_retries = self.config.get_ai_retries()
             attempt = 0
-            result = self.client.generate_json(prompt_str, stage_label="Stage 1.1 (Classification)")
+            # Only responses that pass validation may be served from the cache
+            def is_valid(res: Any) -> bool:
+                return bool(res) and not self.validate_classification(res, pages_text, private_id, business_id)
+
+            result = self.client.generate_json(prompt_str, stage_label="Stage 1.1 (Classification)", validate=is_valid)
 
             while attempt < max_retries:
                 if not result:
@@ -155,7 +159,7 @@ class Stage1Processor:
                 )
                 
                 prompt_with_history = prompt_str + f"\n\n### PREVIOUS ATTEMPT ###\n{json.dumps(result)}\n\n{correction_prompt}"
-                result = self.client.generate_json(prompt_with_history, stage_label=f"STAGE 1.1 CORRECTION {attempt}")
+                result = self.client.generate_json(prompt_with_history, stage_label=f"STAGE 1.1 CORRECTION {attempt}", validate=is_valid)
 
             return result or {}
         except Exception as e:
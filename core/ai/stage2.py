@@ -2,7 +2,7 @@
 ------------------------------------------------------------------------------
 Project:        KPaperFlux
 File:           core/ai/stage2.py
-Version:        2.0.0
+Version:        2.2.0
 Producer:       thorsten.schnebeck@gmx.net
 Generator:      Antigravity
 Description:    Stage 2 Processor (Semantic Extraction).
@@ -11,11 +11,11 @@ Description:    Stage 2 Processor (Semantic Extraction).
 ------------------------------------------------------------------------------
 """
 
-import base64
 import copy
 import json
 import re
 import time
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
 from difflib import get_close_matches
 from typing import Any, Dict, List, Optional, Tuple, Union
@@ -30,13 +30,14 @@ _ZUGFERD_NATIVE_TYPES: frozenset[str] = frozenset(
     {"INVOICE", "CREDIT_NOTE", "RECEIPT", "UTILITY_BILL"}
 )
 
-import fitz
 from pydantic import ValidationError
 
 from core.ai import prompts
 from core.models.types import DocType
 from core.models.identity import IdentityProfile
+from core.models.physical import PdfFacts
 from core.models.semantic import SemanticExtraction, FinanceBody, LegalBody, SubscriptionInfo
+from core.utils.page_raster import DPI_EXTRACTION, PageRasterService, image_budget_for
 from core.utils.validation import validate_iban
 
 
@@ -115,28 +116,22 @@ class Stage2Processor:
 
     def get_page_image_payload(self, pdf_path: str, page_index: int = 0) -> Optional[Dict]:
         """
-        Renders a PDF page as a Base64 image payload.
+        Builds the Base64 image payload of a PDF page, optimized for the provider's image budget.
         """
-        try:
-            with fitz.open(pdf_path) as doc:
-                if page_index >= doc.page_count:
-                    return None
-                page = doc.load_page(page_index)
-                pix = page.get_pixmap(dpi=200)
-                img_bytes = pix.tobytes("png")
-            b64 = base64.b64encode(img_bytes).decode("utf-8")
-            return {
-                "base64": b64,
-                "label": "FIRST_PAGE_VISUAL_CONTEXT",
-                "page_index": page_index
-            }
-        except Exception as e:
-            logger.info(f"[Stage 2] Image generation failed: {e}")
-            return None
-
-    def run_stage_2(self, raw_ocr_pages: List[str], stage_1_result: Dict, stage_1_5_result: Dict, pdf_path: Optional[str] = None) -> Dict:
+        payload = PageRasterService.instance().get_payload(
+            pdf_path, page_index, DPI_EXTRACTION, "FIRST_PAGE_VISUAL_CONTEXT", budget=image_budget_for(self.client)
+        )
+        if payload is None:
+            logger.info(f"[Stage 2] Image generation failed for page {page_index + 1} of {pdf_path}")
+        return payload
+
+    def run_stage_2(self, raw_ocr_pages: List[str], stage_1_result: Dict, stage_1_5_result: Dict, pdf_path: Optional[str] = None,
+                    pdf_facts: Optional[PdfFacts] = None) -> Dict:
         """
         Phase 2.3: Master Semantic Extraction Pipeline.
+
+        pdf_facts (of the file at pdf_path) provides the embedded ZUGFeRD XML
+        without reopening the PDF; without facts no ZUGFeRD data is merged.
         """
         MAX_PAGES_STAGE2 = 50
         is_long_document = len(raw_ocr_pages) > 10
@@ -161,7 +156,7 @@ class Stage2Processor:
             primary = detected_entities[0]
             types_to_extract = primary.get("type_tags") or ["OTHER"]
 
-        types_to_extract = list(set([t for t in types_to_extract if t not in ["INBOUND", "OUTBOUND", "INTERNAL", "CTX_PRIVATE", "CTX_BUSINESS", "UNKNOWN"]]))
+        types_to_extract = list(dict.fromkeys(t for t in types_to_extract if t not in ["INBOUND", "OUTBOUND", "INTERNAL", "CTX_PRIVATE", "CTX_BUSINESS", "UNKNOWN"]))
         if not types_to_extract:
             types_to_extract = ["OTHER"]
 
@@ -183,166 +178,43 @@ class Stage2Processor:
             sig_data = stage_1_5_result["signatures"]
 
         zugferd_data = None
-        if pdf_path:
+        if pdf_facts is not None:
             from core.utils.zugferd_extractor import ZugferdExtractor
-            zugferd_data = ZugferdExtractor.extract_from_pdf(pdf_path)
+            zugferd_data = ZugferdExtractor.extract_from_xml(pdf_facts.zugferd_xml)
             if zugferd_data:
                 logger.info(f"[AI] ZUGFeRD XML detected (will be merged as priority ground-truth).")
 
         if types_to_extract:
             logger.info(f"[AI] Stage 2 (Extraction) [START] -> Types: {', '.join(types_to_extract)}, Vision: {bool(pdf_path)}")
 
-        for i, entity_type in enumerate(types_to_extract):
-            include_repair = (i == 0)
-            schema = self.get_target_schema(entity_type, include_repair=include_repair)
-            
-            limit = 100000
-            long_doc_hint = ""
-            if is_long_document and include_repair:
-                long_doc_hint = "CAUTION: This document is long (>10 pages). Please focus on repairing ONLY the first 10 pages in the `repaired_text` field to avoid output truncation."
-
-            zugferd_hint = ""
-            if zugferd_data:
-                xml_fin = zugferd_data.get("finance_data", {})
-                ms = xml_fin.get("monetary_summation", {})
-                tax = xml_fin.get("tax_breakdown", [])
-                
-                hint_parts = []
-                if ms.get("grand_total_amount"): hint_parts.append(f"Total: {ms['grand_total_amount']} {xml_fin.get('currency', 'EUR')}")
-                if tax:
-                    tax_str = ", ".join([f"{t.get('tax_rate')}% on {t.get('tax_basis_amount')}" for t in tax if t.get('tax_rate')])
-                    hint_parts.append(f"Tax Breakdown: {tax_str}")
-                
-                if hint_parts:
-                    zugferd_hint = "\n### 3.D ELECTRONIC DATA REFERENCE (ZUGFeRD)\nThe following values were detected in the electronic layer and are CONSIDERED GROUND TRUTH. Use them to calibrate your extraction:\n- " + "\n- ".join(hint_parts) + "\n"
+        # Type-independent prompt context, built once and shared by all per-type requests
+        shared_context = {
+            "document_text": best_text[:100000],
+            "stamps_json": stamps_json_str,
+            "signature_json": json.dumps(sig_data),
+            "user_identity": user_identity,
+            "zugferd_hint": self._build_zugferd_hint(zugferd_data),
+        }
 
-            prompt_repair_instruction = ""
-            if include_repair:
-                prompt_repair_instruction = prompts.PROMPT_STAGE_2_REPAIR_INSTRUCTION.format(
-                    long_doc_hint=long_doc_hint
-                )
-            
-            prompt = prompts.PROMPT_STAGE_2_MASTER.format(
-                entity_type=entity_type,
-                document_text=best_text[:limit],
-                stamps_json=stamps_json_str,
-                signature_json=json.dumps(sig_data),
-                user_identity=user_identity,
-                target_schema_json=schema,
-                repair_mission=prompt_repair_instruction,
-                zugferd_hint=zugferd_hint
+        def extract(index: int) -> Optional[Dict]:
+            return self._extract_entity_type(
+                types_to_extract[index], index == 0, is_long_document, shared_context,
+                images_payload, zugferd_data, stage_1_result
             )
-            
-            try:
-                extraction = None
-
-                # -- Stage 0.5: ZUGFeRD native injection --
-                # If the PDF embeds a ZUGFeRD / Factur-X XML and the entity type
-                # is a structured finance document, the XML is 100% authoritative.
-                # Skip the LLM call entirely and build SemanticExtraction directly
-                # from the XML data (~80% token saving for these documents).
-                if zugferd_data and entity_type.upper() in _ZUGFERD_NATIVE_TYPES:
-                    logger.info(
-                        f"[AI] Stage 0.5 — ZUGFeRD native injection ({entity_type}): "
-                        f"AI extraction skipped, XML is authoritative ground truth."
-                    )
-                    extraction = {
-                        "meta_header": {},
-                        "bodies": {},
-                        "repaired_text": "",
-                        "ai_confidence": 1.0,
-                        "extraction_source": "ZUGFERD_NATIVE",
-                        # Carry type_tags so semantic_data.type_tags is not empty.
-                        # For ZUGFeRD-native: stage_1_result already contains the
-                        # type_tags derived from the XML type code (BT-3).
-                        "type_tags": stage_1_result.get("type_tags") or [entity_type],
-                    }
-                    extraction = self._apply_zugferd_overlay(extraction, zugferd_data, entity_type)
 
-                else:
-                    # Normal adaptive AI extraction flow with optional retry loop.
-                    max_s2_retries = self.config.get_ai_retries()
-                    s2_attempt = 0
-
-                    while s2_attempt <= max_s2_retries:
-                        extraction = self.client.generate_json(prompt, stage_label=f"STAGE 2: {entity_type}", images=images_payload)
-                        if not extraction:
-                            return None
-
-                        original_ai_extraction = copy.deepcopy(extraction)
-
-                        if zugferd_data:
-                            extraction = self._apply_zugferd_overlay(extraction, zugferd_data, entity_type)
-
-                        s2_errors = self.validate_semantic_extraction(extraction, entity_type)
-                        if not s2_errors:
-                            break
-
-                        s2_attempt += 1
-                        if s2_attempt <= max_s2_retries:
-                            error_msg = "\n".join(f"- {e}" for e in s2_errors)
-                            faulty_json_str = json.dumps(original_ai_extraction, indent=2, ensure_ascii=False)
-                            prompt += prompts.PROMPT_STAGE_2_CORRECTION.format(
-                                faulty_json_str=faulty_json_str,
-                                error_msg=error_msg
-                            )
-
-                if extraction:
-                    if hasattr(extraction, "model_dump"):
-                        extraction = extraction.model_dump()
-                    
-                    TYPE_TO_BODY = {
-                        "INVOICE": "finance_body", "CREDIT_NOTE": "finance_body", "RECEIPT": "finance_body",
-                        "DUNNING": "finance_body", "UTILITY_BILL": "finance_body", "ORDER": "finance_body",
-                        "QUOTE": "finance_body", "ORDER_CONFIRMATION": "finance_body",
-                        "BANK_STATEMENT": "finance_body", "TAX_ASSESSMENT": "finance_body",
-                        "EXPENSE_REPORT": "finance_body", "PAYSLIP": "finance_body",
-                        "CONTRACT": "legal_body", "INSURANCE_POLICY": "legal_body",
-                        "OFFICIAL_LETTER": "legal_body", "LEGAL_CORRESPONDENCE": "legal_body",
-                        "CERTIFICATE": "legal_body"
-                    }
-                    target_body_key = TYPE_TO_BODY.get(entity_type.upper(), "other_body")
-                    
-                    # Also collect subscription_info if it's a financial document
-                    extra_body_keys = []
-                    if target_body_key == "finance_body":
-                        extra_body_keys.append("subscription_info")
-
-                    source_bodies = extraction.get("bodies", {}) if isinstance(extraction.get("bodies"), dict) else {}
-                    for key, value in extraction.items():
-                        if key.endswith("_body"):
-                            source_bodies[key] = value
-                    
-                    for key, value in source_bodies.items():
-                        if key == target_body_key or key in extra_body_keys:
-                            final_semantic_data["bodies"][key] = value
-                    
-                    if not final_semantic_data["meta_header"]:
-                        final_semantic_data["meta_header"] = extraction.get("meta_header", {})
-                    else:
-                        new_meta = extraction.get("meta_header", {})
-                        for k, v in new_meta.items():
-                            if v and not final_semantic_data["meta_header"].get(k):
-                                final_semantic_data["meta_header"][k] = v
-                    
-                    if extraction.get("ai_confidence") is not None:
-                        # Keep the lowest confidence if multiple entity passes are made
-                        curr_conf = final_semantic_data.get("ai_confidence", 1.0)
-                        final_semantic_data["ai_confidence"] = min(curr_conf, float(extraction["ai_confidence"]))
-
-                    if extraction.get("extraction_source"):
-                        final_semantic_data["extraction_source"] = extraction["extraction_source"]
-
-                    if extraction.get("type_tags"):
-                        existing = final_semantic_data.get("type_tags", [])
-                        for tag in extraction["type_tags"]:
-                            if tag not in existing:
-                                existing.append(tag)
-                        final_semantic_data["type_tags"] = existing
-
-                    if extraction.get("repaired_text"):
-                        if not final_semantic_data["repaired_text"] or len(extraction["repaired_text"]) > len(final_semantic_data["repaired_text"]):
-                            final_semantic_data["repaired_text"] = extraction["repaired_text"]
+        # The per-type extractions are independent: run them concurrently (the
+        # shared AI request executor enforces the rate limits) and merge in type order.
+        if len(types_to_extract) > 1:
+            with ThreadPoolExecutor(max_workers=len(types_to_extract), thread_name_prefix="stage2") as pool:
+                extractions = list(pool.map(extract, range(len(types_to_extract))))
+        else:
+            extractions = [extract(0)]
+
+        for entity_type, extraction in zip(types_to_extract, extractions):
+            if not extraction:
+                return None
+            try:
+                self._merge_extraction(final_semantic_data, extraction, entity_type)
             except Exception as e:
                 logger.info(f"[AI] Stage 2 Error ({entity_type}): {e}")
                 return None
@@ -353,6 +225,186 @@ class Stage2Processor:
 
         return final_semantic_data
 
+    @staticmethod
+    def _build_zugferd_hint(zugferd_data: Optional[Dict]) -> str:
+        """Builds the prompt section listing ZUGFeRD ground-truth values."""
+        if not zugferd_data:
+            return ""
+        xml_fin = zugferd_data.get("finance_data", {})
+        ms = xml_fin.get("monetary_summation", {})
+        tax = xml_fin.get("tax_breakdown", [])
+
+        hint_parts = []
+        if ms.get("grand_total_amount"): hint_parts.append(f"Total: {ms['grand_total_amount']} {xml_fin.get('currency', 'EUR')}")
+        if tax:
+            tax_str = ", ".join([f"{t.get('tax_rate')}% on {t.get('tax_basis_amount')}" for t in tax if t.get('tax_rate')])
+            hint_parts.append(f"Tax Breakdown: {tax_str}")
+
+        if not hint_parts:
+            return ""
+        return "\n### 3.D ELECTRONIC DATA REFERENCE (ZUGFeRD)\nThe following values were detected in the electronic layer and are CONSIDERED GROUND TRUTH. Use them to calibrate your extraction:\n- " + "\n- ".join(hint_parts) + "\n"
+
+    def _extract_entity_type(self, entity_type: str, include_repair: bool, is_long_document: bool,
+                             shared_context: Dict[str, str], images_payload: List[Dict],
+                             zugferd_data: Optional[Dict], stage_1_result: Dict) -> Optional[Dict]:
+        """
+        Runs the extraction of one entity type (thread-safe).
+
+        Args:
+            entity_type: The document type to extract.
+            include_repair: Whether this pass also repairs the OCR text.
+            is_long_document: Whether the document has more than 10 pages.
+            shared_context: Type-independent prompt fields.
+            images_payload: Vision context (shared, read-only).
+            zugferd_data: Embedded ZUGFeRD data, if any.
+            stage_1_result: The Stage 1 result.
+
+        Returns:
+            The extraction dict, or None if the extraction failed.
+        """
+        schema = self.get_target_schema(entity_type, include_repair=include_repair)
+
+        long_doc_hint = ""
+        if is_long_document and include_repair:
+            long_doc_hint = "CAUTION: This document is long (>10 pages). Please focus on repairing ONLY the first 10 pages in the `repaired_text` field to avoid output truncation."
+
+        prompt_repair_instruction = ""
+        if include_repair:
+            prompt_repair_instruction = prompts.PROMPT_STAGE_2_REPAIR_INSTRUCTION.format(
+                long_doc_hint=long_doc_hint
+            )
+
+        prompt = prompts.PROMPT_STAGE_2_MASTER.format(
+            entity_type=entity_type,
+            target_schema_json=schema,
+            repair_mission=prompt_repair_instruction,
+            **shared_context
+        )
+
+        try:
+            extraction = None
+
+            # -- Stage 0.5: ZUGFeRD native injection --
+            # If the PDF embeds a ZUGFeRD / Factur-X XML and the entity type
+            # is a structured finance document, the XML is 100% authoritative.
+            # Skip the LLM call entirely and build SemanticExtraction directly
+            # from the XML data (~80% token saving for these documents).
+            if zugferd_data and entity_type.upper() in _ZUGFERD_NATIVE_TYPES:
+                logger.info(
+                    f"[AI] Stage 0.5 — ZUGFeRD native injection ({entity_type}): "
+                    f"AI extraction skipped, XML is authoritative ground truth."
+                )
+                extraction = {
+                    "meta_header": {},
+                    "bodies": {},
+                    "repaired_text": "",
+                    "ai_confidence": 1.0,
+                    "extraction_source": "ZUGFERD_NATIVE",
+                    # Carry type_tags so semantic_data.type_tags is not empty.
+                    # For ZUGFeRD-native: stage_1_result already contains the
+                    # type_tags derived from the XML type code (BT-3).
+                    "type_tags": stage_1_result.get("type_tags") or [entity_type],
+                }
+                extraction = self._apply_zugferd_overlay(extraction, zugferd_data, entity_type)
+
+            else:
+                # Normal adaptive AI extraction flow with optional retry loop.
+                max_s2_retries = self.config.get_ai_retries()
+                s2_attempt = 0
+
+                # Only responses that pass validation may be served from the cache
+                def is_valid(ext: Any) -> bool:
+                    if not ext:
+                        return False
+                    overlaid = self._apply_zugferd_overlay(copy.deepcopy(ext), zugferd_data, entity_type)
+                    return not self.validate_semantic_extraction(overlaid, entity_type)
+
+                while s2_attempt <= max_s2_retries:
+                    extraction = self.client.generate_json(prompt, stage_label=f"STAGE 2: {entity_type}",
+                                                         images=images_payload, validate=is_valid)
+                    if not extraction:
+                        return None
+
+                    original_ai_extraction = copy.deepcopy(extraction)
+
+                    if zugferd_data:
+                        extraction = self._apply_zugferd_overlay(extraction, zugferd_data, entity_type)
+
+                    s2_errors = self.validate_semantic_extraction(extraction, entity_type)
+                    if not s2_errors:
+                        break
+
+                    s2_attempt += 1
+                    if s2_attempt <= max_s2_retries:
+                        error_msg = "\n".join(f"- {e}" for e in s2_errors)
+                        faulty_json_str = json.dumps(original_ai_extraction, indent=2, ensure_ascii=False)
+                        prompt += prompts.PROMPT_STAGE_2_CORRECTION.format(
+                            faulty_json_str=faulty_json_str,
+                            error_msg=error_msg
+                        )
+
+            if hasattr(extraction, "model_dump"):
+                extraction = extraction.model_dump()
+            return extraction
+        except Exception as e:
+            logger.info(f"[AI] Stage 2 Error ({entity_type}): {e}")
+            return None
+
+    def _merge_extraction(self, final_semantic_data: Dict, extraction: Dict, entity_type: str) -> None:
+        """Merges the extraction of one entity type into the combined Stage 2 result."""
+        TYPE_TO_BODY = {
+            "INVOICE": "finance_body", "CREDIT_NOTE": "finance_body", "RECEIPT": "finance_body",
+            "DUNNING": "finance_body", "UTILITY_BILL": "finance_body", "ORDER": "finance_body",
+            "QUOTE": "finance_body", "ORDER_CONFIRMATION": "finance_body",
+            "BANK_STATEMENT": "finance_body", "TAX_ASSESSMENT": "finance_body",
+            "EXPENSE_REPORT": "finance_body", "PAYSLIP": "finance_body",
+            "CONTRACT": "legal_body", "INSURANCE_POLICY": "legal_body",
+            "OFFICIAL_LETTER": "legal_body", "LEGAL_CORRESPONDENCE": "legal_body",
+            "CERTIFICATE": "legal_body"
+        }
+        target_body_key = TYPE_TO_BODY.get(entity_type.upper(), "other_body")
+
+        # Also collect subscription_info if it's a financial document
+        extra_body_keys = []
+        if target_body_key == "finance_body":
+            extra_body_keys.append("subscription_info")
+
+        source_bodies = extraction.get("bodies", {}) if isinstance(extraction.get("bodies"), dict) else {}
+        for key, value in extraction.items():
+            if key.endswith("_body"):
+                source_bodies[key] = value
+
+        for key, value in source_bodies.items():
+            if key == target_body_key or key in extra_body_keys:
+                final_semantic_data["bodies"][key] = value
+
+        if not final_semantic_data["meta_header"]:
+            final_semantic_data["meta_header"] = extraction.get("meta_header", {})
+        else:
+            new_meta = extraction.get("meta_header", {})
+            for k, v in new_meta.items():
+                if v and not final_semantic_data["meta_header"].get(k):
+                    final_semantic_data["meta_header"][k] = v
+
+        if extraction.get("ai_confidence") is not None:
+            # Keep the lowest confidence if multiple entity passes are made
+            curr_conf = final_semantic_data.get("ai_confidence", 1.0)
+            final_semantic_data["ai_confidence"] = min(curr_conf, float(extraction["ai_confidence"]))
+
+        if extraction.get("extraction_source"):
+            final_semantic_data["extraction_source"] = extraction["extraction_source"]
+
+        if extraction.get("type_tags"):
+            existing = final_semantic_data.get("type_tags", [])
+            for tag in extraction["type_tags"]:
+                if tag not in existing:
+                    existing.append(tag)
+            final_semantic_data["type_tags"] = existing
+
+        if extraction.get("repaired_text"):
+            if not final_semantic_data["repaired_text"] or len(extraction["repaired_text"]) > len(final_semantic_data["repaired_text"]):
+                final_semantic_data["repaired_text"] = extraction["repaired_text"]
+
     def _apply_zugferd_overlay(self, extraction: Dict, zugferd_data: Dict, entity_type: str) -> Dict:
         """
         Deep merge ZUGFeRD ground truth into an extraction result.
@@ -22,6 +22,7 @@ from core.ai.stage2 import Stage2Processor
 from core.ai import prompts
 from core.config import AppConfig
 from core.models.identity import IdentityProfile
+from core.models.physical import PdfFacts
 from core.models.types import DocType
 
 
@@ -127,9 +128,10 @@ class AIAnalyzer:
         """Delegates to Stage2Processor."""
         return self.stage2.get_page_image_payload(pdf_path, page_index)
 
-    def run_stage_2(self, raw_ocr_pages: List[str], stage_1_result: Dict, stage_1_5_result: Dict, pdf_path: Optional[str] = None) -> Dict:
+    def run_stage_2(self, raw_ocr_pages: List[str], stage_1_result: Dict, stage_1_5_result: Dict, pdf_path: Optional[str] = None,
+                    pdf_facts: Optional[PdfFacts] = None) -> Dict:
         """Delegates to Stage2Processor."""
-        return self.stage2.run_stage_2(raw_ocr_pages, stage_1_result, stage_1_5_result, pdf_path)
+        return self.stage2.run_stage_2(raw_ocr_pages, stage_1_result, stage_1_5_result, pdf_path, pdf_facts)
 
     def _apply_zugferd_overlay(self, extraction: Dict, zugferd_data: Dict, entity_type: str) -> Dict:
         """Delegates to Stage2Processor."""
@@ -2,7 +2,7 @@
 ------------------------------------------------------------------------------
 Project:        KPaperFlux
 File:           core/canonizer.py
-Version:        2.0.0
+Version:        2.1.2
 Producer:       thorsten.schnebeck@gmx.net
 Generator:      Antigravity
 Description:    Canonization service that orchestrates the document processing
@@ -15,6 +15,7 @@ Description:    Canonization service that orchestrates the document processing
 import json
 import traceback
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Any, Dict, List, Optional, Tuple, TYPE_CHECKING, Union
 
@@ -97,12 +98,15 @@ class CanonizerService:
         """
         return v_doc.resolve_content(self._load_physical)
 
-    def process_pending_documents(self, limit: int = 10) -> int:
+    def process_pending_documents(self, limit: int = 10, max_workers: int = 1) -> int:
         """
         Scans for Logical Entities with status='NEW' and starts processing them.
 
         Args:
             limit: Maximum number of documents to process in one batch.
+            max_workers: Number of documents processed in parallel. Each worker
+                thread uses its own SQLite connection; the status locks taken
+                here keep other workers away from the same document.
 
         Returns:
             The number of successfully processed documents.
@@ -111,6 +115,40 @@ class CanonizerService:
             logger.info("No AI Analyzer available.")
             return 0
 
+        uuids = self._lock_pending_documents(limit)
+        if uuids:
+            logger.info(f"Locked {len(uuids)} documents for processing.")
+
+        if max_workers <= 1 or len(uuids) <= 1:
+            return sum(1 for uuid_obj in uuids if self._process_locked_document(uuid_obj))
+
+        processed_count = 0
+        critical_error: Optional[BaseException] = None
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(uuids)), thread_name_prefix="canonizer") as pool:
+            futures = [pool.submit(self._process_locked_document_isolated, uuid_obj) for uuid_obj in uuids]
+            for future in futures:
+                try:
+                    if future.result():
+                        processed_count += 1
+                except (NameError, AttributeError, SyntaxError, TypeError, ValueError) as e:
+                    # Let the remaining documents finish, then stop the worker
+                    critical_error = critical_error or e
+
+        if critical_error:
+            raise critical_error
+        return processed_count
+
+    def _lock_pending_documents(self, limit: int) -> List[str]:
+        """
+        Atomically moves up to `limit` pending documents into their
+        PROCESSING_* status, so no other worker picks them up.
+
+        Args:
+            limit: Maximum number of documents to lock.
+
+        Returns:
+            The UUIDs that were locked by this call.
+        """
         cursor = self.db.connection.cursor()
         # Fetch entities - but only those NOT currently being processed by another worker
         query = """
@@ -125,43 +163,57 @@ class CanonizerService:
 
         # Atomic locking of all candidates
         uuids: List[str] = []
-        for row in rows:
-            uuid_val, current = row
-            target = DocumentStatus.PROCESSING_S1 if current in [DocumentStatus.NEW, DocumentStatus.READY_FOR_PIPELINE] else DocumentStatus.PROCESSING_S2
-
-            # Atomic update to lock this document
-            cursor.execute(
-                "UPDATE virtual_documents SET status = ? WHERE uuid = ? AND status = ?",
-                (target, uuid_val, current),
-            )
-            if cursor.rowcount > 0:
-                uuids.append(uuid_val)
+        with self.db._write() as conn:
+            for row in rows:
+                uuid_val, current = row
+                target = DocumentStatus.PROCESSING_S1 if current in [DocumentStatus.NEW, DocumentStatus.READY_FOR_PIPELINE] else DocumentStatus.PROCESSING_S2
+
+                # Atomic update to lock this document
+                lock_cursor = conn.execute(
+                    "UPDATE virtual_documents SET status = ? WHERE uuid = ? AND status = ?",
+                    (target, uuid_val, current),
+                )
+                if lock_cursor.rowcount > 0:
+                    uuids.append(uuid_val)
+        return uuids
 
-        self.db.connection.commit()
-        if uuids:
-            logger.info(f"Locked {len(uuids)} documents for processing.")
+    def _process_locked_document_isolated(self, uuid_obj: str) -> bool:
+        """Runs _process_locked_document on a dedicated worker-thread connection."""
+        with self.db.thread_connection():
+            return self._process_locked_document(uuid_obj)
 
-        processed_count = 0
-        for uuid_obj in uuids:
-            v_doc = self.logical_repo.get_by_uuid(uuid_obj)
-            if v_doc:
-                # The document is already locked to PROCESSING_S1 or S2 at this point
-                try:
-                    success = self.process_virtual_document(v_doc)
-                    if success:
-                        processed_count += 1
-                except (NameError, AttributeError, SyntaxError, TypeError, ValueError) as e:
-                    logger.error(f"CRITICAL ERROR processing {uuid_obj}: {e}")
-                    traceback.print_exc()
-                    raise e  # Propagate critical coding/logic errors to stop the worker
-                except Exception as e:
-                    logger.error(f"ERROR processing {uuid_obj}: {e}")
-                    traceback.print_exc()
-                    # For non-critical exceptions, we might want to release the lock or set a failure status
-                    # v_doc.status = 'FAILED'
-                    # self.logical_repo.save(v_doc)
+    def _process_locked_document(self, uuid_obj: str) -> bool:
+        """
+        Processes a document previously locked by _lock_pending_documents.
 
-        return processed_count
+        Args:
+            uuid_obj: The document UUID.
+
+        Returns:
+            True if the document was processed successfully.
+
+        Raises:
+            NameError, AttributeError, SyntaxError, TypeError, ValueError:
+                Critical coding/logic errors are propagated to stop the worker.
+        """
+        v_doc = self.logical_repo.get_by_uuid(uuid_obj)
+        if not v_doc:
+            return False
+
+        # The document is already locked to PROCESSING_S1 or S2 at this point
+        try:
+            return bool(self.process_virtual_document(v_doc))
+        except (NameError, AttributeError, SyntaxError, TypeError, ValueError) as e:
+            logger.error(f"CRITICAL ERROR processing {uuid_obj}: {e}")
+            traceback.print_exc()
+            raise e  # Propagate critical coding/logic errors to stop the worker
+        except Exception as e:
+            logger.error(f"ERROR processing {uuid_obj}: {e}")
+            traceback.print_exc()
+            # For non-critical exceptions, we might want to release the lock or set a failure status
+            # v_doc.status = 'FAILED'
+            # self.logical_repo.save(v_doc)
+            return False
 
     def _detect_zugferd_type_tags(self, v_doc: VirtualDocument) -> Optional[List[str]]:
         """
@@ -178,7 +230,8 @@ class CanonizerService:
             return None
         try:
             from core.utils.zugferd_extractor import ZugferdExtractor
-            data = ZugferdExtractor.extract_from_pdf(pf.file_path)
+            facts = pf.pdf_facts
+            data = ZugferdExtractor.extract_from_xml(facts.zugferd_xml) if facts else None
             return data.get("type_tags") if data else None
         except Exception as exc:
             logger.warning(f"ZUGFeRD pre-classification failed for {v_doc.uuid}: {exc}")
@@ -197,13 +250,13 @@ class CanonizerService:
         Returns:
             True if the transition was successful.
         """
-        cursor = self.db.connection.cursor()
         placeholders = ",".join(["?"] * len(allowed_old))
         sql = f"UPDATE virtual_documents SET status = ? WHERE uuid = ? AND status IN ({placeholders})"
-        cursor.execute(sql, [target_status, v_doc.uuid] + allowed_old)
-        self.db.connection.commit()
+        with self.db._write() as conn:
+            cursor = conn.execute(sql, [target_status, v_doc.uuid] + allowed_old)
+            changed = cursor.rowcount > 0
 
-        if cursor.rowcount > 0:
+        if changed:
             v_doc.status = target_status
             return True
         return False
@@ -524,7 +577,9 @@ class CanonizerService:
             s1_context = {"type_tags": c_types}
 
             semantic_extraction = self.analyzer.run_stage_2(
-                raw_ocr_pages=entity_pages, stage_1_result=s1_context, stage_1_5_result=audit_res, pdf_path=pf.file_path if pf else None
+                raw_ocr_pages=entity_pages, stage_1_result=s1_context, stage_1_5_result=audit_res,
+                pdf_path=pf.file_path if pf else None,
+                pdf_facts=pf.pdf_facts if pf else None,
             )
 
             if semantic_extraction is None:
@@ -714,12 +769,12 @@ class CanonizerService:
                     if r == current_rot:
                         current_pages.append(p)
                     else:
-                        refs.append(SourceReference(file_uuid, current_pages, current_rot))
+                        refs.append(SourceReference(file_uuid=file_uuid, pages=current_pages, rotation=current_rot))
                         current_rot = r
                         current_pages = [p]
 
             if current_pages:
-                refs.append(SourceReference(file_uuid, current_pages, current_rot))
+                refs.append(SourceReference(file_uuid=file_uuid, pages=current_pages, rotation=current_rot))
 
             new_id = str(uuid.uuid4())
             new_doc = VirtualDocument(
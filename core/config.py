@@ -2,7 +2,7 @@
 ------------------------------------------------------------------------------
 Project:        KPaperFlux
 File:           core/config.py
-Version:        2.0.0
+Version:        2.0.1
 Producer:       thorsten.schnebeck@gmx.net
 Generator:      Antigravity
 Description:    Manages application configuration using QSettings. Standardizes
@@ -14,7 +14,7 @@ Description:    Manages application configuration using QSettings. Standardizes
 import json
 import os
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, List, Optional
 
 from PyQt6.QtCore import QSettings, QStandardPaths
 
@@ -46,11 +46,28 @@ class AppConfig:
     KEY_LOG_LEVEL: str = "log_level"
     KEY_LOG_COMPONENTS: str = "log_components"
     KEY_PDF_PAGE_SIZE: str = "pdf_page_size"
+    KEY_PIPELINE_CONCURRENCY: str = "pipeline_concurrency"
+    KEY_AI_MAX_IN_FLIGHT: str = "ai_max_in_flight"
+    KEY_AI_REQUESTS_PER_MINUTE: str = "ai_requests_per_minute"
+    KEY_AI_TOKENS_PER_MINUTE: str = "ai_tokens_per_minute"
+    KEY_AI_CACHE_MAX_MB: str = "ai_cache_max_mb"
+    KEY_AI_CACHE_EXCLUDED_STAGES: str = "ai_cache_excluded_stages"
+    KEY_INGEST_WORKERS: str = "ingest_workers"
+    KEY_OCR_MAX_JOBS: str = "max_jobs"
+    KEY_OCR_CACHE_MAX_MB: str = "cache_max_mb"
 
     # Defaults
     DEFAULT_LANGUAGE: str = "en"
     DEFAULT_MODEL: str = "gemini-2.5-flash"
     DEFAULT_AI_RETRIES: int = 3
+    DEFAULT_PIPELINE_CONCURRENCY: int = 1
+    DEFAULT_AI_MAX_IN_FLIGHT: int = 4
+    DEFAULT_AI_REQUESTS_PER_MINUTE: int = 0  # 0: unlimited
+    DEFAULT_AI_TOKENS_PER_MINUTE: int = 0  # 0: unlimited
+    DEFAULT_AI_CACHE_MAX_MB: int = 128
+    DEFAULT_INGEST_WORKERS: int = 1
+    DEFAULT_OCR_MAX_JOBS: int = os.cpu_count() or 4
+    DEFAULT_OCR_CACHE_MAX_MB: int = 512
 
     APP_ID: str = "kpaperflux"
     _active_profile: Optional[str] = None
@@ -121,6 +138,15 @@ class AppConfig:
         plugins_dir.mkdir(parents=True, exist_ok=True)
         return plugins_dir
 
+    def get_thumbnail_dir(self) -> Path:
+        """
+        Returns the path to the persistent page thumbnail store.
+        Located within the data folder: ~/.local/share/kpaperflux/thumbnails/
+        """
+        thumbnail_dir = self.get_data_dir() / "thumbnails"
+        thumbnail_dir.mkdir(parents=True, exist_ok=True)
+        return thumbnail_dir
+
     def _get_setting(self, group: str, key: str, default: Any = None) -> Any:
         """
         Helper to retrieve a setting value using a full path key.
@@ -353,6 +379,211 @@ class AppConfig:
         """
         self._set_setting("AI", self.KEY_AI_RETRIES, retries)
 
+    def get_pipeline_concurrency(self) -> int:
+        """
+        Retrieves the number of documents the background pipeline processes in parallel.
+
+        Returns:
+            The concurrency level (at least 1).
+        """
+        try:
+            value = int(self._get_setting("AI", self.KEY_PIPELINE_CONCURRENCY, self.DEFAULT_PIPELINE_CONCURRENCY))
+        except (TypeError, ValueError):
+            value = self.DEFAULT_PIPELINE_CONCURRENCY
+        return max(1, value)
+
+    def set_pipeline_concurrency(self, level: int) -> None:
+        """
+        Saves the number of documents the background pipeline processes in parallel.
+
+        Args:
+            level: The concurrency level.
+        """
+        self._set_setting("AI", self.KEY_PIPELINE_CONCURRENCY, max(1, int(level)))
+
+    def _get_ai_limit(self, key: str, default: int, minimum: int) -> int:
+        try:
+            value = int(self._get_setting("AI", key, default))
+        except (TypeError, ValueError):
+            value = default
+        return max(minimum, value)
+
+    def get_ai_max_in_flight(self) -> int:
+        """
+        Retrieves the maximum number of AI requests running at the same time.
+
+        Returns:
+            The in-flight limit (at least 1).
+        """
+        return self._get_ai_limit(self.KEY_AI_MAX_IN_FLIGHT, self.DEFAULT_AI_MAX_IN_FLIGHT, 1)
+
+    def set_ai_max_in_flight(self, limit: int) -> None:
+        """
+        Saves the maximum number of AI requests running at the same time.
+
+        Args:
+            limit: The in-flight limit.
+        """
+        self._set_setting("AI", self.KEY_AI_MAX_IN_FLIGHT, max(1, int(limit)))
+
+    def get_ai_requests_per_minute(self) -> int:
+        """
+        Retrieves the AI request budget per minute.
+
+        Returns:
+            Requests per minute (0: unlimited).
+        """
+        return self._get_ai_limit(self.KEY_AI_REQUESTS_PER_MINUTE, self.DEFAULT_AI_REQUESTS_PER_MINUTE, 0)
+
+    def set_ai_requests_per_minute(self, limit: int) -> None:
+        """
+        Saves the AI request budget per minute.
+
+        Args:
+            limit: Requests per minute (0: unlimited).
+        """
+        self._set_setting("AI", self.KEY_AI_REQUESTS_PER_MINUTE, max(0, int(limit)))
+
+    def get_ai_tokens_per_minute(self) -> int:
+        """
+        Retrieves the AI token budget per minute.
+
+        Returns:
+            Tokens per minute (0: unlimited).
+        """
+        return self._get_ai_limit(self.KEY_AI_TOKENS_PER_MINUTE, self.DEFAULT_AI_TOKENS_PER_MINUTE, 0)
+
+    def set_ai_tokens_per_minute(self, limit: int) -> None:
+        """
+        Saves the AI token budget per minute.
+
+        Args:
+            limit: Tokens per minute (0: unlimited).
+        """
+        self._set_setting("AI", self.KEY_AI_TOKENS_PER_MINUTE, max(0, int(limit)))
+
+    def get_ai_cache_path(self) -> Path:
+        """
+        Returns the path to the persistent AI response cache.
+        Located within the data folder: ~/.local/share/kpaperflux/ai_cache.db
+        """
+        return self.get_data_dir() / "ai_cache.db"
+
+    def get_ai_cache_max_bytes(self) -> int:
+        """
+        Retrieves the size bound of the persistent AI response cache.
+
+        Returns:
+            The maximum cache size in bytes (0 disables the cache).
+        """
+        return self._get_ai_limit(self.KEY_AI_CACHE_MAX_MB, self.DEFAULT_AI_CACHE_MAX_MB, 0) * 1024 * 1024
+
+    def set_ai_cache_max_mb(self, size_mb: int) -> None:
+        """
+        Saves the size bound of the persistent AI response cache.
+
+        Args:
+            size_mb: The maximum cache size in MiB (0 disables the cache).
+        """
+        self._set_setting("AI", self.KEY_AI_CACHE_MAX_MB, max(0, int(size_mb)))
+
+    def get_ai_cache_excluded_stages(self) -> List[str]:
+        """
+        Retrieves the AI stages whose responses are never cached.
+
+        Returns:
+            Stage label prefixes (case-insensitive), e.g. ['STAGE 1.5'].
+        """
+        raw = str(self._get_setting("AI", self.KEY_AI_CACHE_EXCLUDED_STAGES, "[]"))
+        try:
+            stages = json.loads(raw)
+        except (json.JSONDecodeError, TypeError):
+            return []
+        return [str(s) for s in stages] if isinstance(stages, list) else []
+
+    def set_ai_cache_excluded_stages(self, stages: List[str]) -> None:
+        """
+        Saves the AI stages whose responses are never cached.
+
+        Args:
+            stages: Stage label prefixes (case-insensitive).
+        """
+        self._set_setting("AI", self.KEY_AI_CACHE_EXCLUDED_STAGES, json.dumps(list(stages)))
+
+    def get_ingest_workers(self) -> int:
+        """
+        Retrieves the number of files ingested (hashed, vaulted, OCRed) in parallel.
+
+        Returns:
+            The number of ingest workers (at least 1).
+        """
+        try:
+            value = int(self._get_setting("OCR", self.KEY_INGEST_WORKERS, self.DEFAULT_INGEST_WORKERS))
+        except (TypeError, ValueError):
+            value = self.DEFAULT_INGEST_WORKERS
+        return max(1, value)
+
+    def set_ingest_workers(self, workers: int) -> None:
+        """
+        Saves the number of files ingested in parallel.
+
+        Args:
+            workers: The number of ingest workers.
+        """
+        self._set_setting("OCR", self.KEY_INGEST_WORKERS, max(1, int(workers)))
+
+    def get_ocr_max_jobs(self) -> int:
+        """
+        Retrieves the global cap on OCR worker processes ('--jobs') summed
+        over all concurrently running OCR runs.
+
+        Returns:
+            The maximum number of OCR jobs (at least 1).
+        """
+        try:
+            value = int(self._get_setting("OCR", self.KEY_OCR_MAX_JOBS, self.DEFAULT_OCR_MAX_JOBS))
+        except (TypeError, ValueError):
+            value = self.DEFAULT_OCR_MAX_JOBS
+        return max(1, value)
+
+    def set_ocr_max_jobs(self, jobs: int) -> None:
+        """
+        Saves the global cap on concurrently running OCR worker processes.
+
+        Args:
+            jobs: The maximum number of OCR jobs.
+        """
+        self._set_setting("OCR", self.KEY_OCR_MAX_JOBS, max(1, int(jobs)))
+
+    def get_ocr_cache_dir(self) -> Path:
+        """
+        Returns the folder of the persistent OCR result cache.
+        Located within the data folder: ~/.local/share/kpaperflux/ocr_cache/
+        """
+        return self.get_data_dir() / "ocr_cache"
+
+    def get_ocr_cache_max_bytes(self) -> int:
+        """
+        Retrieves the size bound of the persistent OCR result cache.
+
+        Returns:
+            The maximum cache size in bytes (0 disables the cache).
+        """
+        try:
+            value = int(self._get_setting("OCR", self.KEY_OCR_CACHE_MAX_MB, self.DEFAULT_OCR_CACHE_MAX_MB))
+        except (TypeError, ValueError):
+            value = self.DEFAULT_OCR_CACHE_MAX_MB
+        return max(0, value) * 1024 * 1024
+
+    def set_ocr_cache_max_mb(self, size_mb: int) -> None:
+        """
+        Saves the size bound of the persistent OCR result cache.
+
+        Args:
+            size_mb: The maximum cache size in MiB (0 disables the cache).
+        """
+        self._set_setting("OCR", self.KEY_OCR_CACHE_MAX_MB, max(0, int(size_mb)))
+
     def get_transfer_path(self) -> str:
         """
         Retrieves the path to the transfer folder.
@@ -2,7 +2,7 @@
 ------------------------------------------------------------------------------
 Project:        KPaperFlux
 File:           core/database.py
-Version:        2.0.0
+Version:        2.0.1
 Producer:       thorsten.schnebeck@gmx.net
 Generator:      Antigravity
 Description:    Central database manager for SQLite persistence. Handles 
@@ -27,12 +27,17 @@ from pathlib import Path
 from typing import Any, Dict, Generator, List, Optional, Set, Tuple, Union
 
 from core.models.virtual import VirtualDocument as Document
-from core.models.semantic import SemanticExtraction
+from core.models.list_row import DocumentListRow
+from core.models.physical import PdfFacts
+from core.models.semantic import FinanceBody, SemanticExtraction
 from core.logger import get_logger, log_sql_query, get_silent_logger
 from core.query_builder import QueryBuilder
 from core.document_hydrator import DocumentHydrator
 from core.repositories.logical_repo import LogicalRepository
 from core.repositories.physical_repo import PhysicalRepository
+from core.repositories.page_hash_repo import PageHashRepository
+from core.utils.pdf_probe import probe_pdf
+from core.work_signal import notify_pipeline_work
 
 # --- Central Logging Setup ---
 logger = get_logger("database")
@@ -44,6 +49,49 @@ class DatabaseManager:
     API for document persistence and retrieval.
     """
 
+    # Managed secondary indexes: name -> (table, column list).
+    # _ensure_indexes() creates missing ones and drops managed ("idx_")
+    # indexes that are no longer listed here.
+    INDEXES: Dict[str, Tuple[str, str]] = {
+        # PhysicalRepository.get_by_phash (dedup check on every ingest)
+        "idx_physical_files_phash": ("physical_files", "phash"),
+        # get_pending_pipeline_count / CanonizerService._lock_pending_documents
+        "idx_virtual_documents_status": ("virtual_documents", "status, deleted"),
+        # get_all_entities_view and archive/trash views: filter + ORDER BY in one scan
+        "idx_virtual_documents_active": ("virtual_documents", "deleted, archived, created_at DESC"),
+        # Sorting by creation date without the active-view filters
+        "idx_virtual_documents_created_at": ("virtual_documents", "created_at"),
+        # Process grouping (order_collection_linker, process_id filters)
+        "idx_virtual_documents_process_id": ("virtual_documents", "process_id"),
+        # Tag filters (QueryBuilder 'contains' on tags/type_tags), case-insensitive
+        "idx_document_tags_tag": ("document_tags", "kind, tag COLLATE NOCASE"),
+        # WorkflowScheduler: only rows that are due
+        "idx_workflow_schedule_due": ("workflow_schedule", "next_eval_at"),
+        # Page text hits -> virtual documents and pages
+        "idx_virtual_page_map_physical": ("virtual_page_map", "file_uuid, phys_page"),
+    }
+
+    # VirtualDocument properties read via SemanticExtraction.get_financial_value
+    # (first body carrying the value), as JSON paths within a body. List rows
+    # project them as dynamic columns without hydrating the semantic model.
+    LIST_FINANCIAL_PATHS: Dict[str, str] = {
+        "total_gross":    "$.monetary_summation.grand_total_amount",
+        "total_net":      "$.monetary_summation.tax_basis_total_amount",
+        "total_tax":      "$.monetary_summation.tax_total_amount",
+        "currency":       "$.currency",
+        "due_date":       "$.due_date",
+    }
+    LIST_NUMERIC_FIELDS = ("total_gross", "total_net", "total_tax")
+
+    # Body fields VirtualDocument.doc_number falls back to, in priority order
+    DOC_NUMBER_FALLBACKS = ("invoice_number", "document_number", "order_number", "ref")
+
+    # app_meta key: PdfFacts.VERSION the physical files were last probed with
+    PDF_FACTS_VERSION_KEY = "pdf_facts_version"
+
+    # Prepared statements kept per connection (sqlite3 default: 128)
+    STATEMENT_CACHE_SIZE: int = 512
+
     def __init__(self, db_path: str = ":memory:") -> None:
         """
         Initializes the DatabaseManager.
@@ -52,8 +100,11 @@ class DatabaseManager:
             db_path: Path to the SQLite database file.
         """
         self.db_path: str = db_path
-        self.connection: Optional[sqlite3.Connection] = None
+        self._main_connection: Optional[sqlite3.Connection] = None
+        self._local: threading.local = threading.local()
         self._lock: threading.RLock = threading.RLock()
+        self._semantic_columns: bool = False
+        self._trigram: bool = False  # FTS5 trigram tokenizer (SQLite >= 3.34)
         self._connect()
         self.init_db()
         # Source of truth for document selection to avoid index mismatches
@@ -64,27 +115,80 @@ class DatabaseManager:
             tags, deleted_at, locked_at, exported_at, pdf_class,
             archived, storage_location, ai_confidence, process_id
         """
-        self._qb = QueryBuilder()
+        self._qb = QueryBuilder(materialized=self._semantic_columns, tag_index=True)
         self._hydrator = DocumentHydrator()
         self.logical_repo: LogicalRepository = LogicalRepository(self)
         self.physical_repo: PhysicalRepository = PhysicalRepository(self)
+        self.page_hash_repo: PageHashRepository = PageHashRepository(self)
 
-    def _connect(self) -> None:
+    @property
+    def connection(self) -> Optional[sqlite3.Connection]:
         """
-        Establishes a connection to the database and configures performance PRAGMAs.
+        The connection used by the calling thread: its dedicated worker
+        connection (see thread_connection) or the shared main connection.
+        """
+        worker_conn = getattr(self._local, "connection", None)
+        return worker_conn if worker_conn is not None else self._main_connection
+
+    @connection.setter
+    def connection(self, value: Optional[sqlite3.Connection]) -> None:
+        """Replaces the shared main connection."""
+        self._main_connection = value
+
+    def _open_connection(self) -> sqlite3.Connection:
+        """
+        Opens a new connection to the database and configures performance PRAGMAs.
         Enables WAL mode and foreign key constraints.
+
+        Returns:
+            The configured connection.
+        """
+        # check_same_thread=False allows using the connection across worker threads
+        # Statement cache sized for the compiled QueryBuilder templates
+        conn = sqlite3.connect(self.db_path, check_same_thread=False,
+                               cached_statements=self.STATEMENT_CACHE_SIZE)
+        conn.row_factory = sqlite3.Row  # Enable named column access
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute("PRAGMA journal_mode = WAL")
+        return conn
+
+    def _connect(self) -> None:
+        """
+        Establishes the shared main connection to the database.
         """
         try:
-            # check_same_thread=False allows using the connection across worker threads
-            self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
-            self.connection.row_factory = sqlite3.Row  # Enable named column access
-            self.connection.execute("PRAGMA foreign_keys = ON")
-            self.connection.execute("PRAGMA journal_mode = WAL")
+            self.connection = self._open_connection()
             logger.info(f"Connected to database at {self.db_path} (WAL mode enabled)")
         except sqlite3.Error as e:
             logger.critical(f"Failed to connect to database: {e}")
             raise
 
+    @contextmanager
+    def thread_connection(self) -> Generator[Optional[sqlite3.Connection], None, None]:
+        """
+        Gives the calling worker thread its own SQLite connection for the
+        duration of the block, so parallel workers do not share one
+        connection's transaction state. Writes stay serialized via _write().
+        In-memory databases cannot be shared across connections and keep
+        using the main connection.
+
+        Usage::
+
+            with db.thread_connection():
+                repo.get_by_uuid(uuid)  # runs on the worker connection
+        """
+        if self.db_path == ":memory:" or getattr(self._local, "connection", None) is not None:
+            yield self.connection
+            return
+
+        conn = self._open_connection()
+        self._local.connection = conn
+        try:
+            yield conn
+        finally:
+            self._local.connection = None
+            conn.close()
+
     def init_db(self) -> None:
         """
         Initializes the database schema and handles migrations for all components.
@@ -99,7 +203,8 @@ class DatabaseManager:
             file_size INTEGER,
             raw_ocr_data TEXT, -- JSON page map (page_num -> text)
             created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            page_count_phys INTEGER
+            page_count_phys INTEGER,
+            pdf_facts TEXT -- JSON PdfFacts of the single-pass probe
         );
         """
 
@@ -163,6 +268,106 @@ class DatabaseManager:
         );
         """
 
+        # Full text of every document, mirrored from virtual_documents.cached_full_text
+        # by triggers (see _create_text_hit_triggers) and indexed by the trigram
+        # FTS5 table below for substring hit counts (see _text_hit_counts).
+        create_virtual_documents_text_table = """
+        CREATE TABLE IF NOT EXISTS virtual_documents_text (
+            id   INTEGER PRIMARY KEY, -- Stable rowid for the FTS index
+            uuid TEXT NOT NULL UNIQUE,
+            text TEXT NOT NULL
+        );
+        """
+
+        create_virtual_documents_text_fts = """
+        CREATE VIRTUAL TABLE IF NOT EXISTS virtual_documents_text_fts USING fts5(
+            text,
+            content='virtual_documents_text',
+            content_rowid='id',
+            tokenize='trigram'
+        );
+        """
+
+        # Page-granular OCR text, mirrored from physical_files.raw_ocr_data by
+        # triggers (see _create_page_text_triggers) and indexed by the trigram
+        # FTS5 table below, which supports substring search.
+        create_physical_pages_table = """
+        CREATE TABLE IF NOT EXISTS physical_pages (
+            id        INTEGER PRIMARY KEY, -- Stable rowid for the FTS index
+            file_uuid TEXT NOT NULL,
+            page      INTEGER NOT NULL, -- 1-based
+            text      TEXT NOT NULL,
+            UNIQUE (file_uuid, page)
+        );
+        """
+
+        create_physical_pages_fts = """
+        CREATE VIRTUAL TABLE IF NOT EXISTS physical_pages_fts USING fts5(
+            text,
+            content='physical_pages',
+            content_rowid='id',
+            tokenize='trigram'
+        );
+        """
+
+        # Virtual page -> physical page, mirrored from virtual_documents.source_mapping
+        # by triggers (see _create_page_text_triggers)
+        create_virtual_page_map_table = """
+        CREATE TABLE IF NOT EXISTS virtual_page_map (
+            document_uuid TEXT NOT NULL,
+            virt_page     INTEGER NOT NULL, -- 0-based position in the document
+            file_uuid     TEXT NOT NULL,
+            phys_page     INTEGER NOT NULL, -- 1-based page in the physical file
+            PRIMARY KEY (document_uuid, virt_page)
+        ) WITHOUT ROWID;
+        """
+
+        # Per-page visual hashes for duplicate detection (see core/similarity.py).
+        # No FK: INSERT OR REPLACE on physical_files would cascade-delete them.
+        create_page_visual_hashes_table = """
+        CREATE TABLE IF NOT EXISTS page_visual_hashes (
+            file_uuid TEXT NOT NULL,
+            page      INTEGER NOT NULL,
+            dhash     INTEGER NOT NULL,
+            luma      INTEGER NOT NULL,
+            PRIMARY KEY (file_uuid, page)
+        );
+        """
+
+        # Normalized tag index, mirrored from the JSON arrays 'tags' (kind
+        # 'user') and 'type_tags' (kind 'type') by triggers (see _create_tag_triggers)
+        create_document_tags_table = """
+        CREATE TABLE IF NOT EXISTS document_tags (
+            document_uuid TEXT NOT NULL,
+            kind          TEXT NOT NULL,
+            tag           TEXT NOT NULL,
+            PRIMARY KEY (document_uuid, kind, tag)
+        ) WITHOUT ROWID;
+        """
+
+        # Next auto-transition evaluation time per (document, workflow rule),
+        # maintained by core/workflow_scheduler.py. Triggers (see
+        # _create_workflow_schedule_triggers) add rows for new workflows and
+        # mark them due ('') whenever workflow-relevant document data changes.
+        # NULL: no auto-transition can fire until the document changes.
+        create_workflow_schedule_table = """
+        CREATE TABLE IF NOT EXISTS workflow_schedule (
+            document_uuid TEXT NOT NULL,
+            rule_id       TEXT NOT NULL,
+            next_eval_at  TEXT, -- ISO timestamp
+            PRIMARY KEY (document_uuid, rule_id)
+        ) WITHOUT ROWID;
+        """
+
+        # Small key/value store for database-bound state, e.g. the signature
+        # of the workflow rules the schedule was computed with (see get_meta)
+        create_app_meta_table = """
+        CREATE TABLE IF NOT EXISTS app_meta (
+            key   TEXT PRIMARY KEY,
+            value TEXT
+        ) WITHOUT ROWID;
+        """
+
         create_saved_layouts_table = """
 CREATE TABLE IF NOT EXISTS saved_layouts (
     id          TEXT PRIMARY KEY,
@@ -177,15 +382,154 @@ CREATE TABLE IF NOT EXISTS saved_layouts (
             return
 
         with self._write() as conn:
+            tag_table_exists = self._table_exists("document_tags")
+            schedule_table_exists = self._table_exists("workflow_schedule")
+            page_tables_exist = self._table_exists("physical_pages") and self._table_exists("virtual_page_map")
+            text_index_exists = self._table_exists("virtual_documents_text")
+            if not text_index_exists:
+                self._drop_legacy_text_hit_index()
+            self._trigram = self._trigram_available()
+            page_fts_stale = self._trigram and not (
+                self._table_exists("physical_pages_fts") and self._trigger_exists("physical_pages_fts_ai")
+            )
+            text_fts_stale = self._trigram and not (
+                self._table_exists("virtual_documents_text_fts") and self._trigger_exists("virtual_documents_text_fts_ai")
+            )
             self.connection.execute(create_physical_files_table)
             self.connection.execute(create_virtual_documents_table)
             self.connection.execute(create_document_groups_table)
             self.connection.execute(create_document_group_memberships_table)
             self.connection.execute(create_saved_layouts_table)
+            self.connection.execute(create_page_visual_hashes_table)
+            self.connection.execute(create_document_tags_table)
+            self.connection.execute(create_workflow_schedule_table)
+            self.connection.execute(create_app_meta_table)
+            self.connection.execute(create_physical_pages_table)
+            if self._trigram:
+                self.connection.execute(create_physical_pages_fts)
+            self.connection.execute(create_virtual_page_map_table)
             self.connection.execute(create_virtual_documents_fts)
+            self.connection.execute(create_virtual_documents_text_table)
+            if self._trigram:
+                self.connection.execute(create_virtual_documents_text_fts)
             self._create_fts_triggers()
+            self._create_text_hit_triggers()
             self._create_usage_triggers()
+            self._create_tag_triggers()
+            self._create_workflow_schedule_triggers()
+            self._create_page_text_triggers()
+            if not tag_table_exists:
+                self._rebuild_document_tags()
+            if not schedule_table_exists:
+                self.reset_workflow_schedule()
+            if not page_tables_exist:
+                self._rebuild_page_text_index()
+            elif page_fts_stale:
+                self.connection.execute("INSERT INTO physical_pages_fts(physical_pages_fts) VALUES ('rebuild')")
+                logger.info("Migration: rebuilt trigram page index")
+            if not text_index_exists:
+                self._rebuild_text_hit_index()
+            elif text_fts_stale:
+                self.connection.execute("INSERT INTO virtual_documents_text_fts(virtual_documents_text_fts) VALUES ('rebuild')")
+                logger.info("Migration: rebuilt trigram text index")
             self._migrate_drop_ref_count()
+            self._migrate_add_pdf_facts()
+            ocr_cache_dropped = self._migrate_drop_ocr_cache()
+            self._semantic_columns = self._ensure_semantic_columns()
+            self._ensure_indexes()
+        if ocr_cache_dropped:
+            # Give the space of the cached PDFs back (not possible inside a transaction)
+            self.connection.execute("VACUUM")
+
+    def _table_exists(self, name: str) -> bool:
+        """Returns True if a table of that name exists."""
+        return self.connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+        ).fetchone() is not None
+
+    def _trigger_exists(self, name: str) -> bool:
+        """Returns True if a trigger of that name exists."""
+        return self.connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = ?", (name,)
+        ).fetchone() is not None
+
+    def _trigram_available(self) -> bool:
+        """
+        Checks for the FTS5 trigram tokenizer behind the substring indexes
+        (physical_pages_fts, virtual_documents_text_fts). Without it (SQLite < 3.34) the index tables
+        are not created; text search falls back to LIKE and hit counts to
+        the full text arithmetic.
+
+        Returns:
+            True if trigram FTS5 tables can be created.
+        """
+        try:
+            self.connection.execute("CREATE VIRTUAL TABLE temp.trigram_probe USING fts5(text, tokenize='trigram')")
+            self.connection.execute("DROP TABLE temp.trigram_probe")
+        except sqlite3.OperationalError as e:
+            logger.warning(f"FTS5 trigram tokenizer unavailable, text search uses LIKE and hit counts the full text: {e}")
+            return False
+        return True
+
+    def _ensure_semantic_columns(self) -> bool:
+        """
+        Migration: adds the generated columns of QueryBuilder.MATERIALIZED_FIELDS
+        (hot semantic_data fields) to virtual_documents. They are VIRTUAL and
+        indexed, so SQLite maintains them on every write of semantic_data.
+
+        Returns:
+            True if all columns are available (SQLite >= 3.31).
+        """
+        cursor = self.connection.cursor()
+        cursor.execute("PRAGMA table_xinfo(virtual_documents)")
+        columns = {row["name"] for row in cursor.fetchall()}
+
+        try:
+            for field, column in QueryBuilder.MATERIALIZED_FIELDS.items():
+                if column not in columns:
+                    self.connection.execute(
+                        f"ALTER TABLE virtual_documents ADD COLUMN {column} "
+                        f"GENERATED ALWAYS AS ({QueryBuilder.generated_column_expr(field)}) VIRTUAL"
+                    )
+                    logger.info(f"Migration: added generated column virtual_documents.{column}")
+        except sqlite3.OperationalError as e:
+            logger.warning(f"Generated columns unavailable, semantic filters use json_extract: {e}")
+            return False
+        return True
+
+    def _managed_indexes(self) -> Dict[str, Tuple[str, str]]:
+        """Returns INDEXES plus the indexes on available generated columns."""
+        indexes = dict(self.INDEXES)
+        if self._semantic_columns:
+            for column in QueryBuilder.MATERIALIZED_FIELDS.values():
+                indexes[f"idx_virtual_documents_{column}"] = ("virtual_documents", column)
+        return indexes
+
+    def _ensure_indexes(self) -> None:
+        """
+        Synchronizes the managed secondary indexes with _managed_indexes().
+        Creates missing indexes, drops obsolete managed ones and refreshes
+        the planner statistics when something changed.
+        """
+        managed = self._managed_indexes()
+        cursor = self.connection.cursor()
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx\\_%' ESCAPE '\\'")
+        existing = {row[0] for row in cursor.fetchall()}
+
+        changed = False
+        for name in sorted(existing - set(managed)):
+            self.connection.execute(f"DROP INDEX IF EXISTS {name}")
+            logger.info(f"Index manager: dropped obsolete index {name}")
+            changed = True
+
+        for name, (table, columns) in managed.items():
+            if name not in existing:
+                self.connection.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+                logger.info(f"Index manager: created index {name} ON {table} ({columns})")
+                changed = True
+
+        if changed:
+            self.connection.execute("ANALYZE")
 
     def _migrate_drop_ref_count(self) -> None:
         """
@@ -206,6 +550,58 @@ CREATE TABLE IF NOT EXISTS saved_layouts (
             self.connection.execute("ALTER TABLE physical_files DROP COLUMN ref_count")
             logger.info("Migration: dropped legacy ref_count column from physical_files")
 
+    def _migrate_drop_ocr_cache(self) -> bool:
+        """
+        Migration: drops the ocr_cache table of older vaults. OCR results now
+        live in their own cache folder (see core/ocr_cache.py), so the vault
+        database and its backups no longer carry the cached PDFs.
+
+        Returns:
+            True if cached entries were dropped and the file should be vacuumed.
+        """
+        if not self._table_exists("ocr_cache"):
+            return False
+        had_entries = self.connection.execute("SELECT EXISTS (SELECT 1 FROM ocr_cache)").fetchone()[0]
+        self.connection.execute("DROP TABLE ocr_cache")
+        logger.info("Migration: dropped ocr_cache table, OCR results are cached outside the vault")
+        return bool(had_entries)
+
+    def _migrate_add_pdf_facts(self) -> None:
+        """
+        Migration: adds the pdf_facts column to physical_files and probes
+        every file whose facts are missing or from an older probe version.
+        Runs once per PdfFacts.VERSION; files that cannot be opened as a
+        PDF keep no facts.
+        """
+        cursor = self.connection.cursor()
+        cursor.execute("PRAGMA table_info(physical_files)")
+        columns = [row["name"] for row in cursor.fetchall()]
+        if "pdf_facts" not in columns:
+            self.connection.execute("ALTER TABLE physical_files ADD COLUMN pdf_facts TEXT")
+            logger.info("Migration: added pdf_facts column to physical_files")
+
+        version = str(PdfFacts.VERSION)
+        row = self.connection.execute("SELECT value FROM app_meta WHERE key = ?", (self.PDF_FACTS_VERSION_KEY,)).fetchone()
+        if row and row[0] == version:
+            return
+
+        rows = self.connection.execute("SELECT uuid, file_path, pdf_facts FROM physical_files").fetchall()
+        probed = 0
+        for file_uuid, file_path, raw in rows:
+            if PdfFacts.from_json(raw) is not None or not file_path:
+                continue
+            facts = probe_pdf(file_path, extract_text=False)
+            self.connection.execute(
+                "UPDATE physical_files SET pdf_facts = ? WHERE uuid = ?",
+                (facts.to_json() if facts else None, file_uuid),
+            )
+            probed += 1
+        self.connection.execute(
+            "INSERT OR REPLACE INTO app_meta (key, value) VALUES (?, ?)", (self.PDF_FACTS_VERSION_KEY, version)
+        )
+        if probed:
+            logger.info(f"Migration: probed PDF facts of {probed} physical files")
+
     def matches_condition(self, entity_uuid: str, query_dict: Dict[str, Any]) -> bool:
         """
         Checks if a specific document matches a set of filter conditions.
@@ -235,6 +631,38 @@ CREATE TABLE IF NOT EXISTS saved_layouts (
             logger.error(f"Error in matches_condition: {e}")
             return False
 
+    def filter_matching_uuids(self, entity_uuids: List[str], query_dict: Dict[str, Any]) -> Set[str]:
+        """
+        Set-based counterpart of matches_condition(): evaluates a filter once
+        against a whole candidate set.
+
+        Args:
+            entity_uuids: Candidate virtual document UUIDs.
+            query_dict: A dictionary defining the search/filter criteria.
+
+        Returns:
+            The subset of entity_uuids fulfilling the conditions.
+        """
+        if not self.connection or not entity_uuids:
+            return set()
+
+        if not query_dict:
+            return set(entity_uuids)
+
+        where_clause, params = self._qb.build_where(query_dict)
+        sql = (
+            "SELECT uuid FROM virtual_documents "
+            f"WHERE uuid IN (SELECT value FROM json_each(?)) AND ({where_clause})"
+        )
+
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(sql, [json.dumps(entity_uuids)] + params)
+            return {row[0] for row in cursor.fetchall()}
+        except sqlite3.Error as e:
+            logger.error(f"Error in filter_matching_uuids: {e}")
+            return set()
+
     def update_document_metadata(self, uuid: str, updates: Dict[str, Any]) -> bool:
         """
         Updates specific fields of a virtual document in the database.
@@ -349,6 +777,7 @@ CREATE TABLE IF NOT EXISTS saved_layouts (
         """
         with self._write() as conn:
             self.connection.execute(sql, (uuid,))
+        notify_pipeline_work()
 
     def queue_for_semantic_extraction(self, uuids: List[str]) -> None:
         """
@@ -365,6 +794,7 @@ CREATE TABLE IF NOT EXISTS saved_layouts (
         with self._write() as conn:
             for uid in uuids:
                 self.connection.execute(sql, (uid,))
+        notify_pipeline_work()
 
     def get_deleted_documents(self) -> List[Document]:
         """
@@ -445,14 +875,7 @@ CREATE TABLE IF NOT EXISTS saved_layouts (
         if not query or (not query.get("conditions") and not query.get("field")):
              return self.get_all_entities_view()
 
-        where_clause, params = self._qb.build_where(query)
-        
-        # Exclude deleted/archived documents unless explicitly searched
-        if "deleted" not in where_clause.lower():
-            where_clause = f"({where_clause}) AND deleted = 0"
-        if "archived" not in where_clause.lower():
-            where_clause = f"({where_clause}) AND archived = 0"
-            
+        where_clause, params = self._advanced_where(query)
         sql = f"""
             SELECT {self._doc_select}
             FROM virtual_documents
@@ -462,6 +885,27 @@ CREATE TABLE IF NOT EXISTS saved_layouts (
         
         return self._query_documents(sql, params)
 
+    def get_query_cache_stats(self) -> Dict[str, int]:
+        """
+        Returns the hit/miss counters of the compiled filter query cache.
+
+        Returns:
+            Dictionary with 'hits', 'misses' and 'size'.
+        """
+        return self._qb.cache_stats()
+
+    def _advanced_where(self, query: Dict[str, Any]) -> Tuple[str, List[Any]]:
+        """
+        Builds the WHERE clause of an advanced search. Deleted and archived
+        documents are excluded unless the query explicitly targets them.
+        """
+        where_clause, params = self._qb.build_where(query)
+        if "deleted" not in where_clause.lower():
+            where_clause = f"({where_clause}) AND deleted = 0"
+        if "archived" not in where_clause.lower():
+            where_clause = f"({where_clause}) AND archived = 0"
+        return where_clause, params
+
     def count_documents_advanced(self, query: Dict[str, Any]) -> int:
         """
         Returns the number of documents matching an advanced query.
@@ -656,6 +1100,159 @@ CREATE TABLE IF NOT EXISTS saved_layouts (
         """
         return self._query_documents(sql, (search_text,))
 
+    def get_document_list_rows(
+        self,
+        query: Optional[Dict[str, Any]] = None,
+        search_text: Optional[str] = None,
+        trash: bool = False,
+        extra_fields: Optional[List[str]] = None,
+    ) -> List[DocumentListRow]:
+        """
+        Retrieves compact document list rows straight from SQL, without the
+        full text or a hydrated semantic model. Row selection matches
+        get_deleted_entities_view (trash), search_documents_advanced (query),
+        search_documents (search_text) and get_all_entities_view (default).
+
+        Args:
+            query: Optional structured query dictionary.
+            search_text: Optional FTS5 query string (ignored if query is set).
+            trash: Return soft-deleted documents instead.
+            extra_fields: Dynamic column keys to project into DocumentListRow.extra.
+
+        Returns:
+            A list of DocumentListRow objects.
+        """
+        select, select_params, extra_keys = self._list_select(extra_fields or [])
+        params: List[Any] = list(select_params)
+
+        if trash:
+            sql = f"SELECT {select} FROM virtual_documents v WHERE v.deleted = 1 ORDER BY v.created_at DESC"
+        elif query and (query.get("conditions") or query.get("field")):
+            where_clause, where_params = self._advanced_where(query)
+            params.extend(where_params)
+            sql = f"""
+                SELECT {select}
+                FROM virtual_documents v
+                WHERE {where_clause}
+                ORDER BY v.created_at DESC
+            """
+        elif search_text:
+            params.append(search_text)
+            sql = f"""
+                SELECT {select}
+                FROM virtual_documents v
+                JOIN virtual_documents_fts f ON v.uuid = f.uuid
+                WHERE f.cached_full_text MATCH ? AND v.deleted = 0 AND v.archived = 0
+                ORDER BY rank
+            """
+        else:
+            sql = f"""
+                SELECT {select}
+                FROM virtual_documents v
+                WHERE v.deleted = 0 AND v.archived = 0
+                ORDER BY v.created_at DESC
+            """
+
+        cursor = self.connection.cursor()
+        cursor.execute(sql, params)
+        return [self._hydrator.hydrate_list_row(row, extra_keys) for row in cursor.fetchall()]
+
+    def _list_select(self, extra_fields: List[str]) -> Tuple[str, List[Any], List[str]]:
+        """
+        Builds the column list of get_document_list_rows().
+
+        Semantic values are read with json_extract (or the materialized
+        sem_* columns) and guarded by json_valid, so malformed rows yield
+        NULL instead of failing the whole list.
+
+        Args:
+            extra_fields: Dynamic column keys requested by the list.
+
+        Returns:
+            Tuple of (select clause, bound parameters, projected extra keys).
+        """
+        def semantic(expr: str) -> str:
+            return f"CASE WHEN json_valid(semantic_data) THEN {expr} END"
+
+        def extract(path: str) -> str:
+            return f"json_extract(semantic_data, '{path}')"
+
+        def field(name: str) -> str:
+            expr = self._qb.map_field(name)
+            return expr if self._qb.materialized else semantic(expr)
+
+        def party(role: str) -> str:
+            return (f"COALESCE(NULLIF({extract(f'$.meta_header.{role}.company')}, ''), "
+                    f"{extract(f'$.meta_header.{role}.name')})")
+
+        def first_body(value_sql: str) -> str:
+            # Bodies in document order, like SemanticExtraction.get_financial_value
+            return (f"(SELECT {value_sql} FROM json_each(semantic_data, '$.bodies') AS b "
+                    f"WHERE b.type = 'object' AND {value_sql} IS NOT NULL LIMIT 1)")
+
+        def financial(key: str) -> str:
+            value = f"json_extract(b.value, '{self.LIST_FINANCIAL_PATHS[key]}')"
+            if key in self.LIST_NUMERIC_FIELDS:
+                value = f"CAST({value} AS REAL)"
+            elif key == "currency":  # Model default of a parsed finance body
+                default = FinanceBody.model_fields["currency"].default
+                value = f"CASE WHEN b.key = 'finance_body' THEN COALESCE({value}, '{default}') ELSE {value} END"
+            return semantic(first_body(value))
+
+        body_number = "COALESCE(" + ", ".join(
+            f"NULLIF(json_extract(b.value, '$.{key}'), '')" for key in self.DOC_NUMBER_FALLBACKS
+        ) + ")"
+        doc_number = semantic(
+            f"COALESCE(NULLIF({extract('$.meta_header.doc_number')}, ''), "
+            f"CAST({first_body(body_number)} AS TEXT))"
+        )
+
+        expiry = ", ".join(
+            extract(path) for path in (
+                "$.bodies.legal_body.termination_date",
+                "$.bodies.legal_body.valid_until",
+                "$.bodies.legal_body.effective_date",
+                "$.bodies.finance_body.due_date",
+            )
+        )
+        columns = [
+            "v.uuid", "v.status", "v.export_filename", "v.page_count_virt", "v.created_at",
+            "v.last_used", "v.last_processed_at", "v.deleted_at", "v.locked_at",
+            "v.exported_at", "v.is_immutable", "v.deleted", "v.archived", "v.pdf_class",
+            "v.type_tags", "v.tags",
+            f"{semantic(party('sender'))} AS sender_name",
+            f"{field('doc_date')} AS doc_date",
+            f"{financial('total_gross')} AS total_amount",
+            f"{semantic(f'COALESCE({expiry})')} AS expiry_date",
+            semantic(
+                "(SELECT json_group_object(w.key, json_extract(w.value, '$.current_step')) "
+                "FROM json_each(semantic_data, '$.workflows') AS w)"
+            ) + " AS workflow_steps",
+        ]
+
+        params: List[Any] = []
+        extra_keys: List[str] = []
+        row_fields = DocumentListRow.__dataclass_fields__
+        for key in extra_fields:
+            if key in row_fields or key in extra_keys:
+                continue
+            if key == "recipient_name":
+                expr = semantic(party("recipient"))
+            elif key == "doc_number":
+                expr = doc_number
+            elif key in self.LIST_FINANCIAL_PATHS:
+                expr = financial(key)
+            elif key.startswith("semantic:") or ":" not in key:
+                parts = key.split(":", 1)[-1].split(".")
+                params.append("$" + "".join(f'."{p}"' for p in parts))
+                expr = semantic("json_extract(semantic_data, ?)")
+            else:
+                continue
+            columns.append(f"{expr} AS x_{len(extra_keys)}")
+            extra_keys.append(key)
+
+        return ", ".join(columns), params, extra_keys
+
     def delete_document(self, uuid: str) -> bool:
         """
         Performs a soft-delete on a document and records the timestamp.
@@ -797,6 +1394,8 @@ CREATE TABLE IF NOT EXISTS saved_layouts (
     def close(self) -> None:
         """Safely closes the database connection."""
         if self.connection:
+            stats = self.get_query_cache_stats()
+            logger.info(f"Query cache: {stats['hits']} hits, {stats['misses']} misses, {stats['size']} templates")
             self.connection.close()
             self.connection = None
 
@@ -818,36 +1417,35 @@ CREATE TABLE IF NOT EXISTS saved_layouts (
         Aggregates all unique tags and type labels from the database.
 
         Returns:
-            A dictionary mapping tag names to their occurrence counts.
+            A dictionary mapping tag names to their occurrence counts
+            (documents carrying the tag, per tag kind).
         """
-        sql = "SELECT type_tags, tags FROM virtual_documents"
-        cursor = self.connection.cursor()
+        sql = "SELECT tag, COUNT(*) FROM document_tags GROUP BY tag"
         tag_counts: Dict[str, int] = {}
-        
         try:
+            cursor = self.connection.cursor()
             cursor.execute(sql)
-            rows = cursor.fetchall()
-            for (type_tags_json, tags_json) in rows:
-                for json_val in [type_tags_json, tags_json]:
-                    if not json_val:
-                        continue
-                    try:
-                        tags_list = json.loads(json_val)
-                        if isinstance(tags_list, list):
-                            for t in tags_list:
-                                if t and isinstance(t, str):
-                                    tag_counts[t] = tag_counts.get(t, 0) + 1
-                    except (json.JSONDecodeError, TypeError) as e:
-                        logger.debug(f"[DB] Skipping invalid tag JSON: {e}")
+            tag_counts = {tag: count for tag, count in cursor.fetchall()}
         except Exception as e:
             logger.warning(f"get_all_tags_with_counts failed: {e}")
-            
+
         return tag_counts
 
+    def _page_text_match(self, text: str) -> Optional[str]:
+        """
+        FTS5 query for pages containing text (case-insensitive substring), or
+        None if text is too short for the trigram index or the index is
+        unavailable (use LIKE instead).
+        """
+        if not self._trigram or len(text) < 3:
+            return None
+        return '"' + text.replace('"', '""') + '"'
+
     def get_virtual_uuids_with_text_content(self, text: str) -> List[str]:
         """
         Performs a deep search for documents containing a specific text snippet.
-        Searches cached logical text and raw physical OCR data.
+        Searches cached logical text and the raw physical OCR text of the
+        document's pages.
 
         Args:
             text: The text to search for.
@@ -868,21 +1466,23 @@ CREATE TABLE IF NOT EXISTS saved_layouts (
         for row in cursor.fetchall():
             found_uuids.add(row[0])
                 
-        # 2. Deep Physical Search
-        sql_p = "SELECT uuid FROM physical_files WHERE raw_ocr_data LIKE ?"
-        cursor.execute(sql_p, (f"%{text}%",))
-        phys_uuids = [r[0] for r in cursor.fetchall()]
-            
-        if phys_uuids:
-            for p_uuid in phys_uuids:
-                sql_map = """SELECT uuid FROM virtual_documents
-                             WHERE deleted = 0 AND EXISTS (
-                                 SELECT 1 FROM json_each(source_mapping)
-                                 WHERE json_extract(value, '$.file_uuid') = ?
-                             )"""
-                cursor.execute(sql_map, (p_uuid,))
-                for row in cursor.fetchall():
-                    found_uuids.add(row[0])
+        # 2. Deep Physical Search (page index, driven by the text hits)
+        match = self._page_text_match(text)
+        if match:
+            pages, condition, param = (
+                "physical_pages_fts f CROSS JOIN physical_pages p ON p.id = f.rowid",
+                "physical_pages_fts MATCH ?", match
+            )
+        else:
+            pages, condition, param = "physical_pages p", "p.text LIKE ?", f"%{text}%"
+        sql_p = f"""SELECT DISTINCT m.document_uuid
+                    FROM {pages}
+                    CROSS JOIN virtual_page_map m ON m.file_uuid = p.file_uuid AND m.phys_page = p.page
+                    JOIN virtual_documents v ON v.uuid = m.document_uuid
+                    WHERE {condition} AND v.deleted = 0"""
+        cursor.execute(sql_p, (param,))
+        for row in cursor.fetchall():
+            found_uuids.add(row[0])
                     
         return list(found_uuids)
 
@@ -901,47 +1501,22 @@ CREATE TABLE IF NOT EXISTS saved_layouts (
         if not text:
             return []
         
-        matching_pages: List[int] = []
-        sql = "SELECT source_mapping FROM virtual_documents WHERE uuid = ?"
+        match = self._page_text_match(text)
+        if match:
+            condition, param = (
+                "EXISTS (SELECT 1 FROM physical_pages_fts WHERE physical_pages_fts MATCH ? AND rowid = p.id)",
+                match
+            )
+        else:
+            condition, param = "p.text LIKE ?", f"%{text}%"
+        sql = f"""SELECT DISTINCT m.virt_page
+                  FROM virtual_page_map m
+                  JOIN physical_pages p ON p.file_uuid = m.file_uuid AND p.page = m.phys_page
+                  WHERE m.document_uuid = ? AND {condition}
+                  ORDER BY m.virt_page"""
         cursor = self.connection.cursor()
-        cursor.execute(sql, (doc_uuid,))
-        row = cursor.fetchone()
-        
-        if not row or not row[0]:
-            return []
-            
-        try:
-            mapping = json.loads(row[0])
-        except (json.JSONDecodeError, TypeError):
-            return []
-            
-        current_virt_page = 0
-        for segment in mapping:
-            p_uuid = segment.get("file_uuid")
-            src_pages = segment.get("pages", [])
-            
-            if not p_uuid or not src_pages:
-                continue
-                
-            cursor.execute("SELECT raw_ocr_data FROM physical_files WHERE uuid = ?", (p_uuid,))
-            ocr_row = cursor.fetchone()
-            
-            if ocr_row and ocr_row[0]:
-                try:
-                    ocr_map = json.loads(ocr_row[0])
-                except (json.JSONDecodeError, TypeError):
-                    ocr_map = {}
-                    
-                for i, src_page_idx in enumerate(src_pages):
-                    virt_page_idx = current_virt_page + i
-                    # OCR map keys are strings of 1-based indices
-                    page_text = ocr_map.get(str(src_page_idx))
-                    if page_text and text.lower() in page_text.lower():
-                        matching_pages.append(virt_page_idx)
-                        
-            current_virt_page += len(src_pages)
-            
-        return matching_pages
+        cursor.execute(sql, (doc_uuid, param))
+        return [row[0] for row in cursor.fetchall()]
 
     def get_available_tags(self, system: bool = False) -> List[str]:
         """
@@ -953,23 +1528,14 @@ CREATE TABLE IF NOT EXISTS saved_layouts (
         Returns:
             List of unique tag names.
         """
-        col = "type_tags" if system else "tags"
-        sql = f"SELECT {col} FROM virtual_documents WHERE {col} IS NOT NULL"
-        cursor = self.connection.cursor()
-        tags: Set[str] = set()
+        sql = "SELECT DISTINCT tag FROM document_tags WHERE kind = ? ORDER BY tag"
         try:
-            cursor.execute(sql)
-            for (json_val,) in cursor.fetchall():
-                try:
-                    data = json.loads(json_val)
-                    if isinstance(data, list):
-                        for t in data:
-                            tags.add(str(t))
-                except (json.JSONDecodeError, TypeError) as e:
-                    logger.debug(f"[DB] Skipping invalid tag list: {e}")
+            cursor = self.connection.cursor()
+            cursor.execute(sql, ("type" if system else "user",))
+            return [row[0] for row in cursor.fetchall()]
         except sqlite3.Error as e:
             logger.error(f"[DB] get_all_tags query failed: {e}")
-        return sorted(list(tags))
+            return []
 
     def count_documents(self) -> int:
         """Returns total count of non-deleted documents."""
@@ -1086,6 +1652,40 @@ CREATE TABLE IF NOT EXISTS saved_layouts (
             return str(mapping[0].get("file_uuid"))
         return None
 
+    def _text_hit_counts(self, text: str) -> Optional[Dict[str, int]]:
+        """
+        Counts case-insensitive, non-overlapping occurrences of text in the
+        cached_full_text of all documents. The trigram phrase query only
+        selects the documents containing text; their full texts are then
+        read from virtual_documents_text and counted in Python (FTS5 keeps
+        no per-document occurrence counts for phrases). The cost therefore
+        grows with the size of the matched texts, not of the whole vault.
+
+        Args:
+            text: The search text.
+
+        Returns:
+            {uuid: count} of the documents containing text, or None if text
+            is shorter than a trigram or the index is unavailable.
+        """
+        needle = text.lower()
+        if not self._trigram or len(needle) < 3:
+            return None
+
+        cursor = self.connection.cursor()
+        cursor.execute(
+            """SELECT t.uuid, t.text FROM virtual_documents_text_fts f
+               CROSS JOIN virtual_documents_text t ON t.id = f.rowid
+               WHERE virtual_documents_text_fts MATCH ?""",
+            ('"' + needle.replace('"', '""') + '"',)
+        )
+        counts: Dict[str, int] = {}
+        for uuid, content in cursor.fetchall():
+            count = content.lower().count(needle)
+            if count:
+                counts[uuid] = count
+        return counts
+
     def count_total_text_occurrences_advanced(self, query: Dict[str, Any], text: str) -> int:
         """
         Sums up all occurrences of 'text' in the 'cached_full_text' of documents
@@ -1097,8 +1697,24 @@ CREATE TABLE IF NOT EXISTS saved_layouts (
         where_clause, params = self._qb.build_where(query)
         if "deleted" not in where_clause.lower():
             where_clause = f"({where_clause}) AND deleted = 0"
+
+        try:
+            counts = self._text_hit_counts(text)
+            if counts is not None:
+                if not counts:
+                    return 0
+                sql = f"""
+                    SELECT uuid FROM virtual_documents
+                    WHERE {where_clause} AND uuid IN (SELECT value FROM json_each(?))
+                """
+                cursor = self.connection.cursor()
+                cursor.execute(sql, params + [json.dumps(list(counts))])
+                return sum(counts[row[0]] for row in cursor.fetchall())
+        except Exception as e:
+            logger.error(f"[DB] Trigram hit count failed, counting in full text: {e}")
             
-        # SQL trick to count occurrences: (length(haystack) - length(replace(haystack, needle, ''))) / length(needle)
+        # Texts shorter than a trigram:
+        # (length(haystack) - length(replace(haystack, needle, ''))) / length(needle)
         # We use LOWER() for case-insensitive matching.
         sql = f"""
             SELECT SUM(
@@ -1124,6 +1740,13 @@ CREATE TABLE IF NOT EXISTS saved_layouts (
         """
         if not text or not uuids:
             return {}
+
+        try:
+            counts = self._text_hit_counts(text)
+            if counts is not None:
+                return {uuid: counts.get(uuid, 0) for uuid in uuids}
+        except Exception as e:
+            logger.error(f"[DB] Trigram hit count failed, counting in full text: {e}")
             
         needle = text.lower()
         needle_len = max(1, len(text))
@@ -1235,6 +1858,94 @@ CREATE TABLE IF NOT EXISTS saved_layouts (
             for trigger_sql in triggers:
                 self.execute(trigger_sql)
 
+    def _create_text_hit_triggers(self) -> None:
+        """
+        Keeps the text hit index in sync: virtual_documents_text follows
+        virtual_documents.cached_full_text (keyed by uuid), and
+        virtual_documents_text_fts follows virtual_documents_text (external
+        content, only with the trigram tokenizer). The insert trigger also
+        clears a stale row, since INSERT OR REPLACE does not fire delete
+        triggers.
+        """
+        insert_text = (
+            "INSERT INTO virtual_documents_text (uuid, text) "
+            "SELECT new.uuid, new.cached_full_text "
+            "WHERE new.cached_full_text IS NOT NULL AND new.cached_full_text != '';"
+        )
+        triggers = [
+            f"""
+            CREATE TRIGGER IF NOT EXISTS virtual_documents_text_ai AFTER INSERT ON virtual_documents BEGIN
+                DELETE FROM virtual_documents_text WHERE uuid = new.uuid;
+                {insert_text}
+            END;
+            """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS virtual_documents_text_au AFTER UPDATE OF uuid, cached_full_text ON virtual_documents
+            WHEN (old.uuid IS NOT new.uuid OR old.cached_full_text IS NOT new.cached_full_text)
+            BEGIN
+                DELETE FROM virtual_documents_text WHERE uuid = old.uuid;
+                {insert_text}
+            END;
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS virtual_documents_text_ad AFTER DELETE ON virtual_documents BEGIN
+                DELETE FROM virtual_documents_text WHERE uuid = old.uuid;
+            END;
+            """
+        ]
+        fts_triggers = [
+            """
+            CREATE TRIGGER IF NOT EXISTS virtual_documents_text_fts_ai AFTER INSERT ON virtual_documents_text BEGIN
+                INSERT INTO virtual_documents_text_fts(rowid, text) VALUES (new.id, new.text);
+            END;
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS virtual_documents_text_fts_ad AFTER DELETE ON virtual_documents_text BEGIN
+                INSERT INTO virtual_documents_text_fts(virtual_documents_text_fts, rowid, text) VALUES ('delete', old.id, old.text);
+            END;
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS virtual_documents_text_fts_au AFTER UPDATE ON virtual_documents_text BEGIN
+                INSERT INTO virtual_documents_text_fts(virtual_documents_text_fts, rowid, text) VALUES ('delete', old.id, old.text);
+                INSERT INTO virtual_documents_text_fts(rowid, text) VALUES (new.id, new.text);
+            END;
+            """
+        ]
+        with self._write() as conn:
+            for trigger_sql in triggers:
+                self.execute(trigger_sql)
+            if self._trigram:
+                for trigger_sql in fts_triggers:
+                    self.execute(trigger_sql)
+            else:  # A vault indexed by a newer SQLite: the index goes stale, rebuilt once available
+                for trigger_name in ("virtual_documents_text_fts_ai", "virtual_documents_text_fts_ad",
+                                     "virtual_documents_text_fts_au"):
+                    conn.execute(f"DROP TRIGGER IF EXISTS {trigger_name}")
+
+    def _rebuild_text_hit_index(self) -> None:
+        """Migration: fills virtual_documents_text (and its FTS index) from all documents."""
+        with self._write() as conn:
+            conn.execute("DELETE FROM virtual_documents_text")
+            if self._trigram:
+                conn.execute("INSERT INTO virtual_documents_text_fts(virtual_documents_text_fts) VALUES ('delete-all')")
+            conn.execute(
+                "INSERT INTO virtual_documents_text (uuid, text) "
+                "SELECT uuid, cached_full_text FROM virtual_documents "
+                "WHERE cached_full_text IS NOT NULL AND cached_full_text != ''"
+            )
+        logger.info("Migration: built trigram text index")
+
+    def _drop_legacy_text_hit_index(self) -> None:
+        """
+        Migration: drops the first trigram index, which was keyed by the
+        implicit rowid of virtual_documents (renumbered by VACUUM) and read
+        through an fts5vocab table. It is rebuilt from virtual_documents_text.
+        """
+        for trigger_name in ("virtual_documents_text_ai", "virtual_documents_text_au", "virtual_documents_text_ad"):
+            self.connection.execute(f"DROP TRIGGER IF EXISTS {trigger_name}")
+        self.connection.execute("DROP TABLE IF EXISTS virtual_documents_text_vocab")
+        self.connection.execute("DROP TABLE IF EXISTS virtual_documents_text_fts")
+
     def _create_usage_triggers(self) -> None:
         """
         Phase 110: Atomic Usage Tracker.
@@ -1280,6 +1991,311 @@ CREATE TABLE IF NOT EXISTS saved_layouts (
             for trigger_sql in triggers:
                 self.execute(trigger_sql)
 
+    @staticmethod
+    def _tag_array_sql(col: str) -> str:
+        """SQL for a JSON tag array column; non-array or malformed values become '[]'."""
+        return (
+            f"COALESCE(CASE WHEN json_valid({col}) THEN "
+            f"CASE WHEN json_type({col}) = 'array' THEN {col} END END, '[]')"
+        )
+
+    def _create_tag_triggers(self) -> None:
+        """
+        Keeps document_tags in sync with the 'tags' and 'type_tags' JSON arrays.
+        The insert trigger also clears stale rows, since INSERT OR REPLACE does
+        not fire delete triggers.
+        """
+        insert_new_tags = "\n".join(
+            f"INSERT OR IGNORE INTO document_tags (document_uuid, kind, tag) "
+            f"SELECT new.uuid, '{kind}', value FROM json_each({self._tag_array_sql(f'new.{col}')}) "
+            f"WHERE type = 'text' AND value != '';"
+            for kind, col in (("user", "tags"), ("type", "type_tags"))
+        )
+        triggers = [
+            f"""
+            CREATE TRIGGER IF NOT EXISTS document_tags_ai AFTER INSERT ON virtual_documents BEGIN
+                DELETE FROM document_tags WHERE document_uuid = new.uuid;
+                {insert_new_tags}
+            END;
+            """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS document_tags_au AFTER UPDATE OF uuid, tags, type_tags ON virtual_documents
+            WHEN (old.uuid IS NOT new.uuid OR old.tags IS NOT new.tags OR old.type_tags IS NOT new.type_tags)
+            BEGIN
+                DELETE FROM document_tags WHERE document_uuid = old.uuid;
+                {insert_new_tags}
+            END;
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS document_tags_ad AFTER DELETE ON virtual_documents BEGIN
+                DELETE FROM document_tags WHERE document_uuid = old.uuid;
+            END;
+            """
+        ]
+        with self._write() as conn:
+            for trigger_sql in triggers:
+                self.execute(trigger_sql)
+
+    @staticmethod
+    def _workflows_object_sql(col: str) -> str:
+        """SQL for the '$.workflows' object of a semantic_data column; anything else becomes '{}'."""
+        return (
+            f"COALESCE(CASE WHEN json_valid({col}) THEN "
+            f"CASE WHEN json_type({col}, '$.workflows') = 'object' "
+            f"THEN json_extract({col}, '$.workflows') END END, '{{}}')"
+        )
+
+    def _create_workflow_schedule_triggers(self) -> None:
+        """
+        Keeps workflow_schedule rows in sync with the workflows of each
+        document. Any change to data that auto-transition conditions can
+        read (semantic data, type tags, PDF class, page count, dates,
+        deleted/archived state) re-creates the document's rows as due.
+        """
+        insert_due_rows = (
+            "INSERT OR REPLACE INTO workflow_schedule (document_uuid, rule_id, next_eval_at) "
+            f"SELECT new.uuid, key, '' FROM json_each({self._workflows_object_sql('new.semantic_data')});"
+        )
+        watched = ("uuid", "semantic_data", "type_tags", "pdf_class", "page_count_virt",
+                   "created_at", "deleted", "archived")
+        changed = " OR ".join(f"old.{col} IS NOT new.{col}" for col in watched)
+        triggers = [
+            f"""
+            CREATE TRIGGER IF NOT EXISTS workflow_schedule_ai AFTER INSERT ON virtual_documents BEGIN
+                DELETE FROM workflow_schedule WHERE document_uuid = new.uuid;
+                {insert_due_rows}
+            END;
+            """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS workflow_schedule_au AFTER UPDATE OF {", ".join(watched)} ON virtual_documents
+            WHEN ({changed})
+            BEGIN
+                DELETE FROM workflow_schedule WHERE document_uuid = old.uuid;
+                {insert_due_rows}
+            END;
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS workflow_schedule_ad AFTER DELETE ON virtual_documents BEGIN
+                DELETE FROM workflow_schedule WHERE document_uuid = old.uuid;
+            END;
+            """
+        ]
+        with self._write() as conn:
+            for trigger_sql in triggers:
+                self.execute(trigger_sql)
+
+    def reset_workflow_schedule(self) -> None:
+        """
+        Rebuilds workflow_schedule from all documents with every entry due,
+        e.g. after workflow rule definitions changed.
+        """
+        with self._write() as conn:
+            conn.execute("DELETE FROM workflow_schedule")
+            conn.execute(
+                "INSERT OR REPLACE INTO workflow_schedule (document_uuid, rule_id, next_eval_at) "
+                f"SELECT v.uuid, w.key, '' FROM virtual_documents v, "
+                f"json_each({self._workflows_object_sql('v.semantic_data')}) AS w"
+            )
+        logger.info("Workflow schedule reset: all workflow documents due")
+
+    def get_meta(self, key: str) -> Optional[str]:
+        """
+        Reads a value from the app_meta key/value store.
+
+        Args:
+            key: The entry key.
+
+        Returns:
+            The stored value, or None if the key is unknown.
+        """
+        row = self.connection.execute("SELECT value FROM app_meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: Optional[str]) -> None:
+        """
+        Stores a value in the app_meta key/value store.
+
+        Args:
+            key: The entry key.
+            value: The value to store.
+        """
+        with self._write() as conn:
+            conn.execute("INSERT OR REPLACE INTO app_meta (key, value) VALUES (?, ?)", (key, value))
+
+    def get_due_workflow_documents(self, now: str) -> List[Document]:
+        """
+        Retrieves active documents with at least one workflow whose next
+        auto-transition evaluation is due.
+
+        Args:
+            now: Current time as ISO timestamp.
+
+        Returns:
+            A list of Document objects.
+        """
+        sql = f"""
+            SELECT {self._doc_select}
+            FROM virtual_documents
+            WHERE uuid IN (
+                SELECT document_uuid FROM workflow_schedule WHERE next_eval_at <= ?
+            ) AND deleted = 0 AND archived = 0
+        """
+        return self._query_documents(sql, (now,))
+
+    def set_workflow_schedule(self, uuid: str, schedule: Dict[str, Optional[str]]) -> None:
+        """
+        Stores the next evaluation times of a document's workflows.
+
+        Args:
+            uuid: The document UUID.
+            schedule: Mapping rule_id -> ISO timestamp, or None if no
+                      auto-transition can fire until the document changes.
+        """
+        with self._write() as conn:
+            conn.executemany(
+                "UPDATE workflow_schedule SET next_eval_at = ? WHERE document_uuid = ? AND rule_id = ?",
+                [(next_eval, uuid, rule_id) for rule_id, next_eval in schedule.items()],
+            )
+
+    @staticmethod
+    def _ocr_pages_sql(col: str) -> str:
+        """SQL for the JSON page map in a raw_ocr_data column; anything else becomes '{}'."""
+        return f"CASE WHEN json_valid({col}) AND json_type({col}) = 'object' THEN {col} ELSE '{{}}' END"
+
+    @staticmethod
+    def _page_map_select_sql(uuid_col: str, mapping_col: str, from_clause: str = "") -> str:
+        """
+        SELECT of (document_uuid, virt_page, file_uuid, phys_page) rows for a
+        source_mapping column. Virtual pages are numbered across segments;
+        segments without a file_uuid are skipped.
+        """
+        return (
+            f"SELECT {uuid_col}, ROW_NUMBER() OVER (PARTITION BY {uuid_col} ORDER BY s.key, p.key) - 1, "
+            f"json_extract(s.value, '$.file_uuid'), p.value "
+            f"FROM {from_clause}json_each(CASE WHEN json_valid({mapping_col}) AND json_type({mapping_col}) = 'array' "
+            f"THEN {mapping_col} ELSE '[]' END) AS s, json_each(s.value, '$.pages') AS p "
+            f"WHERE s.type = 'object' AND json_extract(s.value, '$.file_uuid') IS NOT NULL "
+            f"AND p.type = 'integer'"
+        )
+
+    def _create_page_text_triggers(self) -> None:
+        """
+        Keeps the page text index in sync: physical_pages follows
+        physical_files.raw_ocr_data, physical_pages_fts follows physical_pages
+        (external content, only with the trigram tokenizer) and
+        virtual_page_map follows source_mapping.
+        Insert triggers also clear stale rows, since INSERT OR REPLACE does
+        not fire delete triggers.
+        """
+        insert_pages = (
+            "INSERT OR IGNORE INTO physical_pages (file_uuid, page, text) "
+            f"SELECT new.uuid, CAST(key AS INTEGER), value FROM json_each({self._ocr_pages_sql('new.raw_ocr_data')}) "
+            "WHERE type = 'text' AND value != '';"
+        )
+        insert_map = (
+            "INSERT OR REPLACE INTO virtual_page_map (document_uuid, virt_page, file_uuid, phys_page) "
+            f"{self._page_map_select_sql('new.uuid', 'new.source_mapping')};"
+        )
+        triggers = [
+            f"""
+            CREATE TRIGGER IF NOT EXISTS physical_pages_files_ai AFTER INSERT ON physical_files BEGIN
+                DELETE FROM physical_pages WHERE file_uuid = new.uuid;
+                {insert_pages}
+            END;
+            """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS physical_pages_files_au AFTER UPDATE OF uuid, raw_ocr_data ON physical_files
+            WHEN (old.uuid IS NOT new.uuid OR old.raw_ocr_data IS NOT new.raw_ocr_data)
+            BEGIN
+                DELETE FROM physical_pages WHERE file_uuid = old.uuid;
+                {insert_pages}
+            END;
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS physical_pages_files_ad AFTER DELETE ON physical_files BEGIN
+                DELETE FROM physical_pages WHERE file_uuid = old.uuid;
+            END;
+            """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS virtual_page_map_ai AFTER INSERT ON virtual_documents BEGIN
+                DELETE FROM virtual_page_map WHERE document_uuid = new.uuid;
+                {insert_map}
+            END;
+            """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS virtual_page_map_au AFTER UPDATE OF uuid, source_mapping ON virtual_documents
+            WHEN (old.uuid IS NOT new.uuid OR old.source_mapping IS NOT new.source_mapping)
+            BEGIN
+                DELETE FROM virtual_page_map WHERE document_uuid = old.uuid;
+                {insert_map}
+            END;
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS virtual_page_map_ad AFTER DELETE ON virtual_documents BEGIN
+                DELETE FROM virtual_page_map WHERE document_uuid = old.uuid;
+            END;
+            """
+        ]
+        fts_triggers = [
+            """
+            CREATE TRIGGER IF NOT EXISTS physical_pages_fts_ai AFTER INSERT ON physical_pages BEGIN
+                INSERT INTO physical_pages_fts(rowid, text) VALUES (new.id, new.text);
+            END;
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS physical_pages_fts_ad AFTER DELETE ON physical_pages BEGIN
+                INSERT INTO physical_pages_fts(physical_pages_fts, rowid, text) VALUES ('delete', old.id, old.text);
+            END;
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS physical_pages_fts_au AFTER UPDATE ON physical_pages BEGIN
+                INSERT INTO physical_pages_fts(physical_pages_fts, rowid, text) VALUES ('delete', old.id, old.text);
+                INSERT INTO physical_pages_fts(rowid, text) VALUES (new.id, new.text);
+            END;
+            """
+        ]
+        with self._write() as conn:
+            for trigger_sql in triggers:
+                self.execute(trigger_sql)
+            if self._trigram:
+                for trigger_sql in fts_triggers:
+                    self.execute(trigger_sql)
+            else:  # A vault indexed by a newer SQLite: the index goes stale, rebuilt once available
+                for trigger_name in ("physical_pages_fts_ai", "physical_pages_fts_ad", "physical_pages_fts_au"):
+                    conn.execute(f"DROP TRIGGER IF EXISTS {trigger_name}")
+
+    def _rebuild_page_text_index(self) -> None:
+        """Migration: fills physical_pages (and its FTS index) and virtual_page_map from existing data."""
+        with self._write() as conn:
+            conn.execute("DELETE FROM physical_pages")
+            if self._trigram:
+                conn.execute("INSERT INTO physical_pages_fts(physical_pages_fts) VALUES ('delete-all')")
+            conn.execute(
+                "INSERT OR IGNORE INTO physical_pages (file_uuid, page, text) "
+                "SELECT f.uuid, CAST(t.key AS INTEGER), t.value "
+                f"FROM physical_files f, json_each({self._ocr_pages_sql('f.raw_ocr_data')}) AS t "
+                "WHERE t.type = 'text' AND t.value != ''"
+            )
+            conn.execute("DELETE FROM virtual_page_map")
+            conn.execute(
+                "INSERT OR REPLACE INTO virtual_page_map (document_uuid, virt_page, file_uuid, phys_page) "
+                f"{self._page_map_select_sql('v.uuid', 'v.source_mapping', 'virtual_documents v, ')}"
+            )
+        logger.info("Migration: built page text index")
+
+    def _rebuild_document_tags(self) -> None:
+        """Migration: fills document_tags from the JSON tag arrays of all documents."""
+        with self._write() as conn:
+            conn.execute("DELETE FROM document_tags")
+            for kind, col in (("user", "tags"), ("type", "type_tags")):
+                conn.execute(
+                    f"INSERT OR IGNORE INTO document_tags (document_uuid, kind, tag) "
+                    f"SELECT v.uuid, '{kind}', t.value "
+                    f"FROM virtual_documents v, json_each({self._tag_array_sql(f'v.{col}')}) AS t "
+                    f"WHERE t.type = 'text' AND t.value != ''"
+                )
+        logger.info("Migration: built document_tags index")
+
     def _update_table(self, table: str, pk_val: str, updates: Dict[str, Any], pk_col: str = "uuid") -> None:
         """Internal generic update helper."""
         if not updates:
@@ -1290,79 +2306,71 @@ CREATE TABLE IF NOT EXISTS saved_layouts (
         with self._write() as conn:
             self.execute(sql, tuple(vals))
 
+    def _rewrite_user_tags(self, match_tags: List[str], rewrite) -> int:
+        """
+        Rewrites the user tag list of every document carrying one of match_tags.
+        Affected documents are found via the document_tags index and updated
+        in a single transaction; triggers keep document_tags in sync.
+
+        Args:
+            match_tags: Tags selecting the affected documents.
+            rewrite: Callable mapping the old tag list to the new one.
+
+        Returns:
+            The number of documents modified.
+        """
+        if not match_tags:
+            return 0
+        placeholders = ", ".join(["?"] * len(match_tags))
+        sql_find = f"""
+            SELECT uuid, tags FROM virtual_documents
+            WHERE uuid IN (SELECT document_uuid FROM document_tags
+                           WHERE kind = 'user' AND tag IN ({placeholders}))
+        """
+        updates = []
+        with self._write() as conn:
+            for uid, tags_json in conn.execute(sql_find, list(match_tags)).fetchall():
+                try:
+                    tags = json.loads(tags_json or "[]")
+                except (json.JSONDecodeError, TypeError):
+                    continue
+                new_tags = rewrite(tags)
+                if new_tags != tags:
+                    updates.append((json.dumps(new_tags), uid))
+            conn.executemany("UPDATE virtual_documents SET tags = ? WHERE uuid = ?", updates)
+        return len(updates)
+
     def rename_tag(self, old_tag: str, new_tag: str) -> int:
         """
         Renames a tag across all documents.
         Returns the number of documents modified.
         """
-        cursor = self.connection.cursor()
-        sql_find = "SELECT uuid, tags FROM virtual_documents WHERE tags LIKE ?"
-        cursor.execute(sql_find, (f'%"%s"%' % old_tag.replace('"', '""'),))
-        rows = cursor.fetchall()
-        
-        count = 0
-        for uid, tags_json in rows:
-            try:
-                tags = json.loads(tags_json or "[]")
-                if old_tag in tags:
-                    # Replace
-                    tags = [new_tag if t == old_tag else t for t in tags]
-                    # Unique
-                    tags = list(dict.fromkeys(tags))
-                    self.update_document_metadata(uid, {"tags": tags})
-                    count += 1
-            except Exception:
-                continue
-        return count
+        # Replace, then unique
+        return self._rewrite_user_tags(
+            [old_tag],
+            lambda tags: list(dict.fromkeys(new_tag if t == old_tag else t for t in tags)),
+        )
 
     def delete_tag(self, tag: str) -> int:
         """
         Removes a tag from all documents.
         """
-        cursor = self.connection.cursor()
-        sql_find = "SELECT uuid, tags FROM virtual_documents WHERE tags LIKE ?"
-        cursor.execute(sql_find, (f'%"%s"%' % tag.replace('"', '""'),))
-        rows = cursor.fetchall()
-        
-        count = 0
-        for uid, tags_json in rows:
-            try:
-                tags = json.loads(tags_json or "[]")
-                if tag in tags:
-                    tags = [t for t in tags if t != tag]
-                    self.update_document_metadata(uid, {"tags": tags})
-                    count += 1
-            except Exception:
-                continue
-        return count
+        return self._rewrite_user_tags([tag], lambda tags: [t for t in tags if t != tag])
 
     def merge_tags(self, tags_to_merge: List[str], target_tag: str) -> int:
         """
         Merges multiple tags into a single target tag.
         """
-        cursor = self.connection.cursor()
-        sql_find = "SELECT uuid, tags FROM virtual_documents"
-        cursor.execute(sql_find)
-        rows = cursor.fetchall()
-        
-        count = 0
         merge_set = set(tags_to_merge)
-        for uid, tags_json in rows:
-            try:
-                tags = json.loads(tags_json or "[]")
-                current_set = set(tags)
-                if current_set.intersection(merge_set):
-                    # Remove merging tags
-                    new_tags = [t for t in tags if t not in merge_set]
-                    # Add target if not present
-                    if target_tag not in new_tags:
-                        new_tags.append(target_tag)
-                    
-                    self.update_document_metadata(uid, {"tags": new_tags})
-                    count += 1
-            except Exception:
-                continue
-        return count
+
+        def merge(tags: List[str]) -> List[str]:
+            # Remove merging tags, add target if not present
+            new_tags = [t for t in tags if t not in merge_set]
+            if target_tag not in new_tags:
+                new_tags.append(target_tag)
+            return new_tags
+
+        return self._rewrite_user_tags(list(merge_set), merge)
 
     # --- Saved Layouts ---
 
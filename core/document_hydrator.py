@@ -15,6 +15,7 @@ import json
 from typing import Any, Dict, List, Optional
 
 from core.logger import get_logger, get_silent_logger
+from core.models.list_row import DocumentListRow
 from core.models.semantic import SemanticExtraction
 from core.models.virtual import VirtualDocument as Document
 
@@ -82,6 +83,7 @@ class DocumentHydrator:
             "deleted_at":       data.get("deleted_at"),
             "locked_at":        data.get("locked_at"),
             "exported_at":      data.get("exported_at"),
+            "pdf_class":        data.get("pdf_class") or "C",
             "archived":         bool(data.get("archived", False)),
             "storage_location": data.get("storage_location"),
             "ai_confidence":    float(data.get("ai_confidence", 1.0)),
@@ -98,6 +100,44 @@ class DocumentHydrator:
             logger.debug(f"Faulty doc_data: {doc_data}")
             return None
 
+    def hydrate_list_row(self, row: Any, extra_keys: List[str]) -> DocumentListRow:
+        """
+        Convert a row of DatabaseManager.get_document_list_rows() into a
+        DocumentListRow.
+
+        Args:
+            row: A sqlite3.Row (or mapping) with the list projection columns.
+            extra_keys: Dynamic column keys, in the order of the x_<n> columns.
+
+        Returns:
+            The compact list row.
+        """
+        uuid = row["uuid"]
+        return DocumentListRow(
+            uuid=uuid,
+            status=row["status"],
+            original_filename=row["export_filename"] or f"Entity {str(uuid)[:8]}",
+            page_count=row["page_count_virt"],
+            created_at=row["created_at"],
+            last_used=row["last_used"],
+            last_processed_at=row["last_processed_at"],
+            deleted_at=row["deleted_at"],
+            locked_at=row["locked_at"],
+            exported_at=row["exported_at"],
+            is_immutable=bool(row["is_immutable"]),
+            deleted=bool(row["deleted"]),
+            archived=bool(row["archived"]),
+            pdf_class=row["pdf_class"] or "C",
+            type_tags=self._safe_json(row["type_tags"], []),
+            tags=self._parse_tags(row["tags"], uuid),
+            sender_name=row["sender_name"],
+            doc_date=row["doc_date"],
+            total_amount=row["total_amount"],
+            expiry_date=row["expiry_date"],
+            workflow_steps=self._safe_json(row["workflow_steps"], {}),
+            extra={key: row[f"x_{i}"] for i, key in enumerate(extra_keys)},
+        )
+
     # ── Private helpers ───────────────────────────────────────────────────────
 
     @staticmethod
@@ -14,3 +14,4 @@ from .physical import PhysicalFile
 from .virtual import VirtualDocument, SourceReference, VirtualPage
 from .types import DocType
 from .reporting import ReportDefinition, Aggregation
+from .list_row import DocumentListRow
@@ -0,0 +1,139 @@
+"""
+------------------------------------------------------------------------------
+Project:        KPaperFlux
+File:           core/models/list_row.py
+Version:        1.1.0
+Producer:       thorsten.schnebeck@gmx.net
+Generator:      Antigravity
+Description:    Compact, read-only projection of a virtual document as shown
+                in the document list. Built directly from SQL columns without
+                loading the full text or hydrating the semantic model, or
+                projected from a full document (from_document) for
+                comparison with the displayed row.
+------------------------------------------------------------------------------
+"""
+
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional
+
+
+@dataclass
+class DocumentListRow:
+    """
+    One row of the document list.
+
+    Attribute names mirror the VirtualDocument fields and properties the
+    list displays, so list code can treat rows and full documents alike.
+    The full VirtualDocument is loaded on demand via
+    DatabaseManager.get_document_by_uuid().
+    """
+    uuid: str
+    status: Optional[str] = None
+    original_filename: Optional[str] = None
+    page_count: Optional[int] = None
+    created_at: Optional[str] = None
+    last_used: Optional[str] = None
+    last_processed_at: Optional[str] = None
+    deleted_at: Optional[str] = None
+    locked_at: Optional[str] = None
+    exported_at: Optional[str] = None
+    is_immutable: bool = False
+    deleted: bool = False
+    archived: bool = False
+    pdf_class: str = "C"
+    type_tags: List[str] = field(default_factory=list)
+    tags: List[str] = field(default_factory=list)
+    sender_name: Optional[str] = None
+    doc_date: Optional[str] = None
+    total_amount: Optional[float] = None
+    expiry_date: Optional[str] = None
+    workflow_steps: Dict[str, str] = field(default_factory=dict)  # rule_id -> current_step
+    extra: Dict[str, Any] = field(default_factory=dict)  # Projected dynamic column values
+
+    # Not projected: consumers needing these must load the full document
+    semantic_data = None
+    text_content = None
+
+    @classmethod
+    def from_document(cls, doc: Any, extra_keys: Iterable[str] = ()) -> "DocumentListRow":
+        """
+        Projects a full VirtualDocument onto the list row fields, using the
+        document's property semantics (the SQL projection mirrors them).
+
+        Args:
+            doc: The VirtualDocument.
+            extra_keys: Dynamic column keys to project into extra (row
+                        fields are skipped, like in the SQL projection).
+
+        Returns:
+            The list row of the document.
+        """
+        sd = doc.semantic_data
+        workflows = getattr(sd, "workflows", None) if sd else None
+        return cls(
+            uuid=doc.uuid,
+            status=doc.status,
+            original_filename=doc.original_filename or f"Entity {str(doc.uuid)[:8]}",
+            page_count=doc.page_count,
+            created_at=doc.created_at,
+            last_used=doc.last_used,
+            last_processed_at=doc.last_processed_at,
+            deleted_at=doc.deleted_at,
+            locked_at=doc.locked_at,
+            exported_at=doc.exported_at,
+            is_immutable=bool(doc.is_immutable),
+            deleted=bool(doc.deleted),
+            archived=bool(doc.archived),
+            pdf_class=doc.pdf_class or "C",
+            type_tags=list(doc.type_tags or []),
+            tags=list(doc.tags or []),
+            sender_name=doc.sender_name,
+            doc_date=doc.doc_date,
+            total_amount=_plain(doc.total_amount),
+            expiry_date=doc.expiry_date,
+            workflow_steps={rule_id: wf.current_step for rule_id, wf in (workflows or {}).items()},
+            extra={
+                key: _plain(document_column_value(doc, key))
+                for key in extra_keys if key not in cls.__dataclass_fields__
+            },
+        )
+
+    def column_value(self, key: str) -> Any:
+        """
+        Returns the value of a list column.
+
+        Args:
+            key: Attribute name or projected dynamic column key.
+
+        Returns:
+            The value, or None if the column is not part of the projection.
+        """
+        if key in self.extra:
+            return self.extra[key]
+        return getattr(self, key, None)
+
+
+def document_column_value(doc: Any, key: str) -> Any:
+    """
+    Resolves a dynamic list column of a full VirtualDocument: a document
+    attribute or property, else a semantic_data attribute or extra field.
+
+    Args:
+        doc: The VirtualDocument.
+        key: The column key.
+
+    Returns:
+        The value, or None.
+    """
+    val = getattr(doc, key, None)
+    if val is None and doc.semantic_data:
+        val = getattr(doc.semantic_data, key, None)
+        if val is None and hasattr(doc.semantic_data, "model_extra") and doc.semantic_data.model_extra:
+            val = doc.semantic_data.model_extra.get(key)
+    return val
+
+
+def _plain(value: Any) -> Any:
+    """Decimals become floats, like the numbers read from SQL."""
+    return float(value) if isinstance(value, Decimal) else value
@@ -2,19 +2,88 @@
 ------------------------------------------------------------------------------
 Project:        KPaperFlux
 File:           core/models/physical.py
-Version:        2.0.0
+Version:        2.1.0
 Producer:       thorsten.schnebeck@gmx.net
 Generator:      Antigravity
 Description:    Data model for physical files stored in the immutable document 
                 vault. Tracks file metadata, perceptual hashes, and raw OCR 
-                content per page.
+                content per page, plus the structural PDF facts gathered by
+                the single-pass probe at ingest.
 ------------------------------------------------------------------------------
 """
 
+import base64
 import json
 from core.logger import get_silent_logger
-from dataclasses import dataclass, field
-from typing import Any, Dict, Optional, Tuple
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+# Embedded file names of ZUGFeRD / Factur-X / XRechnung invoice XML
+ZUGFERD_XML_NAMES = ("factur-x.xml", "zugferd-invoice.xml", "xrechnung.xml")
+
+
+@dataclass
+class PdfFacts:
+    """
+    Structural facts of a PDF, gathered in one pass by core.utils.pdf_probe
+    and persisted with the physical file so later stages do not reopen it.
+
+    page_texts is transient: the text layer is persisted as raw_ocr_data.
+    """
+    VERSION = 1  # Bump to invalidate persisted facts after probe changes
+
+    page_count: int = 0
+    has_text_layer: bool = False  # At least one page uses fonts (native PDF)
+    sig_flags: int = 0
+    is_hybrid: bool = False  # KPaperFlux hybrid container
+    zugferd_xml: Optional[bytes] = None
+    page_sizes: List[Tuple[float, float]] = field(default_factory=list)  # (width, height) in points
+    page_texts: Dict[str, str] = field(default_factory=dict)  # "page_num" -> text, not persisted
+
+    @property
+    def pdf_class(self) -> str:
+        """The Hybrid Protection class code (see core.utils.forensics.PDFClass)."""
+        if self.is_hybrid:
+            return "H"
+        signed = self.sig_flags > 0
+        if signed and self.zugferd_xml:
+            return "AB"
+        if signed:
+            return "A"
+        if self.zugferd_xml:
+            return "B"
+        return "C"
+
+    def to_json(self) -> str:
+        """Serializes the persistent facts to JSON."""
+        data = asdict(self)
+        del data["page_texts"]
+        data["version"] = self.VERSION
+        if self.zugferd_xml is not None:
+            data["zugferd_xml"] = base64.b64encode(self.zugferd_xml).decode("ascii")
+        return json.dumps(data)
+
+    @classmethod
+    def from_json(cls, raw: Optional[str]) -> Optional['PdfFacts']:
+        """
+        Parses facts written by to_json().
+
+        Returns:
+            The facts, or None if missing, malformed or from an older probe version.
+        """
+        if not raw:
+            return None
+        try:
+            data = json.loads(raw)
+            if data.pop("version", None) != cls.VERSION:
+                return None
+            xml = data.get("zugferd_xml")
+            data["zugferd_xml"] = base64.b64decode(xml) if xml else None
+            data["page_sizes"] = [tuple(size) for size in data.get("page_sizes", [])]
+            return cls(**data)
+        except (ValueError, TypeError) as e:
+            get_silent_logger().warning(f"Failed to decode PDF facts of physical file: {e}")
+            return None
 
 
 @dataclass
@@ -31,6 +100,7 @@ class PhysicalFile:
     page_count_phys: int = 0
     raw_ocr_data: Dict[str, str] = field(default_factory=dict)  # Map "page_num" -> "text"
     created_at: Optional[str] = None  # ISO format string
+    pdf_facts: Optional[PdfFacts] = None
 
     @classmethod
     def from_row(cls, row: Tuple[Any, ...]) -> 'PhysicalFile':
@@ -41,7 +111,7 @@ class PhysicalFile:
             row: A tuple containing database column values.
                  Expected indices: 0:uuid, 1:phash, 2:file_path, 
                  3:original_filename, 4:file_size, 5:raw_ocr_data, 
-                 6:created_at, 7:page_count_phys.
+                 6:created_at, 7:page_count_phys, 8:pdf_facts (optional).
 
         Returns:
             A populated PhysicalFile instance.
@@ -61,5 +131,6 @@ class PhysicalFile:
             file_size=int(row["file_size"]) if row["file_size"] else 0,
             raw_ocr_data=ocr_data,
             created_at=str(row["created_at"]) if row["created_at"] else None,
-            page_count_phys=int(row["page_count_phys"]) if "page_count_phys" in row.keys() and row["page_count_phys"] else 0
+            page_count_phys=int(row["page_count_phys"]) if "page_count_phys" in row.keys() and row["page_count_phys"] else 0,
+            pdf_facts=PdfFacts.from_json(row["pdf_facts"]) if "pdf_facts" in row.keys() else None,
         )
@@ -0,0 +1,216 @@
+"""
+------------------------------------------------------------------------------
+Project:        KPaperFlux
+File:           core/ocr_cache.py
+Version:        1.0.0
+Producer:       thorsten.schnebeck@gmx.net
+Generator:      Antigravity
+Description:    Persistent, size-bounded OCR result cache outside the vault
+                database. Entries are keyed by file content hash, OCR
+                language and OCR settings. The searchable output PDFs are
+                plain files in the cache folder, the page texts and the LRU
+                index live in a small SQLite file next to them, so evicting
+                an entry frees its disk space immediately.
+------------------------------------------------------------------------------
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from core.logger import get_logger
+
+logger = get_logger("ocr_cache")
+
+# (page text map, searchable OCR output PDF or None)
+OcrCacheEntry = Tuple[Dict[str, str], Optional[bytes]]
+
+
+def ocr_cache_key(file_sha: str, language: str, settings: str) -> str:
+    """
+    Builds the cache key of an OCR run.
+
+    Args:
+        file_sha: SHA256 of the OCR input file.
+        language: The OCR language string (e.g. 'deu+eng').
+        settings: A canonical string of all output-relevant OCR options.
+
+    Returns:
+        A hex digest identifying the OCR result.
+    """
+    return hashlib.sha256(f"{file_sha}|{language}|{settings}".encode("utf-8")).hexdigest()
+
+
+class OcrResultCache:
+    """
+    Thread-safe OCR result cache in its own folder. One instance per folder
+    is shared by all pipelines (see shared()).
+    """
+
+    _shared: Dict[str, "OcrResultCache"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, cache_dir: Union[str, Path], max_bytes: int) -> None:
+        """
+        Args:
+            cache_dir: Folder holding the index and the cached PDFs.
+            max_bytes: Size bound of all cached results.
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.cache_dir / "index.db"), check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS ocr_cache (
+                cache_key    TEXT PRIMARY KEY, -- sha256(file_sha|language|settings)
+                page_texts   TEXT NOT NULL,    -- JSON page map (page_num -> text)
+                has_pdf      INTEGER NOT NULL, -- 1 if <cache_key>.pdf holds the OCR output
+                byte_size    INTEGER NOT NULL,
+                created_at   TEXT,
+                last_used_at TEXT
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_ocr_cache_lru ON ocr_cache(last_used_at)")
+        self._conn.commit()
+
+    @classmethod
+    def shared(cls, cache_dir: Union[str, Path], max_bytes: int) -> "OcrResultCache":
+        """
+        Returns the cache instance of a folder, applying the current size bound.
+
+        Args:
+            cache_dir: Folder holding the index and the cached PDFs.
+            max_bytes: Size bound of all cached results.
+        """
+        with cls._shared_lock:
+            cache = cls._shared.get(str(cache_dir))
+            if cache is None:
+                cache = cls._shared[str(cache_dir)] = cls(cache_dir, max_bytes)
+            cache.max_bytes = max_bytes
+            return cache
+
+    def _pdf_path(self, cache_key: str) -> Path:
+        """Returns the file of a cached OCR output PDF."""
+        return self.cache_dir / f"{cache_key}.pdf"
+
+    def get(self, cache_key: str) -> Optional[OcrCacheEntry]:
+        """
+        Looks up a cached OCR result and marks it as recently used.
+
+        Args:
+            cache_key: Key from ocr_cache_key().
+
+        Returns:
+            The (page text map, output PDF) tuple, or None on a miss.
+        """
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT page_texts, has_pdf FROM ocr_cache WHERE cache_key = ?", (cache_key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                pdf_bytes = None
+                if row[1]:
+                    try:
+                        pdf_bytes = self._pdf_path(cache_key).read_bytes()
+                    except OSError as e:
+                        # PDF deleted behind our back: drop the stale entry
+                        logger.warning(f"OCR cache PDF of {cache_key} unreadable, dropping entry: {e}")
+                        self._conn.execute("DELETE FROM ocr_cache WHERE cache_key = ?", (cache_key,))
+                        self._conn.commit()
+                        return None
+                self._conn.execute(
+                    "UPDATE ocr_cache SET last_used_at = ? WHERE cache_key = ?",
+                    (datetime.now().isoformat(), cache_key),
+                )
+                self._conn.commit()
+            return json.loads(row[0]), pdf_bytes
+        except (sqlite3.Error, json.JSONDecodeError) as e:
+            logger.error(f"OCR cache lookup error for {cache_key}: {e}")
+            return None
+
+    def put(self, cache_key: str, text_map: Dict[str, str], pdf_bytes: Optional[bytes]) -> bool:
+        """
+        Stores an OCR result and evicts least recently used entries
+        until the cache fits into max_bytes.
+
+        Args:
+            cache_key: Key from ocr_cache_key().
+            text_map: Dictionary mapping 1-based page indices to text.
+            pdf_bytes: The searchable OCR output PDF, if any.
+
+        Returns:
+            True if the entry was stored.
+        """
+        page_texts = json.dumps(text_map)
+        byte_size = len(page_texts.encode("utf-8")) + (len(pdf_bytes) if pdf_bytes else 0)
+        if byte_size > self.max_bytes:
+            logger.debug(f"OCR result {cache_key} ({byte_size} bytes) exceeds the cache size, not cached")
+            return False
+
+        now = datetime.now().isoformat()
+        try:
+            with self._lock:
+                pdf_path = self._pdf_path(cache_key)
+                if pdf_bytes:
+                    # Write-then-rename, so a crash never leaves a torn PDF behind
+                    temp_path = pdf_path.with_suffix(".tmp")
+                    temp_path.write_bytes(pdf_bytes)
+                    os.replace(temp_path, pdf_path)
+                else:
+                    pdf_path.unlink(missing_ok=True)
+                self._conn.execute(
+                    """
+                    INSERT OR REPLACE INTO ocr_cache
+                        (cache_key, page_texts, has_pdf, byte_size, created_at, last_used_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    """,
+                    (cache_key, page_texts, 1 if pdf_bytes else 0, byte_size, now, now),
+                )
+                evicted = self._evict()
+                self._conn.commit()
+                for key in evicted:
+                    self._pdf_path(key).unlink(missing_ok=True)
+            return True
+        except (sqlite3.Error, OSError) as e:
+            logger.error(f"OCR cache save error for {cache_key}: {e}")
+            return False
+
+    def _evict(self) -> List[str]:
+        """
+        Deletes least recently used entries until the total size fits.
+
+        Returns:
+            The evicted keys, whose PDFs the caller removes after the commit.
+        """
+        total = self._conn.execute("SELECT COALESCE(SUM(byte_size), 0) FROM ocr_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return []
+
+        evicted: List[str] = []
+        for key, size in self._conn.execute(
+            "SELECT cache_key, byte_size FROM ocr_cache ORDER BY last_used_at ASC"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            evicted.append(key)
+            total -= size
+        self._conn.executemany("DELETE FROM ocr_cache WHERE cache_key = ?", [(key,) for key in evicted])
+        logger.info(f"OCR cache: evicted {len(evicted)} entries")
+        return evicted
+
+    def total_size(self) -> int:
+        """Returns the summed byte size of all cached entries."""
+        try:
+            with self._lock:
+                return int(self._conn.execute("SELECT COALESCE(SUM(byte_size), 0) FROM ocr_cache").fetchone()[0])
+        except sqlite3.Error as e:
+            logger.error(f"OCR cache size error: {e}")
+            return 0
@@ -2,7 +2,7 @@
 ------------------------------------------------------------------------------
 Project:        KPaperFlux
 File:           core/pipeline.py
-Version:        2.0.0
+Version:        2.1.1
 Producer:       thorsten.schnebeck@gmx.net
 Generator:      Antigravity
 Description:    Coordinator for document ingestion, processing, and storage.
@@ -19,9 +19,10 @@ import subprocess
 import tempfile
 import threading
 import uuid
-from concurrent.futures import CancelledError
+from concurrent.futures import CancelledError, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple, Union
+from typing import Any, Dict, Generator, List, Optional, Set, Tuple, Union
 from core.logger import get_logger, get_silent_logger
 
 logger = get_logger("pipeline")
@@ -34,10 +35,14 @@ from core.config import AppConfig
 from core.database import DatabaseManager
 from core.models.physical import PhysicalFile
 from core.models.virtual import VirtualDocument, VirtualDocument as Document, SourceReference, DocumentStatus
-from core.repositories import LogicalRepository, PhysicalRepository
+from core.repositories import LogicalRepository, PhysicalRepository, PageHashRepository
+from core.ocr_cache import OcrResultCache, ocr_cache_key
+from core.similarity import compute_file_page_hashes
+from core.utils.pdf_probe import probe_pdf
 from core.vault import DocumentVault
 from core.vocabulary import VocabularyManager
 from core.canonizer import CanonizerService
+from core.work_signal import notify_pipeline_work
 
 
 class CancellationToken:
@@ -73,11 +78,62 @@ class CancellationToken:
         self._event.clear()
 
 
+class OcrJobLimiter:
+    """Caps the total number of OCR worker processes across concurrent OCR runs.
+
+    Every ocrmypdf run reserves its ``--jobs`` count before starting and
+    returns it when done, so parallel ingest never oversubscribes the CPU::
+
+        with ocr_job_limiter.reserve(4) as jobs:
+            run_ocrmypdf(jobs=jobs)  # jobs <= capacity
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self._capacity = max(1, capacity)
+        self._in_use = 0
+        self._cond = threading.Condition()
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    def set_capacity(self, capacity: int) -> None:
+        """Changes the global cap; waiting runs are re-evaluated."""
+        with self._cond:
+            self._capacity = max(1, capacity)
+            self._cond.notify_all()
+
+    @contextmanager
+    def reserve(self, jobs: int) -> Generator[int, None, None]:
+        """Blocks until ``jobs`` (clamped to the capacity) are free and holds them for the block."""
+        with self._cond:
+            granted = max(1, min(jobs, self._capacity))
+            while self._in_use + granted > self._capacity:
+                self._cond.wait()
+            self._in_use += granted
+        try:
+            yield granted
+        finally:
+            with self._cond:
+                self._in_use -= granted
+                self._cond.notify_all()
+
+
+# Shared by all PipelineProcessor instances (import, reprocess, ...)
+ocr_job_limiter = OcrJobLimiter(AppConfig.DEFAULT_OCR_MAX_JOBS)
+
+
 class PipelineProcessor:
     """
     Coordinator for document ingestion, processing, and storage.
     """
 
+    # Default '--jobs' of a single OCR run
+    OCR_JOBS_PER_RUN = 4
+    OCR_LANGUAGE = "deu+eng"
+    # Output-relevant ocrmypdf options; part of the OCR cache key, so keep in sync with _run_ocr
+    OCR_SETTINGS = "skip-text,rotate-pages,deskew,optimize=1"
+
     def __init__(
         self,
         base_path: str = "vault",
@@ -102,22 +158,32 @@ class PipelineProcessor:
         # Repositories (Phase 2.0)
         self.physical_repo = PhysicalRepository(self.db)
         self.logical_repo = LogicalRepository(self.db)
+        self.page_hash_repo = PageHashRepository(self.db)
         self.current_process: Optional[subprocess.Popen] = None
+        self._active_processes: Set[subprocess.Popen] = set()
+        self._process_lock = threading.Lock()
+        self._ingest_lock = threading.Lock()
+        self._hash_locks: Dict[str, List[Any]] = {}
         self._token: CancellationToken = CancellationToken()
+        ocr_job_limiter.set_capacity(self.config.get_ocr_max_jobs())
 
     def terminate_activity(self) -> None:
         """Forcefully terminates any running subprocess and signals cooperative cancellation."""
         self._token.cancel()
-        if self.current_process:
+        with self._process_lock:
+            processes = set(self._active_processes)
+            if self.current_process:
+                processes.add(self.current_process)
+        for process in processes:
             try:
-                logger.info(f"[Pipeline] Terminating subprocess PID {self.current_process.pid}...")
-                self.current_process.kill()
+                logger.info(f"[Pipeline] Terminating subprocess PID {process.pid}...")
+                process.kill()
             except ProcessLookupError:
                 # Process already gone, safe to ignore
-                get_silent_logger().debug(f"Process {self.current_process.pid} already terminated.")
+                get_silent_logger().debug(f"Process {process.pid} already terminated.")
             except Exception as e:
                 get_silent_logger().debug(f"Error killing process: {e}")
-            self.current_process = None
+        self.current_process = None
 
     def reset_cancellation(self) -> None:
         """Reset the cancellation token before starting a new operation."""
@@ -135,13 +201,14 @@ class PipelineProcessor:
         """
         sha256_hash = hashlib.sha256()
         with open(path, "rb") as f:
-            for byte_block in iter(lambda: f.read(4096), b""):
+            # Large blocks: hashlib releases the GIL, so parallel ingest hashes concurrently
+            for byte_block in iter(lambda: f.read(1024 * 1024), b""):
                 sha256_hash.update(byte_block)
         return sha256_hash.hexdigest()
 
 
         
-    def _ingest_physical_file(self, file_path: str, move_source: bool = False) -> Optional[PhysicalFile]:
+    def _ingest_physical_file(self, file_path: str, move_source: bool = False, ocr_jobs: Optional[int] = None) -> Optional[PhysicalFile]:
         """
         Stage 0 Phase A: Physical Ingestion (Vault + OCR -> PhysicalFile).
         Handles Hashing, Dedup, Vault Storage, and OCR.
@@ -149,6 +216,7 @@ class PipelineProcessor:
         Args:
             file_path: The path to the file to ingest.
             move_source: Whether to move the source file instead of copying.
+            ocr_jobs: Optional OCR '--jobs' request (see _run_ocr).
 
         Returns:
             The created or existing PhysicalFile object, or None if ingestion failed.
@@ -160,6 +228,45 @@ class PipelineProcessor:
         logger.info(f"[STAGE 0] Starting Ingest for: {file_path}")
         file_sha = self._compute_sha256(path)
 
+        # Identical files ingested in parallel must end up as one physical record
+        with self._hash_lock(file_sha):
+            return self._ingest_by_hash(path, file_sha, move_source, ocr_jobs)
+
+    @contextmanager
+    def _hash_lock(self, file_sha: str) -> Generator[None, None, None]:
+        """
+        Serializes ingestion of files with the same content hash.
+
+        Args:
+            file_sha: The SHA256 of the file content.
+        """
+        with self._ingest_lock:
+            entry = self._hash_locks.setdefault(file_sha, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._ingest_lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._hash_locks[file_sha]
+
+    def _ingest_by_hash(self, path: Path, file_sha: str, move_source: bool, ocr_jobs: Optional[int]) -> Optional[PhysicalFile]:
+        """
+        Dedup check, Vault storage and text extraction of a hashed file.
+
+        Args:
+            path: The path to the file to ingest.
+            file_sha: The SHA256 of the file content.
+            move_source: Whether to move the source file instead of copying.
+            ocr_jobs: Optional OCR '--jobs' request (see _run_ocr).
+
+        Returns:
+            The created or existing PhysicalFile object.
+        """
+        file_path = str(path)
+
         # Check by SHA (Dedup)
         phys_file = self.physical_repo.get_by_phash(file_sha)
 
@@ -169,18 +276,17 @@ class PipelineProcessor:
             stored_path_str = self.vault.store_file_by_uuid(file_path, file_uuid, move=move_source)
             stored_path = Path(stored_path_str)
 
-            # 2. Extract Text / OCR
-            text_map: Dict[str, str] = {}
-            if self._is_native_pdf(stored_path):
-                text_map = self._extract_text_native(stored_path)
-                if not text_map:
-                    text_map = self._run_ocr(stored_path)
-            else:
-                text_map = self._run_ocr(stored_path)
+            # 2. Probe the PDF once (structure + native text layer), OCR otherwise
+            facts = probe_pdf(stored_path)
+            text_map: Dict[str, str] = facts.page_texts if facts else {}
+            if not text_map:
+                text_map = self._run_ocr(stored_path, jobs=ocr_jobs, file_sha=file_sha)
+                # OCR replaces the file with the searchable PDF
+                facts = probe_pdf(stored_path, extract_text=False)
 
             # 3. Create PhysicalFile Entry
             size = stored_path.stat().st_size
-            pages = self._calculate_page_count(stored_path)
+            pages = facts.page_count if facts else 0
 
             phys_file = PhysicalFile(
                 uuid=file_uuid,
@@ -191,9 +297,16 @@ class PipelineProcessor:
                 page_count_phys=pages,
                 raw_ocr_data=text_map,  # Stored as Dict/JSON
                 created_at=datetime.datetime.now().isoformat(),
+                pdf_facts=facts,
             )
             self.physical_repo.save(phys_file)
             logger.info(f"[Phase A] Imported new physical file: {file_uuid}")
+
+            # 4. Visual page hashes (duplicate detection reuses them). Rendered
+            #    by poppler like all stored hashes, so not from the probe above
+            page_hashes = compute_file_page_hashes(stored_path_str)
+            if page_hashes:
+                self.page_hash_repo.save_hashes(file_uuid, page_hashes)
         else:
             logger.info(f"[Phase A] Dedup: Using existing physical file {phys_file.uuid}")
             if move_source:
@@ -254,6 +367,8 @@ class PipelineProcessor:
         if not skip_ai:
             self._token.check()
             self._run_ai_analysis(v_doc, file_path)
+        else:
+            notify_pipeline_work()
 
         return v_doc
 
@@ -334,7 +449,10 @@ class PipelineProcessor:
             A tuple of UUIDs for the two resulting entities.
         """
         canonizer = CanonizerService(self.db, physical_repo=self.physical_repo, logical_repo=self.logical_repo)
-        return canonizer.split_entity(entity_uuid, split_after_page_index)
+        result = canonizer.split_entity(entity_uuid, split_after_page_index)
+        # Both parts are saved as NEW
+        notify_pipeline_work()
+        return result
 
     def restructure_file(self, file_uuid: str, new_mappings: List[List[Dict[str, Any]]]) -> List[str]:
         """
@@ -348,7 +466,11 @@ class PipelineProcessor:
             A list of new entity UUIDs.
         """
         canonizer = CanonizerService(self.db, physical_repo=self.physical_repo, logical_repo=self.logical_repo)
-        return canonizer.restructure_file_entities(file_uuid, new_mappings)
+        new_uuids = canonizer.restructure_file_entities(file_uuid, new_mappings)
+        # The new entities are saved as READY_FOR_PIPELINE
+        if new_uuids:
+            notify_pipeline_work()
+        return new_uuids
 
     def update_entity_structure(self, entity_uuid: str, new_mapping: List[Any]) -> bool:
         """
@@ -610,6 +732,8 @@ class PipelineProcessor:
                 entity_callback(v_doc.uuid)
 
         logger.info(f"[Stage 0] Created {len(new_uuids)} entities from instructions.")
+        if new_uuids:
+            notify_pipeline_work()
         return new_uuids
 
     def process_batch_with_instructions(self, file_paths: List[str], instructions: List[Dict[str, Any]], move_source: bool = False, progress_callback=None, entity_callback=None) -> List[str]:
@@ -633,15 +757,7 @@ class PipelineProcessor:
         total_steps = total_files + total_entities
         
         # 1. Ingest all
-        path_to_uuid: Dict[str, str] = {}
-        for idx, path in enumerate(file_paths):
-            if progress_callback:
-                # Use sub-total 0..total_files range for ingestion
-                progress_callback(idx + 1, total_steps, f"Ingesting {os.path.basename(path)}...")
-            
-            phys = self._ingest_physical_file(path, move_source)
-            if phys:
-                path_to_uuid[path] = phys.uuid
+        path_to_uuid = self._ingest_files(file_paths, move_source, progress_callback, total_steps)
 
         new_uuids: List[str] = []
 
@@ -714,8 +830,74 @@ class PipelineProcessor:
                     entity_callback(v_doc.uuid)
 
         logger.info(f"[Stage 0 Batch] Created {len(new_uuids)} entities from instructions across {len(file_paths)} files.")
+        if new_uuids:
+            notify_pipeline_work()
         return new_uuids
 
+    def _ingest_files(self, file_paths: List[str], move_source: bool, progress_callback=None, total_steps: int = 0) -> Dict[str, str]:
+        """
+        Ingests several physical files, in parallel if AppConfig.get_ingest_workers() > 1.
+        Threads suffice: hashing releases the GIL and OCR runs in ocrmypdf
+        subprocesses whose total '--jobs' are capped by ocr_job_limiter.
+
+        Args:
+            file_paths: List of paths to physical files.
+            move_source: Whether to move source files.
+            progress_callback: Optional callable(current_step, total_steps, label),
+                               called with steps 1..len(file_paths).
+            total_steps: The total passed through to progress_callback.
+
+        Returns:
+            A dictionary mapping source paths to physical file UUIDs.
+        """
+        path_to_uuid: Dict[str, str] = {}
+        workers = min(self.config.get_ingest_workers(), len(file_paths))
+
+        if workers <= 1:
+            for idx, path in enumerate(file_paths):
+                if progress_callback:
+                    # Use sub-total 0..total_files range for ingestion
+                    progress_callback(idx + 1, total_steps, f"Ingesting {os.path.basename(path)}...")
+
+                phys = self._ingest_physical_file(path, move_source)
+                if phys:
+                    path_to_uuid[path] = phys.uuid
+            return path_to_uuid
+
+        # Share the OCR job budget between the parallel files
+        ocr_jobs = max(1, ocr_job_limiter.capacity // workers)
+        logger.info(f"[Stage 0 Batch] Ingesting {len(file_paths)} files with {workers} workers ({ocr_jobs} OCR jobs each)")
+
+        def ingest(path: str) -> Optional[PhysicalFile]:
+            self._token.check()
+            with self.db.thread_connection():
+                return self._ingest_physical_file(path, move_source, ocr_jobs=ocr_jobs)
+
+        first_error: Optional[BaseException] = None
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest") as executor:
+            futures = {executor.submit(ingest, path): path for path in file_paths}
+            for done, future in enumerate(as_completed(futures), start=1):
+                path = futures[future]
+                try:
+                    phys = future.result()
+                    if phys:
+                        path_to_uuid[path] = phys.uuid
+                except CancelledError as e:
+                    first_error = first_error or e
+                except Exception as e:
+                    logger.error(f"[Stage 0 Batch] Ingest failed for {path}: {e}")
+                    first_error = first_error or e
+                if first_error:
+                    # Stop scheduling; running ingests finish or get killed
+                    for pending in futures:
+                        pending.cancel()
+                if progress_callback:
+                    progress_callback(done, total_steps, f"Ingested {os.path.basename(path)}")
+
+        if first_error:
+            raise first_error
+        return path_to_uuid
+
     def merge_documents(self, uuids: List[str]) -> bool:
         """
         Merges multiple documents LOGICALLY into a new entity.
@@ -752,6 +934,7 @@ class PipelineProcessor:
         )
         self.logical_repo.save(merged_doc)
         logger.info(f"[Pipeline] Logically merged {len(uuids)} documents into {merged_doc.uuid}")
+        notify_pipeline_work()
         return True
 
     def merge_documents_physical(self, uuids: List[str]) -> Optional[VirtualDocument]:
@@ -772,10 +955,10 @@ class PipelineProcessor:
             Extracted text content.
         """
         try:
-            if self._is_native_pdf(path):
+            facts = probe_pdf(path)
+            if facts and facts.has_text_layer:
                 logger.info(f"[{doc_uuid}] Detected Native PDF. Extracting text directly.")
-                text_map = self._extract_text_native(path)
-                text = "\n".join(text_map.values())
+                text = "\n".join(facts.page_texts.values())
                 # Fallback check
                 if len(text.strip()) < 50:
                     logger.info(f"[{doc_uuid}] Native text insufficient (<50 chars). Falling back to OCR.")
@@ -790,27 +973,6 @@ class PipelineProcessor:
             logger.info(f"Extraction Error [{doc_uuid}]: {e}")
             return ""
 
-    def _is_native_pdf(self, path: Path) -> bool:
-        """
-        Checks if a PDF is native (has a text layer) or a scanned image.
-
-        Args:
-            path: Path to the PDF file.
-
-        Returns:
-            True if a text layer is detected.
-        """
-        try:
-            with pikepdf.Pdf.open(path) as pdf:
-                # Heuristic: Check if pages have fonts
-                for page in pdf.pages:
-                    if "/Font" in page.resources:
-                        return True
-            return False
-        except Exception as e:
-            logger.info(f"Error checking PDF native status: {e}")
-            return False
-
     def _extract_text_native(self, path: Path) -> Dict[str, str]:
         """
         Extracts text from a native PDF using pdfminer.
@@ -845,19 +1007,29 @@ class PipelineProcessor:
             except (ImportError, Exception):
                 return {}
 
-    def _run_ocr(self, path: Path) -> Dict[str, str]:
+    def _run_ocr(self, path: Path, jobs: Optional[int] = None, file_sha: Optional[str] = None) -> Dict[str, str]:
         """
         Executes OCRmyPDF to extract text from a scanned document.
+        Results are served from / stored in the persistent OCR cache.
 
         Args:
             path: Path to the source file.
+            jobs: Requested '--jobs' count (default OCR_JOBS_PER_RUN). The run
+                  waits until the global OcrJobLimiter grants the jobs.
+            file_sha: Optional precomputed SHA256 of the file.
 
         Returns:
             A dictionary mapping 1-based page indices to the OCR'd text.
         """
         ocr_binary = self.config.get_ocr_binary()
+        cache_key = self._ocr_cache_key(file_sha or self._compute_sha256(path), ocr_binary)
+        cached = self._load_cached_ocr(cache_key, path)
+        if cached is not None:
+            return cached
 
-        with tempfile.TemporaryDirectory() as temp_dir:
+        with tempfile.TemporaryDirectory() as temp_dir, \
+                ocr_job_limiter.reserve(jobs or self.OCR_JOBS_PER_RUN) as granted_jobs:
+            self._token.check()
             output_pdf = Path(temp_dir) / f"ocr_{path.name}"
 
             # Run ocrmypdf with speed and quality optimizations
@@ -866,29 +1038,36 @@ class PipelineProcessor:
                 "--skip-text",      # Only OCR what needs it
                 "--rotate-pages",   # Fix landscape/inverted scans
                 "--deskew",         # Straighten crooked scans
-                "--jobs", "4",      # Parallel processing
+                "--jobs", str(granted_jobs),  # Parallel processing (globally capped)
                 "--optimize", "1",   # Basic optimization without heavy compression
-                "-l", "deu+eng",
+                "-l", self.OCR_LANGUAGE,
                 str(path),
                 str(output_pdf),
             ]
 
+            process: Optional[subprocess.Popen] = None
             try:
-                self.current_process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                stdout, stderr = self.current_process.communicate()
+                process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+                with self._process_lock:
+                    self._active_processes.add(process)
+                    self.current_process = process
+                stdout, stderr = process.communicate()
 
-                if self.current_process.returncode != 0:
+                if process.returncode != 0:
                     logger.info(f"OCR Error: {stderr.decode('utf-8', errors='ignore')}")
             except Exception as e:
                 logger.info(f"Subprocess Error during OCR: {e}")
-                if self.current_process:
+                if process:
                     try:
-                        self.current_process.kill()
+                        process.kill()
                     except ProcessLookupError:
                         # Process already terminated
                         logger.debug("[Pipeline] OCR Process already gone during cleanup.")
             finally:
-                self.current_process = None
+                with self._process_lock:
+                    self._active_processes.discard(process)
+                    if self.current_process is process:
+                        self.current_process = None
 
             if output_pdf.exists():
                 # 1. Replace the original file with the OCR'd version (Sandwich PDF)
@@ -903,10 +1082,80 @@ class PipelineProcessor:
                     logger.error(f"[OCR] Failed to replace original file: {e}")
 
                 # 2. Extract text from the OCR'd PDF using native extractor
-                return self._extract_text_native(path)
+                text_map = self._extract_text_native(path)
+                self._store_cached_ocr(cache_key, path, text_map, ocr_binary)
+                return text_map
 
         return {}
 
+    def _ocr_cache_key(self, file_sha: str, ocr_binary: str) -> str:
+        """
+        Builds the OCR cache key of a file under the current OCR settings.
+
+        Args:
+            file_sha: SHA256 of the OCR input file.
+            ocr_binary: The OCR executable (different versions may differ in output).
+
+        Returns:
+            The cache key.
+        """
+        return ocr_cache_key(file_sha, self.OCR_LANGUAGE, f"{ocr_binary}|{self.OCR_SETTINGS}")
+
+    def _load_cached_ocr(self, cache_key: str, path: Path) -> Optional[Dict[str, str]]:
+        """
+        Serves an OCR run from the cache. Like a real run, a cache hit
+        replaces the file with the cached searchable PDF.
+
+        Args:
+            cache_key: Key from _ocr_cache_key().
+            path: Path to the file that would be OCRed.
+
+        Returns:
+            The cached page text map, or None on a miss (or if caching is disabled).
+        """
+        max_bytes = self.config.get_ocr_cache_max_bytes()
+        if max_bytes <= 0:
+            return None
+        entry = OcrResultCache.shared(self.config.get_ocr_cache_dir(), max_bytes).get(cache_key)
+        if entry is None:
+            return None
+
+        text_map, pdf_bytes = entry
+        if pdf_bytes:
+            try:
+                path.write_bytes(pdf_bytes)
+            except OSError as e:
+                logger.error(f"[OCR] Failed to restore cached searchable PDF for {path}: {e}")
+                return None
+        logger.info(f"[OCR] Cache hit for {path.name} ({len(text_map)} pages)")
+        return text_map
+
+    def _store_cached_ocr(self, cache_key: str, path: Path, text_map: Dict[str, str], ocr_binary: str) -> None:
+        """
+        Caches an OCR result under the input hash (with the searchable PDF,
+        for re-imports of the original scan) and under the output hash (for
+        re-OCR of the already searchable vault file).
+
+        Args:
+            cache_key: Key of the OCR input.
+            path: Path to the file, now holding the OCR output.
+            text_map: The extracted page text map.
+            ocr_binary: The OCR executable used.
+        """
+        max_bytes = self.config.get_ocr_cache_max_bytes()
+        if max_bytes <= 0:
+            return
+        try:
+            pdf_bytes = path.read_bytes()
+        except OSError as e:
+            logger.error(f"[OCR] Cannot read OCR output for caching: {e}")
+            return
+        cache = OcrResultCache.shared(self.config.get_ocr_cache_dir(), max_bytes)
+        cache.put(cache_key, text_map, pdf_bytes)
+        output_key = self._ocr_cache_key(hashlib.sha256(pdf_bytes).hexdigest(), ocr_binary)
+        if output_key != cache_key:
+            cache.put(output_key, text_map, None)
+
     def _calculate_page_count(self, path: Path) -> int:
         """
         Calculates the number of pages in a PDF.
@@ -2,7 +2,7 @@
 ------------------------------------------------------------------------------
 Project:        KPaperFlux
 File:           core/query_builder.py
-Version:        1.0.0
+Version:        1.2.0
 Producer:       thorsten.schnebeck@gmx.net
 Generator:      Claude Sonnet 4.6
 Description:    Pure SQL fragment builder for structured filter query dicts.
@@ -12,21 +12,90 @@ Description:    Pure SQL fragment builder for structured filter query dicts.
 ------------------------------------------------------------------------------
 """
 
-from datetime import datetime, timedelta
-from typing import Any, Dict, List, Tuple
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Any, Callable, Dict, Hashable, List, Tuple
 
 from core.logger import get_logger
 
 logger = get_logger("core.query_builder")
 
 
+# Relative date literals understood by QueryBuilder.resolve_relative_date()
+RELATIVE_DATE_LITERALS = frozenset({
+    "TODAY", "LAST_7_DAYS", "LAST_30_DAYS", "LAST_90_DAYS",
+    "THIS_MONTH", "LAST_MONTH", "THIS_YEAR", "LAST_YEAR",
+})
+
+
+@lru_cache(maxsize=2)
+def _relative_date_table(today: date) -> Dict[str, Any]:
+    """Resolved RELATIVE_DATE_LITERALS for one day (built once per day)."""
+    last_month_end = today.replace(day=1) - timedelta(days=1)
+    last_year = today.year - 1
+    return {
+        "TODAY":        today.isoformat(),
+        "LAST_7_DAYS":  ((today - timedelta(days=7)).isoformat(), today.isoformat()),
+        "LAST_30_DAYS": ((today - timedelta(days=30)).isoformat(), today.isoformat()),
+        "LAST_90_DAYS": ((today - timedelta(days=90)).isoformat(), today.isoformat()),
+        "THIS_MONTH":   (today.replace(day=1).isoformat(), today.isoformat()),
+        "LAST_MONTH":   (last_month_end.replace(day=1).isoformat(), last_month_end.isoformat()),
+        "THIS_YEAR":    (today.replace(month=1, day=1).isoformat(), today.isoformat()),
+        "LAST_YEAR":    (
+            today.replace(year=last_year, month=1, day=1).isoformat(),
+            today.replace(year=last_year, month=12, day=31).isoformat(),
+        ),
+    }
+
+
+class CompiledQuery:
+    """
+    A WHERE clause template compiled from one query shape.
+
+    ``sql`` is identical for all query dicts of the same shape (same fields,
+    operators, nesting and value kinds); ``params()`` extracts the bound
+    parameters of a concrete dict of that shape.
+    """
+
+    __slots__ = ("sql", "_extractors")
+
+    def __init__(self, sql: str, extractors: List[Callable[[Dict[str, Any]], List[Any]]]) -> None:
+        self.sql = sql
+        self._extractors = extractors
+
+    def params(self, node: Dict[str, Any]) -> List[Any]:
+        """
+        Returns the bound parameters of a query dict of this shape.
+
+        Args:
+            node: The query dict the template was looked up for.
+
+        Returns:
+            Parameters in placeholder order.
+        """
+        params: List[Any] = []
+        for leaf, extract in zip(QueryBuilder.iter_leaves(node), self._extractors):
+            params.extend(extract(leaf))
+        return params
+
+
 class QueryBuilder:
     """
     Translates structured filter query dicts into SQL WHERE clause fragments.
 
-    Stateless — all public methods are pure transformations with no side
-    effects and no database connection required.  The class exists solely to
-    be instantiated once inside DatabaseManager and reused across queries.
+    All public methods are pure transformations with no database connection
+    required.  The class exists solely to be instantiated once inside
+    DatabaseManager and reused across queries.  build_where() memoizes the
+    SQL template of each query shape in a bounded LRU (see CompiledQuery),
+    so repeated filters skip SQL generation and always produce the same
+    statement text for sqlite3's statement cache; cache_stats() exposes
+    hit/miss counters.
+    Construction-time options describe the helper structures the database
+    provides: ``materialized`` maps hot semantic fields to the indexed
+    generated columns of MATERIALIZED_FIELDS instead of ``json_extract``, and
+    ``tag_index`` resolves tag filters through the ``document_tags`` table.
 
     Supported query node shapes
     ---------------------------
@@ -87,6 +156,61 @@ class QueryBuilder:
         ),
     }
 
+    # ── Materialized semantic fields ─────────────────────────────────────────
+    # Generated columns on virtual_documents that mirror the FIELD_MAP
+    # expressions above (created by DatabaseManager._ensure_semantic_columns).
+    # Columns are declared without type so their values are identical to the
+    # json_extract results (no affinity conversion).
+    MATERIALIZED_FIELDS: Dict[str, str] = {
+        "sender":      "sem_sender",
+        "doc_date":    "sem_doc_date",
+        "amount":      "sem_amount",
+        "direction":   "sem_direction",
+        "expiry_date": "sem_expiry_date",
+    }
+
+    # ``semantic:`` paths that are equivalent to a materialized field
+    MATERIALIZED_PATHS: Dict[str, str] = {
+        "meta_header.sender.name": "sender",
+        "meta_header.doc_date":    "doc_date",
+        "direction":               "direction",
+    }
+
+    # Tag array columns → document_tags.kind
+    TAG_KINDS: Dict[str, str] = {"tags": "user", "type_tags": "type"}
+
+    # Maximum number of compiled query shapes kept by build_where()
+    CACHE_SIZE: int = 256
+
+    def __init__(self, materialized: bool = False, tag_index: bool = False) -> None:
+        """
+        Args:
+            materialized: Map MATERIALIZED_FIELDS to their generated columns.
+                          Only valid if the database provides them.
+            tag_index:    Resolve tag 'contains' filters via the document_tags
+                          table instead of scanning the JSON arrays per row.
+        """
+        self.materialized = materialized
+        self.tag_index = tag_index
+        self._cache: "OrderedDict[Hashable, CompiledQuery]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @classmethod
+    def generated_column_expr(cls, field: str) -> str:
+        """
+        Returns the generation expression of a materialized field. Rows with
+        malformed semantic JSON yield NULL instead of failing every write.
+
+        Args:
+            field: A key of MATERIALIZED_FIELDS.
+
+        Returns:
+            SQL expression for ``GENERATED ALWAYS AS (...)``.
+        """
+        return f"CASE WHEN json_valid(semantic_data) THEN {cls.FIELD_MAP[field]} END"
+
     # ── Public API ────────────────────────────────────────────────────────────
 
     def build_where(self, node: Dict[str, Any]) -> Tuple[str, List[Any]]:
@@ -99,19 +223,88 @@ class QueryBuilder:
         Returns:
             Tuple of (sql_fragment, bound_parameters).
         """
+        compiled = self.compile(node)
+        return compiled.sql, compiled.params(node)
+
+    def compile(self, node: Dict[str, Any]) -> CompiledQuery:
+        """
+        Returns the compiled template for the shape of a query node,
+        generating and caching it on first use.
+
+        Args:
+            node: Leaf condition dict or group dict.
+
+        Returns:
+            The CompiledQuery of the node's shape.
+        """
+        key = self.shape_key(node)
+        with self._cache_lock:
+            compiled = self._cache.get(key)
+            if compiled is not None:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                return compiled
+            self.cache_misses += 1
+
+        sql, _ = self._build_node(node)
+        extractors = [self._leaf_param_extractor(leaf) for leaf in self.iter_leaves(node)]
+        compiled = CompiledQuery(sql, extractors)
+
+        with self._cache_lock:
+            self._cache[key] = compiled
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return compiled
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Returns hit/miss counters and the current size of the compiled query cache."""
+        with self._cache_lock:
+            return {"hits": self.cache_hits, "misses": self.cache_misses, "size": len(self._cache)}
+
+    def shape_key(self, node: Dict[str, Any]) -> Hashable:
+        """
+        Normalizes a query node into a hashable key of everything that
+        influences the generated SQL: structure, fields, operators, negation
+        and the kind of each value (scalar truthiness, sequence type and
+        length, date range) — but not the values themselves.
+
+        Args:
+            node: Leaf condition dict or group dict.
+
+        Returns:
+            A hashable shape key.
+        """
         if "field" in node:
-            return self._build_leaf(node)
+            field, op, val = node["field"], node["op"], node.get("value")
+            if field != "workflow_step":
+                op, val = self._resolve_operand(op, val)
+            return ("L", field, op, bool(node.get("negate", False)), self._value_shape(val))
 
         if "conditions" in node:
-            return self._build_group(node)
+            return (
+                "G",
+                str(node.get("operator", "AND")).upper(),
+                tuple(self.shape_key(cond) for cond in node["conditions"]),
+            )
 
-        return "1=1", []
+        return ("N",)
+
+    @staticmethod
+    def iter_leaves(node: Dict[str, Any]):
+        """Yields the leaf conditions of a query node in placeholder order."""
+        if "field" in node:
+            yield node
+        elif "conditions" in node:
+            for cond in node["conditions"]:
+                yield from QueryBuilder.iter_leaves(cond)
 
     def map_field(self, field: str) -> str:
         """
         Maps a logical field name to its SQL expression.
 
-        Handles three resolution strategies in order:
+        Handles these resolution strategies in order:
+        0. Materialized generated column (if enabled).
         1. Static FIELD_MAP lookup.
         2. ``semantic:`` / ``json:`` prefix → dynamic json_extract path.
         3. ``stamp_field:`` prefix → correlated subquery over stamp form fields.
@@ -123,6 +316,12 @@ class QueryBuilder:
         Returns:
             SQL expression string.
         """
+        if self.materialized:
+            logical = self.MATERIALIZED_PATHS.get(field.split(":", 1)[1], field) \
+                if field.startswith(("json:", "semantic:")) else field
+            if logical in self.MATERIALIZED_FIELDS:
+                return self.MATERIALIZED_FIELDS[logical]
+
         if field in self.FIELD_MAP:
             return self.FIELD_MAP[field]
 
@@ -159,20 +358,7 @@ class QueryBuilder:
         Returns:
             Tuple of (sql_fragment, bound_parameters).
         """
-        resolved = self.resolve_relative_date(val)
-
-        # Range tuple → force between regardless of original op
-        if isinstance(resolved, tuple) and len(resolved) == 2:
-            op = "between"
-            val = list(resolved)
-        else:
-            val = resolved
-
-        if isinstance(val, str):
-            if val.lower() == "true":
-                val = True
-            elif val.lower() == "false":
-                val = False
+        op, val = self._resolve_operand(op, val)
 
         if op == "equals":
             if isinstance(val, list):
@@ -183,6 +369,16 @@ class QueryBuilder:
             return f"{expr} = ? COLLATE NOCASE", [val]
 
         if op == "contains":
+            if expr in self.TAG_KINDS and self.tag_index:
+                values = val if isinstance(val, list) else [val]
+                if not values:
+                    return "1=1", []
+                placeholders = ", ".join(["?"] * len(values))
+                return (
+                    f"uuid IN (SELECT document_uuid FROM document_tags "
+                    f"WHERE kind = '{self.TAG_KINDS[expr]}' AND tag COLLATE NOCASE IN ({placeholders}))",
+                    values,
+                )
             if expr in ("type_tags", "tags"):
                 if isinstance(val, list):
                     if not val:
@@ -250,31 +446,11 @@ class QueryBuilder:
         if not isinstance(val, str):
             return val
 
-        today = datetime.now().date()
-
-        _LITERALS: Dict[str, Any] = {
-            "TODAY":        today.isoformat(),
-            "LAST_7_DAYS":  ((today - timedelta(days=7)).isoformat(), today.isoformat()),
-            "LAST_30_DAYS": ((today - timedelta(days=30)).isoformat(), today.isoformat()),
-            "LAST_90_DAYS": ((today - timedelta(days=90)).isoformat(), today.isoformat()),
-            "THIS_MONTH":   (today.replace(day=1).isoformat(), today.isoformat()),
-            "THIS_YEAR":    (today.replace(month=1, day=1).isoformat(), today.isoformat()),
-        }
-        if val in _LITERALS:
-            return _LITERALS[val]
-
-        if val == "LAST_MONTH":
-            end = today.replace(day=1) - timedelta(days=1)
-            return (end.replace(day=1).isoformat(), end.isoformat())
-
-        if val == "LAST_YEAR":
-            y = today.year - 1
-            return (
-                today.replace(year=y, month=1, day=1).isoformat(),
-                today.replace(year=y, month=12, day=31).isoformat(),
-            )
+        if val in RELATIVE_DATE_LITERALS:
+            return _relative_date_table(datetime.now().date())[val]
 
         if val.startswith("relative:"):
+            today = datetime.now().date()
             try:
                 offset_str = val.split(":")[1]
                 unit = offset_str[-1]
@@ -291,6 +467,91 @@ class QueryBuilder:
 
     # ── Internal helpers ──────────────────────────────────────────────────────
 
+    def _resolve_operand(self, op: str, val: Any) -> Tuple[str, Any]:
+        """
+        Normalizes operator and value before SQL generation: resolves
+        relative dates (a range promotes the operator to ``between``) and
+        converts ``"true"``/``"false"`` strings to booleans.
+        """
+        resolved = self.resolve_relative_date(val)
+
+        # Range tuple → force between regardless of original op
+        if isinstance(resolved, tuple) and len(resolved) == 2:
+            return "between", list(resolved)
+
+        val = resolved
+        if isinstance(val, str):
+            if val.lower() == "true":
+                val = True
+            elif val.lower() == "false":
+                val = False
+        return op, val
+
+    @staticmethod
+    def _value_shape(val: Any) -> Hashable:
+        """The part of a (resolved) value that influences the generated SQL."""
+        if isinstance(val, (list, tuple, set)):
+            return (type(val).__name__, len(val))
+        return ("scalar", bool(val))
+
+    def _leaf_param_extractor(self, leaf: Dict[str, Any]) -> Callable[[Dict[str, Any]], List[Any]]:
+        """
+        Returns a function producing the bound parameters of leaves shaped
+        like ``leaf``, mirroring map_op() / _build_workflow_step_clause().
+        """
+        field, op = leaf["field"], leaf["op"]
+
+        if field == "workflow_step":
+            if op == "is_not_empty":
+                return lambda node: []
+            if op == "in" and isinstance(leaf.get("value"), list):
+                return lambda node: list(node.get("value"))
+            return lambda node: [node.get("value")]
+
+        op, _ = self._resolve_operand(op, leaf.get("value"))
+        expr = self.map_field(field)
+
+        def operand(node: Dict[str, Any]) -> Any:
+            return self._resolve_operand(node["op"], node.get("value"))[1]
+
+        def as_list(node: Dict[str, Any]) -> List[Any]:
+            val = operand(node)
+            return list(val) if isinstance(val, list) else [val]
+
+        if op == "equals":
+            return as_list
+        if op == "contains":
+            if expr in ("type_tags", "tags"):
+                return as_list
+            return lambda node: [f"%{v}%" for v in as_list(node)]
+        if op == "starts_with":
+            return lambda node: [f"{operand(node)}%"]
+        if op in ("gt", "gte", "lt", "lte"):
+            return lambda node: [operand(node)]
+        if op == "between":
+            def between(node: Dict[str, Any]) -> List[Any]:
+                val = operand(node)
+                return [val[0], val[1]] if isinstance(val, list) and len(val) == 2 else []
+            return between
+        if op == "in":
+            def in_values(node: Dict[str, Any]) -> List[Any]:
+                val = operand(node)
+                if not val:
+                    return []
+                return list(val) if isinstance(val, (list, tuple, set)) else [val]
+            return in_values
+        return lambda node: []
+
+    def _build_node(self, node: Dict[str, Any]) -> Tuple[str, List[Any]]:
+        """Uncached translation of a query node (used to compile templates)."""
+        if "field" in node:
+            return self._build_leaf(node)
+
+        if "conditions" in node:
+            return self._build_group(node)
+
+        return "1=1", []
+
     def _build_leaf(self, node: Dict[str, Any]) -> Tuple[str, List[Any]]:
         """Handles a single field/op/value condition node."""
         field = node["field"]
@@ -319,7 +580,7 @@ class QueryBuilder:
         all_params: List[Any] = []
 
         for cond in node["conditions"]:
-            clause, params = self.build_where(cond)
+            clause, params = self._build_node(cond)
             if clause:
                 sub_clauses.append(f"({clause})")
                 all_params.extend(params)
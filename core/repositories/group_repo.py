@@ -2,7 +2,7 @@
 ------------------------------------------------------------------------------
 Project:        KPaperFlux
 File:           core/repositories/group_repo.py
-Version:        1.0.0
+Version:        1.1.0
 Producer:       thorsten.schnebeck@gmx.net
 Generator:      Claude Sonnet 4.6
 Description:    Repository for DocumentGroup CRUD and document-group
@@ -12,7 +12,7 @@ Description:    Repository for DocumentGroup CRUD and document-group
 """
 import json
 import uuid as _uuid_mod
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from core.models.group import DocumentGroup
 from core.repositories.base import BaseRepository
@@ -103,6 +103,19 @@ class GroupRepository(BaseRepository):
             logger.error(f"GroupRepository.get_children failed: {exc}")
             return []
 
+    def get_hierarchy(self) -> Dict[Optional[str], List[DocumentGroup]]:
+        """
+        Return the whole group tree in one query.
+
+        Returns:
+            Mapping of parent ID (None = top level) to its direct children,
+            each list ordered by sort_order, then name.
+        """
+        children: Dict[Optional[str], List[DocumentGroup]] = {}
+        for group in self.get_all():
+            children.setdefault(group.parent_id, []).append(group)
+        return children
+
     def rename(self, group_id: str, new_name: str) -> bool:
         """Rename an existing group. Returns True on success."""
         try:
@@ -143,6 +156,18 @@ class GroupRepository(BaseRepository):
             logger.error(f"GroupRepository.get_document_count failed: {exc}")
             return 0
 
+    def get_document_counts(self) -> Dict[str, int]:
+        """Return the number of documents per group (groups without members are omitted)."""
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(
+                "SELECT group_id, COUNT(*) FROM document_group_memberships GROUP BY group_id"
+            )
+            return {r[0]: r[1] for r in cursor.fetchall()}
+        except Exception as exc:
+            logger.error(f"GroupRepository.get_document_counts failed: {exc}")
+            return {}
+
     # ------------------------------------------------------------------
     # Membership
     # ------------------------------------------------------------------
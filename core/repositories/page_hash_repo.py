@@ -0,0 +1,104 @@
+"""
+------------------------------------------------------------------------------
+Project:        KPaperFlux
+File:           core/repositories/page_hash_repo.py
+Version:        1.0.0
+Producer:       thorsten.schnebeck@gmx.net
+Generator:      Antigravity
+Description:    Repository for persistent per-page visual hashes (dHash plus
+                mean luminance) of physical files. Used by the similarity
+                engine to compare documents without re-rasterizing the vault.
+------------------------------------------------------------------------------
+"""
+
+from typing import Dict, Tuple
+
+from .base import BaseRepository
+
+from core.logger import get_logger
+logger = get_logger("repositories.page_hash")
+
+# (dhash, mean_luma) of a single page
+PageHash = Tuple[int, int]
+
+_UINT64_MASK = (1 << 64) - 1
+_INT64_SIGN = 1 << 63
+
+
+def _to_signed(value: int) -> int:
+    """Maps an unsigned 64-bit hash into SQLite's signed INTEGER range."""
+    return value - (1 << 64) if value & _INT64_SIGN else value
+
+
+def _to_unsigned(value: int) -> int:
+    """Inverse of _to_signed."""
+    return value & _UINT64_MASK
+
+
+class PageHashRepository(BaseRepository):
+    """
+    Manages access to the 'page_visual_hashes' table, keyed by
+    physical file UUID and 1-based page number.
+    """
+
+    def get_hashes(self, file_uuid: str) -> Dict[int, PageHash]:
+        """
+        Retrieves all stored page hashes of a physical file.
+
+        Args:
+            file_uuid: The physical file UUID.
+
+        Returns:
+            A dictionary mapping 1-based page numbers to (dhash, luma).
+        """
+        sql = "SELECT page, dhash, luma FROM page_visual_hashes WHERE file_uuid = ?"
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(sql, (file_uuid,))
+            return {int(row[0]): (_to_unsigned(int(row[1])), int(row[2])) for row in cursor.fetchall()}
+        except Exception as e:
+            logger.error(f"Hash lookup error for {file_uuid}: {e}")
+            return {}
+
+    def save_hashes(self, file_uuid: str, hashes: Dict[int, PageHash]) -> bool:
+        """
+        Replaces the stored page hashes of a physical file.
+
+        Args:
+            file_uuid: The physical file UUID.
+            hashes: A dictionary mapping 1-based page numbers to (dhash, luma).
+
+        Returns:
+            True if the operation was successful.
+        """
+        rows = [(file_uuid, page, _to_signed(dhash), luma) for page, (dhash, luma) in hashes.items()]
+        try:
+            with self.db._write() as conn:
+                conn.execute("DELETE FROM page_visual_hashes WHERE file_uuid = ?", (file_uuid,))
+                conn.executemany(
+                    "INSERT INTO page_visual_hashes (file_uuid, page, dhash, luma) VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+            return True
+        except Exception as e:
+            logger.error(f"Hash save error for {file_uuid}: {e}")
+            return False
+
+    def invalidate(self, file_uuid: str) -> bool:
+        """
+        Drops the stored hashes of a physical file, e.g. after the file
+        was rewritten. They are recomputed on next access.
+
+        Args:
+            file_uuid: The physical file UUID.
+
+        Returns:
+            True if the deletion was executed without error.
+        """
+        try:
+            with self.db._write() as conn:
+                conn.execute("DELETE FROM page_visual_hashes WHERE file_uuid = ?", (file_uuid,))
+            return True
+        except Exception as e:
+            logger.error(f"Hash invalidation error for {file_uuid}: {e}")
+            return False
@@ -2,12 +2,12 @@
 ------------------------------------------------------------------------------
 Project:        KPaperFlux
 File:           core/repositories/physical_repo.py
-Version:        2.0.0
+Version:        2.2.0
 Producer:       thorsten.schnebeck@gmx.net
 Generator:      Antigravity
 Description:    Repository for managing persistence of PhysicalFile models in 
                 the SQLite database. Handles CRUD operations for immutable 
-                source files, phash lookups, and OCR data storage.
+                source files, phash lookups, OCR data and PDF facts storage.
 ------------------------------------------------------------------------------
 """
 
@@ -41,9 +41,9 @@ class PhysicalRepository(BaseRepository):
         sql = """
         INSERT OR REPLACE INTO physical_files (
             uuid, phash, file_path, original_filename,
-            file_size, page_count_phys, raw_ocr_data, created_at
+            file_size, page_count_phys, raw_ocr_data, created_at, pdf_facts
         ) VALUES (
-            ?, ?, ?, ?, ?, ?, ?, ?
+            ?, ?, ?, ?, ?, ?, ?, ?, ?
         )
         """
 
@@ -58,11 +58,12 @@ class PhysicalRepository(BaseRepository):
             file.page_count_phys,
             ocr_json,
             file.created_at,
+            file.pdf_facts.to_json() if file.pdf_facts else None,
         )
 
         try:
-            with self.conn:
-                self.conn.execute(sql, values)
+            with self.db._write() as conn:
+                conn.execute(sql, values)
             return True
         except Exception as e:
             logger.error(f"Save error: {e}")
@@ -80,7 +81,7 @@ class PhysicalRepository(BaseRepository):
         """
         sql = """
         SELECT uuid, phash, file_path, original_filename, file_size,
-               raw_ocr_data, created_at, page_count_phys
+               raw_ocr_data, created_at, page_count_phys, pdf_facts
         FROM physical_files 
         WHERE uuid = ?
         """
@@ -103,7 +104,7 @@ class PhysicalRepository(BaseRepository):
         """
         sql = """
         SELECT uuid, phash, file_path, original_filename, file_size,
-               raw_ocr_data, created_at, page_count_phys
+               raw_ocr_data, created_at, page_count_phys, pdf_facts
         FROM physical_files 
         WHERE phash = ?
         """
@@ -148,7 +149,7 @@ class PhysicalRepository(BaseRepository):
         """
         sql = """
         SELECT uuid, phash, file_path, original_filename, file_size,
-               raw_ocr_data, created_at, page_count_phys
+               raw_ocr_data, created_at, page_count_phys, pdf_facts
         FROM physical_files
         """
         cursor = self.conn.cursor()
@@ -158,7 +159,7 @@ class PhysicalRepository(BaseRepository):
 
     def delete(self, uuid: str) -> bool:
         """
-        Hard deletes a physical file record from the repository.
+        Hard deletes a physical file record and its page hashes from the repository.
 
         Args:
             uuid: The ID of the record to remove.
@@ -169,6 +170,7 @@ class PhysicalRepository(BaseRepository):
         try:
             with self.conn:
                 self.conn.execute("DELETE FROM physical_files WHERE uuid = ?", (uuid,))
+                self.conn.execute("DELETE FROM page_visual_hashes WHERE file_uuid = ?", (uuid,))
             return True
         except Exception as e:
             logger.error(f"Delete error: {e}")
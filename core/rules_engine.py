@@ -2,22 +2,27 @@
 ------------------------------------------------------------------------------
 Project:        KPaperFlux
 File:           core/rules_engine.py
-Version:        2.0.0
+Version:        2.1.0
 Producer:       thorsten.schnebeck@gmx.net
 Generator:      Antigravity
 Description:    Unified Rule Engine for evaluating and applying tagging rules.
                 Matches VirtualDocuments against FilterTree conditions to 
-                automate document classification.
+                automate document classification, either per document or
+                set-based over many documents at once.
 ------------------------------------------------------------------------------
 """
 
-from typing import TYPE_CHECKING, List, Optional, Set
+import json
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Set
 
 if TYPE_CHECKING:
     from core.models.virtual import VirtualDocument
 
 from core.database import DatabaseManager
 from core.filter_tree import FilterNode, FilterTree
+from core.logger import get_logger
+
+logger = get_logger("core.rules_engine")
 
 
 class RulesEngine:
@@ -26,6 +31,9 @@ class RulesEngine:
     Evaluates tagging rules defined in the FilterTree against documents.
     """
 
+    # Candidate documents evaluated per round in apply_rules_bulk()
+    BULK_CHUNK_SIZE: int = 5000
+
     def __init__(self, db: DatabaseManager, filter_tree: FilterTree) -> None:
         """
         Initializes the RulesEngine.
@@ -87,17 +95,148 @@ class RulesEngine:
             if not v_doc.semantic_data:
                 from core.models.semantic import SemanticExtraction
                 v_doc.semantic_data = SemanticExtraction()
-            from core.models.semantic import WorkflowInfo
-            from core.workflow import WorkflowRuleRegistry, get_initial_state
-            _registry = WorkflowRuleRegistry()
             for workflow_id in new_workflows:
                 if workflow_id not in v_doc.semantic_data.workflows:
-                    _rule = _registry.get_rule(workflow_id)
-                    _initial = get_initial_state(_rule) if _rule else None
-                    v_doc.semantic_data.workflows[workflow_id] = WorkflowInfo(
-                        rule_id=workflow_id,
-                        current_step=_initial or "NEW",
-                    )
+                    v_doc.semantic_data.workflows[workflow_id] = self._new_workflow(workflow_id)
                     modified = True
 
         return modified
+
+    def apply_rules_bulk(
+        self,
+        uuids: List[str],
+        rules: Optional[List[FilterNode]] = None,
+        only_auto: bool = True,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        is_cancelled: Optional[Callable[[], bool]] = None,
+    ) -> int:
+        """
+        Set-based variant of apply_rules_to_entity() for many documents.
+
+        Each rule's filter is evaluated once per chunk of candidates
+        (DatabaseManager.filter_matching_uuids) instead of once per document.
+        Tag and workflow deltas are merged in memory in rule order, and only
+        the modified rows are written, in a single transaction.
+
+        Args:
+            uuids: Candidate virtual document UUIDs.
+            rules: Optional list of specific rules to evaluate. If None, fetches active rules from the tree.
+            only_auto: If True, only apply rules marked as 'auto_apply'.
+            progress_callback: Optional callback receiving (processed, total).
+            is_cancelled: Optional callable; evaluation stops at the next chunk when it returns True.
+
+        Returns:
+            The number of modified documents.
+        """
+        if rules is None:
+            rules = self.filter_tree.get_active_rules(only_auto=only_auto)
+
+        if not rules or not uuids:
+            return 0
+
+        total = len(uuids)
+        tag_updates: Dict[str, Optional[str]] = {}
+        semantic_updates: Dict[str, str] = {}
+
+        for start in range(0, total, self.BULK_CHUNK_SIZE):
+            if is_cancelled and is_cancelled():
+                break
+            chunk = uuids[start:start + self.BULK_CHUNK_SIZE]
+            matches = [self.db.filter_matching_uuids(chunk, rule.data) for rule in rules]
+            self._merge_rule_deltas(rules, matches, tag_updates, semantic_updates)
+            if progress_callback:
+                progress_callback(min(start + self.BULK_CHUNK_SIZE, total), total)
+
+        modified = set(tag_updates) | set(semantic_updates)
+        if modified:
+            with self.db._write() as conn:
+                conn.executemany(
+                    "UPDATE virtual_documents SET tags = ? WHERE uuid = ?",
+                    [(tags, uuid) for uuid, tags in tag_updates.items()],
+                )
+                conn.executemany(
+                    "UPDATE virtual_documents SET semantic_data = ? WHERE uuid = ?",
+                    [(data, uuid) for uuid, data in semantic_updates.items()],
+                )
+            logger.info(f"Bulk rule evaluation: {len(rules)} rules, {total} documents, {len(modified)} modified")
+        return len(modified)
+
+    def _merge_rule_deltas(
+        self,
+        rules: List[FilterNode],
+        matches: List[Set[str]],
+        tag_updates: Dict[str, Optional[str]],
+        semantic_updates: Dict[str, str],
+    ) -> None:
+        """
+        Applies the rule actions to all matched documents of one chunk and
+        records the changed column values (same semantics as apply_rules_to_entity).
+
+        Args:
+            rules: The evaluated rules.
+            matches: Matching UUIDs per rule (same order as rules).
+            tag_updates: Collects uuid -> new tags JSON (None for no tags).
+            semantic_updates: Collects uuid -> new semantic_data JSON.
+        """
+        touched: Set[str] = set().union(*matches)
+        if not touched:
+            return
+
+        from core.models.virtual import VirtualDocument
+        cursor = self.db.connection.cursor()
+        cursor.execute(
+            "SELECT uuid, tags, semantic_data FROM virtual_documents "
+            "WHERE uuid IN (SELECT value FROM json_each(?))",
+            (json.dumps(sorted(touched)),),
+        )
+        for uuid, raw_tags, raw_semantic in cursor.fetchall():
+            current_tags: Set[str] = set(VirtualDocument.normalize_tags(raw_tags))
+            original_tags = current_tags.copy()
+            new_workflows: List[str] = []
+
+            for rule, matched in zip(rules, matches):
+                if uuid not in matched:
+                    continue
+                if rule.tags_to_add:
+                    current_tags.update(set(rule.tags_to_add))
+                if rule.tags_to_remove:
+                    current_tags.difference_update(set(rule.tags_to_remove))
+                if rule.assign_workflow and rule.assign_workflow not in new_workflows:
+                    new_workflows.append(rule.assign_workflow)
+
+            if current_tags != original_tags:
+                tag_updates[uuid] = json.dumps(sorted(current_tags)) if current_tags else None
+
+            if new_workflows:
+                semantic = self._load_semantic_json(raw_semantic)
+                workflows = semantic.setdefault("workflows", {})
+                added = [wf_id for wf_id in new_workflows if wf_id not in workflows]
+                if added:
+                    from core.repositories.logical_repo import EnhancedJSONEncoder
+                    for workflow_id in added:
+                        workflows[workflow_id] = self._new_workflow(workflow_id)
+                    semantic_updates[uuid] = json.dumps(semantic, cls=EnhancedJSONEncoder)
+
+    @staticmethod
+    def _load_semantic_json(raw: Optional[str]) -> Dict[str, Any]:
+        """Parses stored semantic_data; missing or corrupt data starts from an empty extraction."""
+        if raw:
+            try:
+                data = json.loads(raw)
+                if isinstance(data, dict):
+                    if not isinstance(data.get("workflows"), dict):
+                        data["workflows"] = {}
+                    return data
+            except (json.JSONDecodeError, TypeError) as e:
+                logger.warning(f"Replacing unreadable semantic_data during rule evaluation: {e}")
+        from core.models.semantic import SemanticExtraction
+        return SemanticExtraction().model_dump()
+
+    @staticmethod
+    def _new_workflow(workflow_id: str) -> Any:
+        """Creates the WorkflowInfo of a newly assigned workflow in its initial state."""
+        from core.models.semantic import WorkflowInfo
+        from core.workflow import WorkflowRuleRegistry, get_initial_state
+        rule = WorkflowRuleRegistry().get_rule(workflow_id)
+        initial = get_initial_state(rule) if rule else None
+        return WorkflowInfo(rule_id=workflow_id, current_step=initial or "NEW")
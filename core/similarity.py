@@ -2,30 +2,68 @@
 ------------------------------------------------------------------------------
 Project:        KPaperFlux
 File:           core/similarity.py
-Version:        2.0.0
+Version:        2.3.1
 Producer:       thorsten.schnebeck@gmx.net
 Generator:      Antigravity
 Description:    Similarity engine for identifying duplicate documents. Uses a 
                 multi-modal approach combining metadata heuristics, text 
-                Jaccard similarity, and visual RMS comparison.
+                Jaccard similarity, and persisted per-page visual hashes
+                compared by Hamming distance. Candidate pairs
+                are generated via metadata blocking, MinHash/LSH buckets of
+                the text and bit-sampling LSH buckets of the page hashes
+                so that only plausible pairs are scored.
 ------------------------------------------------------------------------------
 """
 
 import math
 import os
 import tempfile
+import zlib
+from collections import defaultdict
 from pathlib import Path
 from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
+import numpy as np
+import pikepdf
 from pdf2image import convert_from_path
-from PIL import Image, ImageChops
+from PIL import Image, ImageStat
 
 from core.database import DatabaseManager
+from core.repositories.page_hash_repo import PageHash, PageHashRepository
 from core.models.virtual import VirtualDocument as Document
 from core.logger import get_logger, get_silent_logger
 
 logger = get_logger("Similarity")
 
+# MinHash/LSH parameters. 128 permutations split into bands of ROWS rows.
+# The band layout is derived from the requested threshold (see _lsh_rows).
+MINHASH_PERMUTATIONS = 128
+MINHASH_SEED = 0x4B50  # Fixed seed: signatures must be reproducible across runs
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Maximum score contribution that does not stem from content similarity
+# (see calculate_similarity: metadata boost). Used to derive the minimum
+# Jaccard index a pair needs to be able to reach the threshold at all.
+METADATA_BOOST = 0.2
+
+# Below this threshold, the amount veto (score 0.1) no longer excludes
+# pairs, so blocking would change results. Exhaustive comparison is used.
+MIN_BLOCKING_THRESHOLD = 0.1
+
+# Visual hashing: 8x8 difference hash of pages rendered at thumbnail size.
+DHASH_SIZE = 8
+DHASH_BITS = DHASH_SIZE * DHASH_SIZE
+HASH_RENDER_SIZE = 128
+VISUAL_PAGES = 5  # Leading pages considered for visual comparison
+
+# Bit-sampling LSH over the page dHashes: bands of sampled hash bits. The
+# layout is derived from the threshold so that a page pair at the minimum
+# visual similarity shares a band with at least VISUAL_LSH_RECALL
+# probability, using at most VISUAL_LSH_MAX_BANDS bands (see _visual_lsh_layout).
+VISUAL_LSH_MAX_BANDS = 128
+VISUAL_LSH_RECALL = 0.99
+
 
 class SimilarityManager:
     """
@@ -42,11 +80,14 @@ class SimilarityManager:
         """
         self.db_manager: DatabaseManager = db_manager
         self.vault: Optional[Any] = vault  # Needed to resolve file paths
-        self.thumbnail_cache: Dict[str, List[Image.Image]] = {}  # Map uuid -> List of PIL.Image
+        self.hash_repo: PageHashRepository = PageHashRepository(db_manager)
+        self.hash_cache: Dict[str, List[PageHash]] = {}  # Map uuid -> page hashes of the current scan
 
     def find_duplicates(self, threshold: float = 0.85, progress_callback: Optional[Callable[[int, int], None]] = None) -> List[Tuple[Document, Document, float]]:
         """
         Find pairs of documents that are likely duplicates.
+        Only candidate pairs produced by the blocking stage are scored
+        (see _generate_candidate_pairs), keeping the scan near-linear.
 
         Args:
             threshold: Similarity score threshold (0.0 to 1.0) above which documents are considered duplicates.
@@ -57,27 +98,230 @@ class SimilarityManager:
         """
         documents = self.db_manager.get_all_entities_view()
         duplicates: List[Tuple[Document, Document, float]] = []
-        self.thumbnail_cache = {}  # Clear cache for a fresh scan
+        self.hash_cache = {}  # Clear cache for a fresh scan
 
-        n = len(documents)
-        total_pairs = (n * (n - 1)) // 2
-        processed = 0
+        candidates = self._generate_candidate_pairs(documents, threshold)
+        total_pairs = len(candidates)
+        logger.info(f"Duplicate scan: {total_pairs} candidate pairs for {len(documents)} documents")
 
-        for i in range(n):
-            for j in range(i + 1, n):
-                doc_a = documents[i]
-                doc_b = documents[j]
+        for processed, (i, j) in enumerate(candidates, start=1):
+            doc_a = documents[i]
+            doc_b = documents[j]
 
-                score = self.calculate_similarity(doc_a, doc_b)
-                if score >= threshold:
-                    duplicates.append((doc_a, doc_b, score))
+            score = self.calculate_similarity(doc_a, doc_b)
+            if score >= threshold:
+                duplicates.append((doc_a, doc_b, score))
 
-                processed += 1
-                if progress_callback:
-                    progress_callback(processed, total_pairs)
+            if progress_callback:
+                progress_callback(processed, total_pairs)
 
         return duplicates
 
+    def _generate_candidate_pairs(self, documents: List[Document], threshold: float) -> List[Tuple[int, int]]:
+        """
+        Blocking stage: returns the index pairs (i < j) worth scoring.
+
+        A pair becomes a candidate if it is metadata-compatible (see
+        _is_metadata_compatible) and shares a bucket:
+        - a MinHash/LSH band of its text tokens,
+        - with a vault, a bit-sampling LSH band of one of its page hashes
+          (visual match regardless of the OCR text), or
+        - with a vault, the same (doc_date, total_amount) key: such pairs
+          get the metadata boost and need a lower visual score.
+        Within every bucket, dated documents are only paired with documents
+        of the same date or without a date.
+
+        Args:
+            documents: The documents to scan.
+            threshold: The similarity threshold of the scan.
+
+        Returns:
+            A sorted list of (i, j) index pairs.
+        """
+        n = len(documents)
+        if threshold <= MIN_BLOCKING_THRESHOLD:
+            return [(i, j) for i in range(n) for j in range(i + 1, n)]
+
+        rows = self._lsh_rows(threshold - METADATA_BOOST)
+        bands = MINHASH_PERMUTATIONS // rows
+        permutations = self._minhash_permutations()
+
+        buckets: Dict[Tuple[Any, ...], List[int]] = defaultdict(list)
+        for idx, doc in enumerate(documents):
+            tokens = set((doc.text_content or "").lower().split())
+            if not tokens:
+                continue
+            signature = self._minhash_signature(tokens, permutations)
+            for band in range(bands):
+                band_key = signature[band * rows:(band + 1) * rows].tobytes()
+                buckets[(band, band_key)].append(idx)
+
+        if self.vault:
+            # The visual score needs the full threshold unless the metadata boost applies
+            masks = self._visual_band_masks(*self._visual_lsh_layout(threshold))
+            for idx, doc in enumerate(documents):
+                if doc.doc_date and doc.total_amount is not None:
+                    buckets[("meta", doc.doc_date, doc.total_amount)].append(idx)
+                page_keys = {(band, dhash & mask)
+                             for dhash, _ in self._get_page_hashes(doc)
+                             for band, mask in enumerate(masks)}
+                for band, key in page_keys:
+                    buckets[("visual", band, key)].append(idx)
+
+        candidates: Set[Tuple[int, int]] = set()
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            by_date: Dict[Optional[str], List[int]] = defaultdict(list)
+            for idx in members:
+                by_date[documents[idx].doc_date or None].append(idx)
+            undated = by_date.pop(None, [])
+
+            groups = list(by_date.values())
+            groups.append(undated)
+            for group in groups:
+                self._add_group_pairs(documents, group, group, candidates)
+            for group in by_date.values():
+                self._add_group_pairs(documents, undated, group, candidates)
+
+        return sorted(candidates)
+
+    def _add_group_pairs(self, documents: List[Document], left: List[int], right: List[int], candidates: Set[Tuple[int, int]]) -> None:
+        """
+        Adds all metadata-compatible pairs between two index groups.
+
+        Args:
+            documents: The scanned documents.
+            left: First group of document indices.
+            right: Second group of document indices (may equal left).
+            candidates: Set that collects (i, j) pairs with i < j.
+        """
+        for i in left:
+            for j in right:
+                if i == j or (left is right and i > j):
+                    continue
+                pair = (i, j) if i < j else (j, i)
+                if pair not in candidates and self._is_metadata_compatible(documents[i], documents[j]):
+                    candidates.add(pair)
+
+    @staticmethod
+    def _is_metadata_compatible(doc_a: Document, doc_b: Document) -> bool:
+        """
+        Mirrors the veto rules of calculate_similarity: documents with
+        differing dates or amounts can never reach a duplicate threshold.
+
+        Args:
+            doc_a: First document.
+            doc_b: Second document.
+
+        Returns:
+            True if neither the date nor the amount vetoes the pair.
+        """
+        date_a, date_b = doc_a.doc_date, doc_b.doc_date
+        if date_a and date_b and date_a != date_b:
+            return False
+        amt_a, amt_b = doc_a.total_amount, doc_b.total_amount
+        if amt_a is not None and amt_b is not None and amt_a != amt_b:
+            return False
+        return True
+
+    @staticmethod
+    def _lsh_rows(min_jaccard: float) -> int:
+        """
+        Picks the number of rows per LSH band. The LSH detection threshold
+        (1/b)^(1/r) must stay well below the minimum Jaccard index a pair
+        needs, so that true duplicates are found with high probability.
+
+        Args:
+            min_jaccard: The lowest text similarity that can still match.
+
+        Returns:
+            Rows per band (1 to 4).
+        """
+        for rows in (4, 3, 2):
+            bands = MINHASH_PERMUTATIONS // rows
+            lsh_threshold = (1.0 / bands) ** (1.0 / rows)
+            if lsh_threshold <= min_jaccard - 0.15:
+                return rows
+        return 1
+
+    @staticmethod
+    def _visual_lsh_layout(min_similarity: float) -> Tuple[int, int]:
+        """
+        Picks the visual LSH layout: the most selective number of sampled
+        dHash bits per band for which two pages at min_similarity (fraction
+        of equal bits) share a band with VISUAL_LSH_RECALL probability
+        within VISUAL_LSH_MAX_BANDS bands.
+
+        Args:
+            min_similarity: The lowest page similarity that can still match.
+
+        Returns:
+            (bits per band, number of bands).
+        """
+        for bits in (24, 20, 16, 12, 8, 4, 2, 1):
+            hit = min_similarity ** bits
+            if hit >= 1.0:
+                return bits, 1
+            if hit > 0.0:
+                bands = math.ceil(math.log(1.0 - VISUAL_LSH_RECALL) / math.log(1.0 - hit))
+                if bands <= VISUAL_LSH_MAX_BANDS:
+                    return bits, bands
+        return 1, VISUAL_LSH_MAX_BANDS
+
+    @staticmethod
+    def _visual_band_masks(bits: int, bands: int) -> List[int]:
+        """
+        Returns one bit mask per visual LSH band, each selecting `bits`
+        randomly chosen (but reproducible) positions of the 64-bit dHash.
+
+        Args:
+            bits: Sampled bits per band.
+            bands: Number of bands.
+
+        Returns:
+            A list of integer masks.
+        """
+        rng = np.random.default_rng(MINHASH_SEED)
+        return [
+            sum(1 << int(pos) for pos in rng.choice(DHASH_BITS, size=bits, replace=False))
+            for _ in range(bands)
+        ]
+
+    @staticmethod
+    def _minhash_permutations() -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the (a, b) coefficients of the universal hash family used
+        to simulate the MinHash permutations.
+
+        Returns:
+            Two uint64 arrays of length MINHASH_PERMUTATIONS.
+        """
+        # Coefficients below 2^32 keep a * x + b inside uint64 for 32-bit x.
+        rng = np.random.default_rng(MINHASH_SEED)
+        a = rng.integers(1, _MAX_HASH, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+        b = rng.integers(0, _MAX_HASH, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+        return a, b
+
+    @staticmethod
+    def _minhash_signature(tokens: Set[str], permutations: Tuple[np.ndarray, np.ndarray]) -> np.ndarray:
+        """
+        Computes the MinHash signature of a token set.
+        Token hashes use CRC32 so that signatures do not depend on the
+        per-process string hash seed.
+
+        Args:
+            tokens: The (lower-cased) token set of a document.
+            permutations: Coefficients from _minhash_permutations.
+
+        Returns:
+            A uint64 array of length MINHASH_PERMUTATIONS.
+        """
+        a, b = permutations
+        hashes = np.fromiter((zlib.crc32(t.encode("utf-8")) for t in tokens), dtype=np.uint64, count=len(tokens))
+        products = (hashes[:, None] * a[None, :] + b[None, :]) % _MERSENNE_PRIME
+        return (products & _MAX_HASH).min(axis=0)
+
     def calculate_similarity(self, doc_a: Document, doc_b: Document) -> float:
         """
         Calculate a similarity score between 0.0 and 1.0.
@@ -144,7 +388,7 @@ class SimilarityManager:
 
     def calculate_visual_similarity(self, doc_a: Document, doc_b: Document) -> float:
         """
-        Render pages as low-res images and compare them.
+        Compare the stored page hashes of two documents.
         Handles containment (single page in multi-page doc) and P1-to-P1 comparison.
 
         Args:
@@ -154,125 +398,146 @@ class SimilarityManager:
         Returns:
             A visual similarity score between 0.0 and 1.0.
         """
-        imgs_a = self._get_cached_thumbnails(doc_a)
-        imgs_b = self._get_cached_thumbnails(doc_b)
+        hashes_a = self._get_page_hashes(doc_a)
+        hashes_b = self._get_page_hashes(doc_b)
 
-        if not imgs_a or not imgs_b:
+        if not hashes_a or not hashes_b:
             return 0.0
 
-        best_sim = 0.0
-
         # Case 1: A is single page, B is multi -> Check for containment
-        if len(imgs_a) == 1 and len(imgs_b) > 1:
-            for img_b in imgs_b:
-                sim = self._compare_images(imgs_a[0], img_b)
-                if sim > best_sim:
-                    best_sim = sim
-            return best_sim
+        if len(hashes_a) == 1 and len(hashes_b) > 1:
+            return max(self._compare_page_hashes(hashes_a[0], h) for h in hashes_b)
 
         # Case 2: B is single page, A is multi -> Check for containment
-        elif len(imgs_b) == 1 and len(imgs_a) > 1:
-            for img_a in imgs_a:
-                sim = self._compare_images(img_a, imgs_b[0])
-                if sim > best_sim:
-                    best_sim = sim
-            return best_sim
+        elif len(hashes_b) == 1 and len(hashes_a) > 1:
+            return max(self._compare_page_hashes(h, hashes_b[0]) for h in hashes_a)
 
         # Case 3: Both single or both multi -> Compare First Page
         else:
-            return self._compare_images(imgs_a[0], imgs_b[0])
+            return self._compare_page_hashes(hashes_a[0], hashes_b[0])
 
-    def _compare_images(self, img_a: Image.Image, img_b: Image.Image) -> float:
+    @staticmethod
+    def _compare_page_hashes(hash_a: PageHash, hash_b: PageHash) -> float:
         """
-        Compare two images using Root Mean Square (RMS) of color difference.
+        Compare two page hashes: Hamming distance of the dHash bits,
+        weighted by the difference in mean luminance. The luminance term
+        keeps blank or uniformly dark pages apart, which share a dHash.
 
         Args:
-            img_a: First image.
-            img_b: Second image.
+            hash_a: First (dhash, luma) tuple.
+            hash_b: Second (dhash, luma) tuple.
 
         Returns:
             Similarity score between 0.0 and 1.0.
         """
-        if img_a.size != img_b.size:
-            img_b = img_b.resize(img_a.size)
-
-        diff = ImageChops.difference(img_a, img_b)
-        h = diff.histogram()
-        sq = (value * ((idx % 256) ** 2) for idx, value in enumerate(h))
-        sum_of_squares = sum(sq)
-        rms = math.sqrt(sum_of_squares / float(img_a.size[0] * img_a.size[1]))
-
-        # Normalize RMS: 0 (identical) to ~100+ (very different)
-        sim = max(0.0, 1.0 - (rms / 100.0))
-        return sim
+        distance = bin(hash_a[0] ^ hash_b[0]).count("1")
+        structural = 1.0 - distance / DHASH_BITS
+        brightness = 1.0 - abs(hash_a[1] - hash_b[1]) / 255.0
+        return max(0.0, structural * brightness)
 
-    def _get_cached_thumbnails(self, doc: Document) -> List[Image.Image]:
+    def _get_page_hashes(self, doc: Document) -> List[PageHash]:
         """
-        Resolves, renders, and caches thumbnails for a document.
-        Strips KPaperFlux stamps before rendering to ensure comparison robustness.
+        Resolves the physical source of a document and returns the hashes
+        of its first pages. Hashes are read from the persistent store and
+        only computed (and stored) if missing, e.g. after a stamp rewrite.
 
         Args:
-            doc: The document to render.
+            doc: The document to look up.
 
         Returns:
-            A list of PIL Image objects.
+            A list of (dhash, luma) tuples ordered by page.
         """
-        if doc.uuid in self.thumbnail_cache:
-            return self.thumbnail_cache[doc.uuid]
+        if doc.uuid in self.hash_cache:
+            return self.hash_cache[doc.uuid]
 
         # Resolve path
+        file_uuid = doc.uuid
         path_str = self.vault.get_file_path(doc.uuid)
         if not path_str or not Path(path_str).exists():
             if hasattr(self.db_manager, "get_source_uuid_from_entity"):
                 phys_uuid = self.db_manager.get_source_uuid_from_entity(doc.uuid)
                 if phys_uuid:
+                    file_uuid = phys_uuid
                     path_str = self.vault.get_file_path(phys_uuid)
 
-        if not path_str:
+        if not path_str or not Path(path_str).exists():
             return []
 
-        path = Path(path_str)
-        if not path.exists():
-            return []
+        stored = self.hash_repo.get_hashes(file_uuid)
+        if not stored:
+            stored = compute_file_page_hashes(path_str)
+            if stored:
+                self.hash_repo.save_hashes(file_uuid, stored)
 
-        render_path = path
-        temp_file: Optional[str] = None
-
-        try:
-            from core.stamper import DocumentStamper
-            import shutil
-
-            stamper = DocumentStamper()
-            if stamper.has_stamp(str(path)):
-                fd, temp_path = tempfile.mkstemp(suffix=".pdf")
-                os.close(fd)
-                shutil.copy2(path, temp_path)
-
-                if stamper.remove_stamp(temp_path):
-                    render_path = Path(temp_path)
-                    temp_file = temp_path
-        except (ImportError, IOError) as e:
-            logger.error(f"Error stripping stamps for {doc.original_filename}: {e}")
-
-        try:
-            # Render first 5 pages, low res (grayscale)
-            images = convert_from_path(str(render_path), first_page=1, last_page=5, size=128, grayscale=True)
-            thumbnails: List[Image.Image] = []
-            for img in images:
-                # Resize to standard aspect ratio/thumbnail size
-                thumb = img.resize((64, 80))
-                thumbnails.append(thumb)
-
-            self.thumbnail_cache[doc.uuid] = thumbnails
-            return thumbnails
-
-        except Exception as e:
-            logger.error(f"Visual Sim Error {doc.original_filename}: {e}")
-            return []
-        finally:
-            if temp_file and Path(temp_file).exists():
-                try:
-                    Path(temp_file).unlink()
-                except OSError as e:
-                    # Safe to ignore in finally block, but logging for traceability
-                    get_silent_logger().debug(f"Could not unlink temp file {temp_file}: {e}")
+        hashes = [stored[page] for page in sorted(stored)[:VISUAL_PAGES]]
+        self.hash_cache[doc.uuid] = hashes
+        return hashes
+
+
+def compute_page_hash(image: Image.Image) -> PageHash:
+    """
+    Computes the 64-bit difference hash (dHash) and the mean luminance of
+    a rendered page.
+
+    Args:
+        image: The rendered page.
+
+    Returns:
+        A (dhash, luma) tuple.
+    """
+    gray = image.convert("L")
+    luma = int(round(ImageStat.Stat(gray).mean[0]))
+    small = np.asarray(gray.resize((DHASH_SIZE + 1, DHASH_SIZE), Image.Resampling.LANCZOS), dtype=np.int16)
+    gradient = (small[:, :-1] > small[:, 1:]).flatten()
+
+    bits = 0
+    for bit in gradient:
+        bits = (bits << 1) | int(bit)
+    return bits, luma
+
+
+def compute_file_page_hashes(file_path: str) -> Dict[int, PageHash]:
+    """
+    Renders all pages of a PDF at thumbnail size and hashes them.
+    Strips KPaperFlux stamps before rendering to ensure comparison robustness.
+
+    Args:
+        file_path: Path to the PDF file.
+
+    Returns:
+        A dictionary mapping 1-based page numbers to (dhash, luma).
+    """
+    path = Path(file_path)
+    render_path = path
+    temp_file: Optional[str] = None
+
+    try:
+        from core.stamper import DocumentStamper
+        import shutil
+
+        stamper = DocumentStamper()
+        if stamper.has_stamp(str(path)):
+            fd, temp_path = tempfile.mkstemp(suffix=".pdf")
+            os.close(fd)
+            shutil.copy2(path, temp_path)
+
+            if stamper.remove_stamp(temp_path):
+                render_path = Path(temp_path)
+                temp_file = temp_path
+    except (ImportError, OSError, pikepdf.PdfError) as e:
+        # Unreadable PDFs must not abort ingest; rendering below reports them too
+        logger.error(f"Error stripping stamps for {path.name}: {e}")
+
+    try:
+        images = convert_from_path(str(render_path), size=HASH_RENDER_SIZE, grayscale=True)
+        return {page: compute_page_hash(img) for page, img in enumerate(images, start=1)}
+    except Exception as e:
+        logger.error(f"Visual hash error {path.name}: {e}")
+        return {}
+    finally:
+        if temp_file and Path(temp_file).exists():
+            try:
+                Path(temp_file).unlink()
+            except OSError as e:
+                # Safe to ignore in finally block, but logging for traceability
+                get_silent_logger().debug(f"Could not unlink temp file {temp_file}: {e}")
@@ -2,7 +2,7 @@
 ------------------------------------------------------------------------------
 Project:        KPaperFlux
 File:           core/utils/forensics.py
-Version:        2.2.0
+Version:        2.3.0
 Producer:       thorsten.schnebeck@gmx.net
 Generator:      Antigravity
 Description:    Forensic analysis for PDFs. Detects digital signatures, 
@@ -15,6 +15,7 @@ from enum import Enum
 from pathlib import Path
 from typing import Optional
 from core.logger import get_silent_logger
+from core.utils.pdf_probe import probe_pdf
 
 class PDFClass(Enum):
     """Classification according to Hybrid Protection Standard."""
@@ -27,61 +28,15 @@ class PDFClass(Enum):
 def get_pdf_class(file_path: str) -> PDFClass:
     """
     Analyzes the structure of a PDF to determine its protection class.
+    Ingested files carry the same information in PhysicalFile.pdf_facts.
     """
     if not Path(file_path).exists() or not file_path.lower().endswith(".pdf"):
         return PDFClass.STANDARD
-        
-    try:
-        doc = fitz.open(file_path)
-        
-        # 0. Detect Hybrid (KPaperFlux specific)
-        meta = doc.metadata
-        keywords = meta.get("keywords", "")
-        is_hybrid = "kpaperflux_immutable" in keywords
-        
-        if not is_hybrid:
-            # Check for specific attachment name as fallback
-            for i in range(doc.embfile_count()):
-                if doc.embfile_info(i)["name"] == "original_signed_source.pdf":
-                    is_hybrid = True
-                    break
-        
-        if is_hybrid:
-            doc.close()
-            return PDFClass.HYBRID
 
-        # 1. Detect Signatures
-        sig_flags = 0
-        if hasattr(doc, "get_sigflags"): 
-            sig_flags = doc.get_sigflags()
-        elif hasattr(doc, "sig_flags"): 
-            sig_flags = doc.sig_flags
-        elif hasattr(doc, "getSigFlags"): 
-            sig_flags = doc.getSigFlags()
-            
-        has_signature = (sig_flags > 0)
-        
-        # 2. Detect ZUGFeRD
-        has_zugferd = False
-        for i in range(doc.embfile_count()):
-            name = doc.embfile_info(i)["name"]
-            if name.lower() in ["factur-x.xml", "zugferd-invoice.xml", "xrechnung.xml"]:
-                has_zugferd = True
-                break
-                
-        doc.close()
-        
-        if has_signature and has_zugferd:
-            return PDFClass.SIGNED_ZUGFERD
-        if has_signature:
-            return PDFClass.SIGNED
-        if has_zugferd:
-            return PDFClass.ZUGFERD
-            
-    except Exception as e:
-        get_silent_logger().debug(f"Forensics: Error analyzing PDF class for {file_path}: {e}")
-        
-    return PDFClass.STANDARD
+    facts = probe_pdf(file_path, extract_text=False)
+    if facts is None:
+        return PDFClass.STANDARD
+    return PDFClass(facts.pdf_class)
 
 def check_pdf_immutable(file_path: str) -> bool:
     """
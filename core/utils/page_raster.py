@@ -0,0 +1,306 @@
+"""
+------------------------------------------------------------------------------
+Project:        KPaperFlux
+File:           core/utils/page_raster.py
+Version:        1.1.0
+Producer:       thorsten.schnebeck@gmx.net
+Generator:      Antigravity
+Description:    Shared page raster service for the AI vision stages. Renders
+                each PDF page once per DPI class straight into PIL images
+                (no PNG round-trip), derives lower resolutions from cached
+                rasters and builds request payloads with an adaptive
+                optimizer (margin crop, colour depth, resolution and
+                quality chosen from a per-provider byte/edge budget).
+------------------------------------------------------------------------------
+"""
+
+import base64
+import io
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+import fitz
+import numpy as np
+from PIL import Image, ImageFilter
+
+from core.logger import get_logger
+logger = get_logger("utils.page_raster")
+
+# DPI classes of the vision stages
+DPI_AUDIT: int = 300       # Stage 1.5 forensic audit (stamps, signatures)
+DPI_EXTRACTION: int = 200  # Stage 2 visual context
+
+MIME_TYPES: Dict[str, str] = {"JPEG": "image/jpeg", "WEBP": "image/webp", "PNG": "image/png"}
+
+# (path, mtime_ns, size) of a file version
+DocumentKey = Tuple[str, int, int]
+
+
+class ImageBudget(NamedTuple):
+    """Per-provider limits for one image in a vision request."""
+    max_bytes: int            # Encoded size limit
+    max_edge: int             # Long edge in pixels (larger images only cost tokens)
+    formats: Tuple[str, ...] = ("JPEG", "PNG")  # Encodings accepted by the provider
+    min_text_dpi: int = 150   # Resolution floor that keeps body text legible
+
+
+DEFAULT_IMAGE_BUDGET = ImageBudget(max_bytes=1_000_000, max_edge=2048)
+
+# Optimizer tuning
+INK_THRESHOLD: int = 230         # Gray values below count as content
+CROP_PADDING_INCH: float = 0.1   # Margin kept around the content
+COLOUR_SATURATION: int = 60      # HSV saturation/value that counts as colour
+COLOUR_MIN_FRACTION: float = 0.001
+QUALITY_STEPS: Tuple[int, ...] = (85, 75, 60)
+SCALE_STEP: float = 0.8
+
+
+class PageRasterService:
+    """
+    Process-wide, byte-bounded LRU of rendered pages, keyed by file version,
+    page and DPI. Thread-safe; the returned images are shared and must be
+    treated as read-only.
+    """
+
+    MAX_BYTES: int = 192 * 1024 * 1024
+
+    _instance: Optional["PageRasterService"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, max_bytes: int = MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.renders = 0  # Number of actual PDF renders (diagnostics)
+        self._images: "OrderedDict[Tuple[DocumentKey, int, int], Image.Image]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def instance(cls) -> "PageRasterService":
+        """Returns the shared service."""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    @staticmethod
+    def _document_key(pdf_path: str) -> Optional[DocumentKey]:
+        try:
+            stat = os.stat(pdf_path)
+        except OSError:
+            return None
+        return (os.path.abspath(pdf_path), stat.st_mtime_ns, stat.st_size)
+
+    def get_image(self, pdf_path: str, page_index: int, dpi: int) -> Optional[Image.Image]:
+        """
+        Returns a page raster (RGB) at the given DPI.
+
+        A cached raster of the same page at a higher DPI is downscaled
+        instead of rendering the page again.
+
+        Args:
+            pdf_path: Path to the PDF file.
+            page_index: 0-based page index.
+            dpi: Target resolution.
+
+        Returns:
+            The shared PIL image, or None if the page cannot be rendered.
+        """
+        doc_key = self._document_key(pdf_path)
+        if doc_key is None:
+            return None
+
+        with self._lock:
+            image = self._images.get((doc_key, page_index, dpi))
+            if image is not None:
+                self._images.move_to_end((doc_key, page_index, dpi))
+                return image
+            larger = [(d, img) for (k, p, d), img in self._images.items() if k == doc_key and p == page_index and d > dpi]
+
+        if larger:
+            source_dpi, source = min(larger, key=lambda item: item[0])
+            scale = dpi / source_dpi
+            image = source.resize((max(1, round(source.width * scale)), max(1, round(source.height * scale))), Image.LANCZOS)
+        else:
+            image = self._render(pdf_path, page_index, dpi)
+            if image is None:
+                return None
+
+        self._put((doc_key, page_index, dpi), image)
+        return image
+
+    def get_array(self, pdf_path: str, page_index: int, dpi: int) -> Optional[np.ndarray]:
+        """Returns a read-only numpy view (H x W x 3, uint8) of a page raster."""
+        image = self.get_image(pdf_path, page_index, dpi)
+        return np.asarray(image) if image is not None else None
+
+    def get_payload(self, pdf_path: str, page_index: int, dpi: int, label: str,
+                    budget: ImageBudget = DEFAULT_IMAGE_BUDGET,
+                    keep_colour: Optional[bool] = None) -> Optional[Dict[str, Any]]:
+        """
+        Builds the optimized base64 image payload of a page for an AI request.
+
+        Args:
+            pdf_path: Path to the PDF file.
+            page_index: 0-based page index.
+            dpi: Resolution of the source raster.
+            label: Payload label for the prompt.
+            budget: Limits of the target provider.
+            keep_colour: Force colour (True) or grayscale (False); None detects it.
+
+        Returns:
+            Dict with 'base64', 'mime_type', 'label' and 'page_index', or None.
+        """
+        image = self.get_image(pdf_path, page_index, dpi)
+        if image is None:
+            return None
+        payload = optimize_image(image, dpi, budget, label, keep_colour)
+        payload["page_index"] = page_index
+        return payload
+
+    def _render(self, pdf_path: str, page_index: int, dpi: int) -> Optional[Image.Image]:
+        try:
+            with fitz.open(pdf_path) as doc:
+                if not 0 <= page_index < doc.page_count:
+                    return None
+                pix = doc.load_page(page_index).get_pixmap(dpi=dpi, colorspace=fitz.csRGB, alpha=False)
+                image = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+        except Exception as e:
+            logger.error(f"Render error {pdf_path} page {page_index}: {e}")
+            return None
+        with self._lock:
+            self.renders += 1
+        return image
+
+    def _put(self, key: Tuple[DocumentKey, int, int], image: Image.Image) -> None:
+        size = image.width * image.height * len(image.getbands())
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._images:
+                return
+            self._images[key] = image
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._images.popitem(last=False)
+                self._bytes -= evicted.width * evicted.height * len(evicted.getbands())
+
+
+def encode_image(image: Image.Image, fmt: str = "JPEG", grayscale: bool = False, quality: int = 85) -> bytes:
+    """
+    Encodes a raster for transmission.
+
+    Args:
+        image: The PIL image (left unchanged).
+        fmt: 'JPEG', 'WEBP' or 'PNG'.
+        grayscale: Convert to 8-bit grayscale first.
+        quality: Lossy compression quality (JPEG/WebP).
+
+    Returns:
+        The encoded bytes.
+    """
+    fmt = fmt.upper()
+    if grayscale:
+        image = image.convert("L")
+    buffer = io.BytesIO()
+    if fmt == "PNG":
+        image.save(buffer, format="PNG", optimize=True)
+    else:
+        image.save(buffer, format=fmt, quality=quality)
+    return buffer.getvalue()
+
+
+def image_budget_for(client: Any) -> ImageBudget:
+    """Returns the image budget of an AIClient's provider (default if unknown)."""
+    budget = getattr(getattr(client, "provider", None), "IMAGE_BUDGET", None)
+    return budget if isinstance(budget, ImageBudget) else DEFAULT_IMAGE_BUDGET
+
+
+def content_box(image: Image.Image, dpi: int) -> Tuple[int, int, int, int]:
+    """
+    Finds the bounding box of the page content, ignoring blank margins and
+    isolated scan specks, padded by CROP_PADDING_INCH.
+
+    Returns:
+        (left, top, right, bottom); the full page if it is blank.
+    """
+    factor = 4
+    small = image.convert("L").reduce(factor)
+    mask = small.point(lambda v: 255 if v < INK_THRESHOLD else 0).filter(ImageFilter.MedianFilter(3))
+    bbox = mask.getbbox()
+    if bbox is None:
+        return (0, 0, image.width, image.height)
+    pad = int(dpi * CROP_PADDING_INCH)
+    left, top, right, bottom = (v * factor for v in bbox)
+    return (max(0, left - pad), max(0, top - pad), min(image.width, right + pad), min(image.height, bottom + pad))
+
+
+def has_colour(image: Image.Image) -> bool:
+    """Whether a page carries colour worth transmitting (stamps, ink, logos)."""
+    hsv = np.asarray(image.reduce(4).convert("HSV"))
+    coloured = (hsv[..., 1] > COLOUR_SATURATION) & (hsv[..., 2] > COLOUR_SATURATION)
+    return coloured.mean() > COLOUR_MIN_FRACTION
+
+
+def optimize_image(image: Image.Image, dpi: int, budget: ImageBudget, label: str = "",
+                   keep_colour: Optional[bool] = None) -> Dict[str, Any]:
+    """
+    Encodes a page raster as small as the provider budget requires while
+    keeping text legible: crops blank margins, drops colour on black and
+    white pages, encodes with the smaller of lossless PNG (clean digital
+    pages) and JPEG (scans), then lowers quality and resolution step by
+    step (not below budget.min_text_dpi) until it fits budget.max_bytes.
+
+    Args:
+        image: The page raster at dpi (left unchanged).
+        dpi: Resolution of the raster.
+        budget: Provider limits.
+        label: Payload label (also used for logging).
+        keep_colour: Force colour (True) or grayscale (False); None detects it.
+
+    Returns:
+        Dict with 'base64', 'mime_type' and 'label'.
+    """
+    box = content_box(image, dpi)
+    work = image.crop(box) if box != (0, 0, image.width, image.height) else image
+    colour = has_colour(work) if keep_colour is None else keep_colour
+    if not colour:
+        work = work.convert("L")
+
+    formats = tuple(f.upper() for f in budget.formats)
+    scale = min(1.0, budget.max_edge / max(work.width, work.height))
+    min_scale = min(scale, budget.min_text_dpi / dpi)
+    while True:
+        scaled = work
+        if scale < 1.0:
+            scaled = work.resize((max(1, round(work.width * scale)), max(1, round(work.height * scale))), Image.LANCZOS)
+        # Lossless PNG wins on clean born-digital pages, JPEG on noisy scans: take the smaller
+        lossless = encode_image(scaled, "PNG") if "PNG" in formats else None
+        for quality in QUALITY_STEPS:
+            fmt, data = "PNG", lossless
+            lossy = next((f for f in formats if f != "PNG"), None)
+            if lossy:
+                candidate = encode_image(scaled, lossy, quality=quality)
+                if data is None or len(candidate) < len(data):
+                    fmt, data = lossy, candidate
+            if len(data) <= budget.max_bytes or not lossy:
+                break
+        if len(data) <= budget.max_bytes or scale <= min_scale:
+            break
+        scale = max(min_scale, scale * SCALE_STEP)
+
+    raw_bytes = image.width * image.height * len(image.getbands())
+    if len(data) > budget.max_bytes:
+        logger.warning(f"[Payload] {label}: {len(data)} bytes exceed the budget of {budget.max_bytes} at the legibility floor")
+    logger.info(
+        f"[Payload] {label}: {image.width}x{image.height} {image.mode} @ {dpi} DPI -> "
+        f"{scaled.width}x{scaled.height} {scaled.mode} {fmt}"
+        f"{f' q{quality}' if fmt != 'PNG' else ''}, crop {box}, "
+        f"{len(data)} bytes (raster {raw_bytes}, budget {budget.max_bytes})"
+    )
+    return {
+        "base64": base64.b64encode(data).decode("ascii"),
+        "mime_type": MIME_TYPES[fmt],
+        "label": label,
+    }
@@ -0,0 +1,79 @@
+"""
+------------------------------------------------------------------------------
+Project:        KPaperFlux
+File:           core/utils/pdf_probe.py
+Version:        1.0.0
+Producer:       thorsten.schnebeck@gmx.net
+Generator:      Antigravity
+Description:    Single-pass PDF probe. Opens a PDF once and collects page
+                count, text layer, per-page text, signature flags, embedded
+                ZUGFeRD XML, hybrid marker and page sizes (PdfFacts).
+------------------------------------------------------------------------------
+"""
+
+from pathlib import Path
+from typing import Optional, Union
+
+import fitz
+
+from core.logger import get_silent_logger
+from core.models.physical import ZUGFERD_XML_NAMES, PdfFacts
+
+HYBRID_KEYWORD = "kpaperflux_immutable"
+HYBRID_ATTACHMENT = "original_signed_source.pdf"
+
+
+def probe_pdf(path: Union[str, Path], extract_text: bool = True) -> Optional[PdfFacts]:
+    """
+    Opens a PDF once and gathers its PdfFacts.
+
+    Args:
+        path: Path to the PDF file.
+        extract_text: Whether to extract the per-page text layer
+                      (only done if the PDF has one).
+
+    Returns:
+        The facts, or None if the file cannot be opened as a PDF.
+    """
+    try:
+        doc = fitz.open(str(path))
+    except Exception as e:
+        get_silent_logger().debug(f"PDF probe: cannot open {path}: {e}")
+        return None
+
+    try:
+        if not doc.is_pdf:  # fitz also opens images and e-books
+            return None
+        facts = PdfFacts(page_count=len(doc))
+
+        keywords = (doc.metadata or {}).get("keywords", "") or ""
+        facts.is_hybrid = HYBRID_KEYWORD in keywords
+
+        for i in range(doc.embfile_count()):
+            name = doc.embfile_info(i)["name"]
+            if name == HYBRID_ATTACHMENT:
+                facts.is_hybrid = True
+            elif facts.zugferd_xml is None and name.lower() in ZUGFERD_XML_NAMES:
+                facts.zugferd_xml = doc.embfile_get(i)
+
+        if hasattr(doc, "get_sigflags"):
+            facts.sig_flags = doc.get_sigflags()
+        elif hasattr(doc, "sig_flags"):
+            facts.sig_flags = doc.sig_flags
+
+        for page in doc:
+            facts.page_sizes.append((round(page.rect.width, 2), round(page.rect.height, 2)))
+            if not facts.has_text_layer and page.get_fonts():
+                facts.has_text_layer = True
+
+        if extract_text and facts.has_text_layer:
+            for i, page in enumerate(doc):
+                text = page.get_text().strip()
+                if text:
+                    facts.page_texts[str(i + 1)] = text
+        return facts
+    except Exception as e:
+        get_silent_logger().debug(f"PDF probe: error analyzing {path}: {e}")
+        return None
+    finally:
+        doc.close()
@@ -4,6 +4,7 @@ from typing import Optional, Dict, Any
 from lxml import etree
 import decimal
 from core.logger import get_logger
+from core.models.physical import ZUGFERD_XML_NAMES
 
 logger = get_logger("core.utils.zugferd")
 
@@ -32,7 +33,7 @@ class ZugferdExtractor:
             # 1. Search for embedded files
             for i in range(doc.embfile_count()):
                 name = doc.embfile_info(i)["name"]
-                if name.lower() in ["factur-x.xml", "zugferd-invoice.xml", "xrechnung.xml"]:
+                if name.lower() in ZUGFERD_XML_NAMES:
                     xml_data = doc.embfile_get(i)
                     logger.info(f"Detected embedded ZUGFeRD file: {name}")
                     break
@@ -48,6 +49,20 @@ class ZugferdExtractor:
             logger.error(f"Error extracting ZUGFeRD data: {e}")
             return None
 
+    @classmethod
+    def extract_from_xml(cls, xml_data: Optional[bytes]) -> Optional[Dict[str, Any]]:
+        """
+        Parses ZUGFeRD XML already taken from the PDF (e.g. PhysicalFile.pdf_facts).
+        Same result and error handling as extract_from_pdf().
+        """
+        if not xml_data:
+            return None
+        try:
+            return cls.parse_cii_xml(xml_data)
+        except Exception as e:
+            logger.error(f"Error extracting ZUGFeRD data: {e}")
+            return None
+
     @classmethod
     def parse_cii_xml(cls, xml_bytes: bytes) -> Dict[str, Any]:
         """Parses UN/CEFACT CII XML into our internal FinanceBody structure."""
@@ -2,7 +2,7 @@
 ------------------------------------------------------------------------------
 Project:        KPaperFlux
 File:           core/visual_auditor.py
-Version:        2.0.0
+Version:        2.1.1
 Producer:       thorsten.schnebeck@gmx.net
 Generator:      Antigravity
 Description:    Forensic document auditor that integrates AI-vision to identify
@@ -12,16 +12,15 @@ Description:    Forensic document auditor that integrates AI-vision to identify
 """
 
 import base64
-import io
 import json
 import os
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Union
 
 import fitz  # PyMuPDF
-from PIL import Image
 
 from core.logger import get_logger
+from core.utils.page_raster import DPI_AUDIT, PageRasterService, image_budget_for, optimize_image
 logger = get_logger("visual_auditor")
 
 # Audit Modes
@@ -350,11 +349,10 @@ class VisualAuditor:
         # 3. Rendering relevant pages at high DPI
         for idx, label in indices_with_labels.items():
             try:
-                page = doc.load_page(idx)
-                # High resolution (approx 300 DPI) for visual analysis
-                pix = page.get_pixmap(matrix=fitz.Matrix(4.16, 4.16))
-                img_data = pix.tobytes("png")
-                pil_img = Image.open(io.BytesIO(img_data))
+                # High resolution for visual analysis, from the shared raster service
+                pil_img = PageRasterService.instance().get_image(pdf_path, idx, DPI_AUDIT)
+                if pil_img is None:
+                    continue
 
                 images_payload.append({
                     "image": pil_img,
@@ -414,11 +412,15 @@ class VisualAuditor:
             expected_types=str(list(set(all_doc_types)))
         )
 
-        # Gemini Multimodal Content
-        contents: List[Union[str, Image.Image]] = []
+        # Multimodal content: rasters are encoded only here, within the provider's image budget.
+        # Always in colour: stamp and ink colours are audit evidence, and thin strokes
+        # do not register with the page-level colour detection.
+        budget = image_budget_for(getattr(self.ai, "client", None))
+        contents: List[Union[str, Dict[str, Any]]] = []
         for item in audit_images_data:
             contents.append(f"\n[IMAGE CONTEXT: {item['label']}]\n")
-            contents.append(item['image'])
+            contents.append(optimize_image(item['image'], DPI_AUDIT, budget, f"STAGE 1.5 {item['label']}",
+                                           keep_colour=True))
 
         # AI Execution
         res_json = self.ai._generate_json(
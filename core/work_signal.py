@@ -0,0 +1,55 @@
+"""
+------------------------------------------------------------------------------
+Project:        KPaperFlux
+File:           core/work_signal.py
+Version:        1.0.0
+Producer:       thorsten.schnebeck@gmx.net
+Generator:      Antigravity
+Description:    In-process wakeup signal for the background pipeline. Producers
+                (ingest, re-analysis, Stage 2 queueing) notify it after queuing
+                work so the main loop starts immediately instead of polling.
+------------------------------------------------------------------------------
+"""
+
+import threading
+
+
+class WorkSignal:
+    """
+    Edge-triggered wakeup flag shared between work producers and the
+    pipeline main loop.
+
+    A notification that arrives while the consumer is busy is not lost:
+    the flag stays set and the next wait() returns immediately.
+    """
+
+    def __init__(self) -> None:
+        self._event = threading.Event()
+
+    def notify(self) -> None:
+        """Signals that new work was queued."""
+        self._event.set()
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Blocks until work is signalled or the timeout expires and resets
+        the flag for the next round.
+
+        Args:
+            timeout: Maximum time to wait in seconds.
+
+        Returns:
+            True if woken by a notification, False on timeout.
+        """
+        woken = self._event.wait(timeout)
+        self._event.clear()
+        return woken
+
+
+# Process-wide signal consumed by gui.workers.MainLoopWorker
+pipeline_work_signal = WorkSignal()
+
+
+def notify_pipeline_work() -> None:
+    """Wakes the background pipeline because new work was queued."""
+    pipeline_work_signal.notify()
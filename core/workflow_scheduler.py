@@ -2,30 +2,46 @@
 ------------------------------------------------------------------------------
 Project:        KPaperFlux
 File:           core/workflow_scheduler.py
-Version:        1.0.0
+Version:        1.2.0
 Producer:       thorsten.schnebeck@gmx.net
 Generator:      Claude Sonnet 4.6
-Description:    Background scheduler that evaluates auto-transitions for all
+Description:    Background scheduler that evaluates auto-transitions for
                 documents with active workflows. Fires on a configurable interval
                 (default 15 minutes) and applies any auto-transitions whose
-                conditions are now satisfied.
+                conditions are now satisfied. Only documents whose persisted
+                next evaluation time (workflow_schedule table) is due are loaded.
 ------------------------------------------------------------------------------
 """
 
-from datetime import datetime
-from typing import Any
+import hashlib
+import math
+from datetime import datetime, time, timedelta
+from typing import Any, Dict, List, Optional, Tuple
 
 from PyQt6.QtCore import QObject, QTimer, pyqtSignal
 
 from core.logger import get_logger
 from core.workflow import (
     WorkflowEngine,
+    WorkflowRule,
     WorkflowRuleRegistry,
+    WorkflowTransition,
     build_workflow_data,
 )
 
 logger = get_logger("core.workflow_scheduler")
 
+# app_meta key of the workflow rule signature the schedule was computed with
+RULES_SIGNATURE_KEY = "workflow_rules_signature"
+
+# Time-based workflow fields and how they change per day
+_DAILY_SLOPES: Dict[str, int] = {
+    "AGE_DAYS": 1,
+    "DAYS_IN_STATE": 1,
+    "DAYS_UNTIL_DUE": -1,
+    "DAYS_UNTIL_EXPIRY": -1,
+}
+
 
 class WorkflowScheduler(QObject):
     """Background scheduler that evaluates auto-transitions for all active workflow documents.
@@ -35,6 +51,12 @@ class WorkflowScheduler(QObject):
     document never aborts the run — all per-document errors are caught and
     logged at WARNING level.
 
+    After evaluating a document the scheduler persists, per workflow rule,
+    the earliest time an auto-transition could fire (see
+    _next_evaluation).  Conditions on non-time fields can only change
+    together with the document, which database triggers mark as due again,
+    so each run only loads the documents that are due.
+
     Signals:
         transitions_applied(int): emitted after each run with the count of
             transitions that were applied (may be 0).
@@ -55,6 +77,8 @@ class WorkflowScheduler(QObject):
         self.db_manager = db_manager
         self._interval_ms = interval_minutes * 60 * 1000
 
+        self._rules_signature: Optional[str] = None
+
         self._timer = QTimer(self)
         self._timer.setSingleShot(False)
         self._timer.timeout.connect(self._run)
@@ -73,13 +97,14 @@ class WorkflowScheduler(QObject):
     # ── Core evaluation loop ───────────────────────────────────────────────
 
     def _run(self) -> None:
-        """Evaluate all documents with active workflows and apply auto-transitions."""
+        """Evaluate all due documents with active workflows and apply auto-transitions."""
         count = 0
         registry = WorkflowRuleRegistry()
 
         try:
-            docs = self.db_manager.search_documents_advanced(
-                {"field": "semantic:workflows", "op": "is_not_empty", "value": None}
+            self._check_rules_changed(registry)
+            docs = self.db_manager.get_due_workflow_documents(
+                datetime.now().isoformat(timespec="seconds")
             )
         except Exception as exc:
             logger.warning(f"[WorkflowScheduler] Failed to query documents: {exc}")
@@ -90,12 +115,16 @@ class WorkflowScheduler(QObject):
         for doc in docs:
             try:
                 count += self._process_document(doc, registry)
+                self.db_manager.set_workflow_schedule(doc.uuid, self._build_schedule(doc, registry))
             except Exception as exc:
                 logger.warning(
                     f"[WorkflowScheduler] Error processing document {getattr(doc, 'uuid', '?')}: {exc}"
                 )
 
-        logger.debug(f"[WorkflowScheduler] Run complete — {count} transition(s) applied.")
+        logger.debug(
+            f"[WorkflowScheduler] Run complete — {len(docs)} due document(s), "
+            f"{count} transition(s) applied."
+        )
         self.transitions_applied.emit(count)
         self.run_completed.emit()
 
@@ -148,6 +177,188 @@ class WorkflowScheduler(QObject):
 
         return applied
 
+    # ── Evaluation schedule ────────────────────────────────────────────────
+
+    def _check_rules_changed(self, registry: WorkflowRuleRegistry) -> None:
+        """
+        Mark every workflow due again when the rule definitions differ from
+        the ones the stored schedule was computed with. The signature is
+        persisted in the database, so rule edits between sessions are
+        detected on the first run.
+        """
+        dump = "|".join(
+            registry.rules[rule_id].model_dump_json() for rule_id in sorted(registry.rules)
+        )
+        signature = hashlib.sha256(dump.encode("utf-8")).hexdigest()
+        if signature == self._rules_signature:
+            return
+        if signature != self.db_manager.get_meta(RULES_SIGNATURE_KEY):
+            logger.info("[WorkflowScheduler] Workflow rules changed — re-evaluating all workflows.")
+            self.db_manager.reset_workflow_schedule()
+            self.db_manager.set_meta(RULES_SIGNATURE_KEY, signature)
+        self._rules_signature = signature
+
+    def _build_schedule(self, doc: Any, registry: WorkflowRuleRegistry) -> Dict[str, Optional[str]]:
+        """Return rule_id -> next evaluation ISO timestamp (or None) for all workflows of *doc*."""
+        sd = getattr(doc, "semantic_data", None)
+        if sd is None or not hasattr(sd, "workflows"):
+            return {}
+
+        now = datetime.now()
+        schedule: Dict[str, Optional[str]] = {}
+        for rule_id, wf_info in sd.workflows.items():
+            rule = registry.get_rule(rule_id)
+            next_eval = None
+            if rule is not None:
+                days_in_state = self._compute_days_in_state(wf_info.current_step_entered_at)
+                next_eval = self._next_evaluation(
+                    rule,
+                    wf_info.current_step,
+                    build_workflow_data(doc, days_in_state),
+                    wf_info.current_step_entered_at,
+                    now,
+                )
+            schedule[rule_id] = next_eval.isoformat(timespec="seconds") if next_eval else None
+        return schedule
+
+    @classmethod
+    def _next_evaluation(
+        cls,
+        rule: WorkflowRule,
+        current_state: str,
+        data: dict,
+        entered_at: Any,
+        now: datetime,
+    ) -> Optional[datetime]:
+        """Earliest time any auto-transition of *current_state* could fire, or None.
+
+        Only the time-based fields of _DAILY_SLOPES change without the
+        document changing, so every other condition is decided now.
+        The result is never later than the true firing time (it may be
+        earlier, in which case the next evaluation simply reschedules).
+        """
+        state = rule.states.get(current_state)
+        if not state:
+            return None
+        engine = WorkflowEngine(rule)
+        candidates = [
+            due for due in (
+                cls._transition_due_at(engine, trans, data, entered_at, now)
+                for trans in state.transitions if trans.auto
+            )
+            if due is not None
+        ]
+        return min(candidates) if candidates else None
+
+    @classmethod
+    def _transition_due_at(
+        cls,
+        engine: WorkflowEngine,
+        transition: WorkflowTransition,
+        data: dict,
+        entered_at: Any,
+        now: datetime,
+    ) -> Optional[datetime]:
+        """Earliest time *transition* could pass its conditions, or None if never (without data changes)."""
+        slopes = dict(_DAILY_SLOPES)
+        entered = cls._parse_timestamp(entered_at)
+        if entered is None:
+            slopes["DAYS_IN_STATE"] = 0  # Stays 0 forever
+
+        static_conditions = [c for c in transition.conditions if not slopes.get(c.field)]
+        static_only = transition.model_copy(update={"conditions": static_conditions})
+        if not engine.evaluate_transition(static_only, data):
+            return None
+
+        # Smallest day offset k >= 0 satisfying all time-based conditions
+        lo, hi = 0, math.inf
+        points: List[int] = []
+        excluded: List[int] = []
+        for cond in transition.conditions:
+            slope = slopes.get(cond.field)
+            if not slope:
+                continue
+            value = data.get(cond.field)
+            if value is None:
+                return None
+            bounds = cls._day_offsets(cond.op, float(value), slope, cond.value)
+            if bounds is None:
+                return None
+            kind, a, b = bounds
+            if kind == "range":
+                lo, hi = max(lo, a), min(hi, b)
+            elif kind == "point":
+                points.append(a)
+            elif kind == "except":
+                excluded.append(a)
+
+        if points:
+            if len(set(points)) > 1:
+                return None
+            lo = max(lo, points[0])
+            hi = min(hi, points[0])
+        k = lo
+        while k in excluded:
+            k += 1
+        if k > hi:
+            return None
+        if k == 0:
+            return now
+
+        used = {c.field for c in transition.conditions if slopes.get(c.field)}
+        times: List[datetime] = []
+        if used - {"DAYS_IN_STATE"}:
+            times.append(datetime.combine(now.date() + timedelta(days=k), time.min))
+        if "DAYS_IN_STATE" in used:
+            times.append(entered + timedelta(days=data["DAYS_IN_STATE"] + k))
+        return min(times)
+
+    @staticmethod
+    def _day_offsets(op: str, value: float, slope: int, target: Any) -> Optional[Tuple[str, float, float]]:
+        """Day offsets k >= 0 for which ``value + slope * k <op> target`` holds.
+
+        Mirrors WorkflowEngine.evaluate_transition.  Returns ("range", lo, hi),
+        ("point", k, k), ("except", k, k) or None if no offset satisfies it.
+        """
+        try:
+            c = float(target)
+        except (ValueError, TypeError):
+            # Non-numeric target: '!=' always holds, anything else never
+            return ("range", 0, math.inf) if op == "!=" else None
+
+        if op in ("=", "!="):
+            # '=' / '!=' compare string forms; integers only match integral targets
+            k = (c - value) * slope
+            exact = k >= 0 and k == int(k) and str(int(value + slope * k)) == str(target)
+            if op == "=":
+                return ("point", int(k), int(k)) if exact else None
+            return ("except", int(k), int(k)) if exact else ("range", 0, math.inf)
+
+        # Normalize to "k <op> bound" (a negative slope flips the comparison)
+        bound = (c - value) * slope
+        if slope < 0:
+            op = {">": "<", "<": ">", ">=": "<=", "<=": ">="}.get(op, op)
+        if op == ">":
+            return ("range", max(0, math.floor(bound) + 1), math.inf)
+        if op == ">=":
+            return ("range", max(0, math.ceil(bound)), math.inf)
+        if op == "<":
+            return ("range", 0, math.ceil(bound) - 1) if math.ceil(bound) - 1 >= 0 else None
+        if op == "<=":
+            return ("range", 0, math.floor(bound)) if bound >= 0 else None
+        return ("range", 0, math.inf)  # Unknown operators do not block
+
+    @staticmethod
+    def _parse_timestamp(value: Any) -> Optional[datetime]:
+        """Parse a naive ISO timestamp (as used by _compute_days_in_state), or return None."""
+        if not value:
+            return None
+        try:
+            parsed = datetime.fromisoformat(str(value))
+        except (ValueError, TypeError):
+            return None
+        return parsed if parsed.tzinfo is None else None
+
     # ── Helpers ────────────────────────────────────────────────────────────
 
     @staticmethod
@@ -13,6 +13,7 @@ Description:    Handles document reprocessing and stamping operations.
 
 import os
 import shutil
+from pathlib import Path
 from typing import List, Optional
 
 from PyQt6.QtCore import QObject, pyqtSignal, Qt
@@ -220,6 +221,7 @@ class ProcessingController(QObject):
                     )
                     uuids = [target_uuid]
                 if stamper.remove_stamp(src_path, stamp_id=remove_id):
+                    self._invalidate_visual_hashes(src_path)
                     successful_count = 1
             else:
                 for uid in uuids:
@@ -238,6 +240,7 @@ class ProcessingController(QObject):
                     tmp_path = f"{base}_stamped{ext}"
                     stamper.apply_stamp(fpath, tmp_path, text, position=pos, color=color, rotation=rotation)
                     shutil.move(tmp_path, fpath)
+                    self._invalidate_visual_hashes(fpath)
                     successful_count += 1
 
             msg = (
@@ -255,3 +258,11 @@ class ProcessingController(QObject):
                 self._parent.tr("Stamping operation failed: %s") % e,
                 icon=QMessageBox.Icon.Critical,
             )
+
+    def _invalidate_visual_hashes(self, file_path: str) -> None:
+        """
+        Drops the stored page hashes of a vault file after it was rewritten.
+        Vault files are named ``{file_uuid}.pdf``.
+        """
+        if self.db_manager:
+            self.db_manager.page_hash_repo.invalidate(Path(file_path).stem)
@@ -29,6 +29,7 @@ logger = get_logger("gui.document_list")
 # Core Imports
 from gui.utils import show_selectable_message_box
 from core.database import DatabaseManager
+from core.models.list_row import DocumentListRow, document_column_value
 from core.config import AppConfig
 from core.metadata_normalizer import MetadataNormalizer
 from core.semantic_translator import SemanticTranslator
@@ -583,7 +584,7 @@ class DocumentListWidget(QWidget):
             # Refresh group tree if present in parent hierarchy
             mw = self.window()
             if hasattr(mw, "group_tree"):
-                mw.group_tree.refresh()
+                mw.group_tree.refresh_counts()
 
     def delete_selected_documents(self, uuids: list[str]):
         """Filter out locked documents before requesting deletion."""
@@ -773,11 +774,7 @@ class DocumentListWidget(QWidget):
             self.show_generic_requested.emit(uuid)
         elif action == export_action:
             # Get selected documents
-            docs = []
-            for u in uuids:
-                if u in self.documents_cache:
-                    docs.append(self.documents_cache[u])
-            self.open_export_dialog(docs)
+            self.open_export_dialog(self.get_documents([u for u in uuids if u in self.documents_cache]))
         elif action == export_all_action:
             # Get ALL visible documents (respecting filters)
             docs = self.get_visible_documents()
@@ -799,14 +796,30 @@ class DocumentListWidget(QWidget):
 
     def get_visible_documents(self) -> list:
         """Return list of Document objects currently visible in the tree."""
-        visible_docs = []
+        visible_uuids = []
         for i in range(self.tree.topLevelItemCount()):
             item = self.tree.topLevelItem(i)
             if not item.isHidden():
                 uuid = item.data(1, Qt.ItemDataRole.UserRole)
                 if uuid in self.documents_cache:
-                    visible_docs.append(self.documents_cache[uuid])
-        return visible_docs
+                    visible_uuids.append(uuid)
+        return self.get_documents(visible_uuids)
+
+    def get_documents(self, uuids: List[str]) -> list:
+        """
+        Return fully hydrated Document objects for the given UUIDs.
+
+        The list itself only holds compact DocumentListRow projections;
+        full documents are loaded from the database on demand.
+        """
+        docs = []
+        for uuid in uuids:
+            doc = self.documents_cache.get(uuid)
+            if isinstance(doc, DocumentListRow) and self.db_manager:
+                doc = self.db_manager.get_document_by_uuid(uuid)
+            if doc:
+                docs.append(doc)
+        return docs
 
     def _on_selection_changed(self):
         """Emit signal with selected UUID(s)."""
@@ -834,14 +847,16 @@ class DocumentListWidget(QWidget):
 
         active_query = None
         search_text = getattr(self, "current_filter_text", "")
+        # Compact list rows; full documents are loaded on demand (get_documents)
+        extra_fields = list(self.dynamic_columns)
         if self.is_trash_mode:
-            docs = self.db_manager.get_deleted_entities_view()
+            docs = self.db_manager.get_document_list_rows(trash=True, extra_fields=extra_fields)
         elif self.is_archive_mode:
-            docs = self.db_manager.search_documents_advanced({
+            docs = self.db_manager.get_document_list_rows({
                 "field": "archived",
                 "op": "equals",
                 "value": True
-            })
+            }, extra_fields=extra_fields)
         else:
             # current_advanced_query takes priority over cockpit query (search must not be overridden by cockpit)
             if self.current_advanced_query:
@@ -849,14 +864,11 @@ class DocumentListWidget(QWidget):
             elif self.current_cockpit_query:
                 active_query = self.current_cockpit_query
 
-            if active_query:
-                docs = self.db_manager.search_documents_advanced(active_query)
-            else:
-                query_text = getattr(self, "current_filter_text", None)
-                if query_text:
-                    docs = self.db_manager.search_documents(query_text)
-                else:
-                    docs = self.db_manager.get_all_entities_view()
+            docs = self.db_manager.get_document_list_rows(
+                active_query,
+                search_text=None if active_query else getattr(self, "current_filter_text", None),
+                extra_fields=extra_fields,
+            )
 
             if not search_text and active_query:
                 search_text = active_query.get('_meta_fulltext')
@@ -930,8 +942,8 @@ class DocumentListWidget(QWidget):
         # Handle programmatic target selection (drill-down from cockpit)
         if hasattr(self, "target_select_query") and self.target_select_query:
             try:
-                select_docs = self.db_manager.search_documents_advanced(self.target_select_query)
-                select_uuids = [d.uuid for d in select_docs]
+                select_rows = self.db_manager.get_document_list_rows(self.target_select_query)
+                select_uuids = [r.uuid for r in select_rows]
                 if select_uuids:
                     # Ensure all documents are loaded into the tree for selection to work
                     # (Infinite scroll would otherwise hide these items)
@@ -971,20 +983,16 @@ class DocumentListWidget(QWidget):
         if not doc: return
 
         # 1. Check if update is actually needed (FOOTPRINT CHANGE)
-        old_doc = self.documents_cache.get(doc.uuid)
-        if old_doc:
-             # Compare fields displayed in the list
-             if (old_doc.status == doc.status and
-                 old_doc.last_processed_at == doc.last_processed_at and
-                 old_doc.last_used == doc.last_used and
-                 old_doc.deleted_at == doc.deleted_at and
-                 old_doc.locked_at == doc.locked_at and
-                 old_doc.type_tags == doc.type_tags and
-                 old_doc.original_filename == doc.original_filename and
-                 old_doc.semantic_data == doc.semantic_data):
+        # The cache holds list rows only: compare the projected list fields
+        old_row = self.documents_cache.get(doc.uuid)
+        row = doc if isinstance(doc, DocumentListRow) else DocumentListRow.from_document(
+            doc, old_row.extra.keys() if isinstance(old_row, DocumentListRow) else self.dynamic_columns
+        )
+        if old_row:
+             if old_row == row:
                   return # Change is irrelevant for view
 
-             logger.debug(f"update_document_item: Updating row for {doc.uuid} ({old_doc.status} -> {doc.status})")
+             logger.debug(f"update_document_item: Updating row for {doc.uuid} ({old_row.status} -> {row.status})")
 
         # 1.5 Find matching item
         target_item = None
@@ -1000,7 +1008,8 @@ class DocumentListWidget(QWidget):
             return
 
         # 2. Update Cache
-        self.documents_cache[doc.uuid] = doc
+        self.documents_cache[doc.uuid] = row
+        doc = row
 
         # 3. Format Data
         created_str = format_datetime(doc.created_at)
@@ -1031,15 +1040,7 @@ class DocumentListWidget(QWidget):
         for d_idx, key in enumerate(self.dynamic_columns):
             col_idx = num_fixed + d_idx
             
-            # Use getattr for properties/fields
-            val = getattr(doc, key, None)
-            
-            # Fallback to semantic_data model_extra if not found as attribute
-            if val is None and doc.semantic_data:
-                # Check for direct attribute on semantic_data
-                val = getattr(doc.semantic_data, key, None)
-                if val is None and hasattr(doc.semantic_data, "model_extra") and doc.semantic_data.model_extra:
-                    val = doc.semantic_data.model_extra.get(key)
+            val = self._column_value(doc, key)
 
             # Special Formatting for Common Fields
             if key in ["total_amount", "total_gross", "total_net"] and val is not None:
@@ -1077,6 +1078,11 @@ class DocumentListWidget(QWidget):
         target_tags = criteria.get('tags')
         text_search = criteria.get('text_search')
 
+        # List rows carry no full text: match it in the database instead
+        text_hits = set()
+        if text_search and self.db_manager:
+            text_hits = set(self.db_manager.get_virtual_uuids_with_text_content(text_search))
+
         visible_count = 0
         total_count = self.tree.topLevelItemCount()
 
@@ -1133,7 +1139,7 @@ class DocumentListWidget(QWidget):
                     str(doc.created_at or "")
                 ]
                 full_text = " ".join(haystack).lower()
-                if query not in full_text:
+                if query not in full_text and doc.uuid not in text_hits:
                     show = False
 
             item.setHidden(not show)
@@ -1322,6 +1328,13 @@ class DocumentListWidget(QWidget):
         if was_sorting:
             self.tree.setSortingEnabled(True)
 
+    @staticmethod
+    def _column_value(doc, key: str) -> Any:
+        """Resolve a dynamic column value from a list row or a full document."""
+        if isinstance(doc, DocumentListRow):
+            return doc.column_value(key)
+        return document_column_value(doc, key)
+
     def _create_tree_item(self, doc) -> SortableTreeWidgetItem:
         """Centralized factory for document list items."""
         created_str = format_datetime(doc.created_at)
@@ -1341,9 +1354,7 @@ class DocumentListWidget(QWidget):
         locked_at_str = format_datetime(doc.locked_at) or "-"
         processed_str = format_datetime(doc.last_processed_at) or "-"
         exported_str = format_datetime(doc.exported_at) or "-"
-        
-        sd = doc.semantic_data
-        
+
         hit_count = self.current_hit_map.get(doc.uuid, 0)
         
         icon = ""
@@ -1383,12 +1394,8 @@ class DocumentListWidget(QWidget):
         # Dynamic Columns
         num_fixed = len(self.fixed_columns)
         for key in self.dynamic_columns:
-            val = getattr(doc, key, None)
-            if val is None and doc.semantic_data:
-                val = getattr(doc.semantic_data, key, None)
-                if val is None and hasattr(doc.semantic_data, "model_extra") and doc.semantic_data.model_extra:
-                    val = doc.semantic_data.model_extra.get(key)
-            
+            val = self._column_value(doc, key)
+
             if key in ["total_amount", "total_gross", "total_net"] and val is not None:
                 try:
                     locale = QLocale.system()
@@ -1437,11 +1444,7 @@ class DocumentListWidget(QWidget):
 
         for d_idx, key in enumerate(self.dynamic_columns):
             col_idx = num_fixed + d_idx
-            val = getattr(doc, key, None)
-            if val is None and doc.semantic_data:
-                val = getattr(doc.semantic_data, key, None)
-                if val is None and hasattr(doc.semantic_data, "model_extra") and doc.semantic_data.model_extra:
-                    val = doc.semantic_data.model_extra.get(key)
+            val = self._column_value(doc, key)
             if val is not None:
                 item.setData(col_idx, Qt.ItemDataRole.UserRole, val)
 
@@ -1459,17 +1462,17 @@ class DocumentListWidget(QWidget):
         open_count = 0
         done_count = 0
         for doc in docs:
-            sd = getattr(doc, "semantic_data", None)
-            if not sd:
-                continue
-            workflows = getattr(sd, "workflows", None)
-            if not workflows:
-                continue
-            for rule_id, wf in workflows.items():
+            if isinstance(doc, DocumentListRow):
+                steps = doc.workflow_steps
+            else:
+                sd = getattr(doc, "semantic_data", None)
+                workflows = getattr(sd, "workflows", None) if sd else None
+                steps = {rule_id: wf.current_step for rule_id, wf in (workflows or {}).items()}
+            for rule_id, current_step in steps.items():
                 rule = registry.get_rule(rule_id)
                 if not rule:
                     continue
-                state_def = rule.states.get(wf.current_step)
+                state_def = rule.states.get(current_step)
                 if state_def and state_def.final:
                     done_count += 1
                 else:
@@ -0,0 +1,448 @@
+"""
+------------------------------------------------------------------------------
+Project:        KPaperFlux
+File:           gui/page_render.py
+Version:        1.2.0
+Producer:       thorsten.schnebeck@gmx.net
+Generator:      Antigravity
+Description:    Page rendering helpers: fitz page to QImage rendering, a
+                memory-capped LRU cache of rendered pages, a background worker
+                that prefetches pages for the PDF viewer and a thumbnail
+                service with a worker pool and a persistent on-disk store.
+------------------------------------------------------------------------------
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Callable, Deque, Dict, Hashable, List, Optional, Tuple, Union
+
+import fitz
+from PyQt6.QtCore import QCoreApplication, QObject, QThread, pyqtSignal
+from PyQt6.QtGui import QImage
+
+from core.logger import get_logger
+
+logger = get_logger("gui.page_render")
+
+# (cache key, PDF path or PDF bytes, 0-based page index, render scale, rotation)
+RenderJob = Tuple[Hashable, Union[str, bytes], int, float, int]
+
+
+def render_page_image(page: fitz.Page, scale: float, rotation: int = 0) -> QImage:
+    """
+    Renders a PDF page into a QImage that owns its pixel data.
+
+    Args:
+        page: The fitz page.
+        scale: Pixels per PDF point.
+        rotation: Additional visual rotation in degrees.
+
+    Returns:
+        The rendered RGB image (safe to use outside the rendering thread).
+    """
+    mat = fitz.Matrix(scale, scale).prerotate(rotation)
+    pix = page.get_pixmap(matrix=mat, alpha=False)
+    return QImage(
+        pix.samples,
+        pix.width,
+        pix.height,
+        pix.stride,
+        QImage.Format.Format_RGB888
+    ).copy()
+
+
+class PageRenderCache:
+    """
+    LRU cache of rendered page images, capped by their total size in bytes.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, QImage]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[QImage]:
+        """Returns the cached image for key (marking it recently used), or None."""
+        with self._lock:
+            image = self._entries.get(key)
+            if image is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return image
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def put(self, key: Hashable, image: QImage) -> None:
+        """Stores an image and evicts the least recently used ones beyond max_bytes."""
+        size = image.sizeInBytes()
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.sizeInBytes()
+            self._entries[key] = image
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.sizeInBytes()
+
+    def clear(self) -> None:
+        """Drops all cached images."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    @property
+    def total_bytes(self) -> int:
+        """Current size of all cached images in bytes."""
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class PagePrefetchWorker(QThread):
+    """
+    Renders pages in the background. Uses its own fitz document per PDF
+    path (or in-memory PDF), as fitz documents must not be shared between
+    threads.
+
+    The thread ends after IDLE_TIMEOUT_MS without work and is restarted by
+    the next request().
+    """
+    page_rendered = pyqtSignal(object, QImage)  # cache key, image
+
+    IDLE_TIMEOUT_MS = 2000
+
+    def __init__(self, parent: Optional[QObject] = None) -> None:
+        super().__init__(parent)
+        self._cond = threading.Condition()
+        self._jobs: List[RenderJob] = []
+        self._active = False
+        self._stopped = False
+
+    def request(self, jobs: List[RenderJob]) -> None:
+        """
+        Replaces the pending jobs (outdated prefetches are dropped).
+
+        Args:
+            jobs: Render jobs in priority order.
+        """
+        with self._cond:
+            if self._stopped:
+                return
+            self._jobs = list(jobs)
+            if not self._jobs:
+                return
+            if self._active:
+                self._cond.notify()
+                return
+            self._active = True
+        self.wait()  # A previous run may still be returning
+        self.start(QThread.Priority.LowPriority)
+
+    def stop(self) -> None:
+        """Discards pending jobs and waits for the thread to finish. Later requests restart it."""
+        with self._cond:
+            self._stopped = True
+            self._jobs = []
+            self._cond.notify()
+        self.wait()
+        with self._cond:
+            self._stopped = False
+            self._active = False
+
+    def run(self) -> None:
+        doc: Optional[fitz.Document] = None
+        doc_source: Optional[Union[str, bytes]] = None
+        try:
+            while True:
+                with self._cond:
+                    if not self._jobs and not self._stopped:
+                        self._cond.wait(self.IDLE_TIMEOUT_MS / 1000)
+                    if self._stopped or not self._jobs:
+                        self._active = False
+                        return
+                    key, source, page_idx, scale, rotation = self._jobs.pop(0)
+
+                try:
+                    if source is not doc_source and source != doc_source:
+                        if doc is not None:
+                            doc.close()
+                        doc, doc_source = None, None
+                        if isinstance(source, bytes):
+                            doc = fitz.open(stream=source, filetype="pdf")
+                        else:
+                            doc = fitz.open(source)
+                        doc_source = source
+                    image = render_page_image(doc[page_idx], scale, rotation)
+                except Exception as e:
+                    logger.debug(f"[PagePrefetch] Could not render page {page_idx}: {e}")
+                    continue
+                self.page_rendered.emit(key, image)
+        finally:
+            if doc is not None:
+                doc.close()
+
+
+# (memory cache key, PDF path, 0-based page index, render scale, rotation)
+ThumbnailJob = Tuple[Hashable, str, int, float, int]
+ThumbnailCallback = Callable[[QImage], None]
+
+
+class _ThumbnailWorker(QThread):
+    """
+    One thread of the ThumbnailService pool. Keeps its own small LRU of open
+    fitz documents, as fitz documents must not be shared between threads.
+    """
+    thumbnail_ready = pyqtSignal(object, QImage)  # memory cache key, image (null on error)
+
+    def __init__(self, service: "ThumbnailService") -> None:
+        super().__init__(service)
+        self._service = service
+        self.busy = False  # Guarded by the service lock
+
+    def run(self) -> None:
+        docs: "OrderedDict[Hashable, fitz.Document]" = OrderedDict()
+        try:
+            while True:
+                job = self._service._next_job(self)
+                if job is None:
+                    return
+                try:
+                    image = self._service._load_or_render(job, docs)
+                except Exception as e:
+                    logger.debug(f"[Thumbnails] Could not render page {job[2]} of {job[1]}: {e}")
+                    image = QImage()
+                self.thumbnail_ready.emit(job[0], image)
+        finally:
+            for doc in docs.values():
+                doc.close()
+
+
+class ThumbnailService(QObject):
+    """
+    Renders page thumbnails off the GUI thread and delivers them asynchronously.
+
+    Lookups go memory cache -> on-disk PNG store -> render. The disk store is
+    keyed by the SHA-256 of the file content, the page, the rotation and the
+    scale, so thumbnails survive restarts and are shared between copies of
+    the same file. Concurrent requests for the same thumbnail are rendered
+    once; the most recent request is served first.
+    """
+
+    MAX_WORKERS = min(4, os.cpu_count() or 1)
+    DOC_HANDLES = 4
+    IDLE_TIMEOUT_MS = 2000
+    MEMORY_CACHE_BYTES = 64 * 1024 * 1024
+    STORE_MAX_BYTES = 256 * 1024 * 1024
+
+    _instance: Optional["ThumbnailService"] = None
+
+    def __init__(self, cache_dir: Optional[Path] = None, parent: Optional[QObject] = None) -> None:
+        """
+        Args:
+            cache_dir: Directory of the persistent thumbnail store (None disables it).
+            parent: Optional Qt parent.
+        """
+        super().__init__(parent)
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.memory_cache = PageRenderCache(self.MEMORY_CACHE_BYTES)
+        self._cond = threading.Condition()
+        self._jobs: Deque[ThumbnailJob] = deque()
+        self._stopped = False
+        self._waiters: Dict[Hashable, List[ThumbnailCallback]] = {}
+        self._digests: Dict[Tuple[str, int, int], str] = {}
+        self._store_lock = threading.Lock()
+        self._written_since_prune = 0
+        self._workers: List[_ThumbnailWorker] = []
+        for _ in range(self.MAX_WORKERS):
+            worker = _ThumbnailWorker(self)
+            worker.thumbnail_ready.connect(self._on_thumbnail_ready)
+            self._workers.append(worker)
+
+    @classmethod
+    def instance(cls) -> "ThumbnailService":
+        """Returns the application-wide service using the configured thumbnail store."""
+        if cls._instance is None:
+            from core.config import AppConfig
+            try:
+                cache_dir = AppConfig().get_thumbnail_dir()
+            except OSError as e:
+                logger.warning(f"[Thumbnails] Persistent store unavailable: {e}")
+                cache_dir = None
+            cls._instance = cls(cache_dir)
+            app = QCoreApplication.instance()
+            if app is not None:
+                app.aboutToQuit.connect(cls._instance.stop)
+        return cls._instance
+
+    def request(
+        self,
+        path: str,
+        page_index: int,
+        scale: float,
+        callback: ThumbnailCallback,
+        rotation: int = 0
+    ) -> None:
+        """
+        Requests a page thumbnail. The callback runs on the GUI thread, right
+        away for memory cache hits; it receives a null QImage on errors.
+
+        Args:
+            path: Path to the PDF file.
+            page_index: 0-based page index.
+            scale: Pixels per PDF point.
+            callback: Receives the rendered image.
+            rotation: Rotation in degrees applied to the rendering.
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            callback(QImage())
+            return
+
+        key = (path, stat.st_mtime_ns, stat.st_size, page_index, rotation, round(scale * 100))
+        image = self.memory_cache.get(key)
+        if image is not None:
+            callback(image)
+            return
+
+        waiters = self._waiters.get(key)
+        if waiters is not None:  # Already queued or rendering
+            waiters.append(callback)
+            return
+        self._waiters[key] = [callback]
+
+        with self._cond:
+            if self._stopped:
+                return
+            self._jobs.append((key, path, page_index, scale, rotation))
+            self._cond.notify()
+            worker = next((w for w in self._workers if not w.busy), None)
+            if worker is None:  # Pool exhausted: a running worker picks the job up
+                return
+            worker.busy = True
+        worker.wait()  # A previous run may still be returning
+        worker.start(QThread.Priority.LowPriority)
+
+    def stop(self) -> None:
+        """Discards pending requests and waits for the workers. Later requests restart them."""
+        with self._cond:
+            self._stopped = True
+            self._jobs.clear()
+            self._cond.notify_all()
+        for worker in self._workers:
+            worker.wait()
+        self._waiters.clear()
+        with self._cond:
+            self._stopped = False
+
+    def _next_job(self, worker: _ThumbnailWorker) -> Optional[ThumbnailJob]:
+        """Blocks until a job is available; returns None when the worker should exit."""
+        with self._cond:
+            if not self._jobs and not self._stopped:
+                self._cond.wait(self.IDLE_TIMEOUT_MS / 1000)
+            if self._stopped or not self._jobs:
+                worker.busy = False
+                return None
+            return self._jobs.pop()  # Newest first: follows the scroll position
+
+    def _on_thumbnail_ready(self, key: Hashable, image: QImage) -> None:
+        if not image.isNull():
+            self.memory_cache.put(key, image)
+        for callback in self._waiters.pop(key, []):
+            try:
+                callback(image)
+            except RuntimeError as e:  # Receiver widget already deleted
+                logger.debug(f"[Thumbnails] Dropped result for a deleted receiver: {e}")
+
+    def _load_or_render(self, job: ThumbnailJob, docs: "OrderedDict[Hashable, fitz.Document]") -> QImage:
+        """Worker side: serves a job from the disk store or renders (and stores) it."""
+        key, path, page_index, scale, rotation = job
+        file_version = key[:3]
+
+        store_path = None
+        if self.cache_dir is not None:
+            digest = self._file_digest(file_version)
+            store_path = self.cache_dir / digest[:2] / f"{digest}_p{page_index}_r{rotation}_s{key[5]}.png"
+            if store_path.exists():
+                image = QImage(str(store_path))
+                if not image.isNull():
+                    os.utime(store_path)  # Keep recently used thumbnails on pruning
+                    return image
+
+        doc = docs.get(file_version)
+        if doc is None:
+            doc = fitz.open(path)
+            docs[file_version] = doc
+            while len(docs) > self.DOC_HANDLES:
+                docs.popitem(last=False)[1].close()
+        else:
+            docs.move_to_end(file_version)
+        image = render_page_image(doc[page_index], scale, rotation)
+
+        if store_path is not None:
+            self._store(store_path, image)
+        return image
+
+    def _file_digest(self, file_version: Tuple[str, int, int]) -> str:
+        """SHA-256 of the file content, memoized per (path, mtime, size)."""
+        digest = self._digests.get(file_version)
+        if digest is None:
+            sha = hashlib.sha256()
+            with open(file_version[0], "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    sha.update(chunk)
+            digest = sha.hexdigest()
+            self._digests[file_version] = digest
+        return digest
+
+    def _store(self, store_path: Path, image: QImage) -> None:
+        """Writes a thumbnail atomically and prunes the store when it grew enough."""
+        try:
+            store_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = store_path.with_name(f"{store_path.stem}.{threading.get_ident()}.tmp")
+            if not image.save(str(tmp_path), "PNG"):
+                raise OSError("PNG encoding failed")
+            os.replace(tmp_path, store_path)
+            size = store_path.stat().st_size
+        except OSError as e:
+            logger.debug(f"[Thumbnails] Could not store {store_path.name}: {e}")
+            return
+
+        with self._store_lock:
+            self._written_since_prune += size
+            if self._written_since_prune < self.STORE_MAX_BYTES // 10:
+                return
+            self._written_since_prune = 0
+            self._prune()
+
+    def _prune(self) -> None:
+        """Deletes the least recently used thumbnails beyond STORE_MAX_BYTES."""
+        entries = []
+        for file in self.cache_dir.glob("*/*.png"):
+            try:
+                stat = file.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, file))
+        total = sum(size for _, size, _ in entries)
+        for _, size, file in sorted(entries):
+            if total <= self.STORE_MAX_BYTES:
+                break
+            try:
+                file.unlink()
+                total -= size
+            except OSError as e:
+                logger.debug(f"[Thumbnails] Could not prune {file.name}: {e}")
@@ -2,18 +2,23 @@
 ------------------------------------------------------------------------------
 Project:        KPaperFlux
 File:           gui/pdf_viewer.py
-Version:        1.3.1
+Version:        1.5.0
 Producer:       thorsten.schnebeck@gmx.net
 Generator:      Antigravity
 Description:    High-performance PDF viewer based on fitz (PyMuPDF). 
                 Supports side-by-side comparison, synchronous scrolling, 
-                text extraction, and automated match analysis.
+                text extraction, and automated match analysis. Rendered
+                pages are cached and neighbouring pages prefetched; virtual
+                documents are stitched in memory and cached by content.
 ------------------------------------------------------------------------------
 """
 from typing import List, Optional, Tuple, Callable, Any, Union
 from pathlib import Path
-import tempfile
+import hashlib
+import itertools
+import json
 import sys
+from collections import OrderedDict
 import os
 from core.logger import get_logger, get_silent_logger
 
@@ -38,6 +43,7 @@ import fitz
 
 from core.models.virtual import SourceReference
 from core.utils.hybrid_engine import HybridEngine
+from gui.page_render import PageRenderCache, PagePrefetchWorker, render_page_image
 from gui.workers import MatchAnalysisWorker
 from gui.widgets.integrity_status_bar import IntegrityStatusBar
 
@@ -305,6 +311,10 @@ class PdfCanvas(QScrollArea):
     FIT_FIXED_FRAME = 15.0    
     FIT_COMFORT_SCALE = 1.0
     SUPERSAMPLING = 3.0 
+    RENDER_CACHE_BYTES = 256 * 1024 * 1024
+    ZOOM_BUCKETS = 1000  # Cache key resolution per zoom unit (0.1 %)
+    PREFETCH_OFFSETS = (1, -1, 2)  # Pages around the current one to prefetch
+    _memory_doc_ids = itertools.count()
 
     def __init__(self, parent: Optional[QWidget] = None) -> None:
         super().__init__(parent)
@@ -343,6 +353,14 @@ class PdfCanvas(QScrollArea):
         self.all_hits: List[Tuple[int, fitz.Rect]] = [] # (page_idx, rect)
         self.current_hit_idx: int = -1
 
+        # Rendered pages, keyed by _render_key()
+        self.render_cache = PageRenderCache(self.RENDER_CACHE_BYTES)
+        self._doc_key: Optional[str] = None
+        self._doc_source: Optional[Union[str, bytes]] = None  # What the prefetcher opens
+        self._prefetcher = PagePrefetchWorker()
+        self._prefetcher.page_rendered.connect(self._on_page_prefetched)
+        self.destroyed.connect(self._prefetcher.stop)
+
     def sizeHint(self) -> QSize:
         return QSize(10, 10)
 
@@ -354,14 +372,26 @@ class PdfCanvas(QScrollArea):
         canvas_pos = self.mapFromGlobal(self.display_label.mapToGlobal(widget_pos))
         self.toast.show_message(self.tr("Copied!"), canvas_pos)
 
-    def set_document(self, fitz_doc: Optional[fitz.Document]) -> None:
+    def set_document(
+        self,
+        fitz_doc: Optional[fitz.Document],
+        stream_source: Optional[Tuple[str, bytes]] = None
+    ) -> None:
         """
         Loads a new PDF document into the canvas.
         
         Args:
             fitz_doc: The fitz Document object to load or None to clear.
+            stream_source: (content key, PDF bytes) of a document opened from
+                           memory. Enables render caching and prefetching
+                           across loads of the same content.
         """
         self.doc = fitz_doc
+        if stream_source:
+            self._doc_key, self._doc_source = stream_source
+        else:
+            self._doc_key = self._document_key(fitz_doc)
+            self._doc_source = None if self._doc_key is None or self._doc_key.startswith("memory:") else fitz_doc.name
         self.current_page_idx = 0
         self.rotation = 0 # Reset rotation on new document
         
@@ -528,27 +558,75 @@ class PdfCanvas(QScrollArea):
 
         self.display_label.setUpdatesEnabled(False)
         try:
-            page = self.doc[self.current_page_idx]
             dpr = self.devicePixelRatioF()
-            mat = fitz.Matrix(
-                self.zoom_factor * dpr * self.SUPERSAMPLING, 
-                self.zoom_factor * dpr * self.SUPERSAMPLING
-            ).prerotate(self.rotation)
-            pix = page.get_pixmap(matrix=mat, alpha=False)
-            qimg = QImage(
-                pix.samples, 
-                pix.width, 
-                pix.height, 
-                pix.stride, 
-                QImage.Format.Format_RGB888
-            ).copy()
+            key = self._render_key(self.current_page_idx, self.rotation)
+            qimg = self.render_cache.get(key)
+            if qimg is None:
+                qimg = render_page_image(
+                    self.doc[self.current_page_idx], self._render_scale(), self.rotation
+                )
+                self.render_cache.put(key, qimg)
             qimg.setDevicePixelRatio(dpr * self.SUPERSAMPLING)
             self.display_label.setPixmap(QPixmap.fromImage(qimg))
             # Manually set label size to match pixmap logical size
-            self.display_label.resize(int(pix.width / (dpr*self.SUPERSAMPLING)), 
-                                    int(pix.height / (dpr*self.SUPERSAMPLING)))
+            self.display_label.resize(int(qimg.width() / (dpr*self.SUPERSAMPLING)), 
+                                    int(qimg.height() / (dpr*self.SUPERSAMPLING)))
         finally:
             self.display_label.setUpdatesEnabled(True)
+        self._prefetch_neighbours()
+
+    def _render_scale(self) -> float:
+        """Pixels per PDF point for the current zoom and screen."""
+        return self.zoom_factor * self.devicePixelRatioF() * self.SUPERSAMPLING
+
+    @classmethod
+    def _document_key(cls, fitz_doc: Optional[fitz.Document]) -> Optional[str]:
+        """
+        Identifies the file version behind a document for the render cache.
+        In-memory documents get a new key per load and are not prefetched.
+        """
+        if fitz_doc is None:
+            return None
+        name = getattr(fitz_doc, "name", "") or ""
+        if not name or not os.path.exists(name):
+            return f"memory:{next(cls._memory_doc_ids)}"
+        stat = os.stat(name)
+        return f"{name}|{stat.st_mtime_ns}|{stat.st_size}"
+
+    def _render_key(self, page_idx: int, rotation: int) -> Tuple[Any, ...]:
+        """Render cache key: document, page, zoom bucket, rotation and screen scale."""
+        return (
+            self._doc_key,
+            page_idx,
+            round(self.zoom_factor * self.ZOOM_BUCKETS),
+            rotation,
+            round(self.devicePixelRatioF() * 100),
+        )
+
+    def _prefetch_neighbours(self) -> None:
+        """Renders the pages around the current one in the background."""
+        if not self.doc or self._doc_source is None:
+            return
+        scale = self._render_scale()
+        jobs = []
+        for offset in self.PREFETCH_OFFSETS:
+            page_idx = self.current_page_idx + offset
+            if not 0 <= page_idx < len(self.doc):
+                continue
+            # Page changes reset the visual rotation (see jump_to_page)
+            key = self._render_key(page_idx, 0)
+            if key not in self.render_cache:
+                jobs.append((key, self._doc_source, page_idx, scale, 0))
+        self._prefetcher.request(jobs)
+
+    def _on_page_prefetched(self, key: Any, image: QImage) -> None:
+        """Stores a page rendered by the prefetch worker."""
+        if key[0] == self._doc_key:
+            self.render_cache.put(key, image)
+
+    def stop_prefetch(self) -> None:
+        """Stops background rendering (before the canvas is destroyed)."""
+        self._prefetcher.stop()
 
     def wheelEvent(self, event: QWheelEvent) -> None:
         """Handles mouse wheel for scrolling and Ctrl+Wheel for zooming."""
@@ -862,7 +940,9 @@ class DualPdfViewerWidget(QWidget):
                     worker.wait()
                 logger.info("[DualPdfViewer] Background thread stopped.")
             self._diff_worker = None
-            
+
+        self.left_viewer.canvas.stop_prefetch()
+        self.right_viewer.canvas.stop_prefetch()
         self.left_viewer.canvas.doc = None
         self.right_viewer.canvas.doc = None
 
@@ -1103,6 +1183,10 @@ class PdfViewerWidget(QWidget):
     export_requested = pyqtSignal(list)
     delete_requested = pyqtSignal(str)
 
+    STITCH_CACHE_BYTES = 64 * 1024 * 1024
+    # Stitched virtual documents by _stitch_key(), shared by all viewers
+    _stitch_cache: "OrderedDict[str, bytes]" = OrderedDict()
+
     def __init__(
         self, 
         pipeline: Optional[Any] = None, 
@@ -1117,7 +1201,6 @@ class PdfViewerWidget(QWidget):
         self.sync_active = True 
         self.current_uuid: Optional[str] = None
         self.current_pages_data: List[dict] = []
-        self.temp_pdf_path: Optional[Path] = None
         self.search_text = ""
         self.global_search_offset = 0
         self.global_search_total = 0   # Total hits across all results
@@ -1451,13 +1534,64 @@ class PdfViewerWidget(QWidget):
             QTimer.singleShot(300, lambda: self.canvas.perform_text_search(self.search_text))
 
     def _refresh_preview(self) -> None:
-        """Reconstructs the multi-page preview from source fragments."""
+        """Shows the multi-page preview stitched from source fragments (in memory)."""
         if not self.current_pages_data:
             return
             
         try:
-            out_doc = fitz.open()
-            for item in self.current_pages_data:
+            key = self._stitch_key(self.current_pages_data)
+            data = self._stitch_cache.get(key)
+            if data is None:
+                data = self._stitch_pages(self.current_pages_data)
+                if data is None:
+                    logger.error("Reconstructed document has 0 pages.")
+                    self.toast.show_message(self.tr("Empty Doc"), self.rect().center())
+                    self.clear()
+                    return
+                self._cache_stitched(key, data)
+            else:
+                self._stitch_cache.move_to_end(key)
+
+            self.canvas.set_document(
+                fitz.open(stream=data, filetype="pdf"),
+                stream_source=(f"stitched:{key}", data)
+            )
+            self._update_toolbar_policy()
+            self.on_document_status_ready()
+            
+        except Exception as e:
+            logger.error(f"Failed to refresh preview: {e}")
+            self.toast.show_message(self.tr("Stitch Error"), self.rect().center())
+            self.clear()
+
+    @staticmethod
+    def _stitch_key(pages_data: List[dict]) -> str:
+        """
+        Content key of a fragment list: source file versions, pages and rotations.
+        Changes to any source file produce a new key.
+        """
+        parts = []
+        for item in pages_data:
+            src_path = item.get('file_path')
+            try:
+                stat = os.stat(src_path)
+                version = [stat.st_mtime_ns, stat.st_size]
+            except (OSError, TypeError):
+                version = None
+            parts.append([src_path, version, item['page_index'], item.get('rotation', 0)])
+        return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _stitch_pages(pages_data: List[dict]) -> Optional[bytes]:
+        """
+        Stitches the fragments into a new PDF.
+
+        Returns:
+            The PDF bytes, or None if no page could be taken over.
+        """
+        out_doc = fitz.open()
+        try:
+            for item in pages_data:
                 src_path = item.get('file_path')
                 if not src_path or not os.path.exists(src_path):
                     logger.warning(f"Fragment source path not found: {src_path}")
@@ -1479,26 +1613,21 @@ class PdfViewerWidget(QWidget):
                     logger.error(f"Error inserting PDF fragment {src_path}: {e}")
 
             if out_doc.page_count == 0:
-                logger.error("Reconstructed document has 0 pages.")
-                self.toast.show_message(self.tr("Empty Doc"), self.rect().center())
-                self.clear()
-                return
-
-            fd, temp_path = tempfile.mkstemp(suffix=".pdf", prefix="kview_")
-            os.close(fd)
-            self.temp_pdf_path = Path(temp_path)
-            out_doc.save(str(self.temp_pdf_path))
+                return None
+            return out_doc.tobytes()
+        finally:
             out_doc.close()
 
-            # Load the temporary file into the canvas
-            self.canvas.set_document(fitz.open(str(self.temp_pdf_path)))
-            self._update_toolbar_policy()
-            self.on_document_status_ready()
-            
-        except Exception as e:
-            logger.error(f"Failed to refresh preview: {e}")
-            self.toast.show_message(self.tr("Stitch Error"), self.rect().center())
-            self.clear()
+    @classmethod
+    def _cache_stitched(cls, key: str, data: bytes) -> None:
+        """Stores a stitched PDF, evicting the least recently used beyond STITCH_CACHE_BYTES."""
+        if len(data) > cls.STITCH_CACHE_BYTES:
+            return
+        cls._stitch_cache[key] = data
+        total = sum(len(v) for v in cls._stitch_cache.values())
+        while total > cls.STITCH_CACHE_BYTES:
+            _, evicted = cls._stitch_cache.popitem(last=False)
+            total -= len(evicted)
         
 
     def _update_toolbar_policy(self) -> None:
@@ -1635,6 +1764,7 @@ class PdfViewerWidget(QWidget):
 
     def stop(self) -> None:
         """Gracefully terminates background threads and clears references."""
+        self.canvas.stop_prefetch()
         self.clear()
 
     def set_integrity_info(self, v_doc: Optional[Any]) -> None:
@@ -1651,14 +1781,6 @@ class PdfViewerWidget(QWidget):
         self.current_uuid = None
         self.integrity_bar.clear()
         self.canvas.set_document(None)
-        
-        # Cleanup temporary PDF if it exists
-        if self.temp_pdf_path and self.temp_pdf_path.exists():
-            try:
-                self.temp_pdf_path.unlink()
-            except Exception as e:
-                logger.warning(f"Could not delete temporary PDF {self.temp_pdf_path}: {e}")
-            self.temp_pdf_path = None
             
         self.update_ui_state(0)
         self.edit_zoom.setText("100%")
@@ -2,17 +2,19 @@
 ------------------------------------------------------------------------------
 Project:        KPaperFlux
 File:           gui/widgets/group_tree.py
-Version:        1.0.0
+Version:        1.1.0
 Producer:       thorsten.schnebeck@gmx.net
 Generator:      Claude Sonnet 4.6
 Description:    Collapsible sidebar GroupTreeWidget that displays document
                 groups in a hierarchy. Selecting a group emits a signal that
                 the main window uses to filter the document list. Supports
                 right-click CRUD (new, rename, delete) and drag-and-drop
-                membership assignment from DocumentListWidget.
+                membership assignment from DocumentListWidget. The tree
+                is built from one hierarchy and one count query; membership
+                changes only update the item labels (refresh_counts).
 ------------------------------------------------------------------------------
 """
-from typing import Optional, List
+from typing import Dict, Optional, List
 
 from PyQt6.QtCore import Qt, pyqtSignal, QMimeData, QEvent
 from PyQt6.QtGui import QAction, QColor, QDragEnterEvent, QDropEvent
@@ -49,6 +51,8 @@ class GroupTreeWidget(QWidget):
         super().__init__(parent)
         self._repo = GroupRepository(db_manager)
         self._current_group_id: Optional[str] = None
+        self._groups: Dict[str, DocumentGroup] = {}
+        self._items: Dict[str, QTreeWidgetItem] = {}
 
         self.setMinimumWidth(30)
         self.setSizePolicy(QSizePolicy.Policy.Preferred, QSizePolicy.Policy.Expanding)
@@ -112,6 +116,8 @@ class GroupTreeWidget(QWidget):
     def refresh(self) -> None:
         """Rebuild the tree from the repository."""
         self._tree.clear()
+        self._groups.clear()
+        self._items.clear()
 
         # "All Documents" root item
         all_item = QTreeWidgetItem(self._tree)
@@ -124,32 +130,40 @@ class GroupTreeWidget(QWidget):
         font.setBold(True)
         all_item.setFont(0, font)
 
-        # Recursive group population
-        self._populate_children(parent_item=self._tree.invisibleRootItem(),
+        # Top-level groups go under "All Documents"
+        self._populate_children(parent_item=all_item,
                                  parent_id=None,
-                                 skip_root_item=all_item)
+                                 hierarchy=self._repo.get_hierarchy(),
+                                 counts=self._repo.get_document_counts())
         self._tree.expandAll()
 
         # Restore selection
         self._restore_selection()
 
+    def refresh_counts(self) -> None:
+        """Update the document counts of the existing items after membership changes."""
+        counts = self._repo.get_document_counts()
+        for group_id, item in self._items.items():
+            label = self._item_label(self._groups[group_id], counts.get(group_id, 0))
+            if item.text(0) != label:
+                item.setText(0, label)
+
     def _populate_children(self, parent_item: QTreeWidgetItem,
                             parent_id: Optional[str],
-                            skip_root_item: Optional[QTreeWidgetItem] = None) -> None:
+                            hierarchy: Dict[Optional[str], List[DocumentGroup]],
+                            counts: Dict[str, int]) -> None:
         """Recursively add group items under parent_item."""
-        groups = self._repo.get_children(parent_id)
-        target = parent_item
-        if skip_root_item is not None:
-            target = skip_root_item  # top-level groups go under "All Documents"
-
-        for group in groups:
-            count = self._repo.get_document_count(group.id)
-            item = QTreeWidgetItem(target)
-            item.setText(0, self._item_label(group, count))
+        for group in hierarchy.get(parent_id, []):
+            if group.id in self._items:  # Guard against parent_id cycles
+                continue
+            item = QTreeWidgetItem(parent_item)
+            item.setText(0, self._item_label(group, counts.get(group.id, 0)))
             item.setData(0, Qt.ItemDataRole.UserRole, group.id)
             if group.color:
                 item.setForeground(0, QColor(group.color))
-            self._populate_children(parent_item=item, parent_id=group.id)
+            self._groups[group.id] = group
+            self._items[group.id] = item
+            self._populate_children(item, group.id, hierarchy, counts)
 
     @staticmethod
     def _item_label(group: DocumentGroup, count: int) -> str:
@@ -165,22 +179,10 @@ class GroupTreeWidget(QWidget):
             self._tree.setCurrentItem(it)
 
     def _find_item(self, group_id: str) -> Optional[QTreeWidgetItem]:
-        """Search tree for item with matching group_id UserRole data."""
-        iterator = QTreeWidgetItem
-        def _search(item: QTreeWidgetItem) -> Optional[QTreeWidgetItem]:
-            if item.data(0, Qt.ItemDataRole.UserRole) == group_id:
-                return item
-            for i in range(item.childCount()):
-                result = _search(item.child(i))
-                if result:
-                    return result
-            return None
-        root = self._tree.invisibleRootItem()
-        for i in range(root.childCount()):
-            result = _search(root.child(i))
-            if result:
-                return result
-        return None
+        """Return the tree item of a group (or of "All Documents")."""
+        if group_id == _ALL_DOCS_ID:
+            return self._tree.topLevelItem(0)
+        return self._items.get(group_id)
 
     # ------------------------------------------------------------------
     # Selection
@@ -289,7 +291,7 @@ class GroupTreeWidget(QWidget):
             if uuid:
                 self._repo.add_membership(uuid, group_id)
                 self.membership_dropped.emit(uuid, group_id)
-        self.refresh()
+        self.refresh_counts()
         event.acceptProposedAction()
 
     # ------------------------------------------------------------------
@@ -10,11 +10,14 @@ from PyQt6.QtGui import (
     QPixmap, QIcon, QCursor, QColor, QDrag, QAction, QPainter, QPen, QBrush,
     QImage, QTransform
 )
-import fitz  # PyMuPDF for thumbnails
+import fitz  # PyMuPDF for page counts
 import os
 from core.logger import get_logger, get_silent_logger
+from gui.page_render import ThumbnailService
 logger = get_logger("gui.widgets.splitter_strip")
 
+THUMBNAIL_SCALE = 1.5
+
 # Fallback für Utils, falls das Modul nicht im Pfad ist
 try:
     from gui.utils import show_selectable_message_box
@@ -291,6 +294,7 @@ class PageThumbnailWidget(QWidget):
             self.aspect_ratio = 1.0 / self.aspect_ratio
 
         self.loaded = False
+        self._load_requested = False
         self.original_pixmap = None
 
         self.setSizePolicy(QSizePolicy.Policy.Preferred, QSizePolicy.Policy.Expanding)
@@ -362,61 +366,65 @@ class PageThumbnailWidget(QWidget):
         self.last_drawn_height = 0
 
     def load_content(self) -> None:
-        """Lazy load the actual image content."""
-        if self.loaded: return
-
-        # Render
-        pix = self._fetch_pixmap()
-        if not pix.isNull():
-            self.original_pixmap = pix
-            self.loaded = True
-
-            # Update AR from Real Content
-            if pix.height() > 0:
-                 real_ar = pix.width() / pix.height()
-                 base_ar = real_ar
-                 if self.current_rotation in [90, 270]:
-                     self.aspect_ratio = 1.0 / base_ar
-                 else:
-                     self.aspect_ratio = base_ar
-
-            self.aspect_ratio_changed.emit()
-            self.last_drawn_height = 0
-            self.resizeEvent(None)
-        else:
+        """Lazy load the actual image content (rendered in the background)."""
+        if self.loaded or self._load_requested: return
+
+        path = self._resolve_path()
+        if not path:
+            self.lbl_img.setText("Error")
+            return
+
+        self._load_requested = True
+        # page is 1-based; rotation is applied visually, so the unrotated render is cached
+        ThumbnailService.instance().request(
+            path, self.page_info["page"] - 1, THUMBNAIL_SCALE, self._on_thumbnail_ready
+        )
+
+    def _on_thumbnail_ready(self, image: QImage) -> None:
+        if not self._load_requested: return  # Unloaded while rendering
+        self._load_requested = False
+
+        if image.isNull():
+            logger.error(f"Render Error p{self._page_num}")
             self.lbl_img.setText("Error")
+            return
+
+        pix = QPixmap.fromImage(image)
+        self.original_pixmap = pix
+        self.loaded = True
+
+        # Update AR from Real Content
+        if pix.height() > 0:
+             real_ar = pix.width() / pix.height()
+             base_ar = real_ar
+             if self.current_rotation in [90, 270]:
+                 self.aspect_ratio = 1.0 / base_ar
+             else:
+                 self.aspect_ratio = base_ar
+
+        self.aspect_ratio_changed.emit()
+        self.last_drawn_height = 0
+        self.resizeEvent(None)
 
     def unload_content(self):
+        self._load_requested = False
         if not self.loaded: return
         self.original_pixmap = None
         self.lbl_img.clear()
         self.lbl_img.setText("Loading...")
         self.loaded = False
 
-    def _fetch_pixmap(self) -> QPixmap:
-        try:
-            path = None
-            if "raw_path" in self.page_info:
-                path = self.page_info["raw_path"]
-            elif "file_path" in self.page_info: # Consistency
-                path = self.page_info["file_path"]
-            elif self.pipeline:
-                path = self.pipeline.vault.get_file_path(self.page_info["file_uuid"])
-
-            if not path or not os.path.exists(path): return QPixmap()
-
-            with fitz.open(path) as doc:
-                # page is 1-based
-                page = doc.load_page(self.page_info["page"] - 1)
-                # Standard render scaling
-                pix = page.get_pixmap(matrix=fitz.Matrix(1.5, 1.5))
-
-            img_format = QImage.Format.Format_RGB888
-            qt_img = QImage(pix.samples, pix.width, pix.height, pix.stride, img_format)
-            return QPixmap.fromImage(qt_img)
-        except Exception as e:
-            logger.error(f"Render Error p{self._page_num}: {e}")
-            return QPixmap()
+    def _resolve_path(self):
+        path = None
+        if "raw_path" in self.page_info:
+            path = self.page_info["raw_path"]
+        elif "file_path" in self.page_info: # Consistency
+            path = self.page_info["file_path"]
+        elif self.pipeline:
+            path = self.pipeline.vault.get_file_path(self.page_info["file_uuid"])
+
+        if not path or not os.path.exists(path): return None
+        return path
 
     def rotate_right(self):
         # Allow rotation even if deleted
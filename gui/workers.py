@@ -12,7 +12,6 @@ Description:    PyQt6 worker threads for background processing (AI Queue,
 import os
 import tempfile
 import traceback
-import time
 from concurrent.futures import CancelledError
 from typing import Any, Optional, Union, List, Dict
 
@@ -26,8 +25,8 @@ logger = get_logger("gui.workers")
 from core.pipeline import PipelineProcessor
 from core.ai_analyzer import AIAnalyzer
 from core.rules_engine import RulesEngine
-from core.repositories.logical_repo import LogicalRepository
 from core.canonizer import CanonizerService
+from core.work_signal import pipeline_work_signal
 from core.similarity import SimilarityManager
 
 class BatchTaggingWorker(QThread):
@@ -47,7 +46,6 @@ class BatchTaggingWorker(QThread):
 
     def run(self):
         engine = RulesEngine(self.db, self.filter_tree)
-        repo = LogicalRepository(self.db)
 
         if self.rules is None:
             rules = self.filter_tree.get_active_rules()
@@ -65,21 +63,13 @@ class BatchTaggingWorker(QThread):
         if uuids is None:
             uuids = self.db.get_all_active_uuids()
 
-        total = len(uuids)
-
-        modified_count = 0
-        for i, uuid in enumerate(uuids):
-            if self.is_cancelled:
-                break
-
-            v_doc = repo.get_by_uuid(uuid)
-            if v_doc:
-                if engine.apply_rules_to_entity(v_doc, rules):
-                    repo.save(v_doc)
-                    modified_count += 1
-
-            if i % 10 == 0:
-                self.progress.emit(i + 1, total)
+        # Set-based: one query per rule and chunk, one write transaction
+        modified_count = engine.apply_rules_bulk(
+            list(uuids),
+            rules,
+            progress_callback=self.progress.emit,
+            is_cancelled=lambda: self.is_cancelled,
+        )
 
         self.finished.emit(modified_count)
 
@@ -276,9 +266,19 @@ class ReprocessWorker(QThread):
 class MainLoopWorker(QThread):
     """
     Intelligent Main Loop (Stage 1+).
-    Periodically checks for READY_FOR_PIPELINE documents and processes them.
+    Processes READY_FOR_PIPELINE documents as soon as they are queued,
+    up to AppConfig.get_pipeline_concurrency() documents in parallel.
     Also manages Stage 2 Queue if needed.
+
+    In-process producers wake the loop via core.work_signal; the slow idle
+    poll only catches work queued by other processes.
     """
+    # Seconds between bursts while a backlog remains (also throttles retries)
+    BUSY_POLL_INTERVAL = 0.5
+    # Seconds between checks when idle (external writers only)
+    IDLE_POLL_INTERVAL = 30.0
+    # Seconds between checks while paused
+    PAUSED_POLL_INTERVAL = 0.5
     status_changed = pyqtSignal(str) # Status text
     progress = pyqtSignal(int, int) # completed, total
     documents_processed = pyqtSignal() # Notify UI to refresh list
@@ -297,14 +297,20 @@ class MainLoopWorker(QThread):
                                         physical_repo=pipeline.physical_repo,
                                         logical_repo=pipeline.logical_repo)
 
+    def get_concurrency(self) -> int:
+        """Returns the configured number of documents processed in parallel."""
+        return self.canonizer.config.get_pipeline_concurrency()
+
     def run(self):
         logger.info("[MainLoop] Worker started.")
         while self.is_running:
             if self.is_paused:
                 self.status_changed.emit("Paused")
-                time.sleep(0.5)
+                pipeline_work_signal.wait(self.PAUSED_POLL_INTERVAL)
                 continue
 
+            backlog_remaining = False
+
             try:
                 # 1. Count pending items for progress reporting
                 total_pending = self.pipeline.db.get_pending_pipeline_count()
@@ -317,10 +323,11 @@ class MainLoopWorker(QThread):
                     self.status_changed.emit(f"Processing ({total_pending} remaining)")
                     
                     # Track batch progress for the UI burst
-                    burst_total = min(5, total_pending)
+                    concurrency = self.get_concurrency()
+                    burst_total = min(5 * concurrency, total_pending)
                     processed_in_this_run = 0
 
-                    for i in range(burst_total):
+                    for i in range(0, burst_total, concurrency):
                         if not self.is_running:
                             logger.debug("[MainLoop] Stop requested mid-batch.")
                             break
@@ -329,7 +336,10 @@ class MainLoopWorker(QThread):
                             self.status_changed.emit("Finishing current & Pausing...")
                             break
                             
-                        processed_count = self.canonizer.process_pending_documents(limit=1)
+                        processed_count = self.canonizer.process_pending_documents(
+                            limit=min(concurrency, burst_total - i),
+                            max_workers=concurrency,
+                        )
                         if processed_count == 0:
                             break
                         
@@ -340,6 +350,8 @@ class MainLoopWorker(QThread):
                         self.status_changed.emit(f"Processing ({total_pending} remaining)")
                         self.documents_processed.emit()
 
+                    backlog_remaining = processed_in_this_run > 0 and total_pending > 0
+
             except Exception as e:
                 error_details = traceback.format_exc()
                 logger.error(f"[MainLoop] FATAL ERROR: {e}\n{error_details}")
@@ -347,11 +359,10 @@ class MainLoopWorker(QThread):
                 self.is_running = False
                 break
 
-            # Sleep until next check
-            for _ in range(50): 
-                if not self.is_running or self.is_paused: break
-                time.sleep(0.1)
-        
+            # Sleep until new work is signalled (or the poll interval expires)
+            if self.is_running and not self.is_paused:
+                pipeline_work_signal.wait(self.BUSY_POLL_INTERVAL if backlog_remaining else self.IDLE_POLL_INTERVAL)
+
         logger.info("[MainLoop] Worker stopped.")
         self.status_changed.emit("Stopped")
 
@@ -365,12 +376,14 @@ class MainLoopWorker(QThread):
              self.status_changed.emit("Resuming...")
 
         self.pause_state_changed.emit(paused)
+        pipeline_work_signal.notify()
 
     def stop(self):
         logger.info("[MainLoop] STOP requested.")
         self.status_changed.emit("Stopping (Finishing current)...")
         self.is_running = False
         self.is_paused = False
+        pipeline_work_signal.notify()
 
 class SimilarityWorker(QThread):
     """
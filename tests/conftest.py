@@ -21,6 +21,20 @@ def force_english_locale(request):
     # Restore
     QLocale.setDefault(original_locale)
 
+@pytest.fixture(autouse=True)
+def fresh_ai_executors():
+    """
+    Gives each test its own AI request executors (no cooldowns leaking between
+    tests) and keeps AI responses and OCR results out of the user's persistent
+    caches.
+    """
+    from core.ai.executor import AIRequestExecutor
+    AIRequestExecutor._shared.clear()
+    with patch("core.config.AppConfig.get_ai_cache_max_bytes", return_value=0), \
+         patch("core.config.AppConfig.get_ocr_cache_max_bytes", return_value=0):
+        yield
+    AIRequestExecutor._shared.clear()
+
 def pytest_configure(config):
     config.addinivalue_line("markers", "localized: mark test to run with real language settings")
 
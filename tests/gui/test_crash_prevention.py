@@ -21,7 +21,7 @@ def mock_db():
     )
 
     db.get_all_documents.return_value = [doc]
-    db.get_all_entities_view.return_value = [doc]
+    db.get_document_list_rows.return_value = [doc]
     db.search_documents.return_value = [doc]
     
     # Mock extra keys
@@ -33,7 +33,7 @@ def test_document_list_population(qtbot, mock_db):
         Document(original_filename="contract.pdf", type_tags=["Vertrag"])
     ]
     mock_db.get_all_documents.return_value = docs
-    mock_db.get_all_entities_view.return_value = docs
+    mock_db.get_document_list_rows.return_value = docs
     
     # Init Widget
     widget = DocumentListWidget(db_manager=mock_db)
@@ -67,7 +67,7 @@ def test_document_list_population(qtbot, mock_db):
 def test_empty_state(qtbot, mock_db):
     """Test empty list behavior."""
     mock_db.get_all_documents.return_value = []
-    mock_db.get_all_entities_view.return_value = []
+    mock_db.get_document_list_rows.return_value = []
     
     widget = DocumentListWidget(db_manager=mock_db)
     qtbot.addWidget(widget)
@@ -79,7 +79,7 @@ def test_selection_emits_signal(qtbot, mock_db):
     """Test that selecting a row emits specific signal with UUID."""
     docs = [Document(original_filename="test.pdf")]
     mock_db.get_all_documents.return_value = docs
-    mock_db.get_all_entities_view.return_value = docs
+    mock_db.get_document_list_rows.return_value = docs
     
     widget = DocumentListWidget(db_manager=mock_db)
     qtbot.addWidget(widget)
@@ -98,7 +98,7 @@ def test_context_menu_actions(qtbot, mock_db):
     """Test context menu actions emission."""
     doc = Document(original_filename="test.pdf")
     mock_db.get_all_documents.return_value = [doc]
-    mock_db.get_all_entities_view.return_value = [doc]
+    mock_db.get_document_list_rows.return_value = [doc]
     
     widget = DocumentListWidget(db_manager=mock_db)
     qtbot.addWidget(widget)
@@ -125,7 +125,7 @@ def test_positional_persistence_on_refresh(qtbot, mock_db):
     doc2 = Document(uuid="doc2", original_filename="doc2.pdf")
     
     # State 1: Two docs
-    mock_db.get_all_entities_view.return_value = [doc1, doc2]
+    mock_db.get_document_list_rows.return_value = [doc1, doc2]
     
     widget = DocumentListWidget(db_manager=mock_db)
     qtbot.addWidget(widget)
@@ -136,7 +136,7 @@ def test_positional_persistence_on_refresh(qtbot, mock_db):
     assert widget.get_selected_uuids() == ["doc1"]
     
     # State 2: doc1 is gone, only doc2 remains
-    mock_db.get_all_entities_view.return_value = [doc2]
+    mock_db.get_document_list_rows.return_value = [doc2]
     
     # Refresh (this should trigger positional jump)
     # Note: refresh_list might emit multiple signals (clear then select)
@@ -145,3 +145,36 @@ def test_positional_persistence_on_refresh(qtbot, mock_db):
     
     # Check current state
     assert widget.get_selected_uuids() == ["doc2"]
+
+
+def test_update_item_compares_list_projection(qtbot):
+    """Progress updates with unchanged list fields must not repaint; the cache keeps rows."""
+    import json
+    from core.database import DatabaseManager
+    from core.models.list_row import DocumentListRow
+
+    db = DatabaseManager(":memory:")
+    semantic = {"meta_header": {"doc_date": "2024-01-10"},
+                "bodies": {"finance_body": {"monetary_summation": {"grand_total_amount": "19.99"}}}}
+    with db._write() as conn:
+        conn.execute(
+            "INSERT INTO virtual_documents (uuid, status, semantic_data, export_filename, pdf_class, cached_full_text) "
+            "VALUES ('doc-1', 'PROCESSING', ?, 'scan.pdf', 'A', '')", (json.dumps(semantic),)
+        )
+    widget = DocumentListWidget(db_manager=db)
+    qtbot.addWidget(widget)
+    widget.refresh_list()
+    item = widget.tree.topLevelItem(0)
+    item.setText(2, "painted")  # Marker: any repaint rewrites the filename column
+
+    doc = db.get_document_by_uuid("doc-1")
+    doc.cached_full_text = "new OCR text"  # Not shown in the list
+    widget.update_document_item(doc)
+    assert item.text(2) == "painted"
+    assert isinstance(widget.documents_cache["doc-1"], DocumentListRow)
+
+    doc.status = "PROCESSED"
+    widget.update_document_item(doc)
+    assert item.text(2) == "scan.pdf"
+    assert widget.documents_cache["doc-1"] == DocumentListRow.from_document(doc)
+    db.close()
@@ -0,0 +1,54 @@
+from unittest.mock import patch
+
+import pytest
+from PyQt6.QtCore import Qt
+
+from core.database import DatabaseManager
+from core.repositories.group_repo import GroupRepository
+from gui.widgets.group_tree import GroupTreeWidget, _ALL_DOCS_ID
+
+
+@pytest.fixture
+def db(tmp_path):
+    return DatabaseManager(str(tmp_path / "groups.db"))
+
+
+def labels(item):
+    return [item.child(i).text(0) for i in range(item.childCount())]
+
+
+def test_tree_is_built_without_per_group_queries(qtbot, db):
+    repo = GroupRepository(db)
+    projects = repo.create("Projects")
+    alpha = repo.create("Alpha", parent_id=projects.id)
+    repo.create("Beta", parent_id=projects.id)
+    repo.create("Archive")
+    repo.add_membership("doc-1", alpha.id)
+    repo.add_membership("doc-2", alpha.id)
+
+    with patch.object(GroupRepository, "get_children", side_effect=AssertionError), \
+         patch.object(GroupRepository, "get_document_count", side_effect=AssertionError):
+        widget = GroupTreeWidget(db)
+    qtbot.addWidget(widget)
+
+    all_item = widget._tree.topLevelItem(0)
+    assert all_item.data(0, Qt.ItemDataRole.UserRole) == _ALL_DOCS_ID
+    assert labels(all_item) == ["📁 Archive", "📁 Projects"]
+    assert labels(all_item.child(1)) == ["📁 Alpha  (2)", "📁 Beta"]
+
+
+def test_membership_changes_update_labels_in_place(qtbot, db):
+    repo = GroupRepository(db)
+    alpha = repo.create("Alpha")
+    widget = GroupTreeWidget(db)
+    qtbot.addWidget(widget)
+    item = widget._find_item(alpha.id)
+    widget._tree.setCurrentItem(item)
+
+    repo.add_membership("doc-1", alpha.id)
+    with patch.object(GroupRepository, "get_hierarchy", side_effect=AssertionError):
+        widget.refresh_counts()
+
+    assert widget._find_item(alpha.id) is item  # Not rebuilt
+    assert item.text(0) == "📁 Alpha  (1)"
+    assert widget._tree.currentItem() is item
@@ -20,7 +20,7 @@ def mock_db():
     def get_by_uuid(u):
         return next((d for d in docs if d.uuid == u), None)
     db.get_document_by_uuid.side_effect = get_by_uuid
-    db.get_all_entities_view.return_value = docs # Support Stage 0 ListView
+    db.get_document_list_rows.return_value = docs # Support Stage 0 ListView
     return db
 
 @pytest.fixture
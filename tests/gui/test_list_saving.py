@@ -19,7 +19,7 @@ def mock_db():
     db.get_all_documents.return_value = docs
     db.search_documents.return_value = docs
     db.get_document_by_uuid.side_effect = lambda u: next((d for d in docs if d.uuid == u), None)
-    db.get_all_entities_view.return_value = docs
+    db.get_document_list_rows.return_value = docs
     return db
 
 @pytest.fixture
@@ -0,0 +1,67 @@
+from unittest.mock import patch
+
+import fitz
+import pytest
+from PyQt6.QtGui import QImage
+
+from gui.page_render import PageRenderCache, render_page_image
+from gui.pdf_viewer import PdfCanvas
+
+
+@pytest.fixture
+def pdf_path(tmp_path):
+    path = tmp_path / "contract.pdf"
+    doc = fitz.open()
+    for i in range(6):
+        doc.new_page(width=200, height=300).insert_text((20, 40), f"Page {i + 1}")
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+def image(width):
+    return QImage(width, 10, QImage.Format.Format_RGB888)
+
+
+def test_cache_evicts_least_recently_used_by_bytes():
+    size = image(100).sizeInBytes()
+    cache = PageRenderCache(max_bytes=3 * size)
+    for key in "abc":
+        cache.put(key, image(100))
+    assert cache.get("a") is not None  # "b" is now the oldest
+    cache.put("d", image(100))
+
+    assert "b" not in cache and len(cache) == 3
+    assert cache.total_bytes == 3 * size
+    cache.put("huge", image(1000))  # Larger than the cap: not cached
+    assert "huge" not in cache and "a" in cache
+
+
+def test_canvas_serves_flips_from_prefetched_pages(qtbot, pdf_path):
+    canvas = PdfCanvas()
+    qtbot.addWidget(canvas)
+    canvas.set_document(fitz.open(pdf_path))
+
+    for page_idx in (1, 2):
+        qtbot.waitUntil(lambda: canvas._render_key(page_idx, 0) in canvas.render_cache, timeout=5000)
+
+    with patch("gui.pdf_viewer.render_page_image", wraps=render_page_image) as render:
+        canvas.jump_to_page(1)
+        canvas.jump_to_page(0)
+        assert render.call_count == 0
+        canvas.set_zoom(2.0)
+        assert render.call_count == 1
+
+    pixmap = canvas.display_label.pixmap()
+    assert canvas.display_label.width() == round(pixmap.width() / pixmap.devicePixelRatio())
+    canvas.stop_prefetch()
+
+
+def test_document_key_tracks_file_version(pdf_path):
+    doc = fitz.open(pdf_path)
+    key = PdfCanvas._document_key(doc)
+    assert key == PdfCanvas._document_key(fitz.open(pdf_path))
+
+    memory_doc = fitz.open()
+    assert PdfCanvas._document_key(memory_doc) != PdfCanvas._document_key(memory_doc)
+    assert PdfCanvas._document_key(None) is None
@@ -0,0 +1,70 @@
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import fitz
+import pytest
+
+from core.models.virtual import SourceReference, VirtualDocument
+from gui.pdf_viewer import PdfViewerWidget
+
+
+def make_pdf(path, pages):
+    doc = fitz.open()
+    for text in pages:
+        doc.new_page(width=200, height=300).insert_text((20, 40), text)
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+@pytest.fixture
+def viewer(qtbot, tmp_path):
+    files = {
+        "A": make_pdf(tmp_path / "a.pdf", ["A1", "A2"]),
+        "B": make_pdf(tmp_path / "b.pdf", ["B1"]),
+    }
+    pipeline = MagicMock()
+    pipeline.physical_repo.get_by_uuid.side_effect = lambda uuid: SimpleNamespace(file_path=files[uuid])
+    pipeline.get_document.side_effect = lambda uuid: VirtualDocument(uuid=uuid, source_mapping=[
+        SourceReference(file_uuid="B", pages=[1], rotation=90),
+        SourceReference(file_uuid="A", pages=[2]),
+    ])
+    PdfViewerWidget._stitch_cache.clear()
+    widget = PdfViewerWidget(pipeline=pipeline)
+    qtbot.addWidget(widget)
+    yield widget, files
+    widget.stop()
+    PdfViewerWidget._stitch_cache.clear()
+
+
+def test_virtual_documents_are_stitched_in_memory_once(viewer):
+    widget, files = viewer
+    uuid = "12345678-1234-1234-1234-123456789abc"
+    with patch.object(fitz.Document, "save", autospec=True, side_effect=fitz.Document.save) as save, \
+         patch.object(PdfViewerWidget, "_stitch_pages", wraps=PdfViewerWidget._stitch_pages) as stitch:
+        widget.load_document(uuid)
+        widget.clear()
+        widget.load_document(uuid)
+    assert save.call_count == 1  # The stitched PDF is serialized once...
+    assert not isinstance(save.call_args.args[1], (str, Path))  # ...and never written to disk
+    assert stitch.call_count == 1
+
+    doc = widget.canvas.doc
+    assert [page.get_text().strip() for page in doc] == ["B1", "A2"]
+    assert doc[0].rotation == 90
+    assert widget.canvas._doc_key.startswith("stitched:")
+
+    # A changed source file yields a new stitch
+    make_pdf(files["A"], ["A1", "A2 revised"])
+    with patch.object(PdfViewerWidget, "_stitch_pages", wraps=PdfViewerWidget._stitch_pages) as stitch:
+        widget.load_document(uuid)
+    assert stitch.call_count == 1
+    assert widget.canvas.doc[1].get_text().strip() == "A2 revised"
+
+
+def test_stitched_documents_are_prefetched(qtbot, viewer):
+    widget, _ = viewer
+    widget.load_document("12345678-1234-1234-1234-123456789abc")
+    canvas = widget.canvas
+    qtbot.waitUntil(lambda: canvas._render_key(1, 0) in canvas.render_cache, timeout=5000)
@@ -35,7 +35,7 @@ def test_date_sorting(document_list, mock_db):
         semantic_data=SemanticExtraction(meta_header=MetaHeader(doc_date="2023-01-15"))
     ) # 15.01.2023
     
-    mock_db.get_all_entities_view.return_value = [doc1, doc2]
+    mock_db.get_document_list_rows.return_value = [doc1, doc2]
     
     # Explicitly enable Date column
     document_list.dynamic_columns = ["doc_date"]
@@ -90,7 +90,7 @@ def test_number_sorting(document_list, mock_db):
         )
     )
     
-    mock_db.get_all_entities_view.return_value = [doc1, doc2]
+    mock_db.get_document_list_rows.return_value = [doc1, doc2]
     
     # Explicitly enable Amount column (total_amount property)
     document_list.dynamic_columns = ["total_amount"]
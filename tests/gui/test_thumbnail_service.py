@@ -0,0 +1,77 @@
+from unittest.mock import patch
+
+import fitz
+import pytest
+
+from gui import page_render
+from gui.page_render import ThumbnailService
+from gui.widgets.splitter_strip import PageThumbnailWidget
+
+
+@pytest.fixture
+def pdf_path(tmp_path):
+    path = tmp_path / "scan.pdf"
+    doc = fitz.open()
+    for i in range(3):
+        doc.new_page(width=200, height=300).insert_text((20, 40), f"Page {i + 1}")
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+@pytest.fixture
+def service(tmp_path):
+    service = ThumbnailService(cache_dir=tmp_path / "thumbnails")
+    yield service
+    service.stop()
+
+
+def test_requests_are_rendered_once_and_cached(qtbot, service, pdf_path):
+    images = []
+    with patch.object(page_render.fitz, "open", wraps=fitz.open) as opened:
+        service.request(pdf_path, 1, 1.0, images.append)
+        service.request(pdf_path, 1, 1.0, images.append)
+        assert images == []  # Delivered asynchronously
+        qtbot.waitUntil(lambda: len(images) == 2, timeout=5000)
+
+        service.request(pdf_path, 1, 1.0, images.append)
+        assert len(images) == 3  # Memory cache hit: delivered right away
+    assert opened.call_count == 1
+    assert (images[0].width(), images[0].height()) == (200, 300)
+
+    service.request(pdf_path + ".missing", 0, 1.0, images.append)
+    assert images[-1].isNull()
+
+
+def test_disk_store_survives_restart(qtbot, tmp_path, service, pdf_path):
+    done = []
+    service.request(pdf_path, 0, 1.0, done.append)
+    qtbot.waitUntil(lambda: len(done) == 1, timeout=5000)
+    assert len(list((tmp_path / "thumbnails").glob("*/*_p0_r0_s100.png"))) == 1
+
+    restarted = ThumbnailService(cache_dir=tmp_path / "thumbnails")
+    with patch.object(page_render.fitz, "open") as opened:
+        restarted.request(pdf_path, 0, 1.0, done.append)
+        qtbot.waitUntil(lambda: len(done) == 2, timeout=5000)
+    opened.assert_not_called()
+    assert done[1].size() == done[0].size()
+    restarted.stop()
+
+
+def test_thumbnail_widget_loads_in_background(qtbot, service, pdf_path, monkeypatch):
+    monkeypatch.setattr(ThumbnailService, "_instance", service)
+    widget = PageThumbnailWidget({"raw_path": pdf_path, "page": 2, "rotation": 90}, None)
+    qtbot.addWidget(widget)
+
+    widget.load_content()
+    assert not widget.loaded
+    qtbot.waitUntil(lambda: widget.loaded, timeout=5000)
+    assert widget.aspect_ratio == pytest.approx(1.5)
+
+    # Results arriving after an unload are dropped
+    other = PageThumbnailWidget({"raw_path": pdf_path, "page": 3}, None)
+    qtbot.addWidget(other)
+    other.load_content()
+    other.unload_content()
+    qtbot.waitUntil(lambda: not service._waiters, timeout=5000)
+    assert not other.loaded and other.original_pixmap is None
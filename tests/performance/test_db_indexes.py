@@ -0,0 +1,95 @@
+import time
+import uuid
+
+import pytest
+
+from core.database import DatabaseManager
+
+ROWS = 50_000
+STATUSES = ["PROCESSED"] * 97 + ["NEW", "READY_FOR_PIPELINE", "STAGE2_PENDING"]
+
+
+@pytest.fixture(scope="module")
+def big_db(tmp_path_factory):
+    """A 50k-document database (plus one physical file per document)."""
+    db = DatabaseManager(str(tmp_path_factory.mktemp("perf") / "indexes.db"))
+    with db._write() as conn:
+        conn.executemany(
+            "INSERT INTO physical_files (uuid, phash, file_path, page_count_phys) VALUES (?, ?, ?, 1)",
+            ((f"f{i}", uuid.uuid4().hex, f"/vault/f{i}.pdf") for i in range(ROWS)),
+        )
+        conn.executemany(
+            "INSERT INTO virtual_documents (uuid, status, deleted, archived, created_at, process_id) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                (f"d{i}", STATUSES[i % len(STATUSES)], int(i % 50 == 0), int(i % 7 == 0),
+                 f"2024-01-01T00:00:{i:09d}", f"p{i // 10}")
+                for i in range(ROWS)
+            ),
+        )
+    yield db
+    db.close()
+
+
+ACCESS_PATHS = {
+    "phash": ("SELECT uuid FROM physical_files WHERE phash = ?", lambda db: (db.connection.execute(
+        "SELECT phash FROM physical_files WHERE uuid = 'f4711'").fetchone()[0],)),
+    "pending": ("SELECT COUNT(*) FROM virtual_documents "
+                "WHERE status IN ('NEW', 'READY_FOR_PIPELINE', 'STAGE2_PENDING') AND deleted = 0", lambda db: ()),
+    "active_view": ("SELECT uuid FROM virtual_documents WHERE deleted = 0 AND archived = 0 "
+                    "ORDER BY created_at DESC LIMIT 100", lambda db: ()),
+    "process_id": ("SELECT uuid FROM virtual_documents WHERE process_id = ?", lambda db: ("p42",)),
+}
+
+
+def measure(db, sql, params, repeat=20):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        db.connection.execute(sql, params).fetchall()
+    return (time.perf_counter() - start) / repeat
+
+
+def plan(db, sql, params):
+    return " ".join(row[3] for row in db.connection.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall())
+
+
+def test_access_paths_use_managed_indexes(big_db):
+    for name, (sql, params) in ACCESS_PATHS.items():
+        detail = plan(big_db, sql, params(big_db))
+        assert "USING" in detail and "INDEX idx_" in detail, f"{name}: {detail}"
+        assert "USE TEMP B-TREE" not in detail, f"{name} sorts in a temp b-tree: {detail}"
+
+
+def test_index_benchmark_50k(big_db):
+    """Indexed lookups must beat full scans on the 50k-row vault."""
+    indexed = {name: measure(big_db, sql, params(big_db)) for name, (sql, params) in ACCESS_PATHS.items()}
+
+    with big_db._write() as conn:
+        for name in DatabaseManager.INDEXES:
+            conn.execute(f"DROP INDEX {name}")
+    try:
+        scanned = {name: measure(big_db, sql, params(big_db)) for name, (sql, params) in ACCESS_PATHS.items()}
+    finally:
+        with big_db._write():
+            big_db._ensure_indexes()
+
+    for name in ACCESS_PATHS:
+        print(f"{name:12s} indexed {indexed[name] * 1000:8.3f} ms   full scan {scanned[name] * 1000:8.3f} ms")
+
+    assert indexed["phash"] * 10 < scanned["phash"]
+    assert indexed["process_id"] * 10 < scanned["process_id"]
+    assert indexed["active_view"] < scanned["active_view"]
+    assert indexed["pending"] < scanned["pending"]
+
+
+def test_index_manager_drops_obsolete_and_recreates(tmp_path):
+    db = DatabaseManager(str(tmp_path / "managed.db"))
+    with db._write() as conn:
+        conn.execute("CREATE INDEX idx_legacy ON virtual_documents (tags)")
+        conn.execute("DROP INDEX idx_physical_files_phash")
+        db._ensure_indexes()
+
+    names = {row[0] for row in db.connection.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert "idx_legacy" not in names
+    assert set(DatabaseManager.INDEXES) <= names
+    db.close()
@@ -0,0 +1,82 @@
+import random
+import time
+from unittest.mock import MagicMock, patch
+
+from core.models.virtual import VirtualDocument
+from core.similarity import SimilarityManager
+
+
+def generate_corpus(count, seed=1):
+    """Synthetic vault: distinct documents with a near-duplicate for every 10th."""
+    rng = random.Random(seed)
+    vocab = [f"tok{i}" for i in range(5000)]
+    docs = []
+    for i in range(count):
+        words = rng.sample(vocab, 60)
+        docs.append(VirtualDocument(uuid=f"doc-{i}", text_content=" ".join(words)))
+        if i % 10 == 0:
+            docs.append(VirtualDocument(uuid=f"dup-{i}", text_content=" ".join(words[:-1])))
+    return docs
+
+
+def scan(count):
+    db = MagicMock()
+    db.get_all_entities_view.return_value = generate_corpus(count)
+    manager = SimilarityManager(db)
+    calls = []
+    start = time.perf_counter()
+    duplicates = manager.find_duplicates(threshold=0.85, progress_callback=lambda c, t: calls.append(t))
+    duration = time.perf_counter() - start
+    total_pairs = calls[-1] if calls else 0
+    return duplicates, total_pairs, duration
+
+
+def test_duplicate_scan_scales_near_linearly():
+    """
+    Quadrupling the vault must not multiply the scored pairs by ~16
+    (all-pairs behaviour). With blocking, candidates grow roughly linearly.
+    """
+    dups_small, pairs_small, t_small = scan(500)
+    dups_large, pairs_large, t_large = scan(2000)
+    print(f"\n500 docs: {pairs_small} pairs in {t_small:.3f}s; 2000 docs: {pairs_large} pairs in {t_large:.3f}s")
+
+    assert len(dups_small) == 50
+    assert len(dups_large) == 200
+    assert pairs_large <= 6 * max(pairs_small, 1)
+    assert t_large < 10.0
+
+
+def test_visual_duplicate_scan_scores_few_pairs():
+    """
+    With a vault, text-less scans are paired through their page hashes:
+    every 10th document has a scanned twin (no text, two flipped hash
+    bits) that must be found while scoring only a small fraction of all
+    pairs.
+    """
+    def visual_scan(count):
+        rng = random.Random(count)
+        docs, hashes = [], {}
+        for i in range(count):
+            dhash = rng.getrandbits(64)
+            docs.append(VirtualDocument(uuid=f"doc-{i}", text_content=" ".join(f"tok{w}" for w in rng.sample(range(5000), 40))))
+            hashes[f"doc-{i}"] = [(dhash, 220)]
+            if i % 10 == 0:
+                docs.append(VirtualDocument(uuid=f"scan-{i}", text_content=""))
+                hashes[f"scan-{i}"] = [(dhash ^ (1 << rng.randrange(64)) ^ (1 << rng.randrange(64)), 220)]
+        db = MagicMock()
+        db.get_all_entities_view.return_value = docs
+        manager = SimilarityManager(db, vault=MagicMock())
+        calls = []
+        start = time.perf_counter()
+        with patch.object(SimilarityManager, "_get_page_hashes", lambda self, doc: hashes[doc.uuid]):
+            duplicates = manager.find_duplicates(threshold=0.85, progress_callback=lambda c, t: calls.append(t))
+        return duplicates, calls[-1] if calls else 0, time.perf_counter() - start
+
+    dups_small, pairs_small, t_small = visual_scan(500)
+    dups_large, pairs_large, t_large = visual_scan(2000)
+    print(f"\nvisual 500 docs: {pairs_small} pairs in {t_small:.3f}s; 2000 docs: {pairs_large} pairs in {t_large:.3f}s")
+
+    assert len(dups_small) == 50
+    assert len(dups_large) == 200
+    assert pairs_large <= 0.001 * 2200 * 2199 / 2
+    assert t_large < 10.0
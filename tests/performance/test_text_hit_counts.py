@@ -0,0 +1,54 @@
+import random
+import time
+
+import pytest
+
+from core.database import DatabaseManager
+
+DOCS = 3000
+WORDS = ["rechnung", "betrag", "mehrwertsteuer", "lieferschein", "kunde", "datum", "summe", "ein", "und", "der"]
+
+
+@pytest.fixture(scope="module")
+def text_db(tmp_path_factory):
+    """3000 documents of ~6k characters each."""
+    rng = random.Random(19)
+    filler = [f"wort{i}" for i in range(2000)]
+    db = DatabaseManager(str(tmp_path_factory.mktemp("perf") / "texts.db"))
+    with db._write() as conn:
+        conn.executemany(
+            "INSERT INTO virtual_documents (uuid, cached_full_text) VALUES (?, ?)",
+            (
+                (f"d{i}", " ".join(rng.choice(WORDS) if rng.random() < 0.05 else rng.choice(filler)
+                                   for _ in range(900)))
+                for i in range(DOCS)
+            ),
+        )
+    yield db
+    db.close()
+
+
+def legacy_counts(db, text):
+    """The LOWER/REPLACE arithmetic over all full texts that the index replaces."""
+    rows = db.connection.execute(
+        "SELECT uuid, (LENGTH(cached_full_text) - LENGTH(REPLACE(LOWER(cached_full_text), ?, ''))) / ? "
+        "FROM virtual_documents", (text.lower(), len(text))
+    ).fetchall()
+    return {uuid: count for uuid, count in rows if count}
+
+
+def measure(func, repeat=3):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - start) / repeat
+
+
+@pytest.mark.parametrize("text", ["rechnung", "mehrwertsteuer", "ein", "wort1999", "nirgendwo"])
+def test_hit_counts_beat_full_text_arithmetic(text_db, text):
+    indexed, t_indexed = measure(lambda: text_db._text_hit_counts(text))
+    legacy, t_legacy = measure(lambda: legacy_counts(text_db, text))
+    print(f"\n{text:15s} index {t_indexed * 1000:8.1f} ms   full text {t_legacy * 1000:8.1f} ms")
+
+    assert indexed == legacy
+    assert t_indexed < t_legacy
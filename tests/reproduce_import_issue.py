@@ -9,6 +9,7 @@ sys.path.append(str(Path(__file__).parent.parent))
 
 from core.pipeline import PipelineProcessor
 from core.database import DatabaseManager
+from core.utils.pdf_probe import probe_pdf
 from core.utils.zugferd_extractor import ZugferdExtractor
 from core.models.virtual import VirtualDocument
 from core.models.semantic import SemanticExtraction
@@ -45,8 +46,8 @@ def test_repro_document_import():
     pipeline = PipelineProcessor(base_path=str(vault_path), db_path=db_path)
     
     try:
-        is_native = pipeline._is_native_pdf(Path(file_path))
-        print(f"  Is Native PDF (Text Layer): {is_native}")
+        facts = probe_pdf(file_path, extract_text=False)
+        print(f"  Is Native PDF (Text Layer): {bool(facts and facts.has_text_layer)}")
         
         doc = pipeline.process_document(file_path, skip_ai=True)
         print(f"SUCCESS: Document ingested into pipeline. UUID: {doc.uuid}")
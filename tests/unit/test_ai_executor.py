@@ -0,0 +1,109 @@
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from core.ai.executor import AIRequestExecutor, RateLimitError, TokenBucket
+from core.ai.anthropic_provider import AnthropicProvider
+from core.ai.gemini_provider import GeminiProvider
+from core.ai.ollama_provider import OllamaProvider
+from core.ai.openai_provider import OpenAIProvider
+
+
+def test_in_flight_requests_are_capped():
+    executor = AIRequestExecutor(max_in_flight=2)
+    release = threading.Event()
+    peak = []
+
+    def request():
+        peak.append(executor.in_flight)
+        release.wait(5)
+        return True
+
+    threads = [threading.Thread(target=executor.submit, args=(request,)) for _ in range(5)]
+    for t in threads:
+        t.start()
+    deadline = time.monotonic() + 5
+    while len(peak) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.05)
+    assert executor.in_flight == 2 and len(peak) == 2  # The others wait for a slot
+
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert len(peak) == 5 and max(peak) <= 2
+    assert executor.in_flight == 0
+
+
+def test_token_bucket_reports_wait_for_debt():
+    bucket = TokenBucket(per_minute=600)  # 10 per second
+    assert bucket.reserve(500) == 0.0
+    assert bucket.reserve(200) == pytest.approx(10.0, abs=0.1)  # 100 tokens in debt
+    bucket.adjust(-150)  # Refund: the estimate was too high
+    assert bucket.reserve(0) == 0.0
+
+
+def test_budgets_delay_requests():
+    executor = AIRequestExecutor(requests_per_minute=60, tokens_per_minute=6000)
+    with patch("time.sleep") as sleep:
+        executor.submit(lambda: 1, tokens=6000)
+        sleep.assert_not_called()
+        executor.submit(lambda: 2, tokens=3000)  # Token budget: 3000 tokens at 100/s
+    assert sleep.call_args[0][0] == pytest.approx(30.0, abs=0.1)
+
+
+def test_rate_limits_back_off_and_give_up():
+    executor = AIRequestExecutor(max_retries=3)
+    request = MagicMock(side_effect=RateLimitError(retry_after=30))
+    with patch("time.sleep") as sleep:
+        assert executor.submit(request) is None
+        assert request.call_count == 3
+        assert all(call[0][0] >= 29 for call in sleep.call_args_list)  # Retry-After honoured
+        assert executor.adaptive_delay == 8.0
+        assert executor.in_flight == 0
+
+        with pytest.raises(ValueError):  # Other errors reach the caller
+            executor.submit(MagicMock(side_effect=ValueError("bad request")))
+        assert executor.in_flight == 0
+
+
+@patch("requests.post")
+def test_http_provider_retries_429(mock_post):
+    limited = MagicMock(status_code=429, headers={"retry-after": "3"})
+    ok = MagicMock(status_code=200)
+    ok.json.return_value = {"choices": [{"message": {"content": '{"ok": true}'}}]}
+    mock_post.side_effect = [limited, ok]
+
+    provider = OpenAIProvider("key")
+    with patch("time.sleep") as sleep:
+        assert provider.generate_json("json please") == {"ok": True}
+    assert mock_post.call_count == 2
+    assert sleep.call_args[0][0] >= 2.9
+    assert provider.get_executor() is AIRequestExecutor.shared("OpenAIProvider")
+
+
+@patch("requests.post")
+def test_reported_usage_replaces_estimate(mock_post):
+    ok = MagicMock(status_code=200)
+    ok.json.return_value = {"choices": [{"message": {"content": "{}"}}], "usage": {"total_tokens": 5000}}
+    mock_post.return_value = ok
+
+    provider = OpenAIProvider("key")
+    provider.executor = AIRequestExecutor(tokens_per_minute=6000)
+    provider.generate_json("x" * 400)  # Estimated: 100 tokens
+    with patch("time.sleep") as sleep:
+        provider.executor.submit(lambda: 1, tokens=1100)  # 5000 + 1100 > 6000: waits
+    assert sleep.call_args[0][0] == pytest.approx(1.0, abs=0.1)
+
+
+def test_providers_read_their_usage_fields():
+    assert AnthropicProvider("key").usage_tokens({"usage": {"input_tokens": 70, "output_tokens": 30}}) == 100
+    assert OllamaProvider("http://ollama").usage_tokens({"prompt_eval_count": 70, "eval_count": 30}) == 100
+    assert OpenAIProvider("key").usage_tokens({"choices": []}) is None  # Not reported: keep the estimate
+
+    with patch("core.ai.gemini_provider.genai"):
+        gemini = GeminiProvider("key")
+    assert gemini._generation_usage(MagicMock(usage_metadata=MagicMock(total_token_count=100))) == 100
+    assert gemini._generation_usage(object()) is None
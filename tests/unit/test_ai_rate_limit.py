@@ -1,10 +1,8 @@
-
 import pytest
 from unittest.mock import MagicMock, patch
-import datetime
 import time
 from core.ai.client import AIClient
-from core.ai.gemini_provider import GeminiProvider
+from core.ai.executor import AIRequestExecutor
 
 @pytest.fixture
 def mock_genai_client():
@@ -12,29 +10,24 @@ def mock_genai_client():
         yield mock
 
 def test_ai_client_cooldown(mock_genai_client):
-    """Test that _wait_for_cooldown in GeminiProvider sleeps if cooldown is active."""
-    # Reset state
-    GeminiProvider._cooldown_until = None
+    """Test that the shared executor holds requests back while a cooldown is active."""
     client = AIClient(api_key="test")
-    
+    executor = client.provider.get_executor()
+    assert executor is AIRequestExecutor.shared("gemini")
+    assert AIClient(api_key="test").provider.executor is executor  # Shared by all clients
+
     # Set cooldown in future
-    future = datetime.datetime.now() + datetime.timedelta(seconds=0.5)
-    GeminiProvider._cooldown_until = future
-    
+    executor._cooldown_until = time.monotonic() + 0.5
+
     start = time.time()
-    client.provider._wait_for_cooldown()
+    assert executor.submit(lambda: "done") == "done"
     end = time.time()
-    
+
     # Should have slept at least 0.5s (approx)
     assert (end - start) >= 0.4
-    
-    # Cooldown should be cleared
-    assert GeminiProvider._cooldown_until is None
 
 def test_ai_client_backoff_on_429(mock_genai_client):
-    """Test that 429 triggers retry and sets cooldown in GeminiProvider."""
-    # Reset state
-    GeminiProvider._cooldown_until = None
+    """Test that 429 triggers retry and sets the shared cooldown."""
     client = AIClient(api_key="test")
     
     # Mock Response
@@ -63,5 +56,5 @@ def test_ai_client_backoff_on_429(mock_genai_client):
         assert result is not None
         assert mock_model.generate_content.call_count == 3
         assert mock_sleep.called
-        # Cooldown should be None as it's cleared after waiting in the successful attempt
-        assert GeminiProvider._cooldown_until is None
+        # The cooldown of the second 429 (at least 4s) applies to all threads
+        assert client.provider.get_executor()._cooldown_until > time.monotonic() + 3
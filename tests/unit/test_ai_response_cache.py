@@ -0,0 +1,84 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from core.ai.client import AIClient
+from core.ai.response_cache import AIResponseCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return AIResponseCache(tmp_path / "ai_cache.db", max_bytes=1024)
+
+
+def test_key_covers_provider_model_prompt_and_images():
+    key = AIResponseCache.make_key("gemini", "flash", "prompt", [{"base64": "aGVsbG8="}])
+    assert key == AIResponseCache.make_key("gemini", "flash", "prompt", [{"base64": "aGVsbG8=", "label": "other"}])
+    assert key != AIResponseCache.make_key("gemini", "pro", "prompt", [{"base64": "aGVsbG8="}])
+    assert key != AIResponseCache.make_key("openai", "flash", "prompt", [{"base64": "aGVsbG8="}])
+    assert key != AIResponseCache.make_key("gemini", "flash", "prompt!", [{"base64": "aGVsbG8="}])
+    assert key != AIResponseCache.make_key("gemini", "flash", "prompt", [{"base64": "d29ybGQ="}])
+    assert AIResponseCache.make_key("gemini", "flash", "prompt", [object()]) is None  # Not fingerprintable
+
+
+def test_entries_persist_and_are_evicted_lru_first(tmp_path, cache):
+    payload = {"text": "x" * 300}  # ~314 bytes: three entries fit
+    for key in ("a", "b", "c"):
+        assert cache.put(key, payload, "STAGE 2")
+    assert cache.get("a", "STAGE 2") == payload  # "b" is now the oldest
+    cache.put("d", payload)
+    assert cache.get("b") is None and cache.get("c") is not None
+
+    assert not cache.put("huge", {"text": "x" * 2000})
+    reopened = AIResponseCache(tmp_path / "ai_cache.db", max_bytes=1024)
+    assert reopened.get("d") == payload
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 1, 3)
+    assert stats["stages"]["STAGE 2"] == {"hits": 1, "misses": 0}
+
+
+def test_client_serves_repeated_requests_from_cache(tmp_path):
+    with patch("core.config.AppConfig.get_ai_cache_max_bytes", return_value=1 << 20), \
+         patch("core.config.AppConfig.get_ai_cache_path", return_value=tmp_path / "ai_cache.db"), \
+         patch("core.config.AppConfig.get_ai_cache_excluded_stages", return_value=["stage 1.5"]), \
+         patch("core.ai.gemini_provider.genai"):
+        client = AIClient(api_key="test")
+    client.provider.generate_json = MagicMock(side_effect=lambda *a: {"call": client.provider.generate_json.call_count})
+
+    assert client.generate_json("classify", "STAGE 1.1") == {"call": 1}
+    assert client.generate_json("classify", "STAGE 1.1") == {"call": 1}
+    assert client.generate_json("classify", "STAGE 1.1", use_cache=False) == {"call": 2}
+    assert client.generate_json("classify", "STAGE 1.1") == {"call": 2}  # Refreshed entry
+    assert client.generate_json("audit", "STAGE 1.5 AUDIT (FULL)") == {"call": 3}
+    assert client.generate_json("audit", "STAGE 1.5 AUDIT (FULL)") == {"call": 4}  # Opted out
+
+    client.provider.generate_json = MagicMock(return_value=None)
+    assert client.generate_json("failing", "STAGE 2") is None
+    assert client.generate_json("failing", "STAGE 2") is None
+    assert client.provider.generate_json.call_count == 2  # Failures are not cached
+    assert client.get_cache_stats()["hits"] == 2
+
+
+def test_client_caches_only_validated_responses(tmp_path):
+    with patch("core.config.AppConfig.get_ai_cache_max_bytes", return_value=1 << 20), \
+         patch("core.config.AppConfig.get_ai_cache_path", return_value=tmp_path / "ai_cache.db"), \
+         patch("core.ai.gemini_provider.genai"):
+        client = AIClient(api_key="test")
+    responses = iter([{"ok": False}, {"ok": True}, {"ok": False}])
+    client.provider.generate_json = MagicMock(side_effect=lambda *a: next(responses))
+    is_valid = lambda res: res["ok"]
+
+    # A rejected response is not stored: the repeated request reaches the AI
+    assert client.generate_json("classify", "STAGE 1.1", validate=is_valid) == {"ok": False}
+    assert client.generate_json("classify", "STAGE 1.1", validate=is_valid) == {"ok": True}
+    assert client.generate_json("classify", "STAGE 1.1", validate=is_valid) == {"ok": True}
+    assert client.provider.generate_json.call_count == 2
+
+    # Entries stored without validation are discarded once rejected
+    assert client.generate_json("extract", "STAGE 2") == {"ok": False}
+    client.provider.generate_json = MagicMock(return_value={"ok": True})
+    assert client.generate_json("extract", "STAGE 2", validate=is_valid) == {"ok": True}
+    assert client.provider.generate_json.call_count == 1
+    stats = client.get_cache_stats()
+    assert (stats["hits"], stats["misses"]) == (1, 4)
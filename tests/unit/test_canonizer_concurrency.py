@@ -0,0 +1,93 @@
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from core.canonizer import CanonizerService
+from core.database import DatabaseManager
+from core.models.virtual import VirtualDocument, SourceReference, DocumentStatus
+
+
+@pytest.fixture
+def file_db(tmp_path):
+    db = DatabaseManager(str(tmp_path / "concurrency.db"))
+    yield db
+    db.close()
+
+
+def make_service(db):
+    service = CanonizerService(db, analyzer=MagicMock())
+    for i in range(6):
+        db.logical_repo.save(VirtualDocument(
+            uuid=f"doc-{i}",
+            status=DocumentStatus.READY_FOR_PIPELINE,
+            source_mapping=[SourceReference(file_uuid="f1", pages=[1])],
+        ))
+    return service
+
+
+def test_parallel_processing_uses_worker_connections(file_db):
+    service = make_service(file_db)
+    seen = []
+    seen_lock = threading.Lock()
+
+    def fake_process(v_doc):
+        # Documents arrive already locked by process_pending_documents
+        assert v_doc.status == DocumentStatus.PROCESSING_S1
+        time.sleep(0.2)  # Simulated AI latency
+        with seen_lock:
+            seen.append((v_doc.uuid, id(file_db.connection)))
+        v_doc.status = DocumentStatus.PROCESSED
+        service.logical_repo.save(v_doc)
+        return True
+
+    service.process_virtual_document = fake_process
+    main_conn = id(file_db.connection)
+
+    start = time.perf_counter()
+    processed = service.process_pending_documents(limit=6, max_workers=3)
+    duration = time.perf_counter() - start
+
+    assert processed == 6
+    assert sorted(uuid for uuid, _ in seen) == [f"doc-{i}" for i in range(6)]
+    assert all(conn_id != main_conn for _, conn_id in seen)
+    assert duration < 1.0  # Serial would take 1.2s
+    assert file_db.get_pending_pipeline_count() == 0
+    assert file_db.count_entities(DocumentStatus.PROCESSED) == 6
+
+
+def test_locked_documents_are_not_picked_up_twice(file_db):
+    service = make_service(file_db)
+    service.process_virtual_document = MagicMock(return_value=True)
+
+    first = service._lock_pending_documents(limit=4)
+    second = service._lock_pending_documents(limit=4)
+
+    assert len(first) == 4
+    assert len(second) == 2
+    assert not set(first) & set(second)
+
+
+def test_parallel_processing_propagates_critical_errors(file_db):
+    service = make_service(file_db)
+    calls = []
+
+    def failing_process(v_doc):
+        calls.append(v_doc.uuid)
+        if v_doc.uuid == "doc-0":
+            raise TypeError("coding error")
+        return True
+
+    service.process_virtual_document = failing_process
+
+    with pytest.raises(TypeError):
+        service.process_pending_documents(limit=3, max_workers=3)
+    # The other documents of the burst still finished
+    assert len(calls) == 3
+
+
+def test_thread_connection_falls_back_for_memory_db():
+    db = DatabaseManager(":memory:")
+    with db.thread_connection() as conn:
+        assert conn is db.connection
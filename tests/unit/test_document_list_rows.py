@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+from core.database import DatabaseManager
+from core.models.list_row import DocumentListRow
+
+
+def semantic(sender, doc_date, amount, **extra):
+    data = {
+        "meta_header": {"sender": {"name": sender}, "doc_date": doc_date, "doc_number": f"INV-{sender}"},
+        "bodies": {"finance_body": {
+            "monetary_summation": {"grand_total_amount": amount, "tax_basis_total_amount": "10"},
+            "due_date": "2024-06-30",
+        }},
+        "workflows": {"invoice": {"current_step": "PAID"}},
+    }
+    data.update(extra)
+    return json.dumps(data)
+
+
+@pytest.fixture
+def db():
+    db = DatabaseManager(":memory:")
+    rows = [
+        ("a", "PROCESSED", semantic("ACME", "2024-01-10", "100.50"), '["INVOICE"]', '["paid"]', "alpha invoice text", 0, "2024-01-01", "A"),
+        ("b", "NEW", semantic("Globex", "2024-02-01", "20", repaired_text="x"), "[]", "[]", "beta letter", 0, "2024-02-01", "C"),
+        ("c", "PROCESSED", "{not json", "[]", "[]", "gamma", 0, "2024-03-01", "C"),
+        ("d", "PROCESSED", None, "[]", "[]", "delta", 1, "2024-04-01", "C"),
+        ("e", "PROCESSED", json.dumps({
+            "meta_header": {"doc_date": "2024-05-01"},
+            "bodies": {"finance_body": {"invoice_number": "R-77", "monetary_summation": {"grand_total_amount": "19.99"}}},
+        }), "[]", "[]", "epsilon", 0, "2024-05-01", "B"),
+    ]
+    with db._write() as conn:
+        conn.executemany(
+            "INSERT INTO virtual_documents (uuid, status, semantic_data, type_tags, tags, cached_full_text, "
+            "deleted, created_at, pdf_class, page_count_virt, export_filename) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 2, NULL)",
+            rows,
+        )
+    yield db
+    db.close()
+
+
+def test_rows_match_hydrated_documents(db):
+    rows = {r.uuid: r for r in db.get_document_list_rows()}
+    docs = {d.uuid: d for d in db.get_all_entities_view()}
+    assert list(rows) == list(docs) == ["e", "c", "b", "a"]
+    assert all(isinstance(r, DocumentListRow) for r in rows.values())
+
+    for uuid, row in rows.items():
+        doc = docs[uuid]
+        for attr in ("status", "original_filename", "page_count", "created_at", "type_tags",
+                     "tags", "sender_name", "doc_date", "expiry_date"):
+            assert getattr(row, attr) == getattr(doc, attr), (uuid, attr)
+        if doc.total_amount is None:
+            assert row.total_amount is None
+        else:
+            assert row.total_amount == pytest.approx(float(doc.total_amount))
+
+    # The projection of a full document is the SQL row (see update_document_item)
+    keys = ["total_net", "total_gross", "doc_number", "currency", "due_date"]
+    for uuid, row in {r.uuid: r for r in db.get_document_list_rows(extra_fields=keys)}.items():
+        assert DocumentListRow.from_document(docs[uuid], keys) == row, uuid
+
+    assert rows["a"].pdf_class == "A"
+    assert rows["a"].workflow_steps == {"invoice": "PAID"}
+    # Malformed semantic JSON degrades to empty values instead of failing the list
+    assert rows["c"].sender_name is None and rows["c"].workflow_steps == {}
+
+
+def test_row_selection_modes(db):
+    assert [r.uuid for r in db.get_document_list_rows(trash=True)] == ["d"]
+    query = {"field": "sender", "op": "equals", "value": "ACME"}
+    assert [r.uuid for r in db.get_document_list_rows(query)] == [d.uuid for d in db.search_documents_advanced(query)]
+    assert [r.uuid for r in db.get_document_list_rows(search_text="beta")] == ["b"]
+
+
+def test_dynamic_columns_are_projected(db):
+    rows = {r.uuid: r for r in db.get_document_list_rows(
+        extra_fields=["total_net", "doc_number", "semantic:meta_header.sender.name", "repaired_text", "sender_name"]
+    )}
+    a = rows["a"]
+    assert a.column_value("total_net") == 10.0
+    assert a.column_value("doc_number") == "INV-ACME"
+    assert a.column_value("semantic:meta_header.sender.name") == "ACME"
+    assert a.column_value("sender_name") == "ACME"
+    assert "sender_name" not in a.extra
+    assert rows["b"].column_value("repaired_text") == "x"
+    assert rows["c"].column_value("doc_number") is None
+    assert rows["e"].column_value("doc_number") == "R-77"  # Body fallback, like VirtualDocument.doc_number
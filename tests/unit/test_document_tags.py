@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+from core.database import DatabaseManager
+
+
+def insert(db, uuid, tags=None, type_tags=None):
+    with db._write() as conn:
+        conn.execute(
+            "INSERT INTO virtual_documents (uuid, tags, type_tags, cached_full_text) VALUES (?, ?, ?, '')",
+            (uuid, json.dumps(tags) if tags is not None else None, json.dumps(type_tags) if type_tags is not None else None),
+        )
+
+
+def tag_rows(db):
+    return sorted(tuple(r) for r in db.connection.execute("SELECT document_uuid, kind, tag FROM document_tags"))
+
+
+def user_tags(db, uuid):
+    return json.loads(db.connection.execute("SELECT tags FROM virtual_documents WHERE uuid = ?", (uuid,)).fetchone()[0])
+
+
+@pytest.fixture
+def db():
+    db = DatabaseManager(":memory:")
+    insert(db, "a", ["Tax", "Home"], ["INVOICE"])
+    insert(db, "b", ["tax"], ["INVOICE", "ORDER"])
+    insert(db, "c", ["Car"], [])
+    yield db
+    db.close()
+
+
+def test_triggers_keep_junction_table_in_sync(db):
+    db.update_document_metadata("c", {"tags": ["Car", "Tax"]})
+    with db._write() as conn:
+        conn.execute("INSERT OR REPLACE INTO virtual_documents (uuid, tags, cached_full_text) VALUES ('b', '[\"new\"]', '')")
+        conn.execute("DELETE FROM virtual_documents WHERE uuid = 'a'")
+        conn.execute("UPDATE virtual_documents SET type_tags = 'not json' WHERE uuid = 'c'")
+
+    assert tag_rows(db) == [("b", "user", "new"), ("c", "user", "Car"), ("c", "user", "Tax")]
+
+
+def test_counts_and_available_tags(db):
+    assert db.get_all_tags_with_counts() == {"Tax": 1, "Home": 1, "tax": 1, "Car": 1, "INVOICE": 2, "ORDER": 1}
+    assert db.get_available_tags() == ["Car", "Home", "Tax", "tax"]
+    assert db.get_available_tags(system=True) == ["INVOICE", "ORDER"]
+
+
+def test_tag_filter_is_case_insensitive(db):
+    query = {"field": "tags", "op": "contains", "value": "TAX"}
+    assert sorted(d.uuid for d in db.search_documents_advanced(query)) == ["a", "b"]
+    query = {"field": "type_tags", "op": "contains", "value": ["order"], "negate": True}
+    assert sorted(d.uuid for d in db.search_documents_advanced(query)) == ["a", "c"]
+
+
+def test_bulk_tag_edits(db):
+    assert db.rename_tag("Tax", "Taxes") == 1
+    assert user_tags(db, "a") == ["Taxes", "Home"]
+
+    assert db.merge_tags(["Taxes", "tax"], "Finance") == 2
+    assert user_tags(db, "a") == ["Home", "Finance"]
+    assert user_tags(db, "b") == ["Finance"]
+
+    assert db.delete_tag("Finance") == 2
+    assert db.get_all_tags_with_counts().get("Finance") is None
+    assert db.delete_tag("missing") == 0
+
+
+def test_existing_database_is_backfilled(tmp_path):
+    path = str(tmp_path / "legacy.db")
+    db = DatabaseManager(path)
+    insert(db, "a", ["Tax"], ["INVOICE"])
+    with db._write() as conn:
+        for trigger in ("document_tags_ai", "document_tags_au", "document_tags_ad"):
+            conn.execute(f"DROP TRIGGER {trigger}")
+        conn.execute("DROP TABLE document_tags")
+    db.close()
+
+    db = DatabaseManager(path)
+    assert tag_rows(db) == [("a", "type", "INVOICE"), ("a", "user", "Tax")]
+    db.close()
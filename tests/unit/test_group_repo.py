@@ -112,6 +112,15 @@ class TestGroupHierarchy:
         names = [g.name for g in children]
         assert "Child1" in names and "Child2" in names
 
+    def test_get_hierarchy_matches_get_children(self, repo):
+        root_b = repo.create("B")
+        root_a = repo.create("A")
+        child = repo.create("Child", parent_id=root_a.id)
+        repo.create("Grandchild", parent_id=child.id)
+        hierarchy = repo.get_hierarchy()
+        for parent_id in (None, root_a.id, root_b.id, child.id):
+            assert hierarchy.get(parent_id, []) == repo.get_children(parent_id)
+
     def test_delete_parent_reparents_children(self, repo):
         """Child.parent_id becomes NULL when parent is deleted (ON DELETE SET NULL)."""
         parent = repo.create("Parent")
@@ -165,6 +174,13 @@ class TestGroupMembership:
         repo.add_membership("doc-2", g.id)
         assert repo.get_document_count(g.id) == 2
 
+    def test_document_counts_in_one_query(self, repo):
+        g1, g2, empty = repo.create("G1"), repo.create("G2"), repo.create("Empty")
+        for doc in ("doc-1", "doc-2", "doc-3"):
+            repo.add_membership(doc, g1.id)
+        repo.add_membership("doc-1", g2.id)
+        assert repo.get_document_counts() == {g1.id: 3, g2.id: 1}
+
     def test_delete_group_cascades_memberships(self, repo):
         g = repo.create("Group")
         repo.add_membership("doc-uuid", g.id)
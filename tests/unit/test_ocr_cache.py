@@ -0,0 +1,127 @@
+import shutil
+import sqlite3
+from unittest.mock import MagicMock, patch
+
+import fitz
+import pytest
+
+from core.database import DatabaseManager
+from core.ocr_cache import OcrResultCache
+from core.pipeline import PipelineProcessor
+from core.vault import DocumentVault
+
+
+@pytest.fixture
+def pipeline(tmp_path):
+    db = DatabaseManager(str(tmp_path / "ocr.db"))
+    p = PipelineProcessor(vault=DocumentVault(tmp_path / "vault"), db=db)
+    with patch("core.config.AppConfig.get_ocr_cache_max_bytes", return_value=1 << 20), \
+         patch("core.config.AppConfig.get_ocr_cache_dir", return_value=tmp_path / "ocr_cache"):
+        yield p
+    OcrResultCache._shared.clear()
+    db.close()
+
+
+def make_pdf(path, text=None):
+    doc = fitz.open()
+    page = doc.new_page()
+    if text:
+        page.insert_text((72, 72), text)
+    doc.save(str(path))
+    doc.close()
+
+
+def fake_ocrmypdf(calls):
+    """Popen replacement that writes a searchable PDF to the output path."""
+    def popen(cmd, stdout=None, stderr=None):
+        calls.append(cmd)
+        make_pdf(cmd[-1], "Hello OCR")
+        process = MagicMock()
+        process.communicate.return_value = (b"", b"")
+        process.returncode = 0
+        return process
+    return popen
+
+
+def test_ocr_result_is_reused_across_reimport_and_reprocess(pipeline, tmp_path):
+    scan = tmp_path / "scan.pdf"
+    make_pdf(scan)
+    first = tmp_path / "first.pdf"
+    shutil.copy2(scan, first)
+
+    calls = []
+    with patch("core.pipeline.subprocess.Popen", side_effect=fake_ocrmypdf(calls)):
+        assert pipeline._run_ocr(first) == {"1": "Hello OCR"}
+        assert len(calls) == 1
+
+        # Purge + re-import of the same scan: served from cache, file made searchable
+        second = tmp_path / "second.pdf"
+        shutil.copy2(scan, second)
+        assert pipeline._run_ocr(second) == {"1": "Hello OCR"}
+        assert second.read_bytes() == first.read_bytes()
+
+        # Forced re-OCR of the (already searchable) vault file
+        assert pipeline._run_ocr(first) == {"1": "Hello OCR"}
+        assert len(calls) == 1
+
+    # The searchable PDF is a file of the cache folder, not a vault database blob
+    assert [p.suffix for p in (tmp_path / "ocr_cache").iterdir()].count(".pdf") == 1
+    tables = {row[0] for row in pipeline.db.connection.execute("SELECT name FROM sqlite_master")}
+    assert "ocr_cache" not in tables
+
+
+def test_ocr_cache_key_depends_on_settings(pipeline, tmp_path):
+    scan = tmp_path / "scan.pdf"
+    make_pdf(scan)
+    calls = []
+    with patch("core.pipeline.subprocess.Popen", side_effect=fake_ocrmypdf(calls)):
+        pipeline._run_ocr(scan)
+        make_pdf(scan)  # Same scan again, but OCRed with another language
+        with patch.object(PipelineProcessor, "OCR_LANGUAGE", "eng"):
+            pipeline._run_ocr(scan)
+    assert len(calls) == 2
+
+
+def test_ocr_cache_evicts_least_recently_used(tmp_path):
+    cache = OcrResultCache(tmp_path / "ocr_cache", max_bytes=250)
+    page = {"1": "x" * 90}  # ~100 bytes of JSON per entry
+
+    cache.put("a", page, None)
+    cache.put("b", page, b"%PDF")
+    assert cache.get("a") is not None  # "a" becomes most recently used
+    cache.put("c", page, None)
+
+    assert cache.get("b") is None
+    assert not (tmp_path / "ocr_cache" / "b.pdf").exists()  # Eviction frees the disk space
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.total_size() <= 250
+
+
+def test_ocr_cache_drops_entry_with_missing_pdf(tmp_path):
+    cache = OcrResultCache(tmp_path / "ocr_cache", max_bytes=1024)
+    cache.put("a", {"1": "text"}, b"%PDF")
+    assert cache.get("a") == ({"1": "text"}, b"%PDF")
+
+    (tmp_path / "ocr_cache" / "a.pdf").unlink()
+    assert cache.get("a") is None
+    assert cache.total_size() == 0
+
+
+def test_vault_drops_legacy_ocr_cache_table(tmp_path):
+    db_path = tmp_path / "legacy.db"
+    db = DatabaseManager(str(db_path))
+    db.close()
+    conn = sqlite3.connect(str(db_path))
+    conn.execute("CREATE TABLE ocr_cache (cache_key TEXT PRIMARY KEY, page_texts TEXT NOT NULL, "
+                 "ocr_pdf BLOB, byte_size INTEGER NOT NULL, created_at TEXT, last_used_at TEXT)")
+    conn.execute("INSERT INTO ocr_cache VALUES ('k', '{}', ?, 1048576, '', '')", (b"\0" * (1 << 20),))
+    conn.commit()
+    conn.close()
+    size_with_blobs = db_path.stat().st_size
+
+    db = DatabaseManager(str(db_path))
+    tables = {row[0] for row in db.connection.execute("SELECT name FROM sqlite_master")}
+    db.close()
+    assert "ocr_cache" not in tables
+    assert db_path.stat().st_size < size_with_blobs - (1 << 19)
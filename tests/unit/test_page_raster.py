@@ -0,0 +1,161 @@
+import base64
+import io
+from unittest.mock import MagicMock
+
+import fitz
+import pytest
+from PIL import Image
+
+from core.ai.stage2 import Stage2Processor
+from core.utils.page_raster import (
+    DEFAULT_IMAGE_BUDGET, DPI_AUDIT, DPI_EXTRACTION, MIME_TYPES, ImageBudget, PageRasterService, content_box,
+    encode_image, optimize_image
+)
+from core.visual_auditor import VisualAuditor
+
+
+@pytest.fixture
+def pdf_path(tmp_path):
+    path = tmp_path / "letter.pdf"
+    doc = fitz.open()
+    for i in range(2):
+        doc.new_page(width=144, height=216).insert_text((20, 40), f"Page {i + 1}")
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+@pytest.fixture
+def service(monkeypatch):
+    service = PageRasterService()
+    monkeypatch.setattr(PageRasterService, "_instance", service)
+    return service
+
+
+def test_pages_render_once_per_dpi_class(service, pdf_path):
+    audit = service.get_image(pdf_path, 0, DPI_AUDIT)
+    assert audit.size == (600, 900)
+    assert service.get_image(pdf_path, 0, DPI_AUDIT) is audit
+
+    extraction = service.get_image(pdf_path, 0, DPI_EXTRACTION)  # Downscaled from the audit raster
+    assert extraction.size == (400, 600)
+    assert service.get_array(pdf_path, 0, DPI_EXTRACTION).shape == (600, 400, 3)
+    assert service.renders == 1
+
+    service.get_image(pdf_path, 1, DPI_EXTRACTION)
+    assert service.renders == 2
+    assert service.get_image(pdf_path, 5, DPI_AUDIT) is None
+    assert service.get_image(pdf_path + ".missing", 0, DPI_AUDIT) is None
+
+
+def test_cache_is_bounded_and_tracks_file_version(pdf_path):
+    service = PageRasterService(max_bytes=400 * 600 * 3)  # One extraction raster
+    service.get_image(pdf_path, 0, DPI_EXTRACTION)
+    service.get_image(pdf_path, 1, DPI_EXTRACTION)
+    service.get_image(pdf_path, 0, DPI_EXTRACTION)
+    assert service.renders == 3
+
+    doc = fitz.open(pdf_path)
+    doc.new_page()
+    doc.saveIncr()
+    doc.close()
+    service.get_image(pdf_path, 0, DPI_EXTRACTION)
+    assert service.renders == 4
+
+
+def decode(payload):
+    return Image.open(io.BytesIO(base64.b64decode(payload["base64"])))
+
+
+@pytest.fixture
+def fixture_pages(tmp_path):
+    """A4 pages: a black-and-white letter with wide margins and a stamped invoice."""
+    path = tmp_path / "fixtures.pdf"
+    doc = fitz.open()
+    letter = doc.new_page(width=595, height=842)
+    for line in range(12):
+        letter.insert_text((150, 300 + line * 14), f"Line {line + 1}: Rechnung 2025-{line:03d} Betrag 1.234,56 EUR", fontsize=10)
+    invoice = doc.new_page(width=595, height=842)
+    invoice.insert_text((60, 80), "INVOICE 4711", fontsize=10)
+    invoice.draw_circle((450, 700), 40, color=(0.8, 0.1, 0.1), width=4)
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+def test_payloads_are_encoded_at_the_boundary(service, pdf_path):
+    payload = Stage2Processor(None, None).get_page_image_payload(pdf_path, 0)
+    assert payload["label"] == "FIRST_PAGE_VISUAL_CONTEXT"
+    assert payload["mime_type"] == MIME_TYPES[decode(payload).format]
+
+    image = service.get_image(pdf_path, 0, DPI_EXTRACTION)
+    assert Image.open(io.BytesIO(encode_image(image, "PNG"))).mode == "RGB"
+    assert image.mode == "RGB"  # Encoding leaves the shared raster untouched
+
+
+def test_optimizer_crops_margins_and_drops_colour_only_when_unused(service, fixture_pages, caplog):
+    with fitz.open(fixture_pages) as doc:
+        words = doc[0].get_text("words")
+    scale = DPI_EXTRACTION / 72
+
+    letter = service.get_image(fixture_pages, 0, DPI_EXTRACTION)
+    box = content_box(letter, DPI_EXTRACTION)
+    for x0, y0, x1, y1, *_ in words:  # No text is cropped away
+        assert box[0] <= x0 * scale and box[1] <= y0 * scale and x1 * scale <= box[2] and y1 * scale <= box[3]
+    assert (box[2] - box[0]) * (box[3] - box[1]) < 0.3 * letter.width * letter.height
+
+    with caplog.at_level("INFO", logger="kpaperflux.utils.page_raster"):
+        payload = service.get_payload(fixture_pages, 0, DPI_EXTRACTION, "LETTER")
+    assert decode(payload).mode == "L"
+    assert decode(payload).size == (box[2] - box[0], box[3] - box[1])  # Full resolution fits the budget
+    baseline = len(encode_image(letter, "PNG"))  # Former fixed full-colour PNG page
+    assert len(base64.b64decode(payload["base64"])) < baseline / 5
+    assert any("[Payload] LETTER" in r.getMessage() for r in caplog.records)
+
+    stamped = service.get_payload(fixture_pages, 1, DPI_AUDIT, "STAMP")
+    assert decode(stamped).mode == "RGB"  # The red stamp keeps its colour
+
+
+def test_optimizer_meets_budget_without_losing_legibility(service, fixture_pages):
+    image = service.get_image(fixture_pages, 1, DPI_AUDIT)
+    budget = ImageBudget(max_bytes=24_000, max_edge=1568)
+    payload = optimize_image(image, DPI_AUDIT, budget, "TIGHT")
+    decoded = decode(payload)
+    assert len(base64.b64decode(payload["base64"])) <= budget.max_bytes
+    assert max(decoded.size) <= budget.max_edge
+
+    box = content_box(image, DPI_AUDIT)
+    effective_dpi = DPI_AUDIT * decoded.width / (box[2] - box[0])
+    assert effective_dpi >= budget.min_text_dpi - 1  # Never below the legibility floor
+
+    impossible = optimize_image(image, DPI_AUDIT, ImageBudget(max_bytes=100, max_edge=4000), "FLOOR")
+    assert DPI_AUDIT * decode(impossible).width / (box[2] - box[0]) >= budget.min_text_dpi - 1
+
+
+@pytest.fixture
+def signed_contract(tmp_path):
+    """A full A4 text page signed with a thin blue-ink stroke of about 3 cm."""
+    path = tmp_path / "contract.pdf"
+    doc = fitz.open()
+    page = doc.new_page(width=595, height=842)
+    for line in range(50):
+        page.insert_text((60, 60 + line * 14), f"§ {line + 1} Der Mieter verpflichtet sich zur Zahlung von 1.234,56 EUR", fontsize=10)
+    signature = [(380 + i * 4.25, 780 + (3 if i % 2 else -3)) for i in range(21)]  # 3 cm zig-zag
+    page.draw_polyline(signature, color=(0.1, 0.2, 0.8), width=1)
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+def test_stage_1_5_keeps_thin_ink_in_colour(service, signed_contract):
+    image = service.get_image(signed_contract, 0, DPI_AUDIT)
+    # The page-level detection misses the stroke: why Stage 1.5 forces colour
+    assert decode(optimize_image(image, DPI_AUDIT, DEFAULT_IMAGE_BUDGET)).mode == "L"
+
+    ai = MagicMock()
+    ai.client = None
+    ai._generate_json.return_value = {}
+    VisualAuditor(ai).run_stage_1_5(signed_contract, "doc", {"detected_entities": [{"type_tags": ["CONTRACT"]}]})
+
+    payloads = [part for part in ai._generate_json.call_args.kwargs["images"] if isinstance(part, dict)]
+    assert payloads and all(decode(p).mode == "RGB" for p in payloads)
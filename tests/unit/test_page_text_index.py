@@ -0,0 +1,120 @@
+import json
+
+from unittest.mock import patch
+
+import pytest
+
+from core.database import DatabaseManager
+from core.models.physical import PhysicalFile
+from core.repositories.physical_repo import PhysicalRepository
+
+
+def insert_doc(db, uuid, mapping, deleted=0):
+    with db._write() as conn:
+        conn.execute(
+            "INSERT INTO virtual_documents (uuid, source_mapping, deleted, cached_full_text) VALUES (?, ?, ?, '')",
+            (uuid, json.dumps(mapping), deleted),
+        )
+
+
+def physical(uuid, pages):
+    return PhysicalFile(uuid=uuid, original_filename=f"{uuid}.pdf", file_path=f"/vault/{uuid}.pdf", raw_ocr_data=pages)
+
+
+def page_rows(db):
+    return sorted(tuple(r) for r in db.connection.execute("SELECT file_uuid, page, text FROM physical_pages"))
+
+
+@pytest.fixture
+def db():
+    db = DatabaseManager(":memory:")
+    repo = PhysicalRepository(db)
+    repo.save(physical("scan", {"1": "Rechnung Müller", "2": "Seite zwei", "3": "AGB \"Stand\" 2024"}))
+    repo.save(physical("letter", {"1": "Lieferschein MÜLLER"}))
+    insert_doc(db, "v1", [{"file_uuid": "letter", "pages": [1]}, {"file_uuid": "scan", "pages": [2, 1]}])
+    insert_doc(db, "v2", [{"file_uuid": "scan", "pages": [3]}])
+    insert_doc(db, "trash", [{"file_uuid": "scan", "pages": [1]}], deleted=1)
+    yield db
+    db.close()
+
+
+def test_triggers_keep_page_tables_in_sync(db):
+    virt_pages = db.connection.execute(
+        "SELECT virt_page, file_uuid, phys_page FROM virtual_page_map WHERE document_uuid = 'v1' ORDER BY virt_page"
+    ).fetchall()
+    assert [tuple(r) for r in virt_pages] == [(0, "letter", 1), (1, "scan", 2), (2, "scan", 1)]
+
+    # Re-saving a file (INSERT OR REPLACE) replaces its pages and their index entries
+    PhysicalRepository(db).save(physical("letter", {"1": "Mahnung"}))
+    assert ("letter", 1, "Mahnung") in page_rows(db)
+    assert db.find_text_pages_in_document("v1", "Lieferschein") == []
+
+    with db._write() as conn:
+        conn.execute("UPDATE virtual_documents SET source_mapping = ? WHERE uuid = 'v1'",
+                     (json.dumps([{"file_uuid": "scan", "pages": [1]}]),))
+        conn.execute("DELETE FROM physical_files WHERE uuid = 'letter'")
+        conn.execute("DELETE FROM virtual_documents WHERE uuid = 'v2'")
+    assert [r[0] for r in page_rows(db)] == ["scan"] * 3
+    with db._write() as conn:  # Raises if the FTS index diverged from physical_pages
+        conn.execute("INSERT INTO physical_pages_fts(physical_pages_fts) VALUES ('integrity-check')")
+    assert db.connection.execute("SELECT COUNT(*) FROM virtual_page_map WHERE document_uuid IN ('v1', 'v2')").fetchone()[0] == 1
+
+
+def test_text_pages_in_document(db):
+    assert db.find_text_pages_in_document("v1", "müller") == [0, 2]  # Case-insensitive, also for umlauts
+    assert db.find_text_pages_in_document("v1", "zw") == [1]  # Too short for trigrams: LIKE
+    assert db.find_text_pages_in_document("v1", "AGB") == []  # Page 3 is not part of v1
+    assert db.find_text_pages_in_document("v2", '"Stand"') == [0]
+    assert db.find_text_pages_in_document("v2", "  ") == []
+
+
+def test_deep_search_is_page_granular(db):
+    assert sorted(db.get_virtual_uuids_with_text_content("MÜLLER")) == ["v1"]
+    assert db.get_virtual_uuids_with_text_content("Stand") == ["v2"]
+    assert db.get_virtual_uuids_with_text_content("xyz") == []
+
+
+def test_rebuild_fills_index_from_existing_data(db):
+    with db._write() as conn:
+        conn.execute("DELETE FROM physical_pages")
+        conn.execute("DELETE FROM virtual_page_map")
+    db._rebuild_page_text_index()
+
+    assert len(page_rows(db)) == 4
+    assert db.find_text_pages_in_document("v1", "Seite") == [1]
+    assert sorted(db.get_virtual_uuids_with_text_content("2024")) == ["v2"]
+
+
+def test_search_without_trigram_tokenizer(tmp_path):
+    path = str(tmp_path / "old_sqlite.db")
+    db = DatabaseManager(path)
+    PhysicalRepository(db).save(physical("scan", {"1": "Rechnung Müller", "2": "Seite zwei"}))
+    insert_doc(db, "v1", [{"file_uuid": "scan", "pages": [2, 1]}])
+    db.close()
+
+    # SQLite < 3.34: the vault opens and search falls back to LIKE
+    with patch.object(DatabaseManager, "_trigram_available", return_value=False):
+        db = DatabaseManager(path)
+        PhysicalRepository(db).save(physical("letter", {"1": "Lieferschein"}))
+        insert_doc(db, "v2", [{"file_uuid": "letter", "pages": [1]}])
+        assert db.find_text_pages_in_document("v1", "Rechnung") == [1]
+        assert db.get_virtual_uuids_with_text_content("Lieferschein") == ["v2"]
+        db.close()
+
+    # Back on a current SQLite the index catches up with the pages written meanwhile
+    db = DatabaseManager(path)
+    assert db.find_text_pages_in_document("v2", "lieferschein") == [0]
+    assert db.find_text_pages_in_document("v1", "müller") == [1]
+    with db._write() as conn:
+        conn.execute("INSERT INTO physical_pages_fts(physical_pages_fts) VALUES ('integrity-check')")
+    db.close()
+
+
+def test_new_vault_without_trigram_tokenizer():
+    with patch.object(DatabaseManager, "_trigram_available", return_value=False):
+        db = DatabaseManager(":memory:")
+    assert not db._table_exists("physical_pages_fts")
+    PhysicalRepository(db).save(physical("scan", {"1": "Rechnung"}))
+    insert_doc(db, "v1", [{"file_uuid": "scan", "pages": [1]}])
+    assert db.get_virtual_uuids_with_text_content("Rechnung") == ["v1"]
+    db.close()
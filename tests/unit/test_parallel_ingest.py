@@ -0,0 +1,82 @@
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from core.database import DatabaseManager
+from core.pipeline import OcrJobLimiter, PipelineProcessor
+from core.vault import DocumentVault
+
+
+@pytest.fixture
+def pipeline(tmp_path):
+    db = DatabaseManager(str(tmp_path / "ingest.db"))
+    p = PipelineProcessor(vault=DocumentVault(tmp_path / "vault"), db=db)
+    yield p
+    db.close()
+
+
+def test_ocr_job_limiter_never_exceeds_capacity():
+    limiter = OcrJobLimiter(4)
+    in_use = []
+    peak = [0]
+    lock = threading.Lock()
+
+    def run(jobs):
+        with limiter.reserve(jobs) as granted:
+            with lock:
+                in_use.append(granted)
+                peak[0] = max(peak[0], sum(in_use))
+            time.sleep(0.02)
+            with lock:
+                in_use.remove(granted)
+
+    threads = [threading.Thread(target=run, args=(j,)) for j in (3, 2, 2, 8, 1)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(2.0)
+
+    assert peak[0] <= 4
+    # Oversized requests are clamped instead of blocking forever
+    with limiter.reserve(8) as granted:
+        assert granted == 4
+
+
+def test_parallel_ingest_reports_progress_and_dedups(pipeline, tmp_path):
+    paths = []
+    for i, content in enumerate([b"alpha", b"beta", b"alpha", b"gamma"]):
+        path = tmp_path / f"scan_{i}.pdf"
+        path.write_bytes(content)
+        paths.append(str(path))
+
+    ocr_threads = set()
+
+    def fake_ocr(path, jobs=None, file_sha=None):
+        ocr_threads.add(threading.current_thread().name)
+        assert jobs == max(1, 8 // 4)
+        time.sleep(0.1)
+        return {"1": f"text of {path.name}"}
+
+    progress = []
+    with patch.object(pipeline.config, "get_ingest_workers", return_value=4), \
+         patch("core.pipeline.ocr_job_limiter", OcrJobLimiter(8)), \
+         patch.object(pipeline, "_run_ocr", side_effect=fake_ocr):
+        result = pipeline._ingest_files(paths, False, lambda c, t, label: progress.append(c), total_steps=6)
+
+    assert set(result) == set(paths)
+    # Identical content maps to one physical file
+    assert result[paths[0]] == result[paths[2]]
+    assert len(set(result.values())) == 3
+    assert sorted(progress) == [1, 2, 3, 4]
+    assert all(name.startswith("ingest") for name in ocr_threads)
+    stored = pipeline.physical_repo.get_by_uuid(result[paths[1]])
+    assert stored.raw_ocr_data == {"1": f"text of {result[paths[1]]}.pdf"}
+
+
+def test_parallel_ingest_propagates_errors(pipeline, tmp_path):
+    paths = [str(tmp_path / f"missing_{i}.pdf") for i in range(3)]
+    with patch.object(pipeline.config, "get_ingest_workers", return_value=2):
+        with pytest.raises(FileNotFoundError):
+            pipeline._ingest_files(paths, False)
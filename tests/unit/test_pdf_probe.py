@@ -0,0 +1,113 @@
+from unittest.mock import MagicMock, patch
+
+import fitz
+import pikepdf
+import pytest
+
+from core import similarity
+from core.canonizer import CanonizerService
+from core.database import DatabaseManager
+from core.models.physical import PdfFacts, PhysicalFile
+from core.models.virtual import SourceReference, VirtualDocument
+from core.pipeline import PipelineProcessor
+from core.repositories.physical_repo import PhysicalRepository
+from core.utils import pdf_probe
+from core.utils.forensics import PDFClass, get_pdf_class
+from core.utils.pdf_probe import probe_pdf
+from core.vault import DocumentVault
+
+CII_XML = b"""<?xml version="1.0" encoding="ISO-8859-1"?>
+<rsm:CrossIndustryInvoice
+    xmlns:rsm="urn:un:unece:uncefact:data:standard:CrossIndustryInvoice:100"
+    xmlns:ram="urn:un:unece:uncefact:data:standard:ReusableAggregateBusinessInformationEntity:100">
+  <rsm:ExchangedDocument><ram:ID>M\xfcller-1</ram:ID><ram:TypeCode>381</ram:TypeCode></rsm:ExchangedDocument>
+</rsm:CrossIndustryInvoice>"""
+
+
+@pytest.fixture
+def invoice_pdf(tmp_path):
+    path = tmp_path / "invoice.pdf"
+    doc = fitz.open()
+    doc.new_page(width=595, height=842).insert_text((72, 72), "Rechnung Seite eins")
+    doc.new_page(width=842, height=595)
+    doc.embfile_add("factur-x.xml", CII_XML)
+    doc.save(str(path))
+    doc.close()
+    return path
+
+
+def test_probe_collects_all_facts(invoice_pdf):
+    facts = probe_pdf(invoice_pdf)
+    assert facts.page_count == 2
+    assert facts.has_text_layer
+    assert facts.page_texts == {"1": "Rechnung Seite eins"}
+    assert facts.page_sizes == [(595.0, 842.0), (842.0, 595.0)]
+    assert facts.zugferd_xml == CII_XML
+    assert facts.pdf_class == "B" == get_pdf_class(str(invoice_pdf)).value
+
+    restored = PdfFacts.from_json(facts.to_json())
+    assert restored.page_texts == {}
+    assert restored.zugferd_xml == CII_XML and restored.page_sizes == facts.page_sizes
+    assert PdfFacts.from_json(facts.to_json().replace('"version": 1', '"version": 0')) is None
+
+
+def test_probe_rejects_non_pdf(tmp_path):
+    path = tmp_path / "scan.pdf"
+    path.write_bytes(b"not a pdf")
+    assert probe_pdf(path) is None
+    assert get_pdf_class(str(path)) == PDFClass.STANDARD
+
+
+def test_ingest_probes_pdf_once_and_persists_facts(tmp_path, invoice_pdf):
+    db = DatabaseManager(str(tmp_path / "probe.db"))
+    pipeline = PipelineProcessor(vault=DocumentVault(tmp_path / "vault"), db=db)
+
+    with patch.object(pdf_probe.fitz, "open", wraps=fitz.open) as opened, \
+         patch.object(pikepdf.Pdf, "open", wraps=pikepdf.Pdf.open) as pikepdf_open, \
+         patch.object(similarity, "convert_from_path", wraps=similarity.convert_from_path) as rendered, \
+         patch.object(pipeline, "_run_ocr") as ocr:
+        phys = pipeline._ingest_physical_file(str(invoice_pdf))
+
+    # One probe for all facts; the page hashes still need the stamp check
+    # (pikepdf) and the poppler render every stored hash was made with
+    assert opened.call_count == 1
+    assert pikepdf_open.call_count == 1
+    assert rendered.call_count == 1
+    ocr.assert_not_called()
+
+    stored = pipeline.physical_repo.get_by_uuid(phys.uuid)
+    assert stored.page_count_phys == 2
+    assert stored.raw_ocr_data == {"1": "Rechnung Seite eins"}
+    assert stored.pdf_facts.zugferd_xml == CII_XML
+
+    # Later stages reuse the persisted facts
+    canonizer = CanonizerService(db, physical_repo=pipeline.physical_repo, logical_repo=MagicMock())
+    v_doc = VirtualDocument(uuid="v1", source_mapping=[SourceReference(file_uuid=phys.uuid, pages=[1])])
+    with patch.object(pdf_probe.fitz, "open") as opened:
+        assert canonizer._detect_zugferd_type_tags(v_doc) == ["CREDIT_NOTE"]
+    opened.assert_not_called()
+    db.close()
+
+
+def test_migration_backfills_facts_once(tmp_path, invoice_pdf):
+    path = str(tmp_path / "facts.db")
+    db = DatabaseManager(path)
+    repo = PhysicalRepository(db)
+    repo.save(PhysicalFile(uuid="f1", original_filename="invoice.pdf", file_path=str(invoice_pdf)))
+    repo.save(PhysicalFile(uuid="gone", original_filename="gone.pdf", file_path=str(tmp_path / "gone.pdf")))
+    with db._write() as conn:  # A vault from before the facts existed
+        conn.execute("UPDATE physical_files SET pdf_facts = NULL")
+        conn.execute("DELETE FROM app_meta WHERE key = ?", (DatabaseManager.PDF_FACTS_VERSION_KEY,))
+    db.close()
+
+    db = DatabaseManager(path)
+    repo = PhysicalRepository(db)
+    facts = repo.get_by_uuid("f1").pdf_facts
+    assert facts.page_count == 2 and facts.page_texts == {} and facts.zugferd_xml == CII_XML
+    assert repo.get_by_uuid("gone").pdf_facts is None
+    db.close()
+
+    # Same probe version: the next start does not probe again
+    with patch("core.database.probe_pdf") as probe:
+        DatabaseManager(path).close()
+    probe.assert_not_called()
@@ -19,44 +19,8 @@ def mock_pipeline():
     
     return pipeline
 
-@patch("subprocess.run")
-def test_native_pdf_detection(mock_subprocess, mock_pipeline):
-    """
-    Test that we detect native PDFs and extract text efficiently.
-    (This function _run_ocr -> extract_text needs refactoring to support mode switch)
-    """
-    # Create a dummy native PDF logic mock
-    # We haven't implemented _is_native_pdf yet. This test drives it.
-    
-    doc_path = Path("tests/resources/native.pdf") 
-    # We assume this path is handled by mocks, or we need real files? 
-    # Unit tests normally mock file IO, but detecting PDF nature requires reading bytes/structure.
-    # We can mock `pikepdf.Pdf.open` or similar.
-    
-    pass
-    # For now, let's test the interface exists
-    # assert hasattr(mock_pipeline, "_is_native_pdf")
-
-# Instead of complex mocking of simple properties, let's define the requirement via a test case 
-# that asserts the correct logic is CALLED.
-
-@patch("core.pipeline.pikepdf.Pdf") # Mocking pikepdf's Pdf class
-def test_is_native_pdf_simulated(mock_pdf_class, mock_pipeline):
-    # Simulate a PDF that has text
-    mock_pdf_instance = MagicMock()
-    mock_pdf_class.open.return_value.__enter__.return_value = mock_pdf_instance
-    
-    # Page 1 has text/images
-    # How to determine? 
-    # Logic: iterate pages, check /Font resources or extract text.
-    pass 
-
-# Let's focus on logic we can write: 
-# `_extract_text_native` vs `_run_ocr`.
-
 def test_pipeline_methods_exist(mock_pipeline):
     # We want these new methods
-    assert hasattr(mock_pipeline, "_is_native_pdf")
     assert hasattr(mock_pipeline, "_extract_text_native")
     assert hasattr(mock_pipeline, "merge_documents")
 
@@ -55,6 +55,26 @@ class TestMapField:
         assert "''" in expr  # single-quote escaped
 
 
+class TestMaterializedFields:
+    def test_default_builder_uses_json(self, qb):
+        assert "json_extract" in qb.map_field("sender")
+
+    def test_materialized_builder_uses_columns(self):
+        mqb = QueryBuilder(materialized=True)
+        for field, column in QueryBuilder.MATERIALIZED_FIELDS.items():
+            assert mqb.map_field(field) == column
+
+    def test_equivalent_semantic_path_uses_column(self):
+        mqb = QueryBuilder(materialized=True)
+        assert mqb.map_field("semantic:meta_header.doc_date") == "sem_doc_date"
+        assert mqb.map_field("semantic:meta_header.recipient.name").startswith("json_extract")
+
+    def test_generated_expression_guards_malformed_json(self):
+        expr = QueryBuilder.generated_column_expr("amount")
+        assert expr.startswith("CASE WHEN json_valid(semantic_data)")
+        assert "grand_total_amount" in expr
+
+
 # ── resolve_relative_date ──────────────────────────────────────────────────
 
 class TestResolveRelativeDate:
@@ -158,6 +178,15 @@ class TestMapOp:
         assert "json_each" in sql
         assert len(params) == 2
 
+    def test_contains_tag_index(self):
+        tqb = QueryBuilder(tag_index=True)
+        sql, params = tqb.map_op("tags", "contains", ["a", "b"])
+        assert "document_tags" in sql and "kind = 'user'" in sql
+        assert params == ["a", "b"]
+        sql, params = tqb.map_op("type_tags", "contains", "INVOICE")
+        assert "kind = 'type'" in sql
+        assert params == ["INVOICE"]
+
     def test_starts_with(self, qb):
         sql, params = qb.map_op("uuid", "starts_with", "abc")
         assert sql.endswith("LIKE ?")
@@ -311,3 +340,75 @@ class TestWorkflowStep:
         node = {"field": "workflow_step", "op": "equals", "value": "NEW", "negate": True}
         sql, params = qb.build_where(node)
         assert sql.startswith("NOT (")
+
+
+# ── Compiled query cache ──────────────────────────────────────────────────
+
+LEAF_VALUES = {
+    "equals":      ["ACME", "true", ["a", "b"], [], "LAST_MONTH", 0],
+    "contains":    ["inv", ["x", "y"], [], "2024-01-01,2024-02-01"],
+    "starts_with": ["A", "relative:-3d"],
+    "gt":          [10, "TODAY"],
+    "between":     [["2024-01-01", "2024-12-31"], "oops", ["only-one"]],
+    "in":          [["A", "B", "C"], [], "single", None],
+    "is_empty":    [None],
+}
+
+
+def all_leaves():
+    for field in ("sender", "tags", "type_tags", "amount", "semantic:meta_header.doc_date"):
+        for op, values in LEAF_VALUES.items():
+            for value in values:
+                yield {"field": field, "op": op, "value": value}
+    for op, value in (("is_not_empty", None), ("equals", "PAID"), ("in", ["PAID", "DONE"])):
+        yield {"field": "workflow_step", "op": op, "value": value}
+
+
+class TestCompiledQueryCache:
+    @pytest.mark.parametrize("materialized,tag_index", [(False, False), (True, True)])
+    def test_cached_templates_match_uncached_build(self, materialized, tag_index):
+        qb = QueryBuilder(materialized=materialized, tag_index=tag_index)
+        leaves = list(all_leaves())
+        nodes = leaves + [
+            {"operator": "OR", "conditions": leaves[i:i + 3] + [{"operator": "AND", "conditions": leaves[i + 3:i + 5]}]}
+            for i in range(0, len(leaves) - 5, 4)
+        ]
+        for node in nodes:
+            expected = qb._build_node(node)
+            assert qb.build_where(node) == expected  # miss
+            assert qb.build_where(node) == expected  # hit
+        stats = qb.cache_stats()
+        assert stats["hits"] + stats["misses"] == 2 * len(nodes)
+        assert stats["misses"] < len(nodes)  # Equal shapes share one template
+
+    def test_same_shape_shares_template(self, qb):
+        first = qb.build_where({"field": "sender", "op": "equals", "value": "ACME"})
+        second = qb.build_where({"field": "sender", "op": "equals", "value": "Globex"})
+        assert first[0] == second[0]
+        assert second[1] == ["Globex"]
+        assert qb.cache_stats() == {"hits": 1, "misses": 1, "size": 1}
+
+    def test_value_shape_changes_template(self, qb):
+        one = qb.build_where({"field": "status", "op": "in", "value": ["A"]})
+        two = qb.build_where({"field": "status", "op": "in", "value": ["A", "B"]})
+        empty = qb.build_where({"field": "status", "op": "in", "value": []})
+        assert len({one[0], two[0], empty[0]}) == 3
+        assert qb.cache_stats()["misses"] == 3
+
+    def test_cache_is_bounded_lru(self):
+        qb = QueryBuilder()
+        qb.CACHE_SIZE = 2
+        for field in ("status", "uuid", "status", "process_id"):
+            qb.build_where({"field": field, "op": "equals", "value": "x"})
+        assert qb.cache_stats() == {"hits": 1, "misses": 3, "size": 2}
+        qb.build_where({"field": "status", "op": "equals", "value": "x"})
+        assert qb.cache_stats()["hits"] == 2  # Most recently used entry survived
+
+    def test_relative_dates_resolved_per_call(self, qb):
+        node = {"field": "doc_date", "op": "equals", "value": "TODAY"}
+        qb.build_where(node)
+        with patch("core.query_builder.datetime") as mock_dt:
+            mock_dt.now.return_value.date.return_value = date(2030, 5, 17)
+            sql, params = qb.build_where(node)
+        assert params == ["2030-05-17"]
+        assert qb.cache_stats()["hits"] == 1
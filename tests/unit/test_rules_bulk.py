@@ -0,0 +1,106 @@
+import json
+from unittest.mock import patch
+
+import pytest
+
+from core.database import DatabaseManager
+from core.filter_tree import FilterNode, FilterTree, NodeType
+from core.repositories.logical_repo import LogicalRepository
+from core.rules_engine import RulesEngine
+
+DOCS = [
+    ("a", "ACME", '["inbox"]'),
+    ("b", "ACME", None),
+    ("c", "Globex", '["inbox", "todo"]'),
+    ("d", "Initech", None),
+    ("e", None, '["inbox"]'),
+]
+
+
+def make_db():
+    db = DatabaseManager(":memory:")
+    rows = []
+    for uuid, sender, tags in DOCS:
+        semantic = None
+        if sender:
+            semantic = json.dumps({"meta_header": {"sender": {"name": sender}}, "workflows": {}})
+        rows.append((uuid, semantic, tags))
+    with db._write() as conn:
+        conn.executemany(
+            "INSERT INTO virtual_documents (uuid, semantic_data, tags, cached_full_text) VALUES (?, ?, ?, '')", rows
+        )
+    return db
+
+
+def make_rules():
+    tag_acme = FilterNode("ACME", NodeType.FILTER, {"field": "sender", "op": "equals", "value": "ACME"})
+    tag_acme.tags_to_add = ["acme"]
+    done = FilterNode("Done", NodeType.FILTER, {"field": "tags", "op": "contains", "value": ["inbox"]})
+    done.tags_to_remove = ["inbox", "todo"]
+    done.tags_to_add = ["filed"]
+    flow = FilterNode("Flow", NodeType.FILTER, {"field": "sender", "op": "equals", "value": "Globex"})
+    flow.assign_workflow = "review_flow"
+    return [tag_acme, done, flow]
+
+
+def snapshot(db):
+    repo = LogicalRepository(db)
+    result = {}
+    for uuid, _, _ in DOCS:
+        doc = repo.get_by_uuid(uuid)
+        workflows = sorted(doc.semantic_data.workflows) if doc.semantic_data else []
+        result[uuid] = (sorted(doc.tags), workflows)
+    return result
+
+
+def test_bulk_matches_per_document_evaluation():
+    per_doc_db, bulk_db = make_db(), make_db()
+    uuids = [uuid for uuid, _, _ in DOCS]
+
+    engine = RulesEngine(per_doc_db, FilterTree())
+    repo = LogicalRepository(per_doc_db)
+    expected_modified = 0
+    for uuid in uuids:
+        doc = repo.get_by_uuid(uuid)
+        if engine.apply_rules_to_entity(doc, make_rules()):
+            repo.save(doc)
+            expected_modified += 1
+
+    modified = RulesEngine(bulk_db, FilterTree()).apply_rules_bulk(uuids, make_rules())
+
+    assert modified == expected_modified == 4
+    assert snapshot(bulk_db) == snapshot(per_doc_db)
+    assert snapshot(bulk_db)["c"] == (["filed"], ["review_flow"])
+    # The tag junction table follows the bulk write
+    assert per_doc_db.get_all_tags_with_counts() == bulk_db.get_all_tags_with_counts()
+
+
+def test_bulk_runs_one_query_per_rule_and_chunk():
+    db = make_db()
+    engine = RulesEngine(db, FilterTree())
+    engine.BULK_CHUNK_SIZE = 2
+    progress = []
+
+    with patch.object(db, "filter_matching_uuids", wraps=db.filter_matching_uuids) as spy:
+        engine.apply_rules_bulk([u for u, _, _ in DOCS], make_rules(), progress_callback=lambda c, t: progress.append(c))
+
+    assert spy.call_count == 3 * 3  # 3 rules x 3 chunks
+    assert progress == [2, 4, 5]
+    assert db.matches_condition("a", {"field": "tags", "op": "contains", "value": ["acme"]})
+
+
+def test_bulk_unchanged_documents_are_not_written():
+    db = make_db()
+    rule = FilterNode("Noop", NodeType.FILTER, {"field": "sender", "op": "equals", "value": "Initech"})
+    rule.tags_to_remove = ["missing"]
+    with patch.object(db, "_write", wraps=db._write) as write:
+        assert RulesEngine(db, FilterTree()).apply_rules_bulk(["d"], [rule]) == 0
+    write.assert_not_called()
+
+
+def test_filter_matching_uuids():
+    db = make_db()
+    query = {"field": "sender", "op": "equals", "value": "ACME"}
+    assert db.filter_matching_uuids(["a", "c", "d"], query) == {"a"}
+    assert db.filter_matching_uuids(["a", "c"], {}) == {"a", "c"}
+    assert db.filter_matching_uuids([], query) == set()
@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+from core.database import DatabaseManager
+
+
+def semantic(sender, doc_date, amount, direction="INBOUND"):
+    return json.dumps({
+        "direction": direction,
+        "meta_header": {"sender": {"name": sender}, "doc_date": doc_date},
+        "bodies": {"finance_body": {"monetary_summation": {"grand_total_amount": amount}}},
+    })
+
+
+@pytest.fixture
+def db():
+    db = DatabaseManager(":memory:")
+    rows = [
+        ("a", semantic("ACME", "2024-01-10", "100.50")),
+        ("b", semantic("Globex", "2024-02-01", "20")),
+        ("c", semantic("ACME", "2024-03-05", "7.25", "OUTBOUND")),
+        ("d", "{not json"),
+        ("e", None),
+    ]
+    with db._write() as conn:
+        conn.executemany("INSERT INTO virtual_documents (uuid, semantic_data, cached_full_text) VALUES (?, ?, '')", rows)
+    yield db
+    db.close()
+
+
+def test_generated_columns_mirror_semantic_data(db):
+    rows = db.connection.execute(
+        "SELECT uuid, sem_sender, sem_doc_date, sem_amount, sem_direction FROM virtual_documents ORDER BY uuid"
+    ).fetchall()
+    assert [tuple(r) for r in rows] == [
+        ("a", "ACME", "2024-01-10", 100.5, "INBOUND"),
+        ("b", "Globex", "2024-02-01", 20.0, "INBOUND"),
+        ("c", "ACME", "2024-03-05", 7.25, "OUTBOUND"),
+        ("d", None, None, None, None),
+        ("e", None, None, None, None),
+    ]
+
+
+def test_generated_columns_follow_updates(db):
+    with db._write() as conn:
+        conn.execute("UPDATE virtual_documents SET semantic_data = ? WHERE uuid = 'b'", (semantic("Initech", "2024-02-01", "99"),))
+    assert db.count_documents_advanced({"field": "sender", "op": "equals", "value": "initech"}) == 1
+    assert db.sum_documents_advanced({"field": "sender", "op": "equals", "value": "Initech"}) == 99.0
+
+
+def test_advanced_queries_use_materialized_columns(db):
+    query = {"operator": "AND", "conditions": [
+        {"field": "sender", "op": "equals", "value": "ACME"},
+        {"field": "direction", "op": "equals", "value": "INBOUND"},
+    ]}
+    assert [d.uuid for d in db.search_documents_advanced(query)] == ["a"]
+    assert db.sum_documents_advanced({"field": "amount", "op": "gt", "value": 10}) == pytest.approx(120.5)
+
+    where, params = db._qb.build_where({"field": "amount", "op": "gt", "value": 10})
+    plan = " ".join(r[3] for r in db.connection.execute(
+        f"EXPLAIN QUERY PLAN SELECT uuid FROM virtual_documents WHERE {where}", params).fetchall())
+    assert "idx_virtual_documents_sem_amount" in plan
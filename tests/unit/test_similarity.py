@@ -1,6 +1,6 @@
 
 import pytest
-from core.similarity import SimilarityManager
+from core.similarity import SimilarityManager, compute_file_page_hashes
 from core.models.virtual import VirtualDocument as Document
 from core.models.semantic import SemanticExtraction, MetaHeader, FinanceBody, MonetarySummation
 from core.database import DatabaseManager
@@ -110,3 +110,90 @@ def test_find_duplicates(mock_db):
     assert len(duplicates) == 1
     assert duplicates[0][0].uuid == "1"
     assert duplicates[0][1].uuid == "2"
+
+def test_find_duplicates_matches_exhaustive_scan(mock_db):
+    # Blocking must not lose any pair the all-pairs scan would report
+    import random
+    rng = random.Random(7)
+    vocab = [f"word{i}" for i in range(400)]
+    docs = []
+    for i in range(60):
+        words = rng.sample(vocab, 40)
+        docs.append(Document(uuid=f"{i}-a", original_filename="a.pdf", text_content=" ".join(words)))
+        if i % 3 == 0:
+            # Near-duplicate: two words replaced
+            near = words[:-2] + ["extra1", "extra2"]
+            docs.append(Document(uuid=f"{i}-b", original_filename="b.pdf", text_content=" ".join(near)))
+    mock_db.get_all_entities_view.return_value = docs
+
+    manager = SimilarityManager(mock_db)
+    duplicates = manager.find_duplicates(threshold=0.8)
+
+    expected = []
+    for i in range(len(docs)):
+        for j in range(i + 1, len(docs)):
+            score = manager.calculate_similarity(docs[i], docs[j])
+            if score >= 0.8:
+                expected.append((docs[i].uuid, docs[j].uuid))
+
+    assert len(expected) == 20
+    assert [(a.uuid, b.uuid) for a, b, _ in duplicates] == expected
+
+def test_candidate_pairs_skip_metadata_vetoes():
+    same_text = "invoice amazon delivery items"
+    doc_a = Document(uuid="a", original_filename="a.pdf", text_content=same_text,
+                     semantic_data=SemanticExtraction(meta_header=MetaHeader(doc_date="2024-01-01")))
+    doc_b = Document(uuid="b", original_filename="b.pdf", text_content=same_text,
+                     semantic_data=SemanticExtraction(meta_header=MetaHeader(doc_date="2024-02-01")))
+    doc_c = Document(uuid="c", original_filename="c.pdf", text_content=same_text)
+
+    manager = SimilarityManager(None)
+    pairs = manager._generate_candidate_pairs([doc_a, doc_b, doc_c], threshold=0.85)
+
+    # a/b differ in date (veto); the undated c pairs with both
+    assert pairs == [(0, 2), (1, 2)]
+
+def test_candidate_pairs_exhaustive_for_degenerate_threshold():
+    docs = [Document(uuid=str(i), original_filename="x.pdf", text_content=f"t{i}") for i in range(4)]
+    manager = SimilarityManager(None)
+    assert len(manager._generate_candidate_pairs(docs, threshold=0.0)) == 6
+
+def test_find_duplicates_pairs_visual_twins_across_text(mock_db):
+    # A digital original, its text-less scan and a scan with diverging OCR
+    # text only match visually; blocking must still pair all three.
+    import random
+    from unittest.mock import patch
+    rng = random.Random(3)
+    base = rng.getrandbits(64)
+    hashes = {
+        "digital": [(base, 200)],
+        "scan": [(base ^ 0b101, 200)],
+        "ocr-scan": [(base ^ (1 << 40) ^ (1 << 63), 200)],
+    }
+    docs = [
+        Document(uuid="digital", original_filename="a.pdf", text_content="rechnung nummer 4711 betrag"),
+        Document(uuid="scan", original_filename="b.pdf", text_content=""),
+        Document(uuid="ocr-scan", original_filename="c.pdf", text_content="rcchnuug nurnmer 47l1 bctrag"),
+    ]
+    for i in range(30):
+        hashes[f"other-{i}"] = [(rng.getrandbits(64), 200)]
+        docs.append(Document(uuid=f"other-{i}", original_filename="x.pdf", text_content=f"unrelated {i}"))
+    mock_db.get_all_entities_view.return_value = docs
+
+    manager = SimilarityManager(mock_db, vault=MagicMock())
+    with patch.object(SimilarityManager, "_get_page_hashes", lambda self, doc: hashes[doc.uuid]):
+        duplicates = manager.find_duplicates(threshold=0.85)
+        expected = [
+            (a.uuid, b.uuid) for i, a in enumerate(docs) for b in docs[i + 1:]
+            if manager.calculate_similarity(a, b) >= 0.85
+        ]
+
+    assert len(expected) == 3
+    assert [(a.uuid, b.uuid) for a, b, _ in duplicates] == expected
+
+
+def test_page_hashes_of_unreadable_files_are_empty(tmp_path):
+    junk = tmp_path / "junk.pdf"
+    junk.write_bytes(b"not a pdf")
+    assert compute_file_page_hashes(str(junk)) == {}
+    assert compute_file_page_hashes(str(tmp_path / "missing.pdf")) == {}
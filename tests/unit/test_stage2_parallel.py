@@ -0,0 +1,65 @@
+import threading
+from unittest.mock import MagicMock
+
+from core.ai import prompts as prompts_module
+from core.ai.stage2 import Stage2Processor
+
+
+def make_processor(generate_json):
+    config = MagicMock()
+    config.get_ai_retries.return_value = 0
+    config.get_private_profile_json.return_value = "{}"
+    config.get_business_profile_json.return_value = "{}"
+    client = MagicMock()
+    client.generate_json.side_effect = generate_json
+    return Stage2Processor(client, config)
+
+
+RESPONSES = {
+    "INVOICE": {
+        "meta_header": {"doc_number": "R-1"},
+        "bodies": {"finance_body": {"currency": "EUR"}},
+        "repaired_text": "short",
+        "ai_confidence": 0.9,
+        "type_tags": ["INVOICE"],
+    },
+    "DELIVERY_NOTE": {
+        "meta_header": {"doc_number": "L-7", "doc_date": "2025-01-15"},
+        "bodies": {"other_body": {"note": "3 boxes"}},
+        "repaired_text": "",
+        "ai_confidence": 0.7,
+        "type_tags": ["DELIVERY_NOTE"],
+    },
+}
+
+
+def test_entity_types_are_extracted_concurrently_and_merged_in_order():
+    barrier = threading.Barrier(2, timeout=5)  # Breaks unless both requests run at once
+    prompts = {}
+
+    def generate_json(prompt, stage_label, images, validate=None):
+        entity_type = stage_label.split(": ")[1]
+        prompts[entity_type] = prompt
+        barrier.wait()
+        return RESPONSES[entity_type]
+
+    proc = make_processor(generate_json)
+    stage_1 = {"detected_entities": [{"type_tags": ["INBOUND", "INVOICE", "DELIVERY_NOTE", "INVOICE"]}]}
+    result = proc.run_stage_2(["Rechnung und Lieferschein"], stage_1, {})
+
+    assert proc.client.generate_json.call_count == 2
+    assert result["meta_header"] == {"doc_number": "R-1", "doc_date": "2025-01-15"}  # First type wins
+    assert result["bodies"] == {"finance_body": {"currency": "EUR"}, "other_body": {"note": "3 boxes"}}
+    assert result["type_tags"] == ["INVOICE", "DELIVERY_NOTE"]
+    assert result["ai_confidence"] == 0.7
+    assert result["repaired_text"] == "short"
+    # Only the first type carries the repair mission; both share the document context
+    repair = prompts_module.PROMPT_STAGE_2_REPAIR_INSTRUCTION.format(long_doc_hint="")
+    assert repair in prompts["INVOICE"] and repair not in prompts["DELIVERY_NOTE"]
+    assert "Rechnung und Lieferschein" in prompts["DELIVERY_NOTE"]
+
+
+def test_failure_of_any_type_fails_the_document():
+    proc = make_processor(lambda prompt, stage_label, images: None if "INVOICE" in stage_label else RESPONSES["DELIVERY_NOTE"])
+    stage_1 = {"detected_entities": [{"type_tags": ["DELIVERY_NOTE", "INVOICE"]}]}
+    assert proc.run_stage_2(["text"], stage_1, {}) is None
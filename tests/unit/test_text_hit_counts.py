@@ -0,0 +1,131 @@
+from unittest.mock import patch
+
+import pytest
+
+from core.database import DatabaseManager
+
+
+def insert(db, uuid, text, deleted=0):
+    with db._write() as conn:
+        conn.execute(
+            "INSERT INTO virtual_documents (uuid, cached_full_text, deleted) VALUES (?, ?, ?)",
+            (uuid, text, deleted),
+        )
+
+
+@pytest.fixture
+def db():
+    db = DatabaseManager(":memory:")
+    insert(db, "a", "Rechnung Nr. 1\nRECHNUNGSBETRAG: 100 EUR\nMüller GmbH, Rechnungsadresse")
+    insert(db, "b", "Lieferschein MÜLLER, keine rechnung")
+    insert(db, "c", "aaaaaaa")
+    insert(db, "trash", "Rechnung", deleted=1)
+    yield db
+    db.close()
+
+
+def legacy_counts(db, uuids, text):
+    """Reference: the LOWER/REPLACE arithmetic the index replaces."""
+    sql = "SELECT uuid, (LENGTH(cached_full_text) - LENGTH(REPLACE(LOWER(cached_full_text), ?, ''))) / ? FROM virtual_documents"
+    rows = db.connection.execute(sql, (text.lower(), len(text))).fetchall()
+    return {uuid: count for uuid, count in rows if uuid in uuids}
+
+
+@pytest.mark.parametrize("text", ["rechnung", "Rechnungs", "aaa", "aa", ", ", "nr. 1\nrech", "xyz"])
+def test_counts_match_full_text_arithmetic(db, text):
+    uuids = ["a", "b", "c"]
+    assert db.get_hit_counts_for_documents(uuids, text) == legacy_counts(db, uuids, text)
+
+
+def test_counts_use_the_index(db):
+    with db._write() as conn:  # Change the full text behind the index' back
+        conn.execute("DROP TRIGGER virtual_documents_text_au")
+        conn.execute("UPDATE virtual_documents SET cached_full_text = '' WHERE uuid = 'b'")
+    assert db.get_hit_counts_for_documents(["b"], "rechnung") == {"b": 1}
+    assert db.get_hit_counts_for_documents(["b"], "re") == {"b": 0}  # Too short: full text
+
+    # Unicode case folding, which LOWER() does not do
+    insert(db, "d", "Herr MÜLLER")
+    assert db.get_hit_counts_for_documents(["a", "d"], "müller") == {"a": 1, "d": 1}
+
+
+def test_index_follows_document_writes(db):
+    db.update_document_metadata("c", {"cached_full_text": "Rechnung"})
+    with db._write() as conn:
+        conn.execute("INSERT OR REPLACE INTO virtual_documents (uuid, cached_full_text) VALUES ('a', 'rechnung rechnung')")
+        conn.execute("DELETE FROM virtual_documents WHERE uuid = 'b'")
+    assert db._text_hit_counts("rechnung") == {"a": 2, "c": 1, "trash": 1}
+
+
+def test_total_occurrences_respect_query(db):
+    query = {"operator": "AND", "conditions": []}
+    assert db.count_total_text_occurrences_advanced(query, "rechnung") == 4
+    assert db.count_total_text_occurrences_advanced(query, "aa") == 3
+    assert db.count_total_text_occurrences_advanced(query, "") == 0
+
+
+def test_index_survives_vacuum(tmp_path):
+    db = DatabaseManager(str(tmp_path / "vacuum.db"))
+    for i in range(20):
+        insert(db, f"doc{i}", f"Rechnung {i}")
+    with db._write() as conn:
+        conn.execute("DELETE FROM virtual_documents WHERE uuid IN ('doc0', 'doc1', 'doc2')")
+    db.connection.execute("VACUUM")
+    db.update_document_metadata("doc10", {"cached_full_text": "Rechnung, Rechnung"})
+
+    counts = db._text_hit_counts("rechnung")
+    assert set(counts) == {f"doc{i}" for i in range(3, 20)}
+    assert counts["doc10"] == 2 and counts["doc11"] == 1
+    # Raises if the index does not match its content table
+    db.connection.execute("INSERT INTO virtual_documents_text_fts(virtual_documents_text_fts) VALUES ('integrity-check')")
+    db.close()
+
+
+def test_rowid_keyed_index_is_migrated(tmp_path):
+    path = str(tmp_path / "legacy.db")
+    db = DatabaseManager(path)
+    insert(db, "a", "Rechnung Rechnung")
+    with db._write() as conn:  # The first, rowid-keyed schema
+        for name in ("ai", "au", "ad", "fts_ai", "fts_au", "fts_ad"):
+            conn.execute(f"DROP TRIGGER virtual_documents_text_{name}")
+        conn.execute("DROP TABLE virtual_documents_text_fts")
+        conn.execute("DROP TABLE virtual_documents_text")
+        conn.execute("CREATE VIRTUAL TABLE virtual_documents_text_fts USING fts5(uuid UNINDEXED, text, tokenize='trigram')")
+        conn.execute("CREATE VIRTUAL TABLE virtual_documents_text_vocab USING fts5vocab(virtual_documents_text_fts, instance)")
+    db.close()
+
+    db = DatabaseManager(path)
+    assert not db._table_exists("virtual_documents_text_vocab")
+    assert db._text_hit_counts("rechnung") == {"a": 2}
+    db.close()
+
+
+def test_counts_without_trigram_tokenizer(tmp_path):
+    path = str(tmp_path / "old_sqlite.db")
+    db = DatabaseManager(path)
+    insert(db, "a", "Rechnung Rechnung")
+    db.close()
+
+    # SQLite < 3.34: the vault opens and counts come from the full text
+    with patch.object(DatabaseManager, "_trigram_available", return_value=False):
+        db = DatabaseManager(path)
+        assert db._text_hit_counts("rechnung") is None
+        insert(db, "b", "Rechnung")
+        assert db.get_hit_counts_for_documents(["a", "b"], "rechnung") == {"a": 2, "b": 1}
+        assert db.count_total_text_occurrences_advanced({"operator": "AND", "conditions": []}, "rechnung") == 3
+        db.close()
+
+    # Back on a current SQLite the index catches up with the texts written meanwhile
+    db = DatabaseManager(path)
+    assert db._text_hit_counts("rechnung") == {"a": 2, "b": 1}
+    db.connection.execute("INSERT INTO virtual_documents_text_fts(virtual_documents_text_fts) VALUES ('integrity-check')")
+    db.close()
+
+
+def test_new_vault_without_trigram_tokenizer():
+    with patch.object(DatabaseManager, "_trigram_available", return_value=False):
+        db = DatabaseManager(":memory:")
+    assert not db._table_exists("virtual_documents_text_fts")
+    insert(db, "a", "Rechnung")
+    assert db.get_hit_counts_for_documents(["a"], "rechnung") == {"a": 1}
+    db.close()
@@ -79,3 +79,38 @@ def test_visual_similarity_different(mock_db, mock_vault, mock_exists):
         
         score = manager.calculate_visual_similarity(doc_a, doc_b)
         assert score == 0.0
+
+def test_page_hash_distinguishes_structure():
+    from core.similarity import compute_page_hash
+    left_dark = Image.new('L', (64, 80), color=255)
+    left_dark.paste(0, (0, 0, 32, 80))
+    right_dark = Image.new('L', (64, 80), color=255)
+    right_dark.paste(0, (32, 0, 64, 80))
+
+    hash_l = compute_page_hash(left_dark)
+    hash_r = compute_page_hash(right_dark)
+    assert hash_l == compute_page_hash(left_dark.copy())
+    assert hash_l[1] == hash_r[1]  # Same brightness
+    assert SimilarityManager._compare_page_hashes(hash_l, hash_r) < 0.9
+
+def test_page_hashes_are_persisted_and_reused(mock_vault, mock_exists):
+    from core.database import DatabaseManager
+    db = DatabaseManager(":memory:")
+    doc_a = Document(uuid="a", original_filename="a.pdf")
+    doc_b = Document(uuid="b", original_filename="b.pdf")
+
+    with patch('core.similarity.convert_from_path') as mock_convert:
+        mock_convert.return_value = [Image.new('L', (64, 80), color=128)]
+        assert SimilarityManager(db, mock_vault).calculate_visual_similarity(doc_a, doc_b) == 1.0
+        assert mock_convert.call_count == 2
+
+        # A new scan (fresh manager) must not re-rasterize
+        assert SimilarityManager(db, mock_vault).calculate_visual_similarity(doc_a, doc_b) == 1.0
+        assert mock_convert.call_count == 2
+
+        # Invalidation (e.g. after stamping) forces a recompute of that file only
+        db.page_hash_repo.invalidate("a")
+        SimilarityManager(db, mock_vault).calculate_visual_similarity(doc_a, doc_b)
+        assert mock_convert.call_count == 3
+
+    assert set(db.page_hash_repo.get_hashes("b")) == {1}
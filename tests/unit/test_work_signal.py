@@ -0,0 +1,88 @@
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+from core.database import DatabaseManager
+from core.models.virtual import SourceReference, VirtualDocument
+from core.pipeline import PipelineProcessor
+from core.vault import DocumentVault
+from core.work_signal import WorkSignal, pipeline_work_signal
+
+
+def test_notify_before_wait_is_not_lost():
+    signal = WorkSignal()
+    signal.notify()
+    assert signal.wait(0.01) is True
+    # Flag is consumed by the first wait
+    assert signal.wait(0.01) is False
+
+
+def test_wait_wakes_on_notify_from_other_thread():
+    signal = WorkSignal()
+    timer = threading.Timer(0.05, signal.notify)
+    timer.start()
+    start = time.perf_counter()
+    assert signal.wait(5.0) is True
+    assert time.perf_counter() - start < 1.0
+
+
+def test_queue_and_reset_notify_pipeline():
+    db = DatabaseManager(":memory:")
+    pipeline_work_signal.wait(0)  # Drain
+
+    db.queue_for_semantic_extraction(["missing"])
+    assert pipeline_work_signal.wait(0) is True
+
+    db.reset_document_for_reanalysis("missing")
+    assert pipeline_work_signal.wait(0) is True
+
+
+def test_split_and_restructure_notify_pipeline(tmp_path):
+    db = DatabaseManager(":memory:")
+    pipeline = PipelineProcessor(vault=DocumentVault(tmp_path / "vault"), db=db)
+    pipeline.logical_repo.save(VirtualDocument(
+        uuid="doc", source_mapping=[SourceReference(file_uuid="file", pages=[1, 2, 3])]))
+
+    with patch("core.pipeline.notify_pipeline_work") as notify:
+        pipeline.split_entity("doc", 0)
+        assert notify.call_count == 1
+
+        pipeline.restructure_file("file", [[{"page": 1}], [{"page": 2}, {"page": 3}]])
+        assert notify.call_count == 2
+    assert [d.status for d in pipeline.logical_repo.get_by_source_file("file")] == ["READY_FOR_PIPELINE"] * 2
+    db.close()
+
+
+def test_main_loop_wakes_immediately_on_new_work():
+    from gui.workers import MainLoopWorker
+
+    pipeline = MagicMock()
+    pending = {"count": 0}
+    pipeline.db.get_pending_pipeline_count.side_effect = lambda: pending["count"]
+    processed = threading.Event()
+
+    with patch("gui.workers.CanonizerService") as canonizer_cls:
+        canonizer = canonizer_cls.return_value
+        canonizer.config.get_pipeline_concurrency.return_value = 1
+
+        def process(limit, max_workers):
+            pending["count"] = 0
+            processed.set()
+            return 1
+
+        canonizer.process_pending_documents.side_effect = process
+        worker = MainLoopWorker(pipeline, filter_tree=None)
+
+    worker.start()
+    try:
+        time.sleep(0.2)  # Let the loop settle into its idle wait
+        assert pipeline.db.get_pending_pipeline_count.call_count == 1
+
+        pending["count"] = 1
+        start = time.perf_counter()
+        pipeline_work_signal.notify()
+        assert processed.wait(2.0)
+        assert time.perf_counter() - start < 1.0
+    finally:
+        worker.stop()
+        assert worker.wait(2000)
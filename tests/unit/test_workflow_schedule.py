@@ -0,0 +1,174 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from core.database import DatabaseManager
+from core.workflow import (
+    WorkflowCondition,
+    WorkflowRule,
+    WorkflowRuleRegistry,
+    WorkflowState,
+    WorkflowTransition,
+)
+from core.workflow_scheduler import WorkflowScheduler
+
+
+def make_rule(*conditions, rule_id="remind"):
+    return WorkflowRule(
+        id=rule_id,
+        states={
+            "OPEN": WorkflowState(transitions=[
+                WorkflowTransition(action="escalate", target="LATE", auto=True, conditions=list(conditions)),
+            ]),
+            "LATE": WorkflowState(final=True),
+        },
+    )
+
+
+def semantic(entered_at, due_date=None, step="OPEN"):
+    data = {"workflows": {"remind": {"rule_id": "remind", "current_step": step,
+                                     "current_step_entered_at": entered_at}}}
+    if due_date:
+        data["bodies"] = {"finance_body": {"due_date": due_date}}
+    return json.dumps(data)
+
+
+@pytest.fixture
+def registry():
+    reg = WorkflowRuleRegistry()
+    saved = dict(reg.rules)
+    reg.rules.clear()
+    yield reg
+    reg.rules.clear()
+    reg.rules.update(saved)
+
+
+@pytest.fixture
+def db():
+    db = DatabaseManager(":memory:")
+    yield db
+    db.close()
+
+
+def schedule_rows(db):
+    return dict(db.connection.execute(
+        "SELECT document_uuid || ':' || rule_id, next_eval_at FROM workflow_schedule").fetchall())
+
+
+def insert(db, uuid, semantic_data):
+    with db._write() as conn:
+        conn.execute(
+            "INSERT INTO virtual_documents (uuid, semantic_data, cached_full_text) VALUES (?, ?, '')",
+            (uuid, semantic_data),
+        )
+
+
+def test_triggers_mark_workflows_due(db):
+    insert(db, "a", semantic("2024-01-01T00:00:00"))
+    insert(db, "b", json.dumps({"workflows": {}}))
+    assert schedule_rows(db) == {"a:remind": ""}
+
+    db.set_workflow_schedule("a", {"remind": "2999-01-01T00:00:00"})
+    assert db.get_due_workflow_documents("2024-06-01T00:00:00") == []
+
+    # Unrelated updates keep the schedule, workflow-relevant ones reset it
+    db.update_document_metadata("a", {"last_used": "2024-05-01"})
+    assert schedule_rows(db) == {"a:remind": "2999-01-01T00:00:00"}
+    db.update_document_metadata("a", {"type_tags": ["INVOICE"]})
+    assert [d.uuid for d in db.get_due_workflow_documents("2024-06-01T00:00:00")] == ["a"]
+
+    with db._write() as conn:
+        conn.execute("DELETE FROM virtual_documents WHERE uuid = 'a'")
+    assert schedule_rows(db) == {}
+
+
+def test_scheduler_processes_only_due_documents(db, registry):
+    registry.rules["remind"] = make_rule(WorkflowCondition(field="DAYS_IN_STATE", op=">", value=3))
+    now = datetime.now()
+    entered_late = (now - timedelta(days=10)).isoformat(timespec="seconds")
+    entered_fresh = (now - timedelta(days=1, hours=2)).isoformat(timespec="seconds")
+    insert(db, "late", semantic(entered_late))
+    insert(db, "fresh", semantic(entered_fresh))
+
+    scheduler = WorkflowScheduler(db, interval_minutes=15)
+    applied = []
+    scheduler.transitions_applied.connect(applied.append)
+    scheduler._run()
+
+    assert applied == [1]
+    rows = schedule_rows(db)
+    assert rows["late:remind"] is None  # Final state: nothing left to fire
+    # DAYS_IN_STATE > 3 first holds 4 days after entering the state
+    expected = datetime.fromisoformat(entered_fresh) + timedelta(days=4)
+    assert rows["fresh:remind"] == expected.isoformat(timespec="seconds")
+
+    # Nothing is due on the next run
+    scheduler._run()
+    assert applied == [1, 0]
+    assert db.get_due_workflow_documents(now.isoformat(timespec="seconds")) == []
+
+
+def test_next_evaluation_for_due_dates(registry):
+    now = datetime(2024, 3, 1, 12, 0)
+    rule = make_rule(WorkflowCondition(field="DAYS_UNTIL_DUE", op="<=", value=2))
+    nxt = WorkflowScheduler._next_evaluation(rule, "OPEN", {"DAYS_UNTIL_DUE": 9}, None, now)
+    assert nxt == datetime(2024, 3, 8)
+    assert WorkflowScheduler._next_evaluation(rule, "OPEN", {"DAYS_UNTIL_DUE": 1}, None, now) == now
+
+    # Window already passed: DAYS_UNTIL_DUE only decreases
+    late = make_rule(WorkflowCondition(field="DAYS_UNTIL_DUE", op=">", value=5))
+    assert WorkflowScheduler._next_evaluation(late, "OPEN", {"DAYS_UNTIL_DUE": 5}, None, now) is None
+
+    exact = make_rule(WorkflowCondition(field="AGE_DAYS", op="=", value="30"))
+    assert WorkflowScheduler._next_evaluation(exact, "OPEN", {"AGE_DAYS": 28}, None, now) == datetime(2024, 3, 3)
+    assert WorkflowScheduler._next_evaluation(exact, "OPEN", {"AGE_DAYS": 31}, None, now) is None
+
+
+def test_static_conditions_block_schedule(registry):
+    now = datetime(2024, 3, 1, 12, 0)
+    rule = make_rule(
+        WorkflowCondition(field="total_gross", op=">", value=100),
+        WorkflowCondition(field="AGE_DAYS", op=">", value=5),
+    )
+    assert WorkflowScheduler._next_evaluation(rule, "OPEN", {"total_gross": 50, "AGE_DAYS": 0}, None, now) is None
+    assert WorkflowScheduler._next_evaluation(
+        rule, "OPEN", {"total_gross": 500, "AGE_DAYS": 0}, None, now) == datetime(2024, 3, 7)
+    # Without an entry timestamp DAYS_IN_STATE stays 0
+    stuck = make_rule(WorkflowCondition(field="DAYS_IN_STATE", op=">=", value=1))
+    assert WorkflowScheduler._next_evaluation(stuck, "OPEN", {"DAYS_IN_STATE": 0}, None, now) is None
+
+
+def test_rule_change_resets_schedule(db, registry):
+    registry.rules["remind"] = make_rule(WorkflowCondition(field="DAYS_IN_STATE", op=">", value=300))
+    insert(db, "a", semantic(datetime.now().isoformat(timespec="seconds")))
+    scheduler = WorkflowScheduler(db, interval_minutes=15)
+    scheduler._run()
+    assert schedule_rows(db)["a:remind"] > datetime.now().isoformat()
+
+    registry.rules["remind"] = make_rule(WorkflowCondition(field="DAYS_IN_STATE", op=">=", value=0))
+    scheduler._run()
+    assert db.get_document_by_uuid("a").semantic_data.workflows["remind"].current_step == "LATE"
+
+
+def test_rule_change_between_sessions_resets_schedule(tmp_path, registry):
+    path = str(tmp_path / "sessions.db")
+    registry.rules["remind"] = make_rule(WorkflowCondition(field="DAYS_IN_STATE", op=">", value=300))
+    db = DatabaseManager(path)
+    insert(db, "a", semantic(datetime.now().isoformat(timespec="seconds")))
+    WorkflowScheduler(db, interval_minutes=15)._run()
+    db.close()
+
+    # Same rules in the next session: the stored schedule stays valid
+    db = DatabaseManager(path)
+    scheduled = schedule_rows(db)["a:remind"]
+    WorkflowScheduler(db, interval_minutes=15)._run()
+    assert schedule_rows(db)["a:remind"] == scheduled > datetime.now().isoformat()
+    db.close()
+
+    # Rules edited between sessions: the first run re-evaluates everything
+    registry.rules["remind"] = make_rule(WorkflowCondition(field="DAYS_IN_STATE", op=">=", value=0))
+    db = DatabaseManager(path)
+    WorkflowScheduler(db, interval_minutes=15)._run()
+    assert db.get_document_by_uuid("a").semantic_data.workflows["remind"].current_step == "LATE"
+    db.close()
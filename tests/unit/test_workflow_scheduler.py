@@ -90,7 +90,7 @@ def _make_registry(rule: WorkflowRule) -> WorkflowRuleRegistry:
 def _make_scheduler(docs: list, save_raises: bool = False) -> WorkflowScheduler:
     """Return a WorkflowScheduler backed by a mock db_manager."""
     mock_db = MagicMock()
-    mock_db.search_documents_advanced.return_value = docs
+    mock_db.get_due_workflow_documents.return_value = docs
     if save_raises:
         mock_db.update_document_metadata.side_effect = RuntimeError("DB down")
     return WorkflowScheduler(mock_db, interval_minutes=15)
@@ -2,7 +2,7 @@
 ------------------------------------------------------------------------------
 Project:        KPaperFlux
 File:           tests/unit/test_zugferd_stage05.py
-Version:        1.0.0
+Version:        1.0.1
 Producer:       thorsten.schnebeck@gmx.net
 Generator:      Claude Sonnet 4.6
 Description:    Unit tests for ZUGFeRD Stage 0.5 native injection.
@@ -15,6 +15,11 @@ Description:    Unit tests for ZUGFeRD Stage 0.5 native injection.
 from unittest.mock import MagicMock, patch
 import pytest
 
+from core.models.physical import PdfFacts
+
+# Facts of a PDF with embedded XML (content is parsed by the patched extractor)
+PDF_FACTS = PdfFacts(page_count=1, zugferd_xml=b"<rsm:CrossIndustryInvoice/>")
+
 
 # ---------------------------------------------------------------------------
 # Fixture helpers
@@ -85,13 +90,14 @@ class TestZugferdStage05NativeInjection:
         stage_1_result = {"detected_entities": [{"type_tags": ["INVOICE"]}]}
         stage_1_5_result = {}
 
-        with patch("core.utils.zugferd_extractor.ZugferdExtractor.extract_from_pdf",
+        with patch("core.utils.zugferd_extractor.ZugferdExtractor.extract_from_xml",
                    return_value=zugferd_data):
             result = proc.run_stage_2(
                 raw_ocr_pages=["Rechnung INV-2025-001"],
                 stage_1_result=stage_1_result,
                 stage_1_5_result=stage_1_5_result,
                 pdf_path="/tmp/test.pdf",
+                pdf_facts=PDF_FACTS,
             )
 
         proc.client.generate_json.assert_not_called()
@@ -104,13 +110,14 @@ class TestZugferdStage05NativeInjection:
 
         stage_1_result = {"detected_entities": [{"type_tags": ["INVOICE"]}]}
 
-        with patch("core.utils.zugferd_extractor.ZugferdExtractor.extract_from_pdf",
+        with patch("core.utils.zugferd_extractor.ZugferdExtractor.extract_from_xml",
                    return_value=zugferd_data):
             result = proc.run_stage_2(
                 raw_ocr_pages=["Rechnung"],
                 stage_1_result=stage_1_result,
                 stage_1_5_result={},
                 pdf_path="/tmp/test.pdf",
+                pdf_facts=PDF_FACTS,
             )
 
         assert result["extraction_source"] == "ZUGFERD_NATIVE"
@@ -122,13 +129,14 @@ class TestZugferdStage05NativeInjection:
 
         stage_1_result = {"detected_entities": [{"type_tags": ["INVOICE"]}]}
 
-        with patch("core.utils.zugferd_extractor.ZugferdExtractor.extract_from_pdf",
+        with patch("core.utils.zugferd_extractor.ZugferdExtractor.extract_from_xml",
                    return_value=zugferd_data):
             result = proc.run_stage_2(
                 raw_ocr_pages=["Rechnung"],
                 stage_1_result=stage_1_result,
                 stage_1_5_result={},
                 pdf_path="/tmp/test.pdf",
+                pdf_facts=PDF_FACTS,
             )
 
         assert result["ai_confidence"] == 1.0
@@ -140,13 +148,14 @@ class TestZugferdStage05NativeInjection:
 
         stage_1_result = {"detected_entities": [{"type_tags": ["INVOICE"]}]}
 
-        with patch("core.utils.zugferd_extractor.ZugferdExtractor.extract_from_pdf",
+        with patch("core.utils.zugferd_extractor.ZugferdExtractor.extract_from_xml",
                    return_value=zugferd_data):
             result = proc.run_stage_2(
                 raw_ocr_pages=["Rechnung"],
                 stage_1_result=stage_1_result,
                 stage_1_5_result={},
                 pdf_path="/tmp/test.pdf",
+                pdf_facts=PDF_FACTS,
             )
 
         finance = result.get("bodies", {}).get("finance_body", {})
@@ -160,13 +169,14 @@ class TestZugferdStage05NativeInjection:
 
         stage_1_result = {"type_tags": ["INVOICE"], "detected_entities": [{"type_tags": ["INVOICE"]}]}
 
-        with patch("core.utils.zugferd_extractor.ZugferdExtractor.extract_from_pdf",
+        with patch("core.utils.zugferd_extractor.ZugferdExtractor.extract_from_xml",
                    return_value=zugferd_data):
             result = proc.run_stage_2(
                 raw_ocr_pages=["Rechnung"],
                 stage_1_result=stage_1_result,
                 stage_1_5_result={},
                 pdf_path="/tmp/test.pdf",
+                pdf_facts=PDF_FACTS,
             )
 
         assert "INVOICE" in result.get("type_tags", [])
@@ -178,13 +188,14 @@ class TestZugferdStage05NativeInjection:
 
         stage_1_result = {"detected_entities": [{"type_tags": ["INVOICE"]}]}
 
-        with patch("core.utils.zugferd_extractor.ZugferdExtractor.extract_from_pdf",
+        with patch("core.utils.zugferd_extractor.ZugferdExtractor.extract_from_xml",
                    return_value=zugferd_data):
             result = proc.run_stage_2(
                 raw_ocr_pages=["Rechnung"],
                 stage_1_result=stage_1_result,
                 stage_1_5_result={},
                 pdf_path="/tmp/test.pdf",
+                pdf_facts=PDF_FACTS,
             )
 
         sender = result.get("meta_header", {}).get("sender", {})
@@ -198,13 +209,14 @@ class TestZugferdStage05NativeInjection:
 
         stage_1_result = {"detected_entities": [{"type_tags": [eligible_type]}]}
 
-        with patch("core.utils.zugferd_extractor.ZugferdExtractor.extract_from_pdf",
+        with patch("core.utils.zugferd_extractor.ZugferdExtractor.extract_from_xml",
                    return_value=zugferd_data):
             proc.run_stage_2(
                 raw_ocr_pages=["text"],
                 stage_1_result=stage_1_result,
                 stage_1_5_result={},
                 pdf_path="/tmp/test.pdf",
+                pdf_facts=PDF_FACTS,
             )
 
         proc.client.generate_json.assert_not_called()
@@ -228,13 +240,14 @@ class TestZugferdStage05Fallback:
 
         stage_1_result = {"detected_entities": [{"type_tags": ["INVOICE"]}]}
 
-        with patch("core.utils.zugferd_extractor.ZugferdExtractor.extract_from_pdf",
+        with patch("core.utils.zugferd_extractor.ZugferdExtractor.extract_from_xml",
                    return_value=None):
             proc.run_stage_2(
                 raw_ocr_pages=["Rechnung"],
                 stage_1_result=stage_1_result,
                 stage_1_5_result={},
                 pdf_path="/tmp/test.pdf",
+                pdf_facts=PDF_FACTS,
             )
 
         proc.client.generate_json.assert_called_once()
@@ -252,19 +265,20 @@ class TestZugferdStage05Fallback:
         stage_1_result = {"detected_entities": [{"type_tags": ["CONTRACT"]}]}
         zugferd_data = _make_zugferd_data()
 
-        with patch("core.utils.zugferd_extractor.ZugferdExtractor.extract_from_pdf",
+        with patch("core.utils.zugferd_extractor.ZugferdExtractor.extract_from_xml",
                    return_value=zugferd_data):
             proc.run_stage_2(
                 raw_ocr_pages=["Vertrag"],
                 stage_1_result=stage_1_result,
                 stage_1_5_result={},
                 pdf_path="/tmp/test.pdf",
+                pdf_facts=PDF_FACTS,
             )
 
         proc.client.generate_json.assert_called_once()
 
-    def test_no_zugferd_without_pdf_path(self):
-        """Without pdf_path, ZUGFeRD detection is skipped and AI runs normally."""
+    def test_no_zugferd_without_pdf_facts(self):
+        """Without pdf_facts, ZUGFeRD detection is skipped and AI runs normally."""
         proc = _make_stage2_processor()
         proc.client.generate_json.return_value = {
             "meta_header": {},